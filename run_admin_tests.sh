@@ -41,7 +41,7 @@ if [ $? -eq 0 ]; then
     echo "✅ AI Service is running at http://localhost:8000"
 else
     echo "❌ AI Service is not running!"
-    echo "   Please start the server with: python -m uvicorn src.app:create_app --host 0.0.0.0 --port 8000"
+    echo "   Please start the server with: python -m uvicorn src.app:create_app --factory --host 0.0.0.0 --port 8000"
     echo "   Or run: python src/app.py"
     exit 1
 fi
@@ -0,0 +1,90 @@
+"""
+Backfill / consistency check for StudyHub progress counters
+(src/services/studyhub_progress_counters.py)
+
+Recomputes, per subject, the cached content totals (studyhub_modules.total_contents,
+studyhub_subjects.metadata.total_contents) and every learner's completion counters
+(studyhub_progress_counters) from studyhub_learning_progress, and reports or fixes
+mismatches. Safe to run while serving; counters missing at read time are seeded
+on demand anyway.
+
+Usage:
+    python scripts/backfill_studyhub_progress_counters.py --check       # report only
+    python scripts/backfill_studyhub_progress_counters.py               # backfill + fix
+    python scripts/backfill_studyhub_progress_counters.py --subject-id 65f0...
+"""
+
+import argparse
+import os
+import sys
+
+from bson import ObjectId
+from dotenv import load_dotenv
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+env_var = os.getenv("ENVIRONMENT", os.getenv("ENV", "production"))
+env_file = "development.env" if env_var == "development" else ".env"
+load_dotenv(env_file)
+
+from src.database.db_manager import DBManager
+from src.services.studyhub_progress_counters import (
+    COUNTERS_COLLECTION,
+    StudyHubProgressCounters,
+)
+
+
+def run(check_only: bool, subject_id: str = None) -> int:
+    db = DBManager().db
+    counters = StudyHubProgressCounters(db)
+
+    db[COUNTERS_COLLECTION].create_index(
+        [("user_id", 1), ("subject_id", 1)], unique=True
+    )
+    db[COUNTERS_COLLECTION].create_index("subject_id")
+
+    query = {"deleted_at": None}
+    if subject_id:
+        query["_id"] = ObjectId(subject_id)
+    subject_ids = [s["_id"] for s in db.studyhub_subjects.find(query, {"_id": 1})]
+    print(f"🔍 {len(subject_ids)} subjects to {'check' if check_only else 'backfill'}")
+
+    learners = counter_mismatches = total_mismatches = error_count = 0
+    for i, sid in enumerate(subject_ids, 1):
+        try:
+            stats = counters.rebuild_subject(sid, fix=not check_only)
+            learners += stats["learners"]
+            counter_mismatches += stats["counter_mismatches"]
+            total_mismatches += stats["total_mismatches"]
+            if stats["counter_mismatches"] or stats["total_mismatches"]:
+                print(
+                    f"   ⚠️ {sid}: {stats['counter_mismatches']} learner counters, "
+                    f"{stats['total_mismatches']} totals differ"
+                )
+        except Exception as e:
+            error_count += 1
+            print(f"   ❌ Error on subject {sid}: {e}")
+        if i % 200 == 0:
+            print(f"   ✅ Processed {i} subjects...")
+
+    print("\n" + "=" * 60)
+    print(f"📊 {'Check' if check_only else 'Backfill'} Summary:")
+    print(f"   👥 Learners:                {learners}")
+    print(f"   🔢 Learner counter diffs:   {counter_mismatches}")
+    print(f"   📚 Content total diffs:     {total_mismatches}")
+    print(f"   ❌ Errors:                  {error_count}")
+    if check_only and (counter_mismatches or total_mismatches):
+        print("   💡 Run without --check to fix")
+    print("=" * 60 + "\n")
+    return 1 if check_only and (counter_mismatches or total_mismatches) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StudyHub progress counters")
+    parser.add_argument("--check", action="store_true", help="Only report mismatches")
+    parser.add_argument("--subject-id", help="Limit to one subject")
+    args = parser.parse_args()
+
+    sys.exit(run(check_only=args.check, subject_id=args.subject_id))
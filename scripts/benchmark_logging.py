@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark: logging cost per chat request on the calling (event loop) thread
+
+Replays the log calls of one chat turn's company-data search (8 RAG chunks)
+and one test submission (40 answers):
+
+1. previous  — f-string records, one line per field, synchronous StreamHandler
+2. queue     — same records through the non-blocking QueueHandler (the listener
+               thread writes them)
+3. hot       — queue + rate-limited hot logger with lazy %-args, as the code
+               now logs per-chunk / per-answer detail
+
+--write-latency-us simulates a slow stdout (container log driver, full pipe);
+the synchronous handler pays it on the request thread, the queue does not.
+
+Usage:
+    python scripts/benchmark_logging.py
+    python scripts/benchmark_logging.py --requests 2000 --write-latency-us 20 --format json
+"""
+
+import argparse
+import io
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import logger as log_utils
+from src.utils.logger import RateLimitFilter, lazy
+
+CHUNKS = [
+    {
+        "chunk_id": f"chunk_{i}",
+        "file_id": f"file_{i % 3}",
+        "data_type": "faq",
+        "score": 0.9 - i * 0.05,
+        "content_for_rag": "Nội dung tài liệu công ty về sản phẩm và dịch vụ. " * 20,
+    }
+    for i in range(8)
+]
+ANSWERS = [
+    {"question_id": f"q{i}", "question_type": "mcq", "selected_answer_keys": ["A", "C"]}
+    if i % 4
+    else {"question_id": f"q{i}", "question_type": "essay", "essay_answer": "x" * 800}
+    for i in range(40)
+]
+
+
+class SlowSink(io.TextIOBase):
+    """Discards output after an optional per-write delay"""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def write(self, s):
+        if self.latency_s:
+            end = time.perf_counter() + self.latency_s
+            while time.perf_counter() < end:
+                pass
+        return len(s)
+
+
+def request_previous(logger):
+    for i, item in enumerate(CHUNKS):
+        content = item["content_for_rag"]
+        logger.info(f"   📄 Chunk {i+1}:")
+        logger.info(f"      ID: {item['chunk_id']}")
+        logger.info(f"      File: {item['file_id']}")
+        logger.info(f"      Type: {item['data_type']}")
+        logger.info(f"      Score: {item['score']:.3f}")
+        logger.info(f"      Content length: {len(content)} chars")
+        logger.info(f"      Content preview: {content[:200]}...")
+    logger.info(f"   📋 User answers payload:")
+    for idx, ans in enumerate(ANSWERS, 1):
+        if ans["question_type"] == "mcq":
+            logger.info(f"      {idx}. Q{ans['question_id']} (MCQ): {ans['selected_answer_keys']}")
+        else:
+            logger.info(f"      {idx}. Q{ans['question_id']} (Essay): {len(ans['essay_answer'])} chars")
+
+
+def request_hot(logger, hot_logger):
+    for i, item in enumerate(CHUNKS):
+        content = item["content_for_rag"]
+        hot_logger.info(
+            "   📄 Chunk %d: id=%s file=%s type=%s score=%.3f len=%d | %s",
+            i + 1,
+            item["chunk_id"],
+            item["file_id"],
+            item["data_type"],
+            item["score"],
+            len(content),
+            lazy(lambda c=content: c[:200]),
+        )
+    hot_logger.info(
+        "   📋 User answers payload: %s",
+        lazy(lambda: "; ".join(f"Q{a['question_id']}" for a in ANSWERS)),
+    )
+    logger.info("✅ [COMPANY_DATA] RAG items: %d", len(CHUNKS))
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def run(label, fn, requests, stop=None):
+    start = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    elapsed = time.perf_counter() - start
+    if stop:
+        stop()
+    print(f"{label:<10} {elapsed / requests * 1e6:>10.1f}µs/request")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request logging cost")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--write-latency-us", type=float, default=0.0)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    args = parser.parse_args()
+
+    formatter = (
+        log_utils.JsonFormatter()
+        if args.format == "json"
+        else logging.Formatter(log_utils.TEXT_FORMAT)
+    )
+    sink = SlowSink(args.write_latency_us / 1e6)
+
+    def stream_handler():
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(formatter)
+        return handler
+
+    def queued(name):
+        log_queue = queue.Queue(maxsize=1_000_000)
+        listener = logging.handlers.QueueListener(log_queue, stream_handler())
+        listener.start()
+        return make_logger(name, log_utils._NonBlockingQueueHandler(log_queue)), listener
+
+    print(
+        f"\n{args.requests} requests, {args.format} format, "
+        f"{args.write_latency_us:.0f}µs per write\n"
+    )
+
+    sync_logger = make_logger("previous", stream_handler())
+    old = run("previous", lambda: request_previous(sync_logger), args.requests)
+
+    queue_logger, listener = queued("queue")
+    new = run("queue", lambda: request_previous(queue_logger), args.requests, listener.stop)
+
+    hot_base, hot_listener = queued("hot")
+    hot_logger = make_logger("hot.hot", hot_base.handlers[0])
+    hot_logger.addFilter(RateLimitFilter(log_utils.LOG_HOT_RATE, log_utils.LOG_HOT_BURST))
+    hot = run(
+        "hot",
+        lambda: request_hot(hot_base, hot_logger),
+        args.requests,
+        hot_listener.stop,
+    )
+
+    print(f"\n⚡ queue {old / new:.1f}x, hot {old / hot:.1f}x faster than previous\n")
+
+
+if __name__ == "__main__":
+    main()
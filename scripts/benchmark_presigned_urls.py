@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: presigned URLs for a 1,000-item listing
+
+Compares the old per-request pattern (new boto3 client + inline signing inside the
+async handler) with R2UrlService (shared client, one off-loop signing batch, URL
+cache). Also reports the worst event-loop stall while each variant runs, which is
+what other requests on the same worker feel.
+
+Presigning is local HMAC work, so no network access is needed; dummy credentials
+are used unless R2_* variables are set.
+
+Usage:
+    python scripts/benchmark_presigned_urls.py
+    python scripts/benchmark_presigned_urls.py --items 1000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from botocore.client import Config
+
+from src.services.r2_url_service import R2UrlService
+
+ENDPOINT = os.getenv("R2_ENDPOINT", "https://account.r2.cloudflarestorage.com")
+BUCKET = os.getenv("R2_BUCKET_NAME", "wordai-documents")
+
+
+def new_client():
+    return boto3.client(
+        "s3",
+        endpoint_url=ENDPOINT,
+        aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID", "benchmark"),
+        aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY", "benchmark-secret"),
+        config=Config(signature_version="s3v4"),
+        region_name="auto",
+    )
+
+
+async def measure(fn, repeat: int):
+    """Best wall time over `repeat` runs, plus the worst event-loop stall seen"""
+    stall = 0.0
+    running = True
+
+    async def ticker():
+        nonlocal stall
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - start - 0.001)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    running = False
+    await tick
+    return best, stall
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Presigned URL benchmark")
+    parser.add_argument("--items", type=int, default=1000, help="Listing size")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    keys = [f"files/user_bench/library/{i:05d}_document.pdf" for i in range(args.items)]
+    shared_client = new_client()
+
+    async def legacy():
+        # Old handlers: get_r2_client() per request, sign inline on the event loop
+        client = new_client()
+        for key in keys:
+            client.generate_presigned_url(
+                "get_object", Params={"Bucket": BUCKET, "Key": key}, ExpiresIn=3600
+            )
+
+    async def shared_inline():
+        for key in keys:
+            shared_client.generate_presigned_url(
+                "get_object", Params={"Bucket": BUCKET, "Key": key}, ExpiresIn=3600
+            )
+
+    cold_service = R2UrlService(s3_client=shared_client, bucket=BUCKET)
+
+    async def service_cold():
+        cold_service.clear()
+        await cold_service.presign_many(keys, scope="user_bench")
+
+    warm_service = R2UrlService(s3_client=shared_client, bucket=BUCKET)
+    await warm_service.presign_many(keys, scope="user_bench")
+
+    async def service_warm():
+        await warm_service.presign_many(keys, scope="user_bench")
+
+    print(f"📦 Listing of {args.items} objects, best of {args.repeat}")
+    results = {}
+    for name, fn in (
+        ("legacy (client per request, inline)", legacy),
+        ("shared client, inline", shared_inline),
+        ("R2UrlService cold (batch off-loop)", service_cold),
+        ("R2UrlService warm (cached)", service_warm),
+    ):
+        elapsed, stall = await measure(fn, args.repeat)
+        results[name] = elapsed
+        print(
+            f"⏱️  {name:<40} {elapsed * 1000:8.1f} ms "
+            f"({elapsed / args.items * 1e6:6.1f} µs/url)  max loop stall {stall * 1000:7.1f} ms"
+        )
+
+    baseline = results["legacy (client per request, inline)"]
+    warm = results["R2UrlService warm (cached)"]
+    if warm > 0:
+        print(f"🚀 Warm cache speedup vs legacy: {baseline / warm:.1f}x")
+    print(f"📊 Cache stats: {warm_service.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: phoneme alignment and reference phonemization
+
+1. Alignment — the previous pure-Python Levenshtein (list-of-lists DP) against the
+   NumPy row-vectorized table in pronunciation_service._align. Every case is also
+   checked for identical backtrace output.
+2. Reference phonemes — eng_to_ipa per word on every request (previous) against
+   the cached _text_to_phoneme_tokens (LRU hit path).
+
+No models are needed. Redis is not required (the cache falls back to the LRU).
+
+Usage:
+    python scripts/benchmark_pronunciation_alignment.py
+    python scripts/benchmark_pronunciation_alignment.py --lengths 10 50 200 500 --repeat 20
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import pronunciation_service as ps
+
+PHONEMES = "p b t d k ɡ f v θ ð s z ʃ ʒ h m n ŋ l ɹ w j i ɪ e ɛ æ ə ʌ ɑ ɔ ʊ u aɪ aʊ eɪ oʊ ɔɪ tʃ dʒ".split()
+SENTENCES = [
+    "the quick brown fox jumps over the lazy dog",
+    "could you tell me the way to the nearest train station",
+    "I would like to order a cup of coffee please",
+    "she sells sea shells by the sea shore",
+    "practice makes perfect when you learn a new language",
+]
+
+
+def align_previous(ref, hyp):
+    """Previous implementation (pure-Python DP table), kept for comparison"""
+    n, m = len(ref), len(hyp)
+    dp = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(n + 1):
+        dp[i][0] = i
+    for j in range(m + 1):
+        dp[0][j] = j
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if ref[i - 1] == hyp[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1]
+            else:
+                dp[i][j] = 1 + min(dp[i - 1][j - 1], dp[i - 1][j], dp[i][j - 1])
+    pairs = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and ref[i - 1] == hyp[j - 1] and dp[i][j] == dp[i - 1][j - 1]:
+            pairs.append({"expected": ref[i - 1], "actual": hyp[j - 1], "correct": True})
+            i -= 1
+            j -= 1
+        elif i > 0 and j > 0 and dp[i][j] == dp[i - 1][j - 1] + 1:
+            pairs.append({"expected": ref[i - 1], "actual": hyp[j - 1], "correct": False})
+            i -= 1
+            j -= 1
+        elif i > 0 and dp[i][j] == dp[i - 1][j] + 1:
+            pairs.append({"expected": ref[i - 1], "actual": None, "correct": False})
+            i -= 1
+        else:
+            pairs.append({"expected": None, "actual": hyp[j - 1], "correct": False})
+            j -= 1
+    pairs.reverse()
+    return pairs
+
+
+def phonemize_previous(text):
+    """Previous implementation: eng_to_ipa for every word on every request"""
+    import eng_to_ipa as ipa
+
+    all_tokens, word_details = [], []
+    for word in text.lower().split():
+        word_clean = re.sub(r"[^a-z'-]", "", word)
+        ipa_raw = ipa.convert(word_clean)
+        tokens = list(word_clean) if "*" in ipa_raw else ps._tokenize_ipa(ipa_raw)
+        tokens = [ps._normalize_phoneme(t) for t in tokens if t]
+        word_details.append((word_clean, tokens))
+        all_tokens.extend(tokens)
+    return all_tokens, word_details
+
+
+def noisy_copy(rng, ref, error_rate):
+    """Simulated recognition: substitutions, deletions and insertions"""
+    hyp = []
+    for p in ref:
+        r = rng.random()
+        if r < error_rate / 3:
+            continue
+        if r < 2 * error_rate / 3:
+            hyp.append(rng.choice(PHONEMES))
+        else:
+            hyp.append(p)
+        if rng.random() < error_rate / 3:
+            hyp.append(rng.choice(PHONEMES))
+    return hyp
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pronunciation alignment benchmark")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--cases", type=int, default=200, help="Equivalence checks")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    # Equivalence
+    for _ in range(args.cases):
+        ref = [rng.choice(PHONEMES[:8]) for _ in range(rng.randint(0, 40))]
+        hyp = noisy_copy(rng, ref, rng.choice([0.0, 0.2, 0.6]))
+        assert ps._align(ref, hyp) == align_previous(ref, hyp), (ref, hyp)
+    print(f"\n✅ Identical alignments on {args.cases} random cases\n")
+
+    print(f"{'phonemes':>9} {'previous':>12} {'numpy':>12} {'speedup':>9}")
+    for n in args.lengths:
+        ref = [rng.choice(PHONEMES) for _ in range(n)]
+        hyp = noisy_copy(rng, ref, 0.2)
+        assert ps._align(ref, hyp) == align_previous(ref, hyp)
+        old = timed(lambda: align_previous(ref, hyp), args.repeat)
+        new = timed(lambda: ps._align(ref, hyp), args.repeat)
+        print(f"{n:>9} {old * 1000:>10.2f}ms {new * 1000:>10.2f}ms {old / new:>8.1f}x")
+
+    try:
+        import eng_to_ipa  # noqa: F401
+    except ImportError:
+        print("\n⚠️ eng_to_ipa not installed - skipping phonemization benchmark\n")
+        return
+
+    for text in SENTENCES:
+        assert ps._text_to_phoneme_tokens(text) == phonemize_previous(text), text
+    old = timed(lambda: [phonemize_previous(t) for t in SENTENCES], args.repeat)
+    new = timed(lambda: [ps._text_to_phoneme_tokens(t) for t in SENTENCES], args.repeat)
+    per = len(SENTENCES)
+    print(
+        f"\n📖 Reference phonemes per sentence: previous {old / per * 1000:.2f}ms, "
+        f"cached {new / per * 1000:.3f}ms ({old / new:.0f}x)\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
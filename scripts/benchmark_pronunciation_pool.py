@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pronunciation scoring throughput on CPU
+
+Compares the old pattern (score_pronunciation called inline in the async handler,
+one request at a time on the event loop) with PronunciationInferencePool at
+different worker / batch settings. Reports requests/second, the worst event-loop
+stall while each variant runs, and per-stage p50/p95 from the pool.
+
+Models are downloaded on first use (~450 MB). Without --audio, synthetic 2-4 s
+clips are generated (scores are meaningless, timings are representative).
+
+Usage:
+    python scripts/benchmark_pronunciation_pool.py
+    python scripts/benchmark_pronunciation_pool.py --requests 64 --concurrency 16
+    python scripts/benchmark_pronunciation_pool.py --audio sample.webm --text "hello world"
+    python scripts/benchmark_pronunciation_pool.py --workers 2 --batch 1 8
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.services.pronunciation_inference import PronunciationInferencePool
+
+SAMPLE_TEXT = "the quick brown fox jumps over the lazy dog"
+
+
+def synthetic_clip(seconds: float, seed: int) -> bytes:
+    """16 kHz mono WAV with voiced-like harmonics and noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(16000 * seconds)) / 16000
+    f0 = 110 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    signal = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+    signal = 0.3 * signal / np.max(np.abs(signal)) + 0.02 * rng.standard_normal(len(t))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+class StallMeter:
+    """Worst event-loop stall while active (what other requests would feel)"""
+
+    def __init__(self):
+        self.stall = 0.0
+        self._running = False
+        self._task = None
+
+    async def _tick(self):
+        while self._running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            self.stall = max(self.stall, time.perf_counter() - start - 0.005)
+
+    async def __aenter__(self):
+        self._running = True
+        self._task = asyncio.create_task(self._tick())
+        await asyncio.sleep(0.01)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._running = False
+        await self._task
+
+
+async def bench_inline(clips, text):
+    from src.services.pronunciation_service import preload_models, score_pronunciation
+
+    preload_models()
+    score_pronunciation(clips[0], text)  # warm caches
+
+    async def handler(clip):
+        return score_pronunciation(clip, text)  # old route: blocking call in handler
+
+    async with StallMeter() as meter:
+        start = time.perf_counter()
+        await asyncio.gather(*(handler(c) for c in clips))
+        elapsed = time.perf_counter() - start
+    return elapsed, meter.stall, None
+
+
+async def bench_pool(clips, text, workers, batch, window_ms, concurrency):
+    pool = PronunciationInferencePool(
+        workers=workers,
+        max_batch=batch,
+        batch_window_ms=window_ms,
+        max_pending=len(clips) + 1,
+    )
+    pool.start(preload=True)
+    await asyncio.gather(*(pool.score(clips[0], text) for _ in range(workers)))
+    pool.reset_stats()  # exclude warm-up requests
+
+    limit = asyncio.Semaphore(concurrency)
+
+    async def client(clip):
+        async with limit:
+            return await pool.score(clip, text)
+
+    async with StallMeter() as meter:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(c) for c in clips))
+        elapsed = time.perf_counter() - start
+    stats = pool.stats()
+    await pool.shutdown()
+    return elapsed, meter.stall, stats
+
+
+def report(label, n, elapsed, stall, stats):
+    print(
+        f"{label:<34} {n / elapsed:7.2f} req/s   "
+        f"{elapsed:7.1f}s total   worst loop stall {stall * 1000:8.0f} ms"
+    )
+    if stats:
+        stages = "  ".join(
+            f"{stage} {v['p50']}/{v['p95']}"
+            for stage, v in stats["stages_ms"].items()
+            if v["p50"] is not None
+        )
+        print(f"{'':<34} avg batch {stats['avg_batch_size']}  p50/p95 ms: {stages}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Pronunciation inference benchmark")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per variant")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--workers", type=int, default=1, help="Pool processes")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8], help="Max batch sizes")
+    parser.add_argument("--window-ms", type=float, default=25, help="Batch window")
+    parser.add_argument("--audio", help="Audio file to score (default: synthetic clips)")
+    parser.add_argument("--text", default=SAMPLE_TEXT, help="Expected text")
+    parser.add_argument("--skip-inline", action="store_true", help="Skip the old pattern")
+    args = parser.parse_args()
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            clips = [f.read()] * args.requests
+    else:
+        rnd = random.Random(0)
+        clips = [synthetic_clip(rnd.uniform(2, 4), i) for i in range(args.requests)]
+
+    print(
+        f"\n🎙️ {args.requests} score requests, {args.concurrency} concurrent clients, "
+        f"{os.cpu_count()} CPUs\n"
+    )
+    if not args.skip_inline:
+        elapsed, stall, _ = await bench_inline(clips, args.text)
+        report("inline in handler (old)", len(clips), elapsed, stall, None)
+
+    for batch in args.batch:
+        elapsed, stall, stats = await bench_pool(
+            clips, args.text, args.workers, batch, args.window_ms, args.concurrency
+        )
+        report(
+            f"pool workers={args.workers} batch<={batch}",
+            len(clips),
+            elapsed,
+            stall,
+            stats,
+        )
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
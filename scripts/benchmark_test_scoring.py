@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark + equality check: compiled answer-key scoring vs ielts_scoring.score_question
+
+Replays recorded submissions (test_submissions joined with online_tests) through both
+scorers, fails if any (is_correct, points, feedback) differs, and reports timings.
+
+Usage:
+    # Replay the latest 500 submissions from MongoDB
+    python scripts/benchmark_test_scoring.py --limit 500
+
+    # Replay an exported JSONL file: {"test": {...test doc...}, "user_answers": [...]}
+    python scripts/benchmark_test_scoring.py --file submissions.jsonl
+
+    # Synthetic tests (no database needed)
+    python scripts/benchmark_test_scoring.py --synthetic 200 --questions 40
+
+The speedup depends on the workload and is noisy between runs: synthetic runs
+(--synthetic 2000 --questions 40) measured between ~1.1x and ~1.9x, and a review
+run measured ~1.12x. Treat it as a modest gain; replay real submissions
+(--limit / --file) before quoting a number.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.ielts_scoring import score_question
+from src.services.test_scoring_engine import (
+    CompiledAnswerKey,
+    build_user_answers_map,
+    get_compiled_answer_key,
+)
+
+
+def load_from_mongodb(limit: int):
+    """Latest submissions with their test documents"""
+    from src.services.online_test_utils import get_mongodb_service
+    from bson import ObjectId
+
+    db = get_mongodb_service().db
+    tests = {}
+    records = []
+    for submission in (
+        db["test_submissions"].find({}, {"test_id": 1, "user_answers": 1})
+        .sort("submitted_at", -1)
+        .limit(limit)
+    ):
+        test_id = submission.get("test_id")
+        if test_id not in tests:
+            try:
+                tests[test_id] = db["online_tests"].find_one({"_id": ObjectId(test_id)})
+            except Exception:
+                tests[test_id] = None
+        if tests[test_id]:
+            records.append((test_id, tests[test_id], submission.get("user_answers", [])))
+    return records
+
+
+def load_from_file(path: str):
+    records = []
+    with open(path) as f:
+        for i, line in enumerate(f):
+            if line.strip():
+                item = json.loads(line)
+                test = item["test"]
+                records.append((str(test.get("_id", i)), test, item["user_answers"]))
+    return records
+
+
+def _synthetic_question(qid: str, rng: random.Random):
+    keys = ["A", "B", "C", "D"]
+    variants = ["Blue car", "the blue  car", "BLUE CAR", "red", "Red Bus", "42"]
+    q_type = rng.choice(
+        ["mcq", "matching", "map_labeling", "completion", "sentence_completion",
+         "short_answer", "true_false_multiple", "essay"]
+    )
+    question = {"question_id": qid, "question_type": q_type, "question_text": qid}
+    answer = {"question_id": qid, "question_type": q_type}
+
+    if q_type == "mcq":
+        question["correct_answer_keys"] = rng.sample(keys, rng.randint(1, 2))
+        answer["selected_answer_keys"] = rng.sample(keys, rng.randint(0, 2))
+    elif q_type in ("matching", "map_labeling"):
+        items = [str(i) for i in range(1, rng.randint(2, 6))]
+        if q_type == "matching":
+            question["correct_answers"] = [{"left_key": k, "right_key": rng.choice(keys)} for k in items]
+            answer["matches"] = {k: rng.choice(keys) for k in items if rng.random() < 0.9}
+        else:
+            question["correct_answers"] = [{"label_key": k, "option_key": rng.choice(keys)} for k in items]
+            answer["labels"] = {k: rng.choice(keys) for k in items if rng.random() < 0.9}
+    elif q_type in ("completion", "sentence_completion", "short_answer"):
+        blanks = [str(i) for i in range(1, rng.randint(2, 5))]
+        accepted = {k: rng.sample(variants, 2) for k in blanks}
+        if q_type == "completion":
+            question["correct_answers"] = [{"blank_key": k, "answers": v} for k, v in accepted.items()]
+        else:
+            field = "sentences" if q_type == "sentence_completion" else "questions"
+            question[field] = [{"key": k, "correct_answers": v} for k, v in accepted.items()]
+        question["case_sensitive"] = rng.random() < 0.2
+        answer["answers"] = {k: rng.choice(variants) for k in blanks if rng.random() < 0.9}
+    elif q_type == "true_false_multiple":
+        options = ["a", "b", "c", "d"]
+        question["options"] = [{"option_key": k, "option_text": k} for k in options]
+        question["correct_answers"] = rng.sample(options, 2)
+        question["scoring_mode"] = rng.choice(["partial", "all_or_nothing"])
+        question["points"] = rng.randint(1, 4)
+        answer["user_answer"] = {k: rng.random() < 0.5 for k in options}
+    else:
+        answer["essay_answer"] = "essay"
+
+    if rng.random() < 0.5 and q_type not in ("essay", "true_false_multiple"):
+        question["max_points"] = rng.randint(1, 4)
+    return question, answer
+
+
+def build_synthetic(count: int, questions: int, seed: int = 42):
+    rng = random.Random(seed)
+    tests = []
+    for t in range(max(1, count // 10)):
+        pairs = [_synthetic_question(f"q{i}", rng) for i in range(questions)]
+        tests.append(
+            {"_id": f"synthetic-{t}", "updated_at": datetime(2025, 1, 1), "questions": [p[0] for p in pairs]}
+        )
+
+    records = []
+    for i in range(count):
+        test = tests[i % len(tests)]
+        answers = [_synthetic_question(q["question_id"], rng)[1] for q in test["questions"]]
+        # Keep the question types of the test so answers hit the right scorer
+        for q, a in zip(test["questions"], answers):
+            a["question_type"] = q["question_type"]
+        records.append((test["_id"], test, answers))
+    return records
+
+
+def reference_scores(test_doc, user_answers_map):
+    return [
+        score_question(q, user_answers_map.get(q.get("question_id"), {}))
+        for q in test_doc.get("questions", [])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled scoring benchmark")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--limit", type=int, help="Replay N latest submissions from MongoDB")
+    source.add_argument("--file", help="Replay a JSONL export")
+    source.add_argument("--synthetic", type=int, help="Generate N synthetic submissions")
+    parser.add_argument("--questions", type=int, default=40, help="Questions per synthetic test")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    if args.limit:
+        records = load_from_mongodb(args.limit)
+    elif args.file:
+        records = load_from_file(args.file)
+    else:
+        records = build_synthetic(args.synthetic, args.questions)
+
+    print(f"📦 Loaded {len(records)} submissions")
+    prepared = [(tid, test, build_user_answers_map(ans)) for tid, test, ans in records]
+
+    # ---- Equality ----
+    mismatches = 0
+    for test_id, test_doc, answers_map in prepared:
+        expected = reference_scores(test_doc, answers_map)
+        actual = CompiledAnswerKey(test_doc.get("questions", [])).score_submission(answers_map)
+        for q, exp, act in zip(test_doc.get("questions", []), expected, actual):
+            if exp != act:
+                mismatches += 1
+                if mismatches <= 20:
+                    print(f"❌ {test_id} {q.get('question_id')}: reference={exp} compiled={act}")
+
+    # ---- Timing ----
+    def run_reference():
+        for _, test_doc, answers_map in prepared:
+            reference_scores(test_doc, answers_map)
+
+    def run_compiled():
+        for test_id, test_doc, answers_map in prepared:
+            get_compiled_answer_key(str(test_id), test_doc).score_submission(answers_map)
+
+    timings = {}
+    for name, fn in (("reference", run_reference), ("compiled", run_compiled)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+
+    per_submission = {k: v / max(1, len(prepared)) * 1e6 for k, v in timings.items()}
+    print(f"⏱️  reference: {timings['reference']:.4f}s ({per_submission['reference']:.1f} µs/submission)")
+    print(f"⏱️  compiled:  {timings['compiled']:.4f}s ({per_submission['compiled']:.1f} µs/submission)")
+    if timings["compiled"] > 0:
+        print(f"🚀 Speedup: {timings['reference'] / timings['compiled']:.2f}x")
+
+    if mismatches:
+        print(f"❌ {mismatches} mismatching question scores")
+        sys.exit(1)
+    print("✅ Compiled scores identical to score_question")
+
+
+if __name__ == "__main__":
+    main()
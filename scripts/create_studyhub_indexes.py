@@ -187,6 +187,25 @@ def create_studyhub_indexes():
     progress.create_index("updated_at")
     print("✅ Created index: updated_at")
 
+    # Content / module removal (progress counter maintenance)
+    progress.create_index([("content_id", 1), ("status", 1)])
+    print("✅ Created compound index: content_id + status")
+    progress.create_index([("module_id", 1), ("status", 1)])
+    print("✅ Created compound index: module_id + status")
+
+    # ==================== PROGRESS COUNTERS COLLECTION ====================
+    print("\n🔢 Creating indexes for studyhub_progress_counters...")
+
+    progress_counters = db["studyhub_progress_counters"]
+
+    # One counter document per learner and subject
+    progress_counters.create_index([("user_id", 1), ("subject_id", 1)], unique=True)
+    print("✅ Created unique compound index: user_id + subject_id")
+
+    # Learner pages and content removal
+    progress_counters.create_index("subject_id")
+    print("✅ Created index: subject_id")
+
     # ==================== SUBJECT PRICING COLLECTION (Phase 2) ====================
     print("\n💰 Creating indexes for studyhub_subject_pricing (Phase 2)...")
 
@@ -0,0 +1,115 @@
+"""
+Migration: Move embedded conversations.messages arrays into message buckets
+Run once in production (un-migrated conversations are still read through a
+$slice of the legacy array, so this can run while the app is serving)
+
+Usage:
+    python scripts/migrate_conversation_buckets.py --dry-run
+    python scripts/migrate_conversation_buckets.py --yes
+
+This script:
+1. Measures conversation header sizes ($bsonSize) before migration
+2. Moves each header's messages array into conversation_message_buckets
+   (negative sequence numbers, token counts computed once) and $unsets it
+3. Measures header and bucket sizes after migration
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+env_var = os.getenv("ENVIRONMENT", os.getenv("ENV", "production"))
+env_file = "development.env" if env_var == "development" else ".env"
+load_dotenv(env_file)
+
+from src.database.conversation_buckets import BUCKETS_COLLECTION, ConversationBucketStore
+from src.services.online_test_utils import get_mongodb_service
+
+
+def measure(collection, label: str, query=None):
+    """Count / average / max / total BSON size of a collection"""
+    pipeline = [{"$match": query}] if query else []
+    pipeline += [
+        {"$project": {"size": {"$bsonSize": "$$ROOT"}}},
+        {
+            "$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "avg": {"$avg": "$size"},
+                "max": {"$max": "$size"},
+                "total": {"$sum": "$size"},
+            }
+        },
+    ]
+    stats = list(collection.aggregate(pipeline))
+    if not stats:
+        print(f"📏 {label}: empty")
+        return
+    s = stats[0]
+    print(
+        f"📏 {label}: {s['count']} docs, avg {s['avg'] / 1024:.1f} KB, "
+        f"max {s['max'] / 1024:.1f} KB, total {s['total'] / 1_048_576:.1f} MB"
+    )
+
+
+def migrate(dry_run: bool):
+    db = get_mongodb_service().db
+    store = ConversationBucketStore(db)
+
+    # Chat headers only (user_manager conversations are keyed by conversation_id)
+    query = {"primary_key": {"$exists": True}, "messages.0": {"$exists": True}}
+    header_ids = [d["_id"] for d in db.conversations.find(query, {"_id": 1})]
+    print(f"🔍 {len(header_ids)} chat conversations with embedded messages")
+
+    measure(db.conversations, "Headers before", {"primary_key": {"$exists": True}})
+
+    if dry_run:
+        print("\n🧪 Dry run - nothing migrated\n")
+        return
+
+    migrated = 0
+    moved_messages = 0
+    error_count = 0
+    for header_id in header_ids:
+        try:
+            moved_messages += store.migrate_legacy(header_id)
+            migrated += 1
+            if migrated % 500 == 0:
+                print(f"   ✅ Migrated {migrated} conversations...")
+        except Exception as e:
+            error_count += 1
+            print(f"   ❌ Error migrating conversation {header_id}: {e}")
+
+    measure(db.conversations, "Headers after", {"primary_key": {"$exists": True}})
+    measure(db[BUCKETS_COLLECTION], "Buckets")
+
+    print("\n" + "=" * 60)
+    print("📊 Migration Summary:")
+    print(f"   ✅ Migrated: {migrated} conversations ({moved_messages} messages)")
+    print(f"   ❌ Errors:   {error_count} conversations")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move conversations.messages into buckets")
+    parser.add_argument("--dry-run", action="store_true", help="Only measure sizes")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("  MIGRATION: conversations.messages → conversation_message_buckets")
+    print("=" * 60 + "\n")
+
+    if not args.dry_run and not args.yes:
+        confirm = input("⚠️  This will modify all chat conversations. Continue? (yes/no): ")
+        if confirm.lower() != "yes":
+            print("\n❌ Migration cancelled.\n")
+            sys.exit(0)
+
+    migrate(dry_run=args.dry_run)
@@ -0,0 +1,158 @@
+"""
+Migration: Move embedded version_history arrays into the document_versions store
+Run once in production (documents are also migrated lazily on first version access)
+
+Usage:
+    python scripts/migrate_version_history_to_store.py --dry-run
+    python scripts/migrate_version_history_to_store.py --yes
+
+This script:
+1. Measures document sizes ($bsonSize) before migration
+2. Moves each document's version_history into document_versions
+   (keyframes + compressed deltas) and $unsets the embedded array
+3. Measures document sizes and version store size after migration
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+env_var = os.getenv("ENVIRONMENT", os.getenv("ENV", "production"))
+env_file = "development.env" if env_var == "development" else ".env"
+load_dotenv(env_file)
+
+from src.services.online_test_utils import get_mongodb_service
+from src.services.document_manager import DocumentManager
+from src.services.document_version_store import VERSIONS_COLLECTION
+
+
+def measure_documents(db, label: str):
+    """Average / max / total BSON size of slide & doc documents"""
+    stats = list(
+        db.documents.aggregate(
+            [
+                {"$project": {"size": {"$bsonSize": "$$ROOT"}}},
+                {
+                    "$group": {
+                        "_id": None,
+                        "count": {"$sum": 1},
+                        "avg": {"$avg": "$size"},
+                        "max": {"$max": "$size"},
+                        "total": {"$sum": "$size"},
+                    }
+                },
+            ]
+        )
+    )
+    if not stats:
+        print(f"📏 {label}: no documents")
+        return None
+    s = stats[0]
+    print(
+        f"📏 {label}: {s['count']} documents, avg {s['avg'] / 1024:.1f} KB, "
+        f"max {s['max'] / 1024:.1f} KB, total {s['total'] / 1_048_576:.1f} MB"
+    )
+    return s
+
+
+def measure_read(db, document_ids, label: str):
+    """Wall time of find_one for a sample of documents (what every editor load pays)"""
+    if not document_ids:
+        return
+    start = time.perf_counter()
+    for document_id in document_ids:
+        db.documents.find_one({"document_id": document_id})
+    elapsed = (time.perf_counter() - start) / len(document_ids)
+    print(f"⏱️  {label}: find_one avg {elapsed * 1000:.2f} ms over {len(document_ids)} docs")
+
+
+def measure_store(db):
+    stats = list(
+        db[VERSIONS_COLLECTION].aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": "$kind",
+                        "count": {"$sum": 1},
+                        "stored": {"$sum": "$stored_bytes"},
+                        "full": {"$sum": "$full_bytes"},
+                    }
+                }
+            ]
+        )
+    )
+    for s in stats:
+        print(
+            f"📦 Version store {s['_id']}: {s['count']} versions, "
+            f"{s['stored'] / 1_048_576:.1f} MB stored "
+            f"(full snapshots would be {s['full'] / 1_048_576:.1f} MB)"
+        )
+
+
+def migrate(dry_run: bool, sample_size: int):
+    mongo = get_mongodb_service()
+    db = mongo.db
+    doc_manager = DocumentManager(db)
+    doc_manager.version_store.create_indexes()
+
+    query = {"version_history": {"$exists": True}}
+    document_ids = [d["document_id"] for d in db.documents.find(query, {"document_id": 1})]
+    sample = document_ids[:sample_size]
+    print(f"🔍 {len(document_ids)} documents with embedded version_history")
+
+    measure_documents(db, "Before")
+    measure_read(db, sample, "Before")
+
+    if dry_run:
+        print("\n🧪 Dry run - nothing migrated\n")
+        return
+
+    migrated_docs = 0
+    migrated_versions = 0
+    error_count = 0
+    for document_id in document_ids:
+        try:
+            migrated_versions += doc_manager.migrate_embedded_history(document_id)
+            migrated_docs += 1
+            if migrated_docs % 100 == 0:
+                print(f"   ✅ Migrated {migrated_docs} documents...")
+        except Exception as e:
+            error_count += 1
+            print(f"   ❌ Error migrating document {document_id}: {e}")
+
+    measure_documents(db, "After")
+    measure_read(db, sample, "After")
+    measure_store(db)
+
+    print("\n" + "=" * 60)
+    print("📊 Migration Summary:")
+    print(f"   ✅ Migrated: {migrated_docs} documents ({migrated_versions} versions)")
+    print(f"   ❌ Errors:   {error_count} documents")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move version_history to document_versions")
+    parser.add_argument("--dry-run", action="store_true", help="Only measure sizes")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    parser.add_argument("--sample", type=int, default=200, help="Docs timed for read cost")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("  MIGRATION: version_history → document_versions")
+    print("=" * 60 + "\n")
+
+    if not args.dry_run and not args.yes:
+        confirm = input("⚠️  This will modify all documents. Continue? (yes/no): ")
+        if confirm.lower() != "yes":
+            print("\n❌ Migration cancelled.\n")
+            sys.exit(0)
+
+    migrate(dry_run=args.dry_run, sample_size=args.sample)
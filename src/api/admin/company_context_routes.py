@@ -8,6 +8,7 @@ from typing import List
 from src.models.company_context import FAQ, Scenario
 from src.database.company_db_service import get_company_db_service, CompanyDBService
 from src.middleware.auth import verify_internal_api_key
+from src.services.company_prompt_cache import bump_company_version
 
 router = APIRouter(
     prefix="/api/admin/companies/{company_id}/context",
@@ -99,6 +100,7 @@ async def delete_all_faqs(
     try:
         update_data = {"$unset": {"metadata.faqs": ""}}
         result = service.companies.update_one({"company_id": company_id}, update_data)
+        bump_company_version(company_id)
 
         if result.matched_count == 0:
             raise HTTPException(
@@ -199,6 +201,7 @@ async def delete_all_scenarios(
     try:
         update_data = {"$unset": {"metadata.scenarios": ""}}
         result = service.companies.update_one({"company_id": company_id}, update_data)
+        bump_company_version(company_id)
 
         if result.matched_count == 0:
             raise HTTPException(
@@ -283,6 +286,7 @@ async def delete_full_context(
     try:
         update_data = {"$unset": {"metadata.faqs": "", "metadata.scenarios": ""}}
         result = service.companies.update_one({"company_id": company_id}, update_data)
+        bump_company_version(company_id)
 
         if result.matched_count == 0:
             raise HTTPException(
@@ -227,6 +227,7 @@ async def preview_tts_voice(
             pitch=pitch,
             prompt=prompt,
             use_pro_model=use_pro_model,
+            cache_path="audio_preview",
         )
 
         # Upload to R2 in previews folder (temporary)
@@ -350,6 +351,7 @@ async def generate_audio_to_library(
             speaking_rate=effective_rate,
             prompt=prompt,
             use_pro_model=use_pro_model,
+            cache_path="audio_tts",
         )
 
         # Upload to R2
@@ -464,6 +464,7 @@ async def generate_audio_from_text(
                 pitch=pitch,
                 prompt=prompt,
                 use_pro_model=use_pro_model,
+                cache_path="book_chapter_audio",
             )
         else:
             # Use provided text
@@ -478,6 +479,7 @@ async def generate_audio_from_text(
                 pitch=pitch,
                 prompt=prompt,
                 use_pro_model=use_pro_model,
+                cache_path="book_chapter_audio",
             )
 
         # 4. Upload audio to R2 and save to library
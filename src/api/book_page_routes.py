@@ -420,6 +420,7 @@ async def generate_book_audio(
                 language=body.language,
                 version=version,
                 use_pro_model=body.use_pro_model,
+                force_regenerate=body.force_regenerate,
             )
         except Exception as e:
             logger.error(f"Background audio generation failed: {e}", exc_info=True)
@@ -94,11 +94,27 @@ from src.database.db_manager import DBManager
 
 # Constants
 from src.constants.book_categories import PARENT_CATEGORIES, CHILD_CATEGORIES
+from src.utils.pagination import InvalidCursorError, cached_count, keyset_page
 
 logger = logging.getLogger("chatbot")
 
 router = APIRouter(prefix="/api/v1/books", tags=["Online Books"])
 
+# Fields rendered by the "my books" list (never load chapters/content for a list row)
+BOOK_LIST_FIELDS = {
+    "_id": 0,
+    "book_id": 1,
+    "title": 1,
+    "slug": 1,
+    "description": 1,
+    "visibility": 1,
+    "view_count": 1,
+    "updated_at": 1,
+    "created_at": 1,
+    "community_config.is_public": 1,
+    "community_config.published_at": 1,
+}
+
 # Initialize DB connection
 db_manager = DBManager()
 db = db_manager.db
@@ -398,7 +414,10 @@ async def create_book(
 
 @router.get("", response_model=BookListResponse)
 async def list_guides(
-    skip: int = Query(0, ge=0, description="Pagination offset"),
+    skip: int = Query(0, ge=0, description="Pagination offset (deprecated, use cursor)"),
+    cursor: Optional[str] = Query(
+        None, description="pagination.next_cursor of the previous page"
+    ),
     limit: int = Query(20, ge=1, le=100, description="Results per page"),
     visibility: Optional[BookVisibility] = Query(
         None, description="Filter by visibility (public/private/unlisted)"
@@ -424,7 +443,8 @@ async def list_guides(
     **Authentication:** Required
 
     **Query Parameters:**
-    - `skip`: Pagination offset (default: 0)
+    - `skip`: Pagination offset (default: 0) - deprecated, use `cursor`
+    - `cursor`: `pagination.next_cursor` of the previous page (null on the last page)
     - `limit`: Results per page (default: 20, max: 100)
     - `visibility`: Filter by visibility type (public/private/unlisted)
     - `is_published`: Filter by community publish status (true = published to marketplace)
@@ -512,27 +532,49 @@ async def list_guides(
         )
         sort_direction = -1 if sort_order == "desc" else 1
 
-        # Count total with filters
-        total = db.online_books.count_documents(query)
+        # Count total with filters (cached for a short TTL)
+        total = cached_count(db.online_books, query)
 
         # DEBUG: Log query and count
         logger.info(f"🔍 DEBUG MongoDB query: {query}")
         logger.info(f"🔍 DEBUG Found {total} books matching query")
 
         # Get paginated results
-        guides_cursor = (
-            db.online_books.find(query)
-            .sort(sort_field, sort_direction)
-            .skip(skip)
-            .limit(limit)
-        )
+        next_cursor = None
+        if skip and not cursor:
+            # Legacy offset clients
+            books = list(
+                db.online_books.find(query, BOOK_LIST_FIELDS)
+                .sort(sort_field, sort_direction)
+                .skip(skip)
+                .limit(limit)
+            )
+        else:
+            books, next_cursor = keyset_page(
+                db.online_books,
+                query,
+                sort=[(sort_field, sort_direction)],
+                projection=BOOK_LIST_FIELDS,
+                limit=limit,
+                cursor=cursor,
+            )
+
+        # Count chapters for the whole page in one aggregation
+        book_ids = [book.get("book_id") for book in books]
+        chapter_counts = {
+            row["_id"]: row["count"]
+            for row in db.book_chapters.aggregate(
+                [
+                    {"$match": {"book_id": {"$in": book_ids}}},
+                    {"$group": {"_id": "$book_id", "count": {"$sum": 1}}},
+                ]
+            )
+        }
 
         guides = []
-        for book in guides_cursor:
+        for book in books:
             book_id = book.get("book_id")
-
-            # Count chapters dynamically from book_chapters collection
-            chapter_count = db.book_chapters.count_documents({"book_id": book_id})
+            chapter_count = chapter_counts.get(book_id, 0)
 
             guides.append(
                 {
@@ -568,9 +610,12 @@ async def list_guides(
             "pagination": {
                 "skip": skip,
                 "limit": limit,
+                "next_cursor": next_cursor,
             },
         }
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Failed to list books: {e}", exc_info=True)
         raise HTTPException(
@@ -4,7 +4,7 @@ API endpoints for document management with auto-save functionality
 Using asyncio.to_thread to wrap synchronous PyMongo calls
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
@@ -28,6 +28,7 @@ from src.services.user_manager import UserManager
 from src.services.subscription_service import get_subscription_service
 from src.middleware.auth import verify_firebase_token
 from src.database.db_manager import DBManager
+from src.utils.pagination import InvalidCursorError
 
 # Use 'chatbot' logger to match app.py logging configuration
 logger = logging.getLogger("chatbot")
@@ -1099,19 +1100,17 @@ async def get_document(
     doc_manager = get_document_manager()
 
     try:
-        # If version is specified, restore from version_history
+        # If version is specified, restore from the version store
         if version is not None:
-            # Get document to access version_history
             base_doc = await asyncio.to_thread(
                 doc_manager.get_document, document_id, user_id
             )
             if not base_doc:
                 raise HTTPException(status_code=404, detail="Document not found")
 
-            # Find the requested version in version_history
-            version_history = base_doc.get("version_history", [])
-            target_version = next(
-                (v for v in version_history if v.get("version") == version), None
+            # Reconstruct the requested version from the version store
+            target_version = await asyncio.to_thread(
+                doc_manager.get_version_snapshot, document_id, user_id, version
             )
 
             if not target_version:
@@ -1394,7 +1393,6 @@ async def duplicate_document(
             "slide_subtitles": original.get("slide_subtitles", []),
             # Metadata - reset for new copy
             "version": 1,
-            "version_history": [],
             "folder_id": original.get("folder_id"),
             "source_type": original.get("source_type", "created"),
             "file_id": None,  # New copy should not reference original file
@@ -1781,8 +1779,10 @@ async def move_document_to_folder(
 
 @router.get("/", response_model=List[DocumentListItem])
 async def list_documents(
+    response: Response,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
     source_type: Optional[str] = None,
     document_type: Optional[str] = None,
     folder_id: Optional[str] = None,
@@ -1794,7 +1794,8 @@ async def list_documents(
 
     Query Parameters:
     - **limit**: Số lượng documents trả về (default: 20)
-    - **offset**: Vị trí bắt đầu (default: 0)
+    - **offset**: Vị trí bắt đầu (default: 0) - deprecated, use cursor
+    - **cursor**: Giá trị header `X-Next-Cursor` của trang trước (keyset pagination)
     - **source_type**: Lọc theo nguồn: "file" | "created" (optional)
     - **document_type**: Lọc theo loại: "doc" | "slide" | "note" (optional)
     - **folder_id**: Lọc theo folder (optional)
@@ -1813,15 +1814,29 @@ async def list_documents(
             f"(source_type={source_type}, document_type={document_type}, folder_id={folder_id}, limit={limit}, offset={offset})"
         )
 
-        documents = await asyncio.to_thread(
-            doc_manager.list_user_documents,
-            user_id=user_id,
-            limit=limit,
-            offset=offset,
-            source_type=source_type,
-            document_type=document_type,
-            folder_id=folder_id,
-        )
+        if offset and not cursor:
+            # Legacy offset clients
+            documents = await asyncio.to_thread(
+                doc_manager.list_user_documents,
+                user_id=user_id,
+                limit=limit,
+                offset=offset,
+                source_type=source_type,
+                document_type=document_type,
+                folder_id=folder_id,
+            )
+        else:
+            documents, next_cursor = await asyncio.to_thread(
+                doc_manager.page_user_documents,
+                user_id=user_id,
+                limit=limit,
+                cursor=cursor,
+                source_type=source_type,
+                document_type=document_type,
+                folder_id=folder_id,
+            )
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
 
         logger.info(f"✅ Found {len(documents)} documents for user {user_id[:8]}...")
 
@@ -1842,6 +1857,8 @@ async def list_documents(
             for doc in documents
         ]
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error listing documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2083,16 +2100,15 @@ async def download_document(
     try:
         # Step 1: Get document from MongoDB (with version support)
         if version is not None:
-            # Get specific version from version_history
+            # Get specific version from the version store
             base_doc = await asyncio.to_thread(
                 doc_manager.get_document, document_id, user_id
             )
             if not base_doc:
                 raise HTTPException(status_code=404, detail="Document not found")
 
-            version_history = base_doc.get("version_history", [])
-            target_version = next(
-                (v for v in version_history if v.get("version") == version), None
+            target_version = await asyncio.to_thread(
+                doc_manager.get_version_snapshot, document_id, user_id, version
             )
 
             if not target_version:
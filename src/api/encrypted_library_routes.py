@@ -13,6 +13,7 @@ from datetime import datetime
 
 from src.middleware.auth import verify_firebase_token
 from src.services.encrypted_library_manager import EncryptedLibraryManager
+from src.services.r2_url_service import get_r2_url_service
 from src.models.subscription import SubscriptionUsageUpdate
 from config.config import get_r2_client, get_mongodb, R2_BUCKET_NAME
 
@@ -361,21 +362,16 @@ async def list_encrypted_images_with_folders(
             include_deleted=includeDeleted,
         )
 
-        # Generate presigned URLs for both thumbnail AND full image
-        s3_client = get_r2_client()
+        # Presigned URLs for both thumbnail AND full image (cached, one signing batch)
+        keys = [img["r2_thumbnail_path"] for img in images]
+        keys += [img["r2_image_path"] for img in images]
+        urls = await get_r2_url_service().presign_many(
+            keys, expires_in=3600, scope=owner_id
+        )
         for img in images:
-            # Thumbnail URL
-            img["thumbnail_download_url"] = s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": R2_BUCKET_NAME, "Key": img["r2_thumbnail_path"]},
-                ExpiresIn=3600,
-            )
+            img["thumbnail_download_url"] = urls.get(img["r2_thumbnail_path"])
             # Full image URL (include in list for better performance)
-            img["image_download_url"] = s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": R2_BUCKET_NAME, "Key": img["r2_image_path"]},
-                ExpiresIn=3600,
-            )
+            img["image_download_url"] = urls.get(img["r2_image_path"])
 
         logger.info(
             f"📚 Listed {len(folders)} folders and {len(images)} images for {owner_id}"
@@ -428,16 +424,12 @@ async def get_encrypted_image(
             )
 
         # Generate presigned URLs
-        s3_client = get_r2_client()
-        image["image_download_url"] = s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": R2_BUCKET_NAME, "Key": image["r2_image_path"]},
-            ExpiresIn=3600,
+        url_service = get_r2_url_service()
+        image["image_download_url"] = url_service.presign(
+            image["r2_image_path"], expires_in=3600, scope=user_id
         )
-        image["thumbnail_download_url"] = s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": R2_BUCKET_NAME, "Key": image["r2_thumbnail_path"]},
-            ExpiresIn=3600,
+        image["thumbnail_download_url"] = url_service.presign(
+            image["r2_thumbnail_path"], expires_in=3600, scope=user_id
         )
 
         logger.info(f"🔍 User {user_id} accessed encrypted image {image_id}")
@@ -82,3 +82,37 @@ async def status():
         timestamp=datetime.now().isoformat(),
         uptime=uptime_str
     )
+
+
+@router.get("/health/workers")
+async def workers_health():
+    """
+    ✅ Liveness + throughput of background workers run by the worker supervisor
+    """
+    import redis.asyncio as aioredis
+    from src.services.worker_heartbeats import get_worker_heartbeats
+
+    redis_client = aioredis.from_url(
+        os.getenv("REDIS_URL", "redis://redis-server:6379"), decode_responses=True
+    )
+    try:
+        heartbeats = await get_worker_heartbeats(redis_client)
+    finally:
+        await redis_client.aclose()
+
+    workers = {}
+    for hb in heartbeats:
+        entry = workers.setdefault(
+            hb.get("worker", "unknown"),
+            {"replicas": [], "alive": 0, "tasks_per_minute": 0.0},
+        )
+        entry["replicas"].append(hb)
+        if hb["alive"]:
+            entry["alive"] += 1
+            entry["tasks_per_minute"] += float(hb.get("tasks_per_minute") or 0)
+
+    return {
+        "status": "healthy" if all(w["alive"] for w in workers.values()) else "degraded",
+        "timestamp": datetime.now().isoformat(),
+        "workers": workers,
+    }
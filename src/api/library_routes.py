@@ -5,7 +5,16 @@ Type 3: Library Files (Templates, Guides, References, Resources)
 
 import logging
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+    Query,
+    Response,
+)
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
@@ -13,36 +22,60 @@ from datetime import datetime
 
 from src.middleware.auth import verify_firebase_token
 from src.services.library_manager import LibraryManager
-from src.services.subscription_service import get_subscription_service
+from src.services.r2_url_service import get_r2_url_service
+from src.services.r2_purge_service import (
+    LIBRARY_KEY_FIELDS,
+    R2_PURGE_INLINE_TIMEOUT,
+    get_r2_purge_service,
+    purge_summary,
+    purge_with_deadline,
+)
 from src.models.subscription import SubscriptionUsageUpdate
+from src.utils.pagination import InvalidCursorError
 from config.config import get_r2_client, get_mongodb, R2_BUCKET_NAME
 import os
 
 logger = logging.getLogger(__name__)
 
-R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL", "https://static.wordai.pro")
 CF_IMAGES_DELIVERY_URL = os.getenv(
     "CLOUDFLARE_IMAGES_DELIVERY_URL",
     "https://imagedelivery.net/Pw2WK7nSZVnnzk4LKnBfXQ",
 )
 
 
-def _resolve_file_url(file_doc: dict, s3_client) -> str:
-    """Return appropriate URL: CF Images delivery, public CDN for audio, presigned for rest."""
+def _public_file_url(file_doc: dict) -> Optional[str]:
+    """Permanent URL if the file is publicly served, else None (needs presigning)"""
     # CF Images: permanent, auto-optimised delivery
     if file_doc.get("cf_image_id"):
         return f"{CF_IMAGES_DELIVERY_URL}/{file_doc['cf_image_id']}/public"
     # Audio: public R2 CDN
     if file_doc.get("category") == "audio" or file_doc.get("file_type") == "audio":
-        return f"{R2_PUBLIC_URL}/{file_doc['r2_key'].lstrip('/')}"
-    # Others: R2 presigned URL
-    return s3_client.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": R2_BUCKET_NAME, "Key": file_doc["r2_key"]},
-        ExpiresIn=3600,
+        return get_r2_url_service().cdn_url(file_doc["r2_key"])
+    return None
+
+
+def _resolve_file_url(file_doc: dict, scope: str = "") -> str:
+    """Return appropriate URL: CF Images delivery, public CDN for audio, presigned for rest."""
+    return _public_file_url(file_doc) or get_r2_url_service().presign(
+        file_doc["r2_key"], expires_in=3600, scope=scope
     )
 
 
+async def _attach_file_urls(files: List[dict], scope: str = "") -> None:
+    """Set file_url on a listing; presigned URLs come from the URL cache or one batch"""
+    private = []
+    for file_doc in files:
+        file_doc["file_url"] = _public_file_url(file_doc)
+        if file_doc["file_url"] is None:
+            private.append(file_doc)
+
+    urls = await get_r2_url_service().presign_many(
+        [doc["r2_key"] for doc in private], expires_in=3600, scope=scope
+    )
+    for file_doc in private:
+        file_doc["file_url"] = urls.get(file_doc["r2_key"])
+
+
 router = APIRouter(prefix="/api/library", tags=["Library Files"])
 
 
@@ -299,10 +332,12 @@ async def upload_library_file(
 
 @router.get("/files", response_model=List[LibraryFileResponse])
 async def list_library_files(
+    response: Response,
     category: Optional[str] = Query(None, pattern="^(documents|images|videos|audio)$"),
     tags: Optional[str] = Query(None, description="Comma-separated tags"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     user_data: Dict[str, Any] = Depends(verify_firebase_token),
 ):
     """
@@ -318,7 +353,9 @@ async def list_library_files(
     - category: Filter by category (documents, images, videos, audio)
     - tags: Comma-separated tags to filter by (e.g., "insurance,contract")
     - limit: Max results (default: 50, max: 100)
-    - offset: Pagination offset (default: 0)
+    - offset: Pagination offset (default: 0) - deprecated, use cursor
+    - cursor: Keyset cursor; the next page's cursor is returned in the
+      `X-Next-Cursor` response header (absent on the last page)
     """
     try:
         user_id = user_data.get("uid")
@@ -329,22 +366,35 @@ async def list_library_files(
             [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else None
         )
 
-        files = await asyncio.to_thread(
-            library_manager.list_library_files,
-            user_id=user_id,
-            category=category,
-            tags=tags_list,
-            limit=limit,
-            offset=offset,
-        )
+        if offset and not cursor:
+            # Legacy offset clients
+            files = await asyncio.to_thread(
+                library_manager.list_library_files,
+                user_id=user_id,
+                category=category,
+                tags=tags_list,
+                limit=limit,
+                offset=offset,
+            )
+        else:
+            files, next_cursor = await asyncio.to_thread(
+                library_manager.page_library_files,
+                user_id=user_id,
+                category=category,
+                tags=tags_list,
+                limit=limit,
+                cursor=cursor,
+            )
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
 
-        # Generate fresh signed URLs (or CDN URL for audio)
-        s3_client = get_r2_client()
-        for file_doc in files:
-            file_doc["file_url"] = _resolve_file_url(file_doc, s3_client)
+        # Signed URLs (cached, one signing batch) or CDN URL for audio
+        await _attach_file_urls(files, scope=user_id)
 
         return [LibraryFileResponse(**doc) for doc in files]
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error listing library files: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -370,8 +420,7 @@ async def get_library_file(
             raise HTTPException(status_code=404, detail="Library file not found")
 
         # Generate fresh signed URL (or CDN URL for audio)
-        s3_client = get_r2_client()
-        file_doc["file_url"] = _resolve_file_url(file_doc, s3_client)
+        file_doc["file_url"] = _resolve_file_url(file_doc, scope=user_id)
 
         return LibraryFileResponse(**file_doc)
 
@@ -472,10 +521,8 @@ async def list_library_trash(
             offset=offset,
         )
 
-        # Generate fresh signed URLs (or CDN URL for audio)
-        s3_client = get_r2_client()
-        for file_doc in files:
-            file_doc["file_url"] = _resolve_file_url(file_doc, s3_client)
+        # Signed URLs (cached, one signing batch) or CDN URL for audio
+        await _attach_file_urls(files, scope=user_id)
 
         return [LibraryFileResponse(**doc) for doc in files]
 
@@ -558,57 +605,43 @@ async def empty_library_trash(
     """
     Permanently delete ALL library files in trash
     ⚠️ WARNING: This action cannot be undone!
+
+    Runs as a bulk purge job (batched R2 deletes + delete_many). Large trashes that
+    take longer than R2_PURGE_INLINE_TIMEOUT return `status: running` and keep
+    purging in the background; poll GET /api/library/purge-jobs/{purge_job_id}.
     """
     try:
         user_id = user_data.get("uid")
-        library_manager = get_library_manager()
 
-        # Get deleted files to calculate storage
-        deleted_files = await asyncio.to_thread(
-            library_manager.list_deleted_library_files, user_id=user_id, limit=10000
-        )
-
-        # Calculate total storage to free
-        total_bytes_freed = sum(
-            file_doc.get("file_size", 0) for file_doc in deleted_files
-        )
-        total_mb_freed = total_bytes_freed / (1024 * 1024)
-
-        # Delete files
-        deleted_count = await asyncio.to_thread(
-            library_manager.empty_library_trash,
+        purger = get_r2_purge_service()
+        job_id = await asyncio.to_thread(
+            purger.create_records_job,
+            kind="library_trash",
             user_id=user_id,
+            collection="library_files",
+            query={"user_id": user_id, "is_deleted": True},
+            key_fields=LIBRARY_KEY_FIELDS,
+            update_storage=True,  # storage_mb decreased when the purge completes
         )
+        job = await purge_with_deadline(job_id, timeout=R2_PURGE_INLINE_TIMEOUT)
 
-        # === DECREASE STORAGE USED ===
-        if deleted_count > 0 and total_mb_freed > 0:
-            try:
-                subscription_service = get_subscription_service()
-                await subscription_service.update_usage(
-                    user_id=user_id,
-                    update=SubscriptionUsageUpdate(storage_mb=-total_mb_freed),
-                )
-                logger.info(
-                    f"📊 Decreased storage by {total_mb_freed:.2f}MB ({deleted_count} library files)"
-                )
-            except Exception as usage_error:
-                logger.error(f"❌ Error updating storage counter: {usage_error}")
-
-        return {
-            "success": True,
-            "message": f"Permanently deleted {deleted_count} library files from trash",
-            "deleted_count": deleted_count,
-            "storage_freed_mb": round(total_mb_freed, 2),
-        }
+        return purge_summary(job, "library files")
 
     except Exception as e:
         logger.error(f"❌ Error emptying library trash: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ============================================================================
-# SEARCH & CATEGORIES
-# ============================================================================
+@router.get("/purge-jobs/{job_id}")
+async def get_purge_job_progress(
+    job_id: str,
+    user_data: Dict[str, Any] = Depends(verify_firebase_token),
+):
+    """Progress of a trash purge (library, upload files or secret images)"""
+    job = await asyncio.to_thread(get_r2_purge_service().get_job, job_id)
+    if not job or job.get("user_id") != user_data.get("uid"):
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return purge_summary(job, "files")
 
 
 @router.get("/search", response_model=List[LibraryFileResponse])
@@ -636,10 +669,8 @@ async def search_library_files(
             limit=limit,
         )
 
-        # Generate fresh signed URLs (or CDN URL for audio)
-        s3_client = get_r2_client()
-        for file_doc in files:
-            file_doc["file_url"] = _resolve_file_url(file_doc, s3_client)
+        # Signed URLs (cached, one signing batch) or CDN URL for audio
+        await _attach_file_urls(files, scope=user_id)
 
         return [LibraryFileResponse(**doc) for doc in files]
 
@@ -739,9 +770,9 @@ async def generate_library_download_url(
             raise HTTPException(status_code=404, detail="Library file not found")
 
         # Audio files: return CDN URL for direct streaming/playback (no presigned)
-        s3_client = get_r2_client()
+        url_service = get_r2_url_service()
         if file_doc.get("category") == "audio" or file_doc.get("file_type") == "audio":
-            stream_url = f"{R2_PUBLIC_URL}/{file_doc['r2_key'].lstrip('/')}"
+            stream_url = url_service.cdn_url(file_doc["r2_key"])
             return {
                 "download_url": stream_url,
                 "filename": file_doc["filename"],
@@ -750,21 +781,19 @@ async def generate_library_download_url(
             }
 
         # Non-audio files: presigned URL for attachment download
-        download_url = s3_client.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": R2_BUCKET_NAME,
-                "Key": file_doc["r2_key"],
-                "ResponseContentDisposition": f'attachment; filename="{file_doc["filename"]}"',
-            },
-            ExpiresIn=3600,  # 1 hour
+        # A URL reused from the signing cache has less than the full hour left
+        download_url, expires_in = url_service.presign_with_expiry(
+            file_doc["r2_key"],
+            expires_in=3600,  # 1 hour
+            scope=user_id,
+            download_name=file_doc["filename"],
         )
 
         return {
             "download_url": download_url,
             "filename": file_doc["filename"],
             "file_size": file_doc["file_size"],
-            "expires_in": 3600,
+            "expires_in": expires_in,
         }
 
     except HTTPException:
@@ -14,12 +14,15 @@ POST /api/v1/pronunciation/score
   - Cost:   FREE — 10 uses/day per user
   - Auth:   required (Firebase login)
 
-Model loading:
-  - Models are lazy-loaded on first request (NOT at startup)
-  - faster-whisper tiny: ~75 MB, already cached from alignment batch
-  - Wav2Vec2 lv-60-espeak: ~370 MB, downloaded on first score request
+Model execution (src/services/pronunciation_inference.py):
+  - Inference runs in a process pool, never on the event loop
+  - Pool workers preload faster-whisper tiny (~75 MB) and Wav2Vec2
+    lv-60-espeak (~370 MB) at API startup
+  - Concurrent requests are micro-batched; when the queue is full the
+    endpoints return 429 (Retry-After) without using a daily credit
 """
 
+import asyncio
 import base64
 import logging
 from datetime import date
@@ -29,6 +32,10 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 
 from src.database.db_manager import DBManager
 from src.middleware.firebase_auth import get_current_user
+from src.services.pronunciation_inference import (
+    InferenceOverloadedError,
+    get_inference_pool,
+)
 
 logger = logging.getLogger("chatbot")
 
@@ -36,6 +43,8 @@ router = APIRouter(prefix="/api/v1/pronunciation", tags=["Pronunciation Assessme
 
 # Daily limit per endpoint per user (free, no points required)
 DAILY_LIMIT = 10
+# Seconds suggested to clients when the inference queue is full
+BUSY_RETRY_AFTER = 5
 
 
 def get_db():
@@ -100,6 +109,50 @@ def _check_and_increment_daily_limit(user_id: str, action: str, db) -> dict:
     }
 
 
+def _refund_daily_limit(user_id: str, action: str, db):
+    """Give back a daily credit taken for a request the server could not run."""
+    db["pronunciation_daily_usage"].update_one(
+        {"user_id": user_id, "date": date.today().isoformat(), "action": action},
+        {"$inc": {"count": -1}},
+    )
+
+
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail={
+            "error": "inference_busy",
+            "message": "Hệ thống chấm phát âm đang quá tải. Vui lòng thử lại sau vài giây.",
+            "retry_after": BUSY_RETRY_AFTER,
+        },
+        headers={"Retry-After": str(BUSY_RETRY_AFTER)},
+    )
+
+
+async def _run_inference(user_id: str, action: str, db, call) -> tuple:
+    """
+    Take a daily credit, then run `call()` on the inference pool.
+
+    Queue-full rejections (before or after taking the credit) return 429 and
+    do not consume the credit.
+
+    Returns:
+        (result, daily_usage)
+    """
+    pool = get_inference_pool()
+    if not pool.has_capacity():
+        raise _busy_exception()
+
+    daily = await asyncio.to_thread(
+        _check_and_increment_daily_limit, user_id, action, db
+    )
+    try:
+        return await call(pool), daily
+    except InferenceOverloadedError:
+        await asyncio.to_thread(_refund_daily_limit, user_id, action, db)
+        raise _busy_exception()
+
+
 # ── POST /transcribe ─────────────────────────────────────────────────────────
 
 
@@ -123,17 +176,20 @@ async def transcribe_endpoint(
       language     — detected language code
       duration_s   — audio duration in seconds
       daily_usage  — {used, limit, remaining}
+      timings_ms   — per-stage latency {queue, decode, asr, total}
+
+    429 with error "inference_busy" when the inference queue is full.
     """
     body: dict[str, Any] = await request.json()
     audio_bytes = _decode_audio(body)
     user_id = current_user["uid"]
 
-    daily = _check_and_increment_daily_limit(user_id, "transcribe", db)
-
     try:
-        from src.services.pronunciation_service import transcribe_audio
-
-        result = transcribe_audio(audio_bytes)
+        result, daily = await _run_inference(
+            user_id, "transcribe", db, lambda pool: pool.transcribe(audio_bytes)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Transcribe error for {user_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
@@ -177,6 +233,10 @@ async def score_endpoint(
                           [{word, expected_ipa, score, phonemes: [{expected, actual, correct}]}]
       feedback          — human-readable score summary
       daily_usage       — {used, limit, remaining}
+      timings_ms        — per-stage latency
+                          {queue, decode, asr, phoneme, phoneme_batch, alignment, total}
+
+    429 with error "inference_busy" when the inference queue is full.
 
     Score interpretation:
       ≥ 0.90 → Excellent
@@ -197,12 +257,15 @@ async def score_endpoint(
 
     user_id = current_user["uid"]
 
-    daily = _check_and_increment_daily_limit(user_id, "score", db)
-
     try:
-        from src.services.pronunciation_service import score_pronunciation
-
-        result = score_pronunciation(audio_bytes, expected_text)
+        result, daily = await _run_inference(
+            user_id,
+            "score",
+            db,
+            lambda pool: pool.score(audio_bytes, expected_text),
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Score error for {user_id}: {e}")
         raise HTTPException(
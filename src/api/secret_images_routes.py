@@ -13,6 +13,14 @@ from datetime import datetime
 
 from src.middleware.auth import verify_firebase_token
 from src.services.library_manager import LibraryManager
+from src.services.r2_url_service import get_r2_url_service
+from src.services.r2_purge_service import (
+    R2_PURGE_INLINE_TIMEOUT,
+    LIBRARY_KEY_FIELDS,
+    get_r2_purge_service,
+    purge_with_deadline,
+    purge_summary,
+)
 from config.config import get_r2_client, get_mongodb, R2_BUCKET_NAME
 
 logger = logging.getLogger("chatbot")  # Use 'chatbot' logger to match app.py
@@ -165,37 +173,31 @@ def get_library_manager() -> LibraryManager:
 
 
 def generate_presigned_urls_for_secret_image(
-    image_doc: Dict[str, Any], s3_client, expires_in: int = 3600
+    image_doc: Dict[str, Any], scope: str = "", expires_in: int = 3600
 ) -> Dict[str, Any]:
     """
-    Generate presigned URLs for encrypted image and thumbnail
+    Generate presigned URLs for encrypted image and thumbnail (single image)
 
     Args:
         image_doc: MongoDB document with r2_image_path and r2_thumbnail_path
-        s3_client: boto3 S3 client
+        scope: URL cache partition (requesting user id)
         expires_in: URL expiration time in seconds
 
     Returns:
         Updated image_doc with download URLs
     """
+    url_service = get_r2_url_service()
     try:
         # Generate URL for full encrypted image
         if image_doc.get("r2_image_path"):
-            image_doc["image_download_url"] = s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": R2_BUCKET_NAME, "Key": image_doc["r2_image_path"]},
-                ExpiresIn=expires_in,
+            image_doc["image_download_url"] = url_service.presign(
+                image_doc["r2_image_path"], expires_in=expires_in, scope=scope
             )
 
         # Generate URL for encrypted thumbnail
         if image_doc.get("r2_thumbnail_path"):
-            image_doc["thumbnail_download_url"] = s3_client.generate_presigned_url(
-                "get_object",
-                Params={
-                    "Bucket": R2_BUCKET_NAME,
-                    "Key": image_doc["r2_thumbnail_path"],
-                },
-                ExpiresIn=expires_in,
+            image_doc["thumbnail_download_url"] = url_service.presign(
+                image_doc["r2_thumbnail_path"], expires_in=expires_in, scope=scope
             )
 
         return image_doc
@@ -208,6 +210,34 @@ def generate_presigned_urls_for_secret_image(
         return image_doc
 
 
+async def attach_secret_image_urls(
+    images: List[Dict[str, Any]], scope: str = "", expires_in: int = 3600
+) -> List[Dict[str, Any]]:
+    """
+    Batch version for listings: all URLs come from the URL cache or one signing batch
+
+    Args:
+        images: MongoDB documents with r2_image_path and r2_thumbnail_path
+        scope: URL cache partition (requesting user id)
+        expires_in: URL expiration time in seconds
+    """
+    keys = []
+    for img in images:
+        keys.append(img.get("r2_image_path"))
+        keys.append(img.get("r2_thumbnail_path"))
+
+    urls = await get_r2_url_service().presign_many(
+        keys, expires_in=expires_in, scope=scope
+    )
+
+    for img in images:
+        if img.get("r2_image_path"):
+            img["image_download_url"] = urls.get(img["r2_image_path"])
+        if img.get("r2_thumbnail_path"):
+            img["thumbnail_download_url"] = urls.get(img["r2_thumbnail_path"])
+    return images
+
+
 # ============================================================================
 # FOLDER MANAGEMENT
 # ============================================================================
@@ -440,7 +470,6 @@ async def list_secret_images(
     try:
         user_id = user_data.get("uid")
         db = get_mongodb()
-        s3_client = get_r2_client()
 
         # Build query for images
         query = {
@@ -526,8 +555,8 @@ async def list_secret_images(
             else:
                 img["folder_name"] = None
 
-            # Generate presigned URLs (AFTER setting folder_name)
-            img = generate_presigned_urls_for_secret_image(img, s3_client)
+        # Generate presigned URLs for the whole page (cached, one signing batch)
+        await attach_secret_image_urls(images, scope=user_id)
 
         # Get folders (if not filtering by specific folder, get root folders)
         folders_query = {
@@ -617,7 +646,6 @@ async def get_secret_image(
     try:
         user_id = user_data.get("uid")
         db = get_mongodb()
-        s3_client = get_r2_client()
 
         # Query by image_id or library_id
         image = db["library_files"].find_one(
@@ -651,7 +679,7 @@ async def get_secret_image(
             image["created_at"] = image["uploaded_at"]
 
         # Generate presigned URLs
-        image = generate_presigned_urls_for_secret_image(image, s3_client)
+        image = generate_presigned_urls_for_secret_image(image, scope=user_id)
 
         # Get folder name if exists
         if image.get("folder_id"):
@@ -888,7 +916,6 @@ async def download_secret_image(
     try:
         user_id = user_data.get("uid")
         db = get_mongodb()
-        s3_client = get_r2_client()
 
         # Get image
         image = db["library_files"].find_one(
@@ -921,10 +948,8 @@ async def download_secret_image(
             if not r2_key:
                 raise HTTPException(status_code=404, detail="Image not found")
 
-        download_url = s3_client.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": R2_BUCKET_NAME, "Key": r2_key},
-            ExpiresIn=3600,  # 1 hour
+        download_url = get_r2_url_service().presign(
+            r2_key, expires_in=3600, scope=user_id  # 1 hour
         )
 
         logger.info(
@@ -961,7 +986,6 @@ async def list_secret_images_trash(
     try:
         user_id = user_data.get("uid")
         db = get_mongodb()
-        s3_client = get_r2_client()
 
         # Get deleted secret images
         images = list(
@@ -990,12 +1014,12 @@ async def list_secret_images_trash(
             if "created_at" not in img and "uploaded_at" in img:
                 img["created_at"] = img["uploaded_at"]
 
-            img = generate_presigned_urls_for_secret_image(img, s3_client)
-
             if img.get("folder_id"):
                 folder = db["library_folders"].find_one({"folder_id": img["folder_id"]})
                 img["folder_name"] = folder.get("folder_name") if folder else None
 
+        await attach_secret_image_urls(images, scope=user_id)
+
         logger.info(f"🗑️ Listed {len(images)} deleted secret images for {user_id}")
 
         return [SecretImageResponse(**img) for img in images]
@@ -1053,6 +1077,40 @@ async def restore_secret_image(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.delete("/trash/empty")
+async def empty_secret_images_trash(
+    user_data: Dict[str, Any] = Depends(verify_firebase_token),
+):
+    """
+    Permanently delete ALL secret images in trash
+    ⚠️ WARNING: This action cannot be undone!
+
+    Encrypted images and thumbnails are removed from R2 with batched deletes.
+    Large trashes keep purging in the background after R2_PURGE_INLINE_TIMEOUT;
+    poll GET /api/library/purge-jobs/{purge_job_id}.
+    """
+    try:
+        user_id = user_data.get("uid")
+
+        purger = get_r2_purge_service()
+        job_id = await asyncio.to_thread(
+            purger.create_records_job,
+            kind="secret_images_trash",
+            user_id=user_id,
+            collection="library_files",
+            query={"user_id": user_id, "is_encrypted": True, "is_deleted": True},
+            key_fields=LIBRARY_KEY_FIELDS,
+            update_storage=True,
+        )
+        job = await purge_with_deadline(job_id, timeout=R2_PURGE_INLINE_TIMEOUT)
+
+        return purge_summary(job, "secret images")
+
+    except Exception as e:
+        logger.error(f"❌ Error emptying secret images trash: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # STATISTICS
 # ============================================================================
@@ -25,6 +25,13 @@ from src.services.user_manager import get_user_manager
 from src.services.subscription_service import get_subscription_service
 from src.services.points_service import get_points_service
 from src.models.subscription import SubscriptionUsageUpdate
+from src.services.r2_purge_service import (
+    R2_PURGE_INLINE_TIMEOUT,
+    USER_FILE_KEY_FIELDS,
+    get_r2_purge_service,
+    purge_with_deadline,
+    purge_summary,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -1651,56 +1658,34 @@ async def empty_files_trash(
     Permanently delete ALL files in trash
     ⚠️ WARNING: This action cannot be undone!
 
-    This will:
-    1. Find all files with is_deleted=true for current user
-    2. Calculate total storage to free
-    3. Delete each file from R2 storage
-    4. Delete each file record from MongoDB
-    5. Decrease storage_used_mb
+    Runs as a bulk purge job:
+    1. Page through files with is_deleted=true (keyset on _id)
+    2. Delete their R2 objects with batched DeleteObjects (1000 keys/request)
+    3. delete_many the records whose objects are gone
+    4. Decrease storage_used_mb by the size actually freed
+
+    Large trashes that take longer than R2_PURGE_INLINE_TIMEOUT return
+    `status: running` and keep purging in the background; poll
+    GET /api/library/purge-jobs/{purge_job_id}.
     """
     try:
         user_id = user_data.get("uid")
-        user_manager = get_user_manager()
 
         logger.info(f"💀 Emptying files trash for user {user_id}")
 
-        # Get deleted files to calculate storage
-        deleted_files = await asyncio.to_thread(
-            user_manager.list_deleted_files, user_id=user_id, limit=10000
-        )
-
-        # Calculate total storage to free
-        total_bytes_freed = sum(
-            file_doc.get("file_size", 0) for file_doc in deleted_files
-        )
-        total_mb_freed = total_bytes_freed / (1024 * 1024)
-
-        # Delete files
-        deleted_count = await asyncio.to_thread(
-            user_manager.empty_files_trash,
+        purger = get_r2_purge_service()
+        job_id = await asyncio.to_thread(
+            purger.create_records_job,
+            kind="files_trash",
             user_id=user_id,
+            collection="user_files",
+            query={"user_id": user_id, "is_deleted": True},
+            key_fields=USER_FILE_KEY_FIELDS,
+            update_storage=True,
         )
+        job = await purge_with_deadline(job_id, timeout=R2_PURGE_INLINE_TIMEOUT)
 
-        # === DECREASE STORAGE USED ===
-        if deleted_count > 0 and total_mb_freed > 0:
-            try:
-                subscription_service = get_subscription_service()
-                await subscription_service.update_usage(
-                    user_id=user_id,
-                    update=SubscriptionUsageUpdate(storage_mb=-total_mb_freed),
-                )
-                logger.info(
-                    f"📊 Decreased storage by {total_mb_freed:.2f}MB ({deleted_count} files)"
-                )
-            except Exception as usage_error:
-                logger.error(f"❌ Error updating storage counter: {usage_error}")
-
-        return {
-            "success": True,
-            "message": f"Permanently deleted {deleted_count} files from trash",
-            "deleted_count": deleted_count,
-            "storage_freed_mb": round(total_mb_freed, 2),
-        }
+        return purge_summary(job, "files")
 
     except Exception as e:
         logger.error(f"❌ Error emptying files trash: {e}")
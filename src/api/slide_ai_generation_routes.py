@@ -28,6 +28,7 @@ from src.models.slide_ai_generation_models import (
     UpdateOutlineResponse,
 )
 from src.services.slide_ai_generation_service import get_slide_ai_service
+from src.services.slide_batch_pipeline import SLIDE_HTML_BATCH_SIZE
 from src.services.points_service import get_points_service
 from src.services.document_manager import DocumentManager
 from src.database.db_manager import DBManager
@@ -263,6 +264,11 @@ async def get_slide_generation_status(
             created_at=job.get("created_at", datetime.utcnow().isoformat()),
             updated_at=job.get("updated_at", datetime.utcnow().isoformat()),
             message=message,
+            batches_completed=job.get("batches_completed"),
+            total_batches=job.get("total_batches"),
+            ready_batches=job.get("ready_batches"),
+            failed_batches=job.get("failed_batches"),
+            can_retry=job.get("can_retry"),
             content_html=None,  # Only in MongoDB, not Redis
             slide_backgrounds=None,  # Only in MongoDB, not Redis
         )
@@ -459,6 +465,94 @@ async def update_slide_outline(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/documents/{document_id}/retry")
+async def retry_slide_generation(
+    document_id: str,
+    user_info: dict = Depends(require_auth),
+):
+    """
+    **Retry an incomplete slide generation**
+
+    Re-queues Step 2 for the document. Batches generated by the previous attempt are
+    kept, so only the failed/missing batches are sent to the AI again. If the
+    outline was edited (PUT /documents/{id}/outline) every batch is regenerated.
+
+    **Returns:**
+    - document_id, status='pending', poll_url
+    """
+    try:
+        doc = db["documents"].find_one(
+            {
+                "document_id": document_id,
+                "user_id": user_info["uid"],
+                "is_deleted": False,
+            }
+        )
+        if not doc:
+            raise HTTPException(
+                status_code=404, detail="Document not found or you don't have access"
+            )
+        if not doc.get("ai_analysis_id"):
+            raise HTTPException(
+                status_code=400, detail="Document was not created by AI slide generation"
+            )
+
+        queue = await get_slide_generation_queue()
+        job = await get_job_status(queue.redis_client, document_id)
+        if job and job.get("status") in ("pending", "processing"):
+            raise HTTPException(
+                status_code=400, detail="Slide generation is already in progress"
+            )
+
+        points_needed = doc.get("ai_points_needed", 0)
+        points_check = await get_points_service().check_sufficient_points(
+            user_id=user_info["uid"],
+            points_needed=points_needed,
+            service="slide_ai_generation",
+        )
+        if not points_check["has_points"]:
+            raise HTTPException(
+                status_code=402,
+                detail={
+                    "error": "INSUFFICIENT_POINTS",
+                    "message": f"Không đủ điểm để tạo lại slides. Cần: {points_needed}, Còn: {points_check['points_available']}",
+                    "points_needed": points_needed,
+                    "points_available": points_check["points_available"],
+                },
+            )
+
+        task = SlideGenerationTask(
+            task_id=document_id,
+            document_id=document_id,
+            user_id=user_info["uid"],
+            step=2,
+            analysis_id=doc["ai_analysis_id"],
+            retry_count=(job.get("retry_count") or 0) + 1 if job else 1,
+        )
+        if not await queue.enqueue_generic_task(task):
+            raise HTTPException(
+                status_code=500, detail="Failed to enqueue slide generation task"
+            )
+
+        logger.info(
+            f"🔁 Slide generation retry enqueued: {document_id} (attempt {task.retry_count})"
+        )
+
+        return {
+            "success": True,
+            "document_id": document_id,
+            "status": "pending",
+            "message": "Retrying slide generation. Only missing batches will be regenerated.",
+            "poll_url": f"/api/slides/ai-generate/status/{document_id}",
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to retry slide generation: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============ STEP 1: ANALYSIS ============
 
 
@@ -807,7 +901,7 @@ async def create_slides_from_analysis(
         num_slides = analysis["num_slides"]
         # IMPORTANT: Worker uses BATCH_SIZE=10 (reduced from 15 to avoid Claude token limits)
         # Must match worker's actual batch count for accurate billing
-        BATCH_SIZE = 10  # Same as worker
+        BATCH_SIZE = SLIDE_HTML_BATCH_SIZE  # Same as worker
         batches_needed = (num_slides + BATCH_SIZE - 1) // BATCH_SIZE  # Round up
         points_needed = batches_needed * 5  # 5 points per batch
 
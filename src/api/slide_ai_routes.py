@@ -11,6 +11,7 @@ from datetime import datetime
 
 from src.middleware.firebase_auth import get_current_user
 from src.services.points_service import get_points_service
+from src.services.document_manager import DocumentManager
 from src.queue.queue_dependencies import get_slide_format_queue
 from src.queue.queue_manager import set_job_status, get_job_status
 from src.models.ai_queue_tasks import SlideFormatTask
@@ -151,19 +152,17 @@ async def ai_format_slide(
 
                 db_manager = DBManager()
                 doc = db_manager.db.documents.find_one(
-                    {"document_id": request.document_id, "user_id": user_id}
+                    {"document_id": request.document_id, "user_id": user_id},
+                    {"version": 1},
                 )
 
                 if doc:
-                    # ✅ FIX: Get from version_history[current_version] not root level!
+                    # ✅ FIX: Get from the current version snapshot, not root level!
                     current_version = doc.get("version", 1)
-                    version_data = next(
-                        (
-                            v
-                            for v in doc.get("version_history", [])
-                            if v.get("version") == current_version
-                        ),
-                        None,
+                    version_data = DocumentManager(
+                        db_manager.db
+                    ).get_version_snapshot(
+                        request.document_id, user_id, current_version
                     )
 
                     slide_elements_data = (
@@ -253,19 +252,17 @@ async def ai_format_slide(
 
                 db_manager = DBManager()
                 doc = db_manager.db.documents.find_one(
-                    {"document_id": request.document_id, "user_id": user_id}
+                    {"document_id": request.document_id, "user_id": user_id},
+                    {"version": 1},
                 )
 
                 if doc:
-                    # ✅ FIX: Get from version_history[current_version] not root level!
+                    # ✅ FIX: Get from the current version snapshot, not root level!
                     current_version = doc.get("version", 1)
-                    version_data = next(
-                        (
-                            v
-                            for v in doc.get("version_history", [])
-                            if v.get("version") == current_version
-                        ),
-                        None,
+                    version_data = DocumentManager(
+                        db_manager.db
+                    ).get_version_snapshot(
+                        request.document_id, user_id, current_version
                     )
 
                     # Get elements for this specific slide
@@ -154,21 +154,12 @@ async def update_outline(
             detail="Failed to update outline",
         )
 
-    # ✅ Also update the current version in version_history
-    mongo.db.documents.update_one(
-        {
-            "document_id": request.document_id,
-            "user_id": user_id,
-            "version_history.version": current_version,
-        },
-        {
-            "$set": {
-                "version_history.$.slides_outline": [
-                    s.dict() for s in request.slides_outline
-                ],
-                "version_history.$.slide_count": len(request.slides_outline),
-            }
-        },
+    # ✅ Also update the current version in the version store
+    doc_manager.update_version_fields(
+        request.document_id,
+        user_id,
+        current_version,
+        {"slides_outline": [s.dict() for s in request.slides_outline]},
     )
 
     logger.info(
@@ -233,19 +224,12 @@ async def add_slide_to_outline(
         is_auto_save=False,
     )
 
-    # ✅ Update current version in version_history
-    mongo.db.documents.update_one(
-        {
-            "document_id": request.document_id,
-            "user_id": user_id,
-            "version_history.version": current_version,
-        },
-        {
-            "$set": {
-                "version_history.$.slides_outline": updated_outline,
-                "version_history.$.slide_count": len(updated_outline),
-            }
-        },
+    # ✅ Also update the current version in the version store
+    doc_manager.update_version_fields(
+        request.document_id,
+        user_id,
+        current_version,
+        {"slides_outline": updated_outline},
     )
 
     logger.info(
@@ -303,19 +287,12 @@ async def delete_slide_from_outline(
         is_auto_save=False,
     )
 
-    # ✅ Update current version in version_history
-    mongo.db.documents.update_one(
-        {
-            "document_id": request.document_id,
-            "user_id": user_id,
-            "version_history.version": current_version,
-        },
-        {
-            "$set": {
-                "version_history.$.slides_outline": updated_outline,
-                "version_history.$.slide_count": len(updated_outline),
-            }
-        },
+    # ✅ Also update the current version in the version store
+    doc_manager.update_version_fields(
+        request.document_id,
+        user_id,
+        current_version,
+        {"slides_outline": updated_outline},
     )
 
     logger.info(
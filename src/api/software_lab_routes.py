@@ -8,6 +8,7 @@ from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from datetime import datetime
 from uuid import uuid4
+import asyncio
 import json
 import zipfile
 import io
@@ -61,6 +62,11 @@ from src.models.software_lab_models import (
     FileType,
 )
 from src.services.software_lab_storage import get_software_lab_storage
+from src.services.r2_purge_service import (
+    R2_PURGE_INLINE_TIMEOUT,
+    get_r2_purge_service,
+    purge_with_deadline,
+)
 from src.middleware.admin_check import check_admin_access
 import secrets
 
@@ -407,7 +413,6 @@ async def delete_project(
     """
     db_manager = DBManager()
     db = db_manager.db
-    storage = get_software_lab_storage()
 
     # Verify ownership
     project = db.software_lab_projects.find_one(
@@ -417,8 +422,14 @@ async def delete_project(
     if not project:
         raise HTTPException(404, "Project not found")
 
-    # Delete R2 files (binary assets)
-    storage.delete_project_files(project_id)
+    # Delete R2 files (binary assets) - large projects finish in the background
+    purge_job_id = await asyncio.to_thread(
+        get_r2_purge_service().create_prefix_job,
+        "software_lab_project",
+        current_user["uid"],
+        f"software-lab/{project_id}/",
+    )
+    await purge_with_deadline(purge_job_id, timeout=R2_PURGE_INLINE_TIMEOUT)
 
     # Delete MongoDB data
     db.software_lab_files.delete_many({"project_id": project_id})
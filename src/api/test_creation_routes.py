@@ -28,7 +28,9 @@ from src.middleware.auth import verify_firebase_token as require_auth
 from src.models.online_test_models import *
 from src.services.online_test_utils import *
 from src.services.marketplace_cache_service import MarketplaceCacheService
+from src.services.test_version_service import get_version_service
 from src.database.db_manager import DBManager
+from src.utils.pagination import InvalidCursorError, cached_count, keyset_page
 
 logger = logging.getLogger("chatbot")
 
@@ -38,6 +40,20 @@ router = APIRouter(prefix="/api/v1/tests", tags=["Test Creation"])
 db_manager = DBManager()
 db = db_manager.db
 
+# Fields rendered by "my tests" (questions are only counted, never loaded)
+TEST_LIST_FIELDS = {
+    "title": 1,
+    "description": 1,
+    "num_questions": {"$size": {"$ifNull": ["$questions", []]}},
+    "time_limit_minutes": 1,
+    "test_category": 1,
+    "status": 1,
+    "is_active": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "marketplace_config": 1,
+}
+
 
 @router.post("/generate")
 async def generate_test(
@@ -1440,6 +1456,7 @@ async def get_test_status(
 async def get_my_tests(
     limit: int = 10,
     offset: int = 0,
+    cursor: Optional[str] = None,
     user_info: dict = Depends(require_auth),
 ):
     """
@@ -1453,7 +1470,8 @@ async def get_my_tests(
 
     Args:
         limit: Number of tests to return (default 10, max 100)
-        offset: Number of tests to skip (default 0)
+        offset: Number of tests to skip (default 0) - deprecated, use cursor
+        cursor: `next_cursor` of the previous page (keyset pagination)
     """
     try:
         logger.info(
@@ -1476,26 +1494,47 @@ async def get_my_tests(
             "is_active": {"$ne": False},  # Include True and null (legacy tests)
         }
 
-        # Get total count of active tests
-        total_count = test_collection.count_documents(query_filter)
-
-        # Get user's created tests with pagination, sorted by updated_at (latest first)
-        tests = list(
-            test_collection.find(query_filter)
-            .sort(
-                [("updated_at", -1), ("created_at", -1)]
-            )  # Latest edited/created first
-            .skip(offset)
-            .limit(limit)
-        )
+        # Get total count of active tests (cached for a short TTL)
+        total_count = cached_count(test_collection, query_filter)
+
+        # Latest edited/created first
+        sort = [("updated_at", -1), ("created_at", -1)]
+        legacy_offset = bool(offset and not cursor)
+        next_cursor = None
+        if legacy_offset:
+            tests = list(
+                test_collection.find(query_filter, TEST_LIST_FIELDS)
+                .sort(sort)
+                .skip(offset)
+                .limit(limit)
+            )
+        else:
+            tests, next_cursor = keyset_page(
+                test_collection,
+                query_filter,
+                sort=sort,
+                projection=TEST_LIST_FIELDS,
+                limit=limit,
+                cursor=cursor,
+            )
+
+        # Submission counts for the whole page in one aggregation
+        test_ids = [str(test["_id"]) for test in tests]
+        submission_counts = {
+            row["_id"]: row["count"]
+            for row in submissions_collection.aggregate(
+                [
+                    {"$match": {"test_id": {"$in": test_ids}}},
+                    {"$group": {"_id": "$test_id", "count": {"$sum": 1}}},
+                ]
+            )
+        }
 
         # Build result with minimal info for list view
         result = []
         for test in tests:
             test_id = str(test["_id"])
-            attempts_count = submissions_collection.count_documents(
-                {"test_id": test_id}
-            )
+            attempts_count = submission_counts.get(test_id, 0)
 
             # Get marketplace config if exists
             marketplace_config = test.get("marketplace_config", {})
@@ -1505,7 +1544,7 @@ async def get_my_tests(
                 "test_id": test_id,
                 "title": test["title"],
                 "description": test.get("description"),  # Optional field
-                "num_questions": len(test.get("questions", [])),
+                "num_questions": test.get("num_questions", 0),
                 "time_limit_minutes": test.get(
                     "time_limit_minutes", 60
                 ),  # Default 60 if missing
@@ -1546,9 +1585,16 @@ async def get_my_tests(
             "total": total_count,
             "limit": limit,
             "offset": offset,
-            "has_more": offset + limit < total_count,
+            "has_more": (
+                offset + limit < total_count
+                if legacy_offset
+                else next_cursor is not None
+            ),
+            "next_cursor": next_cursor,
         }
 
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Failed to get tests: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2078,6 +2124,8 @@ async def update_test_questions(
         if result.modified_count == 0:
             raise HTTPException(status_code=500, detail="Failed to update questions")
 
+        get_version_service().invalidate_taker_view(test_id)
+
         logger.info(f"✅ Updated {len(request.questions)} questions for test {test_id}")
 
         return {
@@ -2248,6 +2296,8 @@ async def add_test_attachment(
         if result.modified_count == 0:
             raise HTTPException(status_code=500, detail="Failed to add attachment")
 
+        get_version_service().invalidate_taker_view(test_id)
+
         # Update storage usage for test owner
         subscription_service = get_subscription_service()
         await subscription_service.update_usage(
@@ -2334,6 +2384,8 @@ async def update_test_attachment(
         if result.modified_count == 0:
             raise HTTPException(status_code=500, detail="Failed to update attachment")
 
+        get_version_service().invalidate_taker_view(test_id)
+
         logger.info(f"✅ Updated attachment {attachment_id} in test {test_id}")
 
         return {
@@ -2409,6 +2461,8 @@ async def delete_test_attachment(
                 status_code=404, detail="Attachment not found or already deleted"
             )
 
+        get_version_service().invalidate_taker_view(test_id)
+
         # Decrease storage usage for test owner
         if file_size_mb > 0:
             subscription_service = get_subscription_service()
@@ -2898,6 +2952,8 @@ async def full_edit_test(
 
         if result.modified_count == 0:
             logger.warning(f"⚠️ No changes made to test {test_id}")
+        else:
+            get_version_service().invalidate_taker_view(test_id)
 
         # ========== Step 6: Get updated test document ==========
         updated_test = db["online_tests"].find_one({"_id": ObjectId(test_id)})
@@ -2975,6 +3031,8 @@ async def delete_test(
         if result.modified_count == 0:
             raise HTTPException(status_code=500, detail="Failed to delete test")
 
+        get_version_service().invalidate_taker_view(test_id)
+
         # Invalidate marketplace stats cache if test was public
         if test_doc.get("marketplace_config", {}).get("is_public", False):
             MarketplaceCacheService.invalidate_cache()
@@ -15,6 +15,7 @@ from pydantic import BaseModel, Field, EmailStr
 from src.middleware.auth import verify_firebase_token as require_auth
 from src.services.test_sharing_service import get_test_sharing_service
 from src.services.brevo_email_service import get_brevo_service
+from src.services.email_outbox import EMAIL_OUTBOX_ENABLED, get_email_outbox
 from src.services.notification_manager import NotificationManager
 from src.database.db_manager import DBManager
 
@@ -171,56 +172,52 @@ async def share_test(
                     or sharer.get("email", "Someone")
                 )
 
-            # Send emails
+            # Resolve registered recipients with one query (not one per share)
+            recipient_emails = [share["sharee_email"] for share in shares]
+            recipients = {
+                u["email"]: u
+                for u in db.users.find(
+                    {"email": {"$in": recipient_emails}},
+                    {"email": 1, "name": 1, "display_name": 1, "firebase_uid": 1},
+                )
+            }
+
+            deadline_str = None
+            if request.deadline:
+                deadline_str = request.deadline.strftime("%d/%m/%Y %H:%M")
+
+            notifications = []
+            emails_to_send = []
             for share in shares:
                 recipient_email = share["sharee_email"]
                 recipient_name = recipient_email.split("@")[0]
 
-                # Get recipient user if exists
-                recipient = db.users.find_one({"email": recipient_email})
+                recipient = recipients.get(recipient_email)
                 if recipient:
                     recipient_name = (
                         recipient.get("name")
                         or recipient.get("display_name")
                         or recipient_name
                     )
-
-                    # Create in-app notification
-                    try:
-                        # ✅ Create NotificationManager instance inline
-                        notification_manager = NotificationManager(db=db)
-                        await asyncio.to_thread(
-                            notification_manager.create_notification,
-                            user_id=recipient.get("firebase_uid"),
-                            notification_type="online_test_invitation",
-                            title=f"Bài thi mới từ {sharer_name}",
-                            message=f"Bạn được chia sẻ bài thi: {test['title']}",
-                            action_url=f"/tests/{test_id}",
-                            metadata={
+                    notifications.append(
+                        {
+                            "user_id": recipient.get("firebase_uid"),
+                            "type": "online_test_invitation",
+                            "title": f"Bài thi mới từ {sharer_name}",
+                            "message": f"Bạn được chia sẻ bài thi: {test['title']}",
+                            "data": {
                                 "test_id": test_id,
                                 "sharer_name": sharer_name,
                                 "share_id": share["share_id"],
+                                "action_url": f"/tests/{test_id}",
                             },
-                        )
-                        logger.info(
-                            f"✅ Created in-app notification for {recipient_email}"
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"⚠️ Failed to create notification for {recipient_email}: {e}"
-                        )
-
-                # Send email
-                try:
-                    # Direct link to test (no invitation token needed)
-                    test_url = "https://wordai.pro/tests"
-
-                    deadline_str = None
-                    if request.deadline:
-                        deadline_str = request.deadline.strftime("%d/%m/%Y %H:%M")
+                        }
+                    )
 
-                    await asyncio.to_thread(
-                        brevo.send_test_invitation,
+                # Direct link to test (no invitation token needed)
+                emails_to_send.append(
+                    brevo.render_email(
+                        "send_test_invitation",
                         to_email=recipient_email,
                         recipient_name=recipient_name,
                         sharer_name=sharer_name,
@@ -230,11 +227,36 @@ async def share_test(
                         time_limit_minutes=test.get("time_limit_minutes"),
                         deadline=deadline_str,
                         message=request.message,
-                        test_url=test_url,
+                        test_url="https://wordai.pro/tests",
                     )
-                    logger.info(f"✅ Sent invitation email to {recipient_email}")
+                )
+
+            # In-app notifications: one insert_many
+            if notifications:
+                created = await asyncio.to_thread(
+                    NotificationManager(db=db).create_notifications, notifications
+                )
+                logger.info(f"✅ Created {created} in-app notifications")
+
+            # Emails: one outbox insert, delivered in batches by the email sender worker
+            queued = False
+            if EMAIL_OUTBOX_ENABLED:
+                try:
+                    await asyncio.to_thread(
+                        get_email_outbox().enqueue, emails_to_send, "test_invitation"
+                    )
+                    queued = True
+                    logger.info(f"✅ Queued {len(emails_to_send)} invitation emails")
                 except Exception as e:
-                    logger.error(f"❌ Failed to send email to {recipient_email}: {e}")
+                    logger.warning(f"⚠️ Email outbox unavailable ({e}), sending inline")
+            if not queued:
+                for email in emails_to_send:
+                    try:
+                        await asyncio.to_thread(brevo.send_email, **email)
+                    except Exception as send_error:
+                        logger.error(
+                            f"❌ Failed to send email to {email['to_email']}: {send_error}"
+                        )
 
         logger.info(f"✅ Created {len(shares)} test shares")
 
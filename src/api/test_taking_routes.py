@@ -22,15 +22,28 @@ from fastapi import (
     File,
     Form,
     Query,
+    Response,
 )
 
 from src.middleware.auth import verify_firebase_token as require_auth
+from src.utils.logger import get_hot_logger, lazy
 from src.models.online_test_models import *
 from src.services.online_test_utils import *
-from src.services.ielts_scoring import score_question
+from src.services.test_scoring_engine import (
+    build_user_answers_map,
+    get_compiled_answer_key,
+)
+from src.services.test_version_service import get_version_service
+from src.services.test_taker_view_cache import (
+    embed_json,
+    get_taker_view_cache,
+    load_test_meta,
+    merge_json,
+)
 from src.database.db_manager import DBManager
 
 logger = logging.getLogger("chatbot")
+hot_logger = get_hot_logger()
 
 router = APIRouter(prefix="/api/v1/tests", tags=["Test Taking"])
 
@@ -39,6 +52,24 @@ db_manager = DBManager()
 db = db_manager.db
 
 
+def _summarize_answers(user_answers: list) -> str:
+    """One-line debug summary of submitted answers: Q{id}(MCQ)=keys, Q{id}(Essay)=N chars"""
+    parts = []
+    for ans in user_answers:
+        q_id = ans.get("question_id", "N/A")
+        q_type = ans.get("question_type", "mcq")
+        if q_type == "mcq":
+            selected = ans.get("selected_answer_keys", []) or [
+                ans.get("selected_answer_key")
+            ]
+            parts.append(f"Q{q_id}(MCQ)={selected}")
+        elif q_type == "essay":
+            parts.append(f"Q{q_id}(Essay)={len(ans.get('essay_answer', ''))} chars")
+        else:
+            parts.append(f"Q{q_id}({q_type})")
+    return "; ".join(parts)
+
+
 @router.post("/submissions/answer-media/presigned-url", tags=["Essay Answers"])
 async def get_answer_media_presigned_url(
     request: PresignedURLRequest,
@@ -182,9 +213,9 @@ async def get_test(
     try:
         logger.info(f"📖 Get test request: {test_id} from user {user_info['uid']}")
 
-        # Get test
-        # db already initialized
-        test = db["online_tests"].find_one({"_id": ObjectId(test_id)})
+        # Get test metadata (questions are loaded only for the owner view;
+        # takers get the cached taker view)
+        test = load_test_meta(db["online_tests"], test_id)
 
         if not test:
             raise HTTPException(status_code=404, detail="Test not found")
@@ -197,6 +228,14 @@ async def get_test(
         if access_info["is_owner"]:
             logger.info(f"   🔑 Owner view: returning full data")
 
+            test.update(
+                db["online_tests"].find_one(
+                    {"_id": ObjectId(test_id)},
+                    {"questions": 1, "audio_sections": 1, "_id": 0},
+                )
+                or {}
+            )
+
             # Get statistics
             submissions_collection = db["test_submissions"]
             total_submissions = submissions_collection.count_documents(
@@ -296,7 +335,7 @@ async def get_test(
                 "short_description": marketplace_config.get("short_description"),
                 "cover_image_url": marketplace_config.get("cover_image_url"),
                 # Test configuration (basic)
-                "num_questions": len(test.get("questions", [])),
+                "num_questions": test.get("question_count", 0),
                 "time_limit_minutes": test.get("time_limit_minutes"),
                 "passing_score": test.get("passing_score", 50),
                 "max_retries": test.get("max_retries"),
@@ -353,20 +392,23 @@ async def get_test(
                     },
                 )
 
-            # Get questions without correct answers
-            test_generator = get_test_generator_service()
-            test_data = await test_generator.get_test_for_taking(
-                test_id, user_info["uid"]
-            )
+            # Questions without correct answers (cached serialized taker view)
+            view_bytes = await get_taker_view_cache().get_view_bytes(test_id, test)
 
             # Add metadata
-            test_data["status"] = "ready"
-            test_data["description"] = test.get("description")
-            test_data["access_type"] = access_info["access_type"]
-            test_data["is_owner"] = False
-            test_data["view_type"] = "shared"
-
-            return test_data
+            return Response(
+                content=merge_json(
+                    view_bytes,
+                    {
+                        "status": "ready",
+                        "description": test.get("description"),
+                        "access_type": access_info["access_type"],
+                        "is_owner": False,
+                        "view_type": "shared",
+                    },
+                ),
+                media_type="application/json",
+            )
 
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -402,7 +444,7 @@ async def start_test(
         test_collection = db["online_tests"]
         submissions_collection = db["test_submissions"]
 
-        test_doc = test_collection.find_one({"_id": ObjectId(test_id)})
+        test_doc = load_test_meta(test_collection, test_id)
         if not test_doc:
             raise HTTPException(status_code=404, detail="Test not found")
 
@@ -612,9 +654,8 @@ async def start_test(
             )
             logger.info(f"   📊 User balance: {current_points} → {new_points}")
 
-        # Get test data
-        test_generator = get_test_generator_service()
-        test_data = await test_generator.get_test_for_taking(test_id, user_info["uid"])
+        # Get test data (cached serialized taker view)
+        view_bytes = await get_taker_view_cache().get_view_bytes(test_id, test_doc)
 
         max_retries = test_doc.get("max_retries", 1)
 
@@ -670,7 +711,7 @@ async def start_test(
                 "current_answers": {},  # ✅ Dict/object, not array
                 "started_at": datetime.now(),
                 "last_saved_at": datetime.now(),
-                "time_remaining_seconds": test_data["time_limit_minutes"] * 60,
+                "time_remaining_seconds": test_doc["time_limit_minutes"] * 60,
                 "is_completed": False,
                 "attempt_number": current_attempt,  # Track which attempt this is
             }
@@ -681,13 +722,12 @@ async def start_test(
         )
 
         # Calculate time values for frontend
-        time_limit_seconds = test_data["time_limit_minutes"] * 60
+        time_limit_seconds = test_doc["time_limit_minutes"] * 60
         time_remaining_seconds = time_limit_seconds  # Full time at start
 
-        return {
+        response_data = {
             "success": True,
             "session_id": session_id,
-            "test": test_data,
             # Attempt tracking
             "current_attempt": current_attempt,  # Lần thử hiện tại (1, 2, 3...)
             "max_attempts": (
@@ -709,6 +749,12 @@ async def start_test(
             "is_completed": False,
         }
 
+        # "test" is spliced in as the cached JSON bytes (no re-serialization)
+        return Response(
+            content=embed_json(response_data, {"test": view_bytes}),
+            media_type="application/json",
+        )
+
     except HTTPException:
         raise
     except Exception as e:
@@ -748,22 +794,11 @@ async def submit_test(
         logger.info(f"📤 Submit test: {test_id} from user {user_info['uid']}")
         logger.info(f"   Answers: {len(request.user_answers)} questions")
 
-        # ========== DEBUG: Log full payload for troubleshooting ==========
-        logger.info(f"   📋 User answers payload:")
-        for idx, ans in enumerate(request.user_answers, 1):
-            q_id = ans.get("question_id", "N/A")
-            q_type = ans.get("question_type", "mcq")
-
-            if q_type == "mcq":
-                selected = ans.get("selected_answer_keys", []) or [
-                    ans.get("selected_answer_key")
-                ]
-                logger.info(f"      {idx}. Q{q_id} (MCQ): {selected}")
-            elif q_type == "essay":
-                essay_len = len(ans.get("essay_answer", ""))
-                logger.info(f"      {idx}. Q{q_id} (Essay): {essay_len} chars")
-            else:
-                logger.info(f"      {idx}. Q{q_id} ({q_type})")
+        # ========== DEBUG: answers payload (rate limited, formatted only if emitted) ==========
+        hot_logger.info(
+            "   📋 User answers payload: %s",
+            lazy(lambda: _summarize_answers(request.user_answers)),
+        )
 
         # Get test with correct answers
         # db already initialized
@@ -809,65 +844,13 @@ async def submit_test(
         logger.info(f"   📊 Test category: {test_category}")
 
         # Create answer maps for all question types
-        user_answers_map = {}
-        for ans in request.user_answers:
-            q_id = ans.get("question_id")
-            ans_type = ans.get("question_type", "mcq")
-
-            if ans_type == "mcq":
-                # Support both new (selected_answer_keys) and legacy (selected_answer_key)
-                selected_answers = ans.get("selected_answer_keys", [])
-                if not selected_answers and "selected_answer_key" in ans:
-                    selected_answers = [ans.get("selected_answer_key")]
-
-                user_answers_map[q_id] = {
-                    "type": "mcq",
-                    "selected_answer_keys": selected_answers,
-                }
-
-            elif ans_type == "matching":
-                user_answers_map[q_id] = {
-                    "type": "matching",
-                    "matches": ans.get("matches", {}),
-                }
-
-            elif ans_type == "map_labeling":
-                user_answers_map[q_id] = {
-                    "type": "map_labeling",
-                    "labels": ans.get("labels", {}),
-                }
-
-            elif ans_type in ["completion", "sentence_completion", "short_answer"]:
-                user_answers_map[q_id] = {
-                    "type": ans_type,
-                    "answers": ans.get("answers", {}),
-                }
-
-            elif ans_type == "essay":
-                user_answers_map[q_id] = {
-                    "type": "essay",
-                    "essay_answer": ans.get("essay_answer", ""),
-                    "media_attachments": ans.get(
-                        "media_attachments", []
-                    ),  # Store media attachments (images, audio, documents)
-                }
-
-            elif ans_type == "true_false_multiple":
-                user_answers_map[q_id] = {
-                    "type": "true_false_multiple",
-                    "user_answer": ans.get("user_answer", {}),
-                }
+        user_answers_map = build_user_answers_map(request.user_answers)
 
         # ========== Auto-grade ALL auto-gradable questions (MCQ + IELTS types) ==========
         mcq_correct_count = 0
         mcq_score = 0
         results = []
 
-        # Get all auto-gradable questions (MCQ + IELTS types)
-        auto_gradable_questions = [
-            q for q in questions if q.get("question_type", "mcq") != "essay"
-        ]
-
         # For diagnostic tests, skip correct/incorrect scoring
         if is_diagnostic:
             # Diagnostic test - no scoring, just save answers
@@ -889,16 +872,19 @@ async def submit_test(
                     }
                 )
         else:
-            # Academic test - score using IELTS scoring logic
-            for q in auto_gradable_questions:
-                question_id = q["question_id"]
+            # Academic test - score the whole submission in one pass against the
+            # compiled (cached) answer key of this test version
+            scores = get_compiled_answer_key(test_id, test_doc).score_submission(
+                user_answers_map
+            )
+
+            for q, (is_correct, points_earned, feedback) in zip(questions, scores):
                 question_type = q.get("question_type", "mcq")
-                user_answer_data = user_answers_map.get(question_id, {})
+                if question_type == "essay":
+                    continue
 
-                # Use new IELTS scoring system
-                is_correct, points_earned, feedback = score_question(
-                    q, user_answer_data
-                )
+                question_id = q["question_id"]
+                user_answer_data = user_answers_map.get(question_id, {})
 
                 if is_correct:
                     mcq_correct_count += 1
@@ -1774,52 +1760,12 @@ async def get_submission_detail(
         results = []
 
         # Create maps for quick lookup (ALL question types)
-        user_answers_map = {}
-        for ans in submission["user_answers"]:
-            q_id = ans.get("question_id")
-            ans_type = ans.get("question_type", "mcq")
-
-            if ans_type == "mcq":
-                # Support both new (selected_answer_keys) and legacy (selected_answer_key)
-                selected_answers = ans.get("selected_answer_keys", [])
-                if not selected_answers and "selected_answer_key" in ans:
-                    selected_answers = [ans.get("selected_answer_key")]
-
-                user_answers_map[q_id] = {
-                    "type": "mcq",
-                    "selected_answer_keys": selected_answers,
-                }
-            elif ans_type == "matching":
-                user_answers_map[q_id] = {
-                    "type": "matching",
-                    "matches": ans.get("matches", {}),
-                }
-            elif ans_type == "completion":
-                user_answers_map[q_id] = {
-                    "type": "completion",
-                    "answers": ans.get("answers", {}),
-                }
-            elif ans_type == "sentence_completion":
-                user_answers_map[q_id] = {
-                    "type": "sentence_completion",
-                    "answers": ans.get("answers", {}),
-                }
-            elif ans_type == "short_answer":
-                user_answers_map[q_id] = {
-                    "type": "short_answer",
-                    "answers": ans.get("answers", {}),
-                }
-            elif ans_type == "essay":
-                user_answers_map[q_id] = {
-                    "type": "essay",
-                    "essay_answer": ans.get("essay_answer", ""),
-                    "media_attachments": ans.get("media_attachments", []),
-                }
-            elif ans_type == "true_false_multiple":
-                user_answers_map[q_id] = {
-                    "type": "true_false_multiple",
-                    "user_answer": ans.get("user_answer", {}),
-                }
+        user_answers_map = build_user_answers_map(submission["user_answers"])
+
+        # Score all questions in one pass with the compiled answer key
+        scores = get_compiled_answer_key(
+            submission["test_id"], test_doc
+        ).score_submission(user_answers_map)
 
         # Get essay grades if available
         essay_grades_map = {}
@@ -1827,7 +1773,7 @@ async def get_submission_detail(
             for grade in submission["essay_grades"]:
                 essay_grades_map[grade["question_id"]] = grade
 
-        for q in test_doc["questions"]:
+        for q, scored in zip(test_doc["questions"], scores):
             question_id = q["question_id"]
             q_type = q.get("question_type", "mcq")
             user_answer_data = user_answers_map.get(question_id, {})
@@ -1885,13 +1831,8 @@ async def get_submission_detail(
                 "sentence_completion",
                 "short_answer",
             ]:
-                # IELTS question types - Use ielts_scoring module
-                user_answer_data = user_answers_map.get(question_id, {})
-
-                # Score using IELTS scoring logic
-                is_correct, points_earned, feedback = score_question(
-                    q, user_answer_data
-                )
+                # IELTS question types - scored by the compiled answer key
+                is_correct, points_earned, feedback = scored
 
                 result = {
                     "question_id": question_id,
@@ -1947,13 +1888,8 @@ async def get_submission_detail(
                 results.append(result)
 
             elif q_type == "true_false_multiple":
-                # True/False Multiple - Use ielts_scoring module
-                user_answer_data = user_answers_map.get(question_id, {})
-
-                # Score using IELTS scoring logic
-                is_correct, points_earned, feedback = score_question(
-                    q, user_answer_data
-                )
+                # True/False Multiple - scored by the compiled answer key
+                is_correct, points_earned, feedback = scored
 
                 # Calculate statement-by-statement breakdown
                 statements = q.get("statements", [])
@@ -2670,8 +2606,14 @@ async def delete_audio_section(
         # Update database
         db.online_tests.update_one(
             {"_id": ObjectId(test_id)},
-            {"$set": {f"audio_sections.{section_index}": audio_section}},
+            {
+                "$set": {
+                    f"audio_sections.{section_index}": audio_section,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
         )
+        get_version_service().invalidate_taker_view(test_id)
 
         logger.info(
             f"✅ User {user_id} deleted audio from test {test_id} section {section_number}"
@@ -2855,8 +2797,14 @@ async def replace_audio_section(
         # Update database
         db.online_tests.update_one(
             {"_id": ObjectId(test_id)},
-            {"$set": {f"audio_sections.{section_index}": audio_section}},
+            {
+                "$set": {
+                    f"audio_sections.{section_index}": audio_section,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
         )
+        get_version_service().invalidate_taker_view(test_id)
 
         logger.info(
             f"✅ User {user_id} replaced audio in test {test_id} section {section_number}"
@@ -1143,10 +1143,14 @@ async def regenerate_audio(
 Job được đẩy vào Redis queue `queue:video_generation` và xử lý bởi `video_generation_worker`.
 
 Poll `GET /{task_id}` cho đến khi status = `completed` hoặc `failed`.
+
+Có thể render lại task đã `completed`/`failed`. Ở chế độ `ai_video`, các clip xAI được
+cache để render lại không tốn phí; truyền `regenerate_clips=true` để sinh clip mới.
 """,
 )
 async def render_video(
     task_id: str,
+    regenerate_clips: bool = False,
     current_user: Dict[str, Any] = Depends(get_current_user),
 ):
     user_id = current_user["uid"]
@@ -1155,11 +1159,17 @@ async def render_video(
     task = db.video_tasks.find_one({"task_id": task_id, "user_id": user_id})
     if not task:
         raise HTTPException(404, "Task not found")
-    if task["status"] not in ("step3_done", "step3_partial"):
+    if task["status"] not in ("step3_done", "step3_partial", "completed", "failed"):
         raise HTTPException(
             400, f"Must complete step3 first (current: '{task['status']}')"
         )
 
+    # A new nonce changes the xAI clip cache key, so every scene gets a fresh clip
+    if regenerate_clips:
+        db.video_tasks.update_one(
+            {"task_id": task_id}, {"$set": {"clip_nonce": uuid.uuid4().hex}}
+        )
+
     # Push render job to Redis queue
     import redis.asyncio as aioredis
 
@@ -0,0 +1,223 @@
+"""
+Import-time profiler and cold-start benchmark for the API process.
+
+Runs the app factory in a fresh interpreter so results reflect a real cold start:
+importing src.app alone loads no routers, create_app() imports and registers every
+enabled route group (API_ROUTE_GROUPS minus API_DEFERRED_ROUTE_GROUPS).
+
+Usage:
+    # Per-module import cost (python -X importtime, aggregated)
+    python -m src.core.import_profiler report --top 30
+    python -m src.core.import_profiler report --groups core,tests --json
+    python -m src.core.import_profiler report --target src.services.ai_service
+
+    # Cold-start regression benchmark
+    python -m src.core.import_profiler benchmark --runs 5 --save-baseline data/cold_start_baseline.json
+    python -m src.core.import_profiler benchmark --runs 5 --baseline data/cold_start_baseline.json --max-regression 0.15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# "module" is imported; "module:factory" is imported and the factory called
+DEFAULT_TARGET = "src.app:create_app"
+
+
+@dataclass
+class ImportRecord:
+    """One line of `python -X importtime` output"""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def _subprocess_env(groups: Optional[str]) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("PYTHONPATH", os.getcwd())
+    if groups:
+        env["API_ROUTE_GROUPS"] = groups
+    return env
+
+
+def _target_code(target: str) -> str:
+    module, _, factory = target.partition(":")
+    if not factory:
+        return f"import {module}"
+    return f"import {module}; {module}.{factory}()"
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """Parse `import time: self [us] | cumulative | imported package` lines"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            _, payload = line.split(":", 1)
+            self_us, cumulative_us, name = payload.split("|", 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append(
+            ImportRecord(
+                module=name.strip(),
+                self_us=int(self_us.strip()),
+                cumulative_us=int(cumulative_us.strip()),
+                depth=depth,
+            )
+        )
+    return records
+
+
+def profile_imports(target: str = DEFAULT_TARGET, groups: Optional[str] = None) -> List[ImportRecord]:
+    """Load `target` in a fresh interpreter with -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _target_code(target)],
+        capture_output=True,
+        text=True,
+        env=_subprocess_env(groups),
+    )
+    if result.returncode != 0:
+        tail = "\n".join(result.stderr.splitlines()[-20:])
+        raise RuntimeError(f"Loading {target} failed:\n{tail}")
+    return parse_importtime(result.stderr)
+
+
+def summarize(records: List[ImportRecord], top: int = 25) -> Dict[str, List[Dict]]:
+    """Aggregate records into the views we care about for startup work"""
+    # Cost per top-level package (third-party SDKs show up here)
+    packages: Dict[str, int] = {}
+    for record in records:
+        root = record.module.split(".")[0]
+        packages[root] = packages.get(root, 0) + record.self_us
+
+    # Our own modules by cumulative time (what a route module drags in)
+    own = [r for r in records if r.module.startswith("src.")]
+
+    def as_ms(us: int) -> float:
+        return round(us / 1000.0, 1)
+
+    return {
+        "total_ms": as_ms(sum(r.self_us for r in records)),
+        "packages": [
+            {"package": name, "self_ms": as_ms(us)}
+            for name, us in sorted(packages.items(), key=lambda i: i[1], reverse=True)[:top]
+        ],
+        "src_modules": [
+            {
+                "module": r.module,
+                "cumulative_ms": as_ms(r.cumulative_us),
+                "self_ms": as_ms(r.self_us),
+            }
+            for r in sorted(own, key=lambda r: r.cumulative_us, reverse=True)[:top]
+        ],
+    }
+
+
+def measure_cold_start(target: str = DEFAULT_TARGET, runs: int = 5, groups: Optional[str] = None) -> Dict[str, float]:
+    """Wall-clock time to load `target` in fresh interpreters"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", _target_code(target)],
+            capture_output=True,
+            text=True,
+            env=_subprocess_env(groups),
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            tail = "\n".join(result.stderr.splitlines()[-20:])
+            raise RuntimeError(f"Loading {target} failed:\n{tail}")
+        timings.append(elapsed)
+
+    return {
+        "runs": runs,
+        "median_s": round(statistics.median(timings), 3),
+        "min_s": round(min(timings), 3),
+        "max_s": round(max(timings), 3),
+    }
+
+
+def _print_report(summary: Dict[str, List[Dict]]):
+    print(f"\n⏱️  Total import time: {summary['total_ms']:.0f} ms\n")
+    print("📦 Top packages (self time):")
+    for item in summary["packages"]:
+        print(f"   {item['self_ms']:>9.1f} ms  {item['package']}")
+    print("\n🧩 Top src modules (cumulative time):")
+    for item in summary["src_modules"]:
+        print(
+            f"   {item['cumulative_ms']:>9.1f} ms  {item['module']} (self {item['self_ms']:.1f} ms)"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="API import-time profiler")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report = sub.add_parser("report", help="Per-module import cost")
+    report.add_argument("--target", default=DEFAULT_TARGET)
+    report.add_argument("--groups", help="API_ROUTE_GROUPS for the profiled process")
+    report.add_argument("--top", type=int, default=25)
+    report.add_argument("--json", action="store_true", help="Print JSON instead of text")
+
+    bench = sub.add_parser("benchmark", help="Cold-start time benchmark")
+    bench.add_argument("--target", default=DEFAULT_TARGET)
+    bench.add_argument("--groups", help="API_ROUTE_GROUPS for the benchmarked process")
+    bench.add_argument("--runs", type=int, default=5)
+    bench.add_argument("--baseline", help="Baseline JSON to compare against")
+    bench.add_argument("--save-baseline", help="Write result as new baseline JSON")
+    bench.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.15,
+        help="Allowed median slowdown vs baseline (fraction, default 0.15)",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "report":
+        summary = summarize(profile_imports(args.target, args.groups), top=args.top)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            _print_report(summary)
+        return 0
+
+    result = measure_cold_start(args.target, args.runs, args.groups)
+    result["target"] = args.target
+    result["groups"] = args.groups or "all"
+    print(f"🚀 Cold start ({result['groups']}): {json.dumps(result)}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limit = baseline["median_s"] * (1 + args.max_regression)
+        change = (result["median_s"] - baseline["median_s"]) / baseline["median_s"]
+        print(
+            f"📊 Median {result['median_s']}s vs baseline {baseline['median_s']}s ({change:+.1%})"
+        )
+        if result["median_s"] > limit:
+            print(f"❌ Cold-start regression above {args.max_regression:.0%}")
+            return 1
+        print("✅ Cold start within budget")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
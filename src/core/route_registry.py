@@ -0,0 +1,918 @@
+"""
+Route Registry
+Declarative list of every API router mounted by src/app.py, grouped by product area.
+
+Route modules are imported when the app is created (create_app(), or first access to
+`src.app.app`) instead of at app.py import time, so a deployment can load only the
+groups it serves and defer the rest:
+
+    API_ROUTE_GROUPS=all                      # default - every group, in declaration order
+    API_ROUTE_GROUPS=core,tests,studyhub      # role-specific pod (e.g. online-test API)
+    API_DEFERRED_ROUTE_GROUPS=media,books     # registered in the background after startup
+
+Declaration order matters: specific routes must be registered before dynamic ones
+(e.g. book_marketplace before book_routes' /{book_id}). Filtering keeps the relative
+order; deferred groups are appended after the eager ones, so only defer groups whose
+paths do not overlap with other groups.
+
+Import cost per module is recorded in IMPORT_TIMINGS (see src/core/import_profiler.py).
+Route modules should keep heavy SDKs off their import path: sentence_transformers
+(torch) is imported on first use by the embedding, AI service, vector store and
+document processor modules, so registering their routers does not load it.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import FastAPI
+
+logger = logging.getLogger("chatbot")
+
+ROUTE_GROUPS = (
+    "core",
+    "chat",
+    "documents",
+    "learning",
+    "partners",
+    "tests",
+    "books",
+    "media",
+    "studyhub",
+)
+
+# module -> seconds spent importing it during registration
+IMPORT_TIMINGS: Dict[str, float] = {}
+
+
+@dataclass
+class RouteSpec:
+    """One app.include_router() call"""
+
+    module: str
+    attr: str = "router"
+    group: str = "core"
+    prefix: str = ""
+    tags: Optional[List[str]] = None
+    requires: List[str] = field(default_factory=list)  # side-effect imports
+
+
+ROUTE_SPECS: List[RouteSpec] = [
+    # ✅ Authentication endpoints - Firebase auth for user management
+    RouteSpec("src.api.auth_routes", group="core", tags=["Firebase Authentication"]),
+    # ✅ Subscription & Points endpoints - User subscription and points management
+    RouteSpec(
+        "src.api.subscription_routes",
+        group="core",
+        tags=["Subscription & Points"],
+    ),
+    # ✅ Payment Activation endpoint - IPN subscription activation from payment service
+    RouteSpec(
+        "src.api.payment_activation_routes",
+        group="core",
+        tags=["Payment Activation"],
+    ),
+    # ✅ Points Management endpoint - Points purchase from payment service
+    RouteSpec(
+        "src.api.payment_activation_routes",
+        attr="points_router",
+        group="core",
+        tags=["Points Management"],
+    ),
+    # ✅ Billing History endpoints - Payment history
+    RouteSpec("src.api.billing_routes", group="core", tags=["Billing & Payments"]),
+    # ✅ USDT BEP20 Payment System - Cryptocurrency payments
+    RouteSpec(
+        "src.api.usdt_subscription_routes",
+        group="core",
+        tags=["USDT - Subscription Payments"],
+    ),
+    RouteSpec(
+        "src.api.usdt_points_routes",
+        group="core",
+        tags=["USDT - Points Purchase"],
+    ),
+    RouteSpec("src.api.usdt_webhook_routes", group="core", tags=["USDT - Webhooks"]),
+    # ✅ Support System endpoints - Customer support tickets
+    RouteSpec("src.api.support_routes", group="core", tags=["Customer Support"]),
+    # ✅ E2EE Secret Documents - Key Management endpoints
+    RouteSpec(
+        "src.api.secret_key_routes",
+        group="documents",
+        tags=["E2EE - Key Management"],
+    ),
+    # ✅ E2EE Secret Documents - CRUD endpoints
+    RouteSpec(
+        "src.api.secret_document_routes",
+        group="documents",
+        tags=["E2EE - Secret Documents"],
+    ),
+    # Health and status endpoints
+    RouteSpec("src.api.health_routes", group="core", tags=["Health"]),
+    # ✅ Public API endpoints (no auth) - For wordai.pro homepage
+    RouteSpec("src.api.public_routes", group="core", tags=["Public"]),
+    # Unified Chat System - Multi-industry with intelligent routing
+    RouteSpec(
+        "src.api.unified_chat_routes",
+        group="chat",
+        tags=["Unified Chat - Multi-Industry"],
+    ),
+    # Conversation Analysis API - Remarketing insights with Google Gemini
+    RouteSpec(
+        "src.api.conversation_analysis_routes",
+        group="chat",
+        tags=["Conversation Analysis", "Remarketing", "Gemini AI"],
+    ),
+    # Real estate analysis endpoints
+    RouteSpec("src.api.real_estate_routes", group="chat", tags=["Real Estate"]),
+    # OCR endpoints
+    RouteSpec("src.api.ocr_routes", group="chat", tags=["OCR"]),
+    # Loan assessment endpoints
+    RouteSpec("src.api.loan_routes", group="chat", tags=["Loan Assessment"]),
+    # Document processing endpoints
+    RouteSpec(
+        "src.api.document_processing_routes",
+        group="chat",
+        tags=["Document Processing"],
+    ),
+    # AI Sales Agent endpoints for loan consultation
+    RouteSpec(
+        "src.ai_sales_agent.api.routes",
+        group="chat",
+        prefix="/api/sales-agent",
+        tags=["AI Sales Agent - Loan Consultation"],
+    ),
+    # Conversation Analysis API for remarketing insights
+    RouteSpec(
+        "src.api.conversation_analysis_routes",
+        group="chat",
+        prefix="/api/conversation-analysis",
+        tags=["Conversation Analysis - Google Gemini"],
+    ),
+    # Admin routers for company data management - Modular Structure
+    RouteSpec(
+        "src.api.admin.company_routes",
+        group="chat",
+        prefix="/api/admin",
+        tags=["Admin - Company Management"],
+    ),
+    RouteSpec(
+        "src.api.admin.file_routes",
+        group="chat",
+        prefix="/api/admin",
+        tags=["Admin - File Management"],
+    ),
+    RouteSpec(
+        "src.api.admin.products_services_routes",
+        group="chat",
+        prefix="/api/admin",
+        tags=["Admin - Products & Services"],
+    ),
+    RouteSpec(
+        "src.api.admin.image_routes",
+        group="chat",
+        prefix="/api/admin",
+        tags=["Admin - Image Processing"],
+    ),
+    RouteSpec("src.api.admin.task_status_routes", group="chat"),
+    # ✅ RESTORED: Document Settings and History APIs - needed by frontend
+    RouteSpec(
+        "src.api.document_settings_routes",
+        group="documents",
+        tags=["Document Settings"],
+    ),
+    RouteSpec(
+        "src.api.documents_history_routes",
+        group="documents",
+        tags=["Documents History"],
+    ),
+    # ✅ ADDED: AI Content Edit API - HTML editing with AI
+    RouteSpec("src.api.ai_content_edit", group="documents", tags=["AI Content Edit"]),
+    # ✅ ADDED: AI Chat API - Streaming chat with file context
+    RouteSpec("src.api.ai_chat", group="documents", tags=["AI Chat"]),
+    # ✅ ADDED: Document Chat API - AI chat with document context
+    RouteSpec(
+        "src.api.document_chat_routes",
+        group="documents",
+        tags=["Document Chat"],
+    ),
+    # ✅ ADDED: Document Editor API - Document management with auto-save
+    RouteSpec(
+        "src.api.document_editor_routes",
+        group="documents",
+        tags=["Document Editor"],
+    ),
+    # ✅ ADDED: Code Editor API - File management, templates, exercises (Phase 1)
+    RouteSpec(
+        "src.api.code_editor_routes",
+        group="learning",
+        tags=["Code Editor", "Phase 1: File Management"],
+    ),
+    # ✅ ADDED: Learning System API - Categories, Topics, Knowledge, Community
+    RouteSpec("src.api.learning_routes", group="learning", tags=["Learning System"]),
+    # ✅ ADDED: Song Learning API - English learning through music (Phase 3-5 complete)
+    RouteSpec("src.api.song_learning_routes", group="learning", tags=["Song Learning"]),
+    # ✅ ADDED: BBC Podcast Learning API - English learning through BBC 6 Minute English
+    RouteSpec(
+        "src.api.podcast_routes",
+        group="learning",
+        tags=["BBC Podcast Learning"],
+    ),
+    # ✅ ADDED: Pronunciation Assessment API - Whisper + Wav2Vec2 phoneme scoring
+    RouteSpec(
+        "src.api.pronunciation_routes",
+        group="learning",
+        tags=["Pronunciation Assessment"],
+    ),
+    # ✅ ADDED: Daily Vocab by WordAI — free vocabulary learning cards
+    RouteSpec("src.api.daily_vocab_routes", group="learning", tags=["Daily Vocab"]),
+    # ✅ ADDED: Conversation Public API - SSR/SEO (no auth) — MUST be before conversation_learning_router
+    RouteSpec(
+        "src.api.conversation_public_routes",
+        group="learning",
+        tags=["SEO Public - Conversations"],
+    ),
+    # ✅ ADDED: Conversation Learning API - English learning through conversations
+    RouteSpec(
+        "src.api.conversation_learning_routes",
+        group="learning",
+        tags=["Conversation Learning"],
+        requires=["src.api.conversation_detail_routes"],
+    ),
+    RouteSpec(
+        "src.api.conversation_subscription_routes",
+        group="learning",
+        tags=["Conversation Subscription"],
+    ),
+    RouteSpec("src.api.affiliate_routes", group="partners", tags=["Affiliate"]),
+    RouteSpec(
+        "src.api.affiliate_admin_routes",
+        group="partners",
+        tags=["Affiliate Admin"],
+    ),
+    RouteSpec("src.api.supervisor_routes", group="partners", tags=["Supervisor"]),
+    RouteSpec(
+        "src.api.supervisor_admin_routes",
+        group="partners",
+        tags=["Supervisor Admin"],
+    ),
+    RouteSpec("src.api.admin_portal_routes", group="partners", tags=["Admin Portal"]),
+    RouteSpec(
+        "src.api.ai_bundle_subscription_routes",
+        group="partners",
+        tags=["AI Bundle Subscription"],
+    ),
+    RouteSpec(
+        "src.api.ai_bundle_affiliate_routes",
+        group="partners",
+        tags=["AI Bundle Affiliate"],
+    ),
+    RouteSpec(
+        "src.api.ai_bundle_supervisor_routes",
+        group="partners",
+        tags=["AI Bundle Supervisor"],
+    ),
+    RouteSpec(
+        "src.api.ai_bundle_admin_routes",
+        group="partners",
+        tags=["AI Bundle Admin"],
+    ),
+    RouteSpec("src.api.partners_routes", group="partners", tags=["Partners"]),
+    RouteSpec("src.api.grammar_routes", group="learning", tags=["Grammar Check"]),
+    RouteSpec("src.api.learning_path_routes", group="learning", tags=["Learning Path"]),
+    # ✅ ADDED: Song Subscription API - Premium subscription for unlimited songs
+    RouteSpec(
+        "src.api.song_subscription_routes",
+        group="learning",
+        tags=["Song Subscription"],
+    ),
+    # ✅ ADDED: Song Subscription Activation - Payment webhook handler
+    RouteSpec(
+        "src.api.song_subscription_activation_routes",
+        group="learning",
+        tags=["Song Subscription Activation"],
+    ),
+    # ✅ ADDED: Software Lab API - Projects, Templates, Files, Sync, Export/Import (19 endpoints)
+    RouteSpec(
+        "src.api.software_lab_routes",
+        group="learning",
+        prefix="/api",
+        tags=["Software Lab"],
+    ),
+    # ✅ ADDED: Software Lab AI API - AI Code Assistant (5 features: Generate, Explain, Transform, Architecture, Scaffold)
+    RouteSpec(
+        "src.api.software_lab_ai_routes",
+        group="learning",
+        prefix="/api",
+        tags=["Software Lab AI"],
+    ),
+    RouteSpec(
+        "src.api.learning_assistant_routes",
+        group="learning",
+        prefix="/api/learning-assistant",
+        tags=["Learning Assistant"],
+    ),
+    # ✅ ADDED: AI Editor Suite - Edit, Translate, Format, Bilingual Conversion
+    RouteSpec("src.api.ai_editor_routes", group="documents", tags=["AI Editor Suite"]),
+    # ✅ ADDED: Document Export API - Export to PDF, DOCX, TXT with pagination
+    RouteSpec(
+        "src.api.document_export_routes",
+        group="documents",
+        tags=["Document Export"],
+    ),
+    # ✅ ADDED: Book Export API - Export books and chapters to PDF, DOCX, TXT, HTML
+    RouteSpec("src.api.book_export_routes", group="books", tags=["Book Export"]),
+    # ✅ ADDED: Test Sharing API - Online Test Phase 4 (Sharing & Collaboration)
+    # IMPORTANT: Mount BEFORE online_test_router to prioritize specific routes like /shared-with-me
+    RouteSpec(
+        "src.api.test_sharing_routes",
+        group="tests",
+        tags=["Online Tests - Phase 4: Sharing"],
+    ),
+    # ✅ ADDED: Test Marketplace API - Online Test Phase 5 (Marketplace)
+    # Mount marketplace routes before online_test_router for priority
+    RouteSpec(
+        "src.api.marketplace_routes",
+        group="tests",
+        tags=["Online Tests - Phase 5: Marketplace"],
+    ),
+    RouteSpec(
+        "src.api.marketplace_transactions_routes",
+        group="tests",
+        tags=["Online Tests - Phase 5: Transactions"],
+    ),
+    # ✅ REFACTORED: Online Test API - Split into 4 specialized routers
+    RouteSpec(
+        "src.api.test_creation_routes",
+        group="tests",
+        tags=["Online Tests - Creation"],
+    ),
+    RouteSpec(
+        "src.api.test_taking_routes",
+        group="tests",
+        tags=["Online Tests - Taking"],
+    ),
+    RouteSpec(
+        "src.api.test_grading_routes",
+        group="tests",
+        tags=["Online Tests - Grading"],
+    ),
+    RouteSpec(
+        "src.api.test_marketplace_routes",
+        group="tests",
+        tags=["Online Tests - Marketplace"],
+    ),
+    # ✅ ADDED: Test Translation API - Translate tests to different languages
+    RouteSpec(
+        "src.api.test_translation_routes",
+        group="tests",
+        tags=["Online Tests - Translation"],
+    ),
+    # ✅ ADDED: Test Statistics API - Analytics and reporting for tests and users
+    RouteSpec(
+        "src.api.test_statistics_routes",
+        group="tests",
+        tags=["Online Tests - Statistics"],
+    ),
+    # ✅ ADDED: Listening Audio Management API - Edit transcript and regenerate audio
+    RouteSpec(
+        "src.api.listening_audio_routes",
+        group="tests",
+        tags=["Online Tests - Listening Audio"],
+    ),
+    # ✅ ADDED: Company Context and User History APIs
+    RouteSpec("src.api.admin.company_context_routes", group="chat"),
+    RouteSpec("src.api.user_history_routes", group="chat"),
+    # ✅ ADDED: AI Extraction API
+    RouteSpec(
+        "src.api.extraction_routes",
+        group="chat",
+        tags=["AI Extraction - Products & Services"],
+    ),
+    # ✅ ADDED: Hybrid Search API for direct testing
+    RouteSpec(
+        "src.api.hybrid_search.hybrid_search_routes",
+        group="chat",
+        tags=["Hybrid Search API"],
+    ),
+    # ✅ ADDED: Document Generation API for AI-powered document creation - KEEP
+    RouteSpec(
+        "src.api.document_generation",
+        group="documents",
+        tags=["Document Generation"],
+    ),
+    # ✅ NEW: Simple File Management API with R2 integration
+    RouteSpec(
+        "src.api.simple_file_routes",
+        group="documents",
+        tags=["Simple File Management"],
+    ),
+    # ✅ NEW: Library Files API - Type 3 files (Phase 1 complete)
+    RouteSpec("src.api.library_routes", group="documents", tags=["Library Files"]),
+    # ✅ NEW: Encrypted Library Images API - E2EE images with Zero-Knowledge
+    RouteSpec(
+        "src.api.encrypted_library_routes",
+        group="documents",
+        tags=["Encrypted Library Images - E2EE"],
+    ),
+    # ✅ NEW: Encrypted Library Folders API - Folder management for E2EE images
+    RouteSpec(
+        "src.api.encrypted_folder_routes",
+        group="documents",
+        tags=["Encrypted Library Folders - E2EE"],
+    ),
+    # ✅ NEW: Secret Images API - Dedicated endpoints for secret images with folder support
+    RouteSpec(
+        "src.api.secret_images_routes",
+        group="documents",
+        tags=["Secret Images"],
+    ),
+    # ✅ NEW: Share API - File Sharing System (Phase 2 complete)
+    RouteSpec("src.api.share_routes", group="documents", tags=["File Sharing"]),
+    # ✅ NEW: Notification API - InApp notification system
+    RouteSpec("src.api.notification_routes", group="core", tags=["Notifications"]),
+    # ✅ NEW: Gemini Slide Parser API - Native PDF support for presentations
+    RouteSpec(
+        "src.api.gemini_slide_parser_routes",
+        group="documents",
+        tags=["Gemini Slide Parser", "AI Document Processing"],
+    ),
+    # ✅ NEW: Slide Template API - Save and apply slide templates (Phase 1 MVP)
+    RouteSpec(
+        "src.api.slide_template_routes",
+        group="documents",
+        tags=["Slide Templates", "Template Management"],
+    ),
+    # ✅ NEW: Slide Share API - Public presentation sharing with password & analytics
+    RouteSpec(
+        "src.api.slide_share_routes",
+        group="documents",
+        tags=["Slide Sharing", "Public Presentations"],
+    ),
+    # ✅ NEW: PDF Document API - Upload, Split, Merge, and AI Conversion
+    RouteSpec(
+        "src.api.pdf_document_routes",
+        group="documents",
+        tags=["PDF Documents", "AI Conversion", "Document Management"],
+    ),
+    # ✅ NEW: Book Marketplace API - Earnings, Purchases, My Published Books
+    # IMPORTANT: Register BEFORE book_router to prioritize specific routes like /my-published, /earnings
+    # over dynamic route /{book_id}
+    RouteSpec(
+        "src.api.book_marketplace_routes",
+        group="books",
+        tags=["Book Marketplace", "Earnings", "Purchases"],
+    ),
+    # ✅ NEW: Book Combo API - Bundle multiple books, purchase as combo
+    # Register BEFORE book_router to avoid /{book_id} catch-all conflict
+    RouteSpec("src.api.book_combo_routes", group="books", tags=["Book Combos"]),
+    # ✅ NEW: Desktop App License API - Individual + Enterprise (with user mgmt & customization)
+    RouteSpec(
+        "src.api.desktop_license_routes",
+        group="books",
+        tags=["Desktop License"],
+    ),
+    # ✅ NEW: Book Chapter Management API - Chapter CRUD, reordering, bulk updates
+    RouteSpec(
+        "src.api.book_chapter_routes",
+        group="books",
+        tags=["Online Books Chapters", "Chapter Management"],
+    ),
+    # ✅ NEW: Book Public & Community API - Public view, Community marketplace, Discovery
+    RouteSpec(
+        "src.api.book_public_routes",
+        group="books",
+        tags=["Online Books Public & Community", "Book Discovery"],
+    ),
+    # ✅ NEW: Online Books API - GitBook-style documentation system (renamed from User Guides)
+    # Contains dynamic route /{book_id} - must be registered AFTER specific routes
+    RouteSpec(
+        "src.api.book_routes",
+        group="books",
+        tags=["Online Books", "Documentation System"],
+    ),
+    # ✅ NEW: Book Advanced API - Translation & Duplication features
+    RouteSpec(
+        "src.api.book_advanced_routes",
+        group="books",
+        tags=["Book Advanced", "Translation", "Duplication"],
+    ),
+    # ✅ NEW: Book Translation API - Multi-language support (17 languages)
+    RouteSpec(
+        "src.api.book_translation_routes",
+        group="books",
+        tags=["Book Translation", "Multi-Language", "AI Translation"],
+    ),
+    # ✅ NEW: Translation Job API - Background translation jobs with status tracking
+    RouteSpec(
+        "src.api.translation_job_routes",
+        group="books",
+        tags=["Translation Jobs", "Background Processing", "Job Status"],
+    ),
+    # ✅ NEW: Book Chapter Audio API - Audio narration for chapters (upload, TTS, multi-language)
+    RouteSpec(
+        "src.api.book_chapter_audio_routes",
+        group="books",
+        tags=["Book Audio", "Chapter Audio", "TTS", "Audio Narration"],
+    ),
+    # ✅ NEW: Book Page Text & Audio API - LetsRead per-page text + TTS audio for reader sync
+    RouteSpec(
+        "src.api.book_page_routes",
+        group="books",
+        tags=["Book Pages", "Book Audio", "TTS", "LetsRead"],
+    ),
+    # ✅ NEW: Standalone Audio API - Voices and preview endpoints
+    RouteSpec(
+        "src.api.audio_routes",
+        group="books",
+        tags=["Audio", "TTS", "Voice Preview"],
+    ),
+    # ✅ NEW: AI Audio - Standalone TTS generate + save to library (/api/ai/audio/generate)
+    RouteSpec(
+        "src.api.audio_routes",
+        attr="ai_audio_router",
+        group="books",
+        prefix="/api",
+        tags=["Audio AI"],
+    ),
+    # ✅ NEW: Book Cover AI - Generate covers using OpenAI gpt-image-1
+    RouteSpec(
+        "src.api.book_cover_ai_routes",
+        group="books",
+        tags=["AI Book Cover", "Image Generation"],
+    ),
+    # ✅ NEW: Test Cover AI - Generate covers for online tests (16:9)
+    RouteSpec(
+        "src.api.test_cover_ai_routes",
+        group="tests",
+        tags=["AI Test Cover", "Online Tests"],
+    ),
+    # ✅ NEW: Test Evaluation AI - AI-powered evaluation of test results
+    RouteSpec(
+        "src.api.test_evaluation_routes",
+        group="tests",
+        tags=["AI Test Evaluation", "Feedback"],
+    ),
+    # ✅ NEW: Book Payment API - QR payment system (Phase 1: QR Payment)
+    # Contains routes for QR order creation, status check, access granting
+    RouteSpec(
+        "src.api.book_payment_routes",
+        group="books",
+        tags=["Book Payment", "QR Payment", "VietQR"],
+    ),
+    # ✅ NEW: Book Background API - AI-powered A4 backgrounds for books and chapters
+    RouteSpec(
+        "src.api.book_background_routes",
+        group="documents",
+        tags=["Book Backgrounds", "Chapter Backgrounds", "AI Background Generation"],
+    ),
+    # ✅ Background image upload endpoint
+    RouteSpec(
+        "src.api.book_background_routes",
+        attr="upload_router",
+        group="documents",
+        tags=["Book Background Upload"],
+    ),
+    # ✅ Slide background generation endpoint
+    RouteSpec(
+        "src.api.book_background_routes",
+        attr="slide_router",
+        group="documents",
+        tags=["Slide Backgrounds", "AI Background Generation"],
+    ),
+    # ✅ Document background endpoints (A4 documents)
+    RouteSpec(
+        "src.api.book_background_routes",
+        attr="document_router",
+        group="documents",
+        tags=["Document Backgrounds", "A4 Documents"],
+    ),
+    # ✅ NEW: Slide AI API - AI-powered slide formatting and editing
+    RouteSpec(
+        "src.api.slide_ai_routes",
+        group="documents",
+        tags=["Slide AI", "AI Formatting"],
+    ),
+    # ✅ NEW: Slide Narration API - AI-powered subtitle and audio generation
+    RouteSpec(
+        "src.api.slide_narration_routes",
+        group="documents",
+        tags=["Slide Narration", "AI"],
+    ),
+    # ✅ NEW: Lyria Music Generation API - AI Tools for instrumental music
+    RouteSpec(
+        "src.api.lyria_routes",
+        group="media",
+        tags=["Lyria Music", "AI Tools", "Music Generation"],
+    ),
+    # ✅ NEW: Music Import API - TikTok URL → MP3 → Shazam → R2
+    RouteSpec("src.api.music_import_routes", group="media", tags=["Music Import"]),
+    # ✅ NEW: Blog Posts API - CRUD for homepage & landing page blog posts
+    RouteSpec("src.api.blog_routes", group="media", tags=["Blog"]),
+    # ✅ NEW: AI Video Generation API - TikTok/Reels style short video
+    RouteSpec("src.api.video_routes", group="media", tags=["AI Video Generation"]),
+    # ✅ NEW: AI Video Studio API - Interactive scene-by-scene pipeline
+    RouteSpec("src.api.video_studio_routes", group="media", tags=["AI Video Studio"]),
+    # ✅ NEW: Feedback & Review API - User reviews with social sharing rewards
+    RouteSpec(
+        "src.api.feedback_routes",
+        group="media",
+        tags=["Feedback", "Reviews", "Points Rewards"],
+    ),
+    # ✅ NEW: Slide AI Generation API - AI-powered slide creation from scratch
+    RouteSpec(
+        "src.api.slide_ai_generation_routes",
+        group="documents",
+        tags=["Slide AI Generation", "AI"],
+    ),
+    # ✅ NEW: Slide Outline & Version Management API - Outline CRUD and version control
+    RouteSpec(
+        "src.api.slide_outline_routes",
+        group="documents",
+        tags=["Slide Outline", "Version Management"],
+    ),
+    # ✅ NEW: Author API - Community books author management
+    RouteSpec(
+        "src.api.author_routes",
+        group="books",
+        tags=["Authors", "Community Books"],
+    ),
+    # ✅ NEW: Saved Books API - User's bookmarked books
+    RouteSpec(
+        "src.api.book_saved_routes",
+        group="books",
+        prefix="/api/v1",
+        tags=["Saved Books", "Bookmarks"],
+    ),
+    # ✅ NEW: Book Reviews API - User reviews and ratings for books
+    RouteSpec(
+        "src.api.book_review_routes",
+        group="books",
+        prefix="/api/v1",
+        tags=["Book Reviews", "Ratings"],
+    ),
+    # ✅ NEW: Community Books API - Public browsing and discovery
+    RouteSpec(
+        "src.api.community_routes",
+        group="books",
+        prefix="/api/v1",
+        tags=["Community Books", "Public Discovery"],
+    ),
+    # ✅ NEW: Book Categories API - Categories tree and books by category
+    RouteSpec(
+        "src.api.book_category_routes",
+        group="books",
+        prefix="/api/v1",
+        tags=["Book Categories", "Public Discovery"],
+    ),
+    # ✅ ADDED: Internal CORS management for chat-plugin
+    RouteSpec("src.api.internal_cors_routes", group="core", tags=["Internal CORS"]),
+    # ✅ ADDED: Image Generation API - AI-powered image generation (Phase 1: Photorealistic, Stylized, Logo)
+    RouteSpec(
+        "src.api.image_generation_routes",
+        group="media",
+        tags=["AI Image Generation"],
+    ),
+    # ✅ ADDED: Image Generation Phase 2 API - Background, Mockup, Sequential Art
+    RouteSpec(
+        "src.api.image_generation_phase2_routes",
+        group="media",
+        tags=["AI Image Generation - Phase 2"],
+    ),
+    # ✅ ADDED: Image Sessions API - Persistent sessions for consistent multi-image generation
+    RouteSpec(
+        "src.api.image_session_routes",
+        group="media",
+        tags=["AI Image Sessions"],
+    ),
+    # ✅ ADDED: Image Editing API - Style Transfer, Object Edit, Inpainting, Composition
+    RouteSpec("src.api.image_editing_routes", group="media", tags=["AI Image Editing"]),
+    # ✅ ADDED: Font Upload API - Custom font upload and management with R2 storage
+    RouteSpec(
+        "src.api.font_routes",
+        group="documents",
+        tags=["Custom Fonts", "Font Management"],
+    ),
+    # ✅ ADDED: Media Upload API - Pre-signed URL for direct R2 image uploads
+    RouteSpec(
+        "src.api.media_routes",
+        group="documents",
+        tags=["Media Upload", "Image Upload"],
+    ),
+    # ✅ NEW: StudyHub Subject API - Learning platform core management (Milestone 1.1)
+    RouteSpec(
+        "src.api.studyhub_subject_routes",
+        group="studyhub",
+        tags=["StudyHub - Subjects"],
+    ),
+    # ✅ NEW: StudyHub Module API - Module & Content management (Milestone 1.2)
+    RouteSpec(
+        "src.api.studyhub_module_routes",
+        group="studyhub",
+        tags=["StudyHub - Modules & Content"],
+    ),
+    # ✅ NEW: StudyHub Enrollment API - Enrollment & Progress tracking (Milestone 1.3)
+    RouteSpec(
+        "src.api.studyhub_enrollment_routes",
+        group="studyhub",
+        tags=["StudyHub - Enrollment & Progress"],
+    ),
+    # ✅ NEW: StudyHub Marketplace API - Public marketplace & discovery (Milestone 1.4)
+    RouteSpec(
+        "src.api.studyhub_marketplace_routes",
+        group="studyhub",
+        tags=["StudyHub - Marketplace"],
+    ),
+    # ✅ NEW: StudyHub Content Management API - Link Documents/Tests/Books
+    RouteSpec(
+        "src.api.studyhub_content_routes",
+        group="studyhub",
+        tags=["StudyHub - Content Management"],
+    ),
+    # ✅ NEW: StudyHub Payment API - Course payment via Points and SePay
+    RouteSpec(
+        "src.api.studyhub_payment_routes",
+        group="studyhub",
+        tags=["StudyHub - Course Payment"],
+    ),
+    # ✅ NEW: StudyHub Category & Course API - Community, categories, course publishing (Milestone 2.0)
+    RouteSpec(
+        "src.api.studyhub_category_routes",
+        group="studyhub",
+        tags=["StudyHub - Categories & Courses"],
+    ),
+    # ✅ NEW: StudyHub Community API - Community subjects marketplace (Phase 1: 6 APIs)
+    RouteSpec(
+        "src.routes.studyhub_community_routes",
+        group="studyhub",
+        prefix="/api",
+        tags=["StudyHub - Community Subjects"],
+    ),
+    # ✅ NEW: StudyHub Discussion API - Community discussions & comments (Phase 2: 6 APIs)
+    RouteSpec(
+        "src.routes.studyhub_discussion_routes",
+        group="studyhub",
+        prefix="/api",
+        tags=["StudyHub - Discussions"],
+    ),
+    # ✅ NEW: StudyHub Review API - Course reviews & ratings (Phase 3: 4 APIs)
+    RouteSpec(
+        "src.routes.studyhub_review_routes",
+        group="studyhub",
+        prefix="/api",
+        tags=["StudyHub - Reviews"],
+    ),
+    # ✅ NEW: StudyHub Wishlist API - Course wishlists (Phase 4: 3 APIs)
+    RouteSpec(
+        "src.routes.studyhub_wishlist_routes",
+        group="studyhub",
+        prefix="/api",
+        tags=["StudyHub - Wishlist"],
+    ),
+    # ✅ Hybrid Search Strategy - Enhanced callbacks, search & CRUD operations
+    RouteSpec(
+        "src.api.hybrid_strategy_router",
+        attr="main_router",
+        group="chat",
+        prefix="/api",
+        tags=["Hybrid Search Strategy", "Enhanced Callbacks", "Metadata + Vector Search"],
+    ),
+    # ✅ Admin Task Status API
+    RouteSpec(
+        "src.api.admin.task_status_routes",
+        group="chat",
+        prefix="/api/admin",
+        tags=["Admin - Task Status"],
+    ),
+    # ✅ AI Social Marketing Plan API
+    RouteSpec(
+        "src.api.social_plan_routes",
+        group="media",
+        tags=["AI Social Marketing Plan"],
+    ),
+    RouteSpec("src.api.community_feed_routes", group="media", tags=["Community Feed"]),
+]
+
+
+def _parse_groups(value: Optional[str]) -> Set[str]:
+    if not value or value.strip().lower() == "all":
+        return set(ROUTE_GROUPS)
+    groups = {g.strip() for g in value.split(",") if g.strip()}
+    unknown = groups - set(ROUTE_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown route group(s): {', '.join(sorted(unknown))}")
+    return groups
+
+
+def enabled_groups() -> Set[str]:
+    """Groups served by this process (eager + deferred)"""
+    return _parse_groups(os.getenv("API_ROUTE_GROUPS"))
+
+
+def deferred_groups() -> Set[str]:
+    """Groups registered after startup; "core" is never deferred"""
+    value = os.getenv("API_DEFERRED_ROUTE_GROUPS", "")
+    if not value.strip():
+        return set()
+    return (_parse_groups(value) & enabled_groups()) - {"core"}
+
+
+def is_group_enabled(group: str) -> bool:
+    return group in enabled_groups()
+
+
+def _import(module: str):
+    start = time.perf_counter()
+    mod = importlib.import_module(module)
+    if module not in IMPORT_TIMINGS:
+        IMPORT_TIMINGS[module] = time.perf_counter() - start
+    return mod
+
+
+def _include(app: FastAPI, spec: RouteSpec):
+    for required in spec.requires:
+        _import(required)
+    router = getattr(_import(spec.module), spec.attr)
+    kwargs = {}
+    if spec.prefix:
+        kwargs["prefix"] = spec.prefix
+    if spec.tags is not None:
+        kwargs["tags"] = spec.tags
+    app.include_router(router, **kwargs)
+
+
+def _specs_for(groups: Iterable[str]) -> List[RouteSpec]:
+    groups = set(groups)
+    return [spec for spec in ROUTE_SPECS if spec.group in groups]
+
+
+def register_routes(app: FastAPI, groups: Optional[Iterable[str]] = None) -> int:
+    """
+    Import and include every router of the given groups (default: enabled groups
+    minus deferred ones), preserving declaration order.
+
+    Returns:
+        Number of routers included
+    """
+    if groups is None:
+        groups = enabled_groups() - deferred_groups()
+
+    start = time.perf_counter()
+    specs = _specs_for(groups)
+    for spec in specs:
+        _include(app, spec)
+
+    logger.info(
+        f"🛣️  Registered {len(specs)} routers ({', '.join(sorted(groups))}) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return len(specs)
+
+
+async def register_deferred_routes(app: FastAPI) -> int:
+    """
+    Register deferred groups after the server started accepting traffic.
+
+    Module imports run in a worker thread so the event loop keeps serving the
+    eager groups; the routers are then included on the loop.
+    """
+    groups = deferred_groups()
+    if not groups:
+        return 0
+
+    specs = _specs_for(groups)
+    start = time.perf_counter()
+
+    def import_all():
+        for spec in specs:
+            for required in spec.requires:
+                _import(required)
+            _import(spec.module)
+
+    await asyncio.to_thread(import_all)
+
+    for spec in specs:
+        _include(app, spec)
+
+    # Routes changed after startup - rebuild the OpenAPI schema on next request
+    app.openapi_schema = None
+
+    logger.info(
+        f"🛣️  Registered {len(specs)} deferred routers ({', '.join(sorted(groups))}) "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return len(specs)
+
+
+def slowest_imports(limit: int = 20) -> List[Dict[str, float]]:
+    """Route modules sorted by measured import time (seconds)"""
+    return [
+        {"module": module, "seconds": round(seconds, 4)}
+        for module, seconds in sorted(
+            IMPORT_TIMINGS.items(), key=lambda item: item[1], reverse=True
+        )[:limit]
+    ]
@@ -11,6 +11,7 @@ from bson import ObjectId
 
 from src.models.unified_models import CompanyConfig, Industry, Language
 from src.utils.logger import setup_logger
+from src.services.company_prompt_cache import bump_company_version
 
 logger = setup_logger()
 
@@ -105,6 +106,7 @@ class CompanyDBService:
                 {"$set": company_data},
                 upsert=True,
             )
+            bump_company_version(company_config.company_id)
 
             if result.upserted_id or result.modified_count > 0:
                 logger.info(f"✅ Saved company to MongoDB: {company_config.company_id}")
@@ -234,6 +236,7 @@ class CompanyDBService:
         """
         try:
             result = self.companies.delete_one({"company_id": company_id})
+            bump_company_version(company_id)
 
             if result.deleted_count > 0:
                 logger.info(f"✅ Deleted company from MongoDB: {company_id}")
@@ -300,6 +303,7 @@ class CompanyDBService:
             result = self.companies.update_one(
                 {"company_id": company_id}, {"$set": update_data}
             )
+            bump_company_version(company_id)
 
             if result.modified_count > 0:
                 logger.info(f"✅ Updated company metadata: {company_id}")
@@ -329,6 +333,7 @@ class CompanyDBService:
                 {"$set": update_data},
                 return_document=pymongo.ReturnDocument.AFTER,
             )
+            bump_company_version(company_id)
 
             if result:
                 # Convert ObjectId to string for JSON serialization
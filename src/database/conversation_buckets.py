@@ -0,0 +1,429 @@
+"""
+Bucketed chat message storage with a Redis hot tail
+
+The `conversations` document per primary_key used to `$push` every message into
+one unbounded `messages` array, and every chat turn loaded that whole array and
+re-tokenized it. Storage is now split:
+
+- `conversations`: small header (user_id, device_id, session_id, lastMessageTime,
+  message_count) - no new messages are pushed into it
+- `conversation_message_buckets`: fixed-size buckets of CONVERSATION_BUCKET_SIZE
+  messages per (primary_key, seq); each message carries its sequence number `n`
+  and its token count, computed once at write time
+- Redis list `chat:tail:{primary_key}`: the last CONVERSATION_TAIL_SIZE messages
+  for the prompt builder, rebuilt from the newest buckets when missing or behind
+
+Headers written before this change still hold a legacy `messages` array; reads
+take its tail (`$slice`) until scripts/migrate_conversation_buckets.py has moved
+it into buckets with negative sequence numbers (older than every new message).
+
+Usage:
+    store = ConversationBucketStore(db)
+    store.append(primary_key, identifiers, "user", "Xin chào", datetime.now())
+    store.append_turns([{"primary_key": pk, "identifiers": ids, "messages": [...]}])
+    tail = store.tail(header)  # [{role, content, timestamp, tokens, n}, ...]
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_COLLECTION = "conversation_message_buckets"
+CONVERSATION_BUCKET_SIZE = int(os.getenv("CONVERSATION_BUCKET_SIZE", "50"))
+# Messages handed to the prompt builder (before the token budget is applied)
+CONVERSATION_TAIL_SIZE = int(os.getenv("CONVERSATION_TAIL_SIZE", "200"))
+CONVERSATION_TAIL_TTL = int(os.getenv("CONVERSATION_TAIL_TTL", str(72 * 3600)))
+
+_TAIL_PREFIX = "chat:tail:"
+
+_encoding = None
+
+
+def count_message_tokens(text: str) -> int:
+    """cl100k_base token count (same encoding as ConversationManager)"""
+    global _encoding
+    if not text:
+        return 0
+    if _encoding is None:
+        import tiktoken
+
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+
+def bucket_seq(n: int) -> int:
+    """Bucket number of message `n` (1-based; legacy messages are negative)"""
+    if n > 0:
+        return (n - 1) // CONVERSATION_BUCKET_SIZE
+    return n // CONVERSATION_BUCKET_SIZE
+
+
+class _RedisTail:
+    """Last N messages per conversation as a Redis list of JSON entries"""
+
+    def __init__(self):
+        self._redis = None
+        self._redis_ok = True
+        self._retry_at = 0.0  # back off after a failed call
+
+    def _client(self):
+        if time.monotonic() < self._retry_at:
+            return None
+        if self._redis is None and self._redis_ok:
+            try:
+                import redis
+
+                self._redis = redis.Redis(
+                    host=os.getenv("REDIS_HOST", "localhost"),
+                    port=int(os.getenv("REDIS_PORT", 6379)),
+                    db=int(os.getenv("REDIS_DB", 0)),
+                    decode_responses=True,
+                    socket_timeout=0.2,
+                    socket_connect_timeout=0.2,
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Chat tail: Redis unavailable ({e})")
+                self._redis_ok = False
+        return self._redis
+
+    def _failed(self, action: str, e: Exception):
+        logger.debug(f"Chat tail {action} failed: {e}")
+        self._retry_at = time.monotonic() + 30
+
+    @staticmethod
+    def _encode(message: Dict[str, Any]) -> str:
+        entry = dict(message)
+        entry["timestamp"] = entry["timestamp"].isoformat()
+        return json.dumps(entry, ensure_ascii=False)
+
+    @staticmethod
+    def _decode(raw: str) -> Dict[str, Any]:
+        entry = json.loads(raw)
+        entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+        return entry
+
+    def push(self, primary_key: str, *messages: Dict[str, Any]):
+        """Append to an existing tail (a missing tail is rebuilt on the next read)"""
+        client = self._client()
+        if client is None or not messages:
+            return
+        key = _TAIL_PREFIX + primary_key
+        try:
+            pipe = client.pipeline()
+            pipe.rpushx(key, *[self._encode(m) for m in messages])
+            pipe.ltrim(key, -CONVERSATION_TAIL_SIZE, -1)
+            pipe.expire(key, CONVERSATION_TAIL_TTL)
+            pipe.execute()
+        except Exception as e:
+            self._failed("push", e)
+
+    def read(self, primary_key: str) -> Optional[List[Dict[str, Any]]]:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = client.lrange(_TAIL_PREFIX + primary_key, 0, -1)
+        except Exception as e:
+            self._failed("read", e)
+            return None
+        return [self._decode(r) for r in raw] if raw else None
+
+    def replace(self, primary_key: str, messages: List[Dict[str, Any]]):
+        client = self._client()
+        if client is None or not messages:
+            return
+        key = _TAIL_PREFIX + primary_key
+        try:
+            pipe = client.pipeline()  # MULTI: readers never see a half-built tail
+            pipe.delete(key)
+            pipe.rpush(key, *[self._encode(m) for m in messages])
+            pipe.expire(key, CONVERSATION_TAIL_TTL)
+            pipe.execute()
+        except Exception as e:
+            self._failed("rebuild", e)
+
+    def delete(self, *primary_keys: str):
+        client = self._client()
+        if client is None or not primary_keys:
+            return
+        try:
+            client.delete(*[_TAIL_PREFIX + pk for pk in primary_keys])
+        except Exception as e:
+            self._failed("delete", e)
+
+
+class ConversationBucketStore:
+    """Message buckets + Redis tail behind DBManager's conversation methods"""
+
+    def __init__(self, db):
+        self.headers = db["conversations"]
+        self.buckets = db[BUCKETS_COLLECTION]
+        self.redis_tail = _RedisTail()
+        self.buckets.create_index([("primary_key", 1), ("seq", -1)], unique=True)
+
+    def append(
+        self,
+        primary_key: str,
+        identifiers: Dict[str, str],
+        role: str,
+        content: str,
+        timestamp: datetime,
+    ) -> bool:
+        """
+        Store one message: bump the header counter, push into its bucket
+
+        Args:
+            primary_key: Conversation key (user_id > device_id > session_id)
+            identifiers: {"user_id", "device_id", "session_id"} for the header
+            role: 'user' hoặc 'assistant'
+            content: Nội dung tin nhắn
+            timestamp: Message time
+
+        Returns:
+            bool: True nếu lưu thành công
+        """
+        from pymongo import ReturnDocument
+
+        header = self.headers.find_one_and_update(
+            {"primary_key": primary_key},
+            {
+                "$set": {
+                    **identifiers,
+                    "primary_key": primary_key,
+                    "lastMessageTime": timestamp,
+                },
+                "$inc": {"message_count": 1},
+            },
+            projection={"message_count": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        n = header["message_count"]
+        message = {
+            "n": n,
+            "role": role,
+            "content": content,
+            "timestamp": timestamp,
+            "tokens": count_message_tokens(content),
+        }
+        result = self.buckets.update_one(
+            {"primary_key": primary_key, "seq": bucket_seq(n)},
+            {
+                "$push": {"messages": message},
+                "$inc": {"count": 1},
+                "$set": {"last_at": timestamp},
+                "$setOnInsert": {"first_at": timestamp},
+            },
+            upsert=True,
+        )
+        self.redis_tail.push(primary_key, message)
+        return result.acknowledged
+
+    def append_turns(self, turns: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Store several chat turns with one header update per conversation and one
+        unordered bulk_write for all bucket pushes
+
+        Args:
+            turns: [{"primary_key", "identifiers", "messages": [{role, content, timestamp}]}]
+
+        Returns:
+            List[bool]: Per turn, True if it opened the conversation (no earlier
+            message, bucketed or legacy) - the "new user" flag for webhooks
+        """
+        from pymongo import ReturnDocument, UpdateOne
+
+        by_key: Dict[str, List[int]] = {}
+        for i, turn in enumerate(turns):
+            by_key.setdefault(turn["primary_key"], []).append(i)
+
+        first_turn = [False] * len(turns)
+        grouped: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        pushed: Dict[str, List[Dict[str, Any]]] = {}
+        for primary_key, indexes in by_key.items():
+            total = sum(len(turns[i]["messages"]) for i in indexes)
+            last = turns[indexes[-1]]
+            # Reserve the message numbers of every turn of this conversation at once
+            header = self.headers.find_one_and_update(
+                {"primary_key": primary_key},
+                {
+                    "$set": {
+                        **last["identifiers"],
+                        "primary_key": primary_key,
+                        "lastMessageTime": last["messages"][-1]["timestamp"],
+                    },
+                    "$inc": {"message_count": total},
+                },
+                projection={
+                    "message_count": 1,
+                    "legacy_message_count": 1,
+                    "messages": {"$slice": -1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            n = header["message_count"] - total
+            # Legacy history (embedded, or already moved by migrate_legacy) means
+            # a returning user even though the bucketed counter starts at 0
+            first_turn[indexes[0]] = (
+                n == 0
+                and not header.get("messages")
+                and not header.get("legacy_message_count")
+            )
+
+            for i in indexes:
+                for m in turns[i]["messages"]:
+                    n += 1
+                    message = {
+                        "n": n,
+                        "role": m["role"],
+                        "content": m["content"],
+                        "timestamp": m["timestamp"],
+                        "tokens": count_message_tokens(m["content"]),
+                    }
+                    grouped.setdefault((primary_key, bucket_seq(n)), []).append(message)
+                    pushed.setdefault(primary_key, []).append(message)
+
+        if grouped:
+            self.buckets.bulk_write(
+                [
+                    UpdateOne(
+                        {"primary_key": primary_key, "seq": seq},
+                        {
+                            "$push": {"messages": {"$each": messages}},
+                            "$inc": {"count": len(messages)},
+                            "$set": {"last_at": messages[-1]["timestamp"]},
+                            "$setOnInsert": {"first_at": messages[0]["timestamp"]},
+                        },
+                        upsert=True,
+                    )
+                    for (primary_key, seq), messages in grouped.items()
+                ],
+                ordered=False,
+            )
+        for primary_key, messages in pushed.items():
+            self.redis_tail.push(primary_key, *messages)
+        return first_turn
+
+    def _tail_from_mongo(self, header: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Newest buckets (+ legacy header array) → last CONVERSATION_TAIL_SIZE messages"""
+        needed = CONVERSATION_TAIL_SIZE // CONVERSATION_BUCKET_SIZE + 2
+        messages: List[Dict[str, Any]] = []
+        for bucket in (
+            self.buckets.find({"primary_key": header["primary_key"]}, {"messages": 1})
+            .sort("seq", -1)
+            .limit(needed)
+        ):
+            messages.extend(bucket.get("messages", []))
+        messages.sort(key=lambda m: m["n"])
+        messages = messages[-CONVERSATION_TAIL_SIZE:]
+
+        legacy = header.get("messages") or []
+        if legacy and len(messages) < CONVERSATION_TAIL_SIZE:
+            # Not migrated yet: the header array predates every bucketed message
+            start = -len(legacy)
+            legacy_tail = [
+                {
+                    "n": start + i,
+                    "role": m["role"],
+                    "content": m["content"],
+                    "timestamp": m["timestamp"],
+                    "tokens": m.get("tokens", count_message_tokens(m["content"])),
+                }
+                for i, m in enumerate(legacy)
+            ]
+            messages = (legacy_tail + messages)[-CONVERSATION_TAIL_SIZE:]
+        return messages
+
+    def tail(self, header: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Last CONVERSATION_TAIL_SIZE messages of a conversation, oldest first
+
+        Args:
+            header: `conversations` document read with HEADER_PROJECTION
+
+        Returns:
+            List[Dict]: {n, role, content, timestamp, tokens}
+        """
+        primary_key = header["primary_key"]
+        # Newest message number: header counter, or -1 for legacy-only conversations
+        # (history still embedded, or moved to negative buckets by migrate_legacy)
+        legacy = header.get("messages") or header.get("legacy_message_count")
+        newest = header.get("message_count") or (-1 if legacy else 0)
+
+        cached = self.redis_tail.read(primary_key)
+        if cached and cached[-1].get("n") == newest:
+            return cached
+
+        messages = self._tail_from_mongo(header)
+        self.redis_tail.replace(primary_key, messages)
+        return messages
+
+    def migrate_legacy(self, header_id) -> int:
+        """
+        Move a header's legacy `messages` array into negative-seq buckets
+
+        Idempotent: legacy buckets are replaced, not appended, and the array is
+        only unset if it did not change meanwhile. Its length is kept in
+        `legacy_message_count` for statistics.
+
+        Returns:
+            int: Number of messages moved
+        """
+        header = self.headers.find_one({"_id": header_id}, {"primary_key": 1, "messages": 1})
+        legacy = (header or {}).get("messages") or []
+        if not legacy or not header.get("primary_key"):
+            return 0
+
+        primary_key = header["primary_key"]
+        grouped: Dict[int, List[Dict[str, Any]]] = {}
+        for i, m in enumerate(legacy):
+            n = i - len(legacy)  # -L .. -1, older than every bucketed message
+            grouped.setdefault(bucket_seq(n), []).append(
+                {
+                    "n": n,
+                    "role": m["role"],
+                    "content": m["content"],
+                    "timestamp": m["timestamp"],
+                    "tokens": count_message_tokens(m["content"]),
+                }
+            )
+        for seq, messages in grouped.items():
+            self.buckets.replace_one(
+                {"primary_key": primary_key, "seq": seq},
+                {
+                    "primary_key": primary_key,
+                    "seq": seq,
+                    "messages": messages,
+                    "count": len(messages),
+                    "first_at": messages[0]["timestamp"],
+                    "last_at": messages[-1]["timestamp"],
+                },
+                upsert=True,
+            )
+        self.headers.update_one(
+            {"_id": header_id, "messages": {"$size": len(legacy)}},
+            {
+                "$unset": {"messages": ""},
+                "$set": {"legacy_message_count": len(legacy)},
+            },
+        )
+        self.redis_tail.delete(primary_key)
+        return len(legacy)
+
+    def delete(self, primary_keys: List[str]) -> int:
+        """Drop buckets and Redis tails of conversations"""
+        if not primary_keys:
+            return 0
+        result = self.buckets.delete_many({"primary_key": {"$in": primary_keys}})
+        self.redis_tail.delete(*primary_keys)
+        return result.deleted_count
+
+
+# Header fields for tail reads: legacy arrays are sliced to the tail size
+HEADER_PROJECTION = {"messages": {"$slice": -CONVERSATION_TAIL_SIZE}}
@@ -1,5 +1,5 @@
 import tiktoken
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from src.utils.logger import setup_logger
 from .db_manager import DBManager
 
@@ -35,6 +35,60 @@ class ConversationManager:
             return 0
         return len(self.encoding.encode(text))
 
+    def _message_tokens(self, msg: Dict) -> int:
+        """Token count stored at write time (counted here only for old messages)"""
+        tokens = msg.get("tokens")
+        return tokens if tokens is not None else self.count_tokens(msg["content"])
+
+    def _fit_history(
+        self, recent_messages: List[Dict], available_tokens: int
+    ) -> List[Dict]:
+        """
+        Newest (user, assistant) pairs that fit in available_tokens
+        Các cặp tin nhắn mới nhất vừa với số token còn lại
+
+        Args:
+            recent_messages: [{"role", "content", "tokens"}] oldest first
+            available_tokens: Token budget for history
+
+        Returns:
+            List[Dict]: [{"role", "content"}] ready for the API
+        """
+        # Nếu không có tin nhắn gần đây, trả về rỗng
+        if not recent_messages:
+            return []
+
+        history = [
+            ({"role": msg["role"], "content": msg["content"]}, self._message_tokens(msg))
+            for msg in recent_messages
+        ]
+
+        # Nếu tổng token nhỏ hơn available_tokens, trả về tất cả tin nhắn
+        if sum(tokens for _, tokens in history) <= available_tokens:
+            return [msg for msg, _ in history]
+
+        # Nếu tổng token vượt quá, cần lọc bớt tin nhắn
+        optimized_messages = []
+        current_tokens = 0
+
+        # Ưu tiên tin nhắn mới nhất, nhưng vẫn giữ cặp (user, assistant)
+        for i in range(len(history) - 1, -1, -2):
+            if i > 0:  # Đảm bảo còn ít nhất 2 tin nhắn
+                assistant_msg, assistant_tokens = history[i]
+                user_msg, user_tokens = history[i - 1]
+
+                # Nếu thêm cặp tin nhắn này vượt quá giới hạn, dừng lại
+                if current_tokens + assistant_tokens + user_tokens > available_tokens:
+                    break
+
+                # Thêm cặp tin nhắn vào đầu danh sách (để giữ thứ tự đúng)
+                optimized_messages.insert(0, user_msg)
+                optimized_messages.insert(1, assistant_msg)
+
+                current_tokens += assistant_tokens + user_tokens
+
+        return optimized_messages
+
     def add_message_enhanced(
         self,
         user_id: str = None,
@@ -65,6 +119,13 @@ class ConversationManager:
             content=content,
         )
 
+    def save_chat_turns(self, turns: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Batch-save completed chat turns; returns the per-turn "new conversation" flags
+        Lưu nhiều lượt chat một lần (write-behind consumer)
+        """
+        return self.db_manager.save_chat_turns(turns)
+
     def add_message(self, user_id: str, role: str, content: str) -> bool:
         """
         Legacy method for backward compatibility
@@ -118,45 +179,15 @@ class ConversationManager:
 
         # Use enhanced method to get recent messages with priority-based identification
         # Sử dụng phương thức nâng cao để lấy tin nhắn gần đây với nhận dạng theo độ ưu tiên
-        recent_messages = self.db_manager.get_recent_messages_enhanced(
-            user_id=user_id, device_id=device_id, session_id=session_id, hours=72
+        recent_messages = self.db_manager.get_recent_messages_with_tokens(
+            user_id=user_id,
+            device_id=device_id,
+            session_id=session_id,
+            hours=72,
+            fallthrough=True,
         )
 
-        # Nếu không có tin nhắn gần đây, trả về rỗng
-        if not recent_messages:
-            return []
-
-        # Tính tổng token của tất cả tin nhắn gần đây
-        all_tokens = sum(self.count_tokens(msg["content"]) for msg in recent_messages)
-
-        # Nếu tổng token nhỏ hơn available_tokens, trả về tất cả tin nhắn
-        if all_tokens <= available_tokens:
-            return recent_messages
-
-        # Nếu tổng token vượt quá, cần lọc bớt tin nhắn
-        optimized_messages = []
-        current_tokens = 0
-
-        # Ưu tiên tin nhắn mới nhất, nhưng vẫn giữ cặp (user, assistant)
-        for i in range(len(recent_messages) - 1, -1, -2):
-            if i > 0:  # Đảm bảo còn ít nhất 2 tin nhắn
-                assistant_msg = recent_messages[i]
-                user_msg = recent_messages[i - 1]
-
-                assistant_tokens = self.count_tokens(assistant_msg["content"])
-                user_tokens = self.count_tokens(user_msg["content"])
-
-                # Nếu thêm cặp tin nhắn này vượt quá giới hạn, dừng lại
-                if current_tokens + assistant_tokens + user_tokens > available_tokens:
-                    break
-
-                # Thêm cặp tin nhắn vào đầu danh sách (để giữ thứ tự đúng)
-                optimized_messages.insert(0, user_msg)
-                optimized_messages.insert(1, assistant_msg)
-
-                current_tokens += assistant_tokens + user_tokens
-
-        return optimized_messages
+        return self._fit_history(recent_messages, available_tokens)
 
     def get_optimized_messages(
         self, user_id: str, rag_context: str, current_query: str
@@ -310,42 +341,12 @@ class ConversationManager:
 
         # Use OPTIMIZED method for frontend requirements
         # Sử dụng phương thức tối ưu cho yêu cầu frontend
-        recent_messages = self.db_manager.get_recent_messages_optimized(
-            user_id=user_id, device_id=device_id, session_id=session_id, hours=72
+        recent_messages = self.db_manager.get_recent_messages_with_tokens(
+            user_id=user_id,
+            device_id=device_id,
+            session_id=session_id,
+            hours=72,
+            fallthrough=False,
         )
 
-        # Nếu không có tin nhắn gần đây, trả về rỗng
-        if not recent_messages:
-            return []
-
-        # Tính tổng token của tất cả tin nhắn gần đây
-        all_tokens = sum(self.count_tokens(msg["content"]) for msg in recent_messages)
-
-        # Nếu tổng token nhỏ hơn available_tokens, trả về tất cả tin nhắn
-        if all_tokens <= available_tokens:
-            return recent_messages
-
-        # Nếu tổng token vượt quá, cần lọc bớt tin nhắn
-        optimized_messages = []
-        current_tokens = 0
-
-        # Ưu tiên tin nhắn mới nhất, nhưng vẫn giữ cặp (user, assistant)
-        for i in range(len(recent_messages) - 1, -1, -2):
-            if i > 0:  # Đảm bảo còn ít nhất 2 tin nhắn
-                assistant_msg = recent_messages[i]
-                user_msg = recent_messages[i - 1]
-
-                assistant_tokens = self.count_tokens(assistant_msg["content"])
-                user_tokens = self.count_tokens(user_msg["content"])
-
-                # Nếu thêm cặp tin nhắn này vượt quá giới hạn, dừng lại
-                if current_tokens + assistant_tokens + user_tokens > available_tokens:
-                    break
-
-                # Thêm cặp tin nhắn vào đầu danh sách (để giữ thứ tự đúng)
-                optimized_messages.insert(0, user_msg)
-                optimized_messages.insert(1, assistant_msg)
-
-                current_tokens += assistant_tokens + user_tokens
-
-        return optimized_messages
+        return self._fit_history(recent_messages, available_tokens)
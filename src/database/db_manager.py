@@ -2,8 +2,13 @@ import os
 import pymongo
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from src.database.conversation_buckets import (
+    HEADER_PROJECTION,
+    ConversationBucketStore,
+    count_message_tokens,
+)
 from src.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -67,6 +72,11 @@ class DBManager:
             self.conversations.create_index(
                 [("session_id", 1), ("lastMessageTime", -1)]
             )
+            self.conversations.create_index("primary_key")
+
+            # Messages live in fixed-size buckets + a Redis tail, not in the header
+            # Tin nhắn lưu theo bucket cố định + Redis tail, không nằm trong header
+            self.message_store = ConversationBucketStore(self.db)
 
             logger.info(f"Connected to MongoDB with enhanced schema: {db_name}")
         except Exception as e:
@@ -74,6 +84,7 @@ class DBManager:
             # Fallback: sử dụng dict để lưu trữ tạm thời
             self.client = None
             self.conversations = {}
+            self.message_store = None
 
     def add_message_enhanced(
         self,
@@ -121,25 +132,14 @@ class DBManager:
                     or f"anonymous_{current_time.timestamp()}"
                 )
 
-                result = self.conversations.update_one(
-                    {"primary_key": primary_key},
-                    {
-                        "$push": {"messages": message},
-                        "$set": {
-                            "user_id": user_id or "unknown",
-                            "device_id": device_id or "unknown",
-                            "session_id": session_id or "unknown",
-                            "primary_key": primary_key,
-                            "lastMessageTime": current_time,
-                        },
-                    },
-                    upsert=True,
+                saved = self.message_store.append(
+                    primary_key, document_id, role, content, current_time
                 )
 
                 logger.info(
                     f"💾 Message saved with primary_key: {primary_key} (user_id: {user_id}, device_id: {device_id}, session_id: {session_id})"
                 )
-                return result.acknowledged
+                return saved
             else:
                 # Fallback khi không có MongoDB
                 primary_key = (
@@ -148,6 +148,7 @@ class DBManager:
                     or session_id
                     or f"anonymous_{current_time.timestamp()}"
                 )
+                message["tokens"] = count_message_tokens(content)
                 if primary_key not in self.conversations:
                     self.conversations[primary_key] = {
                         "primary_key": primary_key,
@@ -164,6 +165,58 @@ class DBManager:
             logger.error(f"Error adding enhanced message: {e}")
             return False
 
+    def save_chat_turns(self, turns: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Batch-save completed chat turns (write-behind consumer)
+        Lưu nhiều lượt chat một lần - mỗi lượt gồm tin nhắn user + assistant
+
+        Args:
+            turns: [{"user_id", "device_id", "session_id",
+                     "messages": [{"role", "content", "timestamp"}]}]
+
+        Returns:
+            List[bool]: Per turn, True if it is the first turn of the conversation
+        """
+        if not self.client:
+            first_turn = []
+            for turn in turns:
+                key = turn.get("user_id") or turn.get("device_id") or turn.get("session_id")
+                first_turn.append(key not in self.conversations)
+                for m in turn["messages"]:
+                    self.add_message_enhanced(
+                        user_id=turn.get("user_id"),
+                        device_id=turn.get("device_id"),
+                        session_id=turn.get("session_id"),
+                        role=m["role"],
+                        content=m["content"],
+                    )
+            return first_turn
+
+        entries = []
+        for turn in turns:
+            user_id, device_id, session_id = (
+                turn.get("user_id"),
+                turn.get("device_id"),
+                turn.get("session_id"),
+            )
+            entries.append(
+                {
+                    "primary_key": user_id
+                    or device_id
+                    or session_id
+                    or f"anonymous_{turn['messages'][0]['timestamp'].timestamp()}",
+                    "identifiers": {
+                        "user_id": user_id or "unknown",
+                        "device_id": device_id or "unknown",
+                        "session_id": session_id or "unknown",
+                    },
+                    "messages": turn["messages"],
+                }
+            )
+        first_turn = self.message_store.append_turns(entries)
+        logger.info(f"💾 Saved {len(turns)} chat turns ({sum(first_turn)} new conversations)")
+        return first_turn
+
     def add_message(self, user_id: str, role: str, content: str) -> bool:
         """
         Legacy method for backward compatibility - delegates to enhanced method
@@ -171,128 +224,149 @@ class DBManager:
         """
         return self.add_message_enhanced(user_id=user_id, role=role, content=content)
 
-    def get_recent_messages_enhanced(
+    def _find_conversation_header(
+        self,
+        user_id: str = None,
+        device_id: str = None,
+        session_id: str = None,
+        fallthrough: bool = True,
+        log_prefix: str = "",
+    ) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Latest conversation header for the first matching identifier
+        Header conversation mới nhất theo identifier đầu tiên khớp
+
+        Args:
+            fallthrough: True = try user_id → device_id → session_id until one
+                matches; False = only the first identifier provided
+
+        Returns:
+            (header, used_identifier) - header is None if nothing matched
+        """
+        lookups = [
+            ("user_id", user_id, "👤"),
+            ("device_id", device_id, "📱"),
+            ("session_id", session_id, "🔗"),
+        ]
+        for field, value, icon in lookups:
+            if not value or value == "unknown":
+                continue
+            conversations = list(
+                self.conversations.find({field: value}, HEADER_PROJECTION)
+                .sort("lastMessageTime", -1)
+                .limit(1)
+            )
+            if conversations:
+                logger.info(f"{icon} {log_prefix}Found conversation using {field}: {value}")
+                return conversations[0], f"{field}:{value}"
+            if not fallthrough:
+                break
+        return None, None
+
+    def get_recent_messages_with_tokens(
         self,
         user_id: str = None,
         device_id: str = None,
         session_id: str = None,
         hours: int = 72,
+        fallthrough: bool = True,
     ) -> List[Dict]:
         """
-        Enhanced method to get recent messages with priority-based user identification
-        Phương thức nâng cao lấy tin nhắn gần đây với nhận dạng user theo độ ưu tiên
+        Tail window of the latest conversation, with per-message token counts
+        Cửa sổ tin nhắn cuối của conversation mới nhất, kèm số token mỗi tin
 
-        Priority order: user_id > device_id > session_id
-        Thứ tự ưu tiên: user_id > device_id > session_id
+        Reads the Redis tail (or the newest buckets) - never the whole history.
 
         Args:
             user_id: Authenticated user ID (highest priority)
             device_id: Device identifier
             session_id: Session identifier
             hours: Số giờ gần đây để lọc tin nhắn
+            fallthrough: See _find_conversation_header
 
         Returns:
-            List[Dict]: Danh sách các tin nhắn gần đây từ session gần nhất
+            List[Dict]: [{"role", "content", "tokens"}] oldest first
         """
         cutoff_time = datetime.now() - timedelta(hours=hours)
+        log_prefix = "" if fallthrough else "[OPTIMIZED] "
 
         try:
             if self.client:
-                # Try to find conversation by priority order
-                # Thử tìm conversation theo thứ tự ưu tiên
-                conversation = None
-                used_identifier = None
-
-                # Priority 1: user_id (authenticated users)
-                if user_id and user_id != "unknown":
-                    conversations = list(
-                        self.conversations.find({"user_id": user_id})
-                        .sort("lastMessageTime", -1)
-                        .limit(1)
-                    )
-
-                    if conversations:
-                        conversation = conversations[0]
-                        used_identifier = f"user_id:{user_id}"
-                        logger.info(f"👤 Found conversation using user_id: {user_id}")
-
-                # Priority 2: device_id if no user_id found
-                if not conversation and device_id and device_id != "unknown":
-                    conversations = list(
-                        self.conversations.find({"device_id": device_id})
-                        .sort("lastMessageTime", -1)
-                        .limit(1)
-                    )
-
-                    if conversations:
-                        conversation = conversations[0]
-                        used_identifier = f"device_id:{device_id}"
-                        logger.info(
-                            f"📱 Found conversation using device_id: {device_id}"
-                        )
-
-                # Priority 3: session_id as fallback
-                if not conversation and session_id and session_id != "unknown":
-                    conversations = list(
-                        self.conversations.find({"session_id": session_id})
-                        .sort("lastMessageTime", -1)
-                        .limit(1)
-                    )
-
-                    if conversations:
-                        conversation = conversations[0]
-                        used_identifier = f"session_id:{session_id}"
-                        logger.info(
-                            f"🔗 Found conversation using session_id: {session_id}"
-                        )
-
+                conversation, used_identifier = self._find_conversation_header(
+                    user_id, device_id, session_id, fallthrough, log_prefix
+                )
                 if not conversation:
                     logger.info(
-                        f"👤 No conversation found for user_id:{user_id}, device_id:{device_id}, session_id:{session_id}"
+                        f"👤 {log_prefix}No conversation found for user_id:{user_id}, device_id:{device_id}, session_id:{session_id}"
                     )
                     return []
-
-                # Filter messages within time window
-                # Lọc tin nhắn trong khung thời gian
-                recent_messages = [
-                    {"role": msg["role"], "content": msg["content"]}
-                    for msg in conversation.get("messages", [])
-                    if msg["timestamp"] >= cutoff_time
-                ]
-
-                logger.info(
-                    f"📥 Retrieved {len(recent_messages)} recent messages using {used_identifier}"
-                )
-                return recent_messages
-
+                messages = self.message_store.tail(conversation)
             else:
                 # Fallback khi không có MongoDB
-                # Try priority order for in-memory storage
-                identifiers = [user_id, device_id, session_id]
-
-                for identifier in identifiers:
-                    if (
+                used_identifier = next(
+                    (
                         identifier
+                        for identifier in (user_id, device_id, session_id)
+                        if identifier
                         and identifier != "unknown"
                         and identifier in self.conversations
-                    ):
-                        conversation = self.conversations[identifier]
-                        recent_messages = [
-                            {"role": msg["role"], "content": msg["content"]}
-                            for msg in conversation["messages"]
-                            if msg["timestamp"] >= cutoff_time
-                        ]
-                        logger.info(
-                            f"📥 Retrieved {len(recent_messages)} messages from memory using: {identifier}"
-                        )
-                        return recent_messages
-
-                return []
+                    ),
+                    None,
+                )
+                if not used_identifier:
+                    return []
+                messages = self.conversations[used_identifier]["messages"]
+
+            # Lọc tin nhắn trong khung thời gian
+            recent_messages = [
+                {
+                    "role": msg["role"],
+                    "content": msg["content"],
+                    "tokens": msg.get("tokens"),
+                }
+                for msg in messages
+                if msg["timestamp"] >= cutoff_time
+            ]
+
+            logger.info(
+                f"📥 {log_prefix}Retrieved {len(recent_messages)} recent messages using {used_identifier}"
+            )
+            return recent_messages
 
         except Exception as e:
-            logger.error(f"Error getting enhanced messages: {e}")
+            logger.error(f"❌ {log_prefix}Error getting messages: {e}")
             return []
 
+    def get_recent_messages_enhanced(
+        self,
+        user_id: str = None,
+        device_id: str = None,
+        session_id: str = None,
+        hours: int = 72,
+    ) -> List[Dict]:
+        """
+        Enhanced method to get recent messages with priority-based user identification
+        Phương thức nâng cao lấy tin nhắn gần đây với nhận dạng user theo độ ưu tiên
+
+        Priority order: user_id > device_id > session_id
+        Thứ tự ưu tiên: user_id > device_id > session_id
+
+        Args:
+            user_id: Authenticated user ID (highest priority)
+            device_id: Device identifier
+            session_id: Session identifier
+            hours: Số giờ gần đây để lọc tin nhắn
+
+        Returns:
+            List[Dict]: Danh sách các tin nhắn gần đây từ session gần nhất
+        """
+        return [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in self.get_recent_messages_with_tokens(
+                user_id, device_id, session_id, hours, fallthrough=True
+            )
+        ]
+
     def get_recent_messages(self, user_id: str, hours: int = 72) -> List[Dict]:
         """
         Legacy method for backward compatibility - delegates to enhanced method
@@ -311,10 +385,9 @@ class DBManager:
         OPTIMIZED method for frontend requirements - user_id first, then device_id
         Phương thức tối ưu cho yêu cầu frontend - user_id trước, sau đó device_id
 
-        Frontend always sends user_id, so check user_id first for speed optimization
-        If user_id exists, get latest session_id conversation history
-        Frontend luôn gửi user_id, nên check user_id trước để tối ưu tốc độ
-        Nếu có user_id, lấy history chat từ session_id gần nhất
+        Frontend always sends user_id, so only the first identifier provided is
+        looked up (no fallthrough to device_id/session_id).
+        Frontend luôn gửi user_id, nên chỉ tra identifier đầu tiên được cung cấp.
 
         Args:
             user_id: Always provided by frontend (authenticated or anon_web_xxx)
@@ -325,106 +398,12 @@ class DBManager:
         Returns:
             List[Dict]: Recent messages from latest session
         """
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-
-        try:
-            if self.client:
-                conversation = None
-                used_identifier = None
-
-                # OPTIMIZED: Check user_id FIRST (since frontend always provides it)
-                if user_id and user_id != "unknown":
-                    # Find the LATEST session for this user_id (most recent conversation)
-                    conversations = list(
-                        self.conversations.find({"user_id": user_id})
-                        .sort("lastMessageTime", -1)
-                        .limit(1)
-                    )
-
-                    if conversations:
-                        conversation = conversations[0]
-                        used_identifier = f"user_id:{user_id}"
-                        logger.info(
-                            f"👤 [OPTIMIZED] Found latest session for user_id: {user_id}"
-                        )
-                        logger.info(
-                            f"👤 [OPTIMIZED] Latest session_id: {conversation.get('session_id', 'unknown')}"
-                        )
-
-                # Fallback to device_id only if user_id failed
-                elif device_id and device_id != "unknown":
-                    conversations = list(
-                        self.conversations.find({"device_id": device_id})
-                        .sort("lastMessageTime", -1)
-                        .limit(1)
-                    )
-
-                    if conversations:
-                        conversation = conversations[0]
-                        used_identifier = f"device_id:{device_id}"
-                        logger.info(
-                            f"📱 [OPTIMIZED] Found conversation using device_id: {device_id}"
-                        )
-
-                # Last resort: session_id (rarely used now)
-                elif session_id and session_id != "unknown":
-                    conversations = list(
-                        self.conversations.find({"session_id": session_id})
-                        .sort("lastMessageTime", -1)
-                        .limit(1)
-                    )
-
-                    if conversations:
-                        conversation = conversations[0]
-                        used_identifier = f"session_id:{session_id}"
-                        logger.info(
-                            f"🔗 [OPTIMIZED] Found conversation using session_id: {session_id}"
-                        )
-
-                if not conversation:
-                    logger.info(
-                        f"👤 [OPTIMIZED] No conversation found for user_id:{user_id}, device_id:{device_id}"
-                    )
-                    return []
-
-                # Filter messages within time window
-                recent_messages = [
-                    {"role": msg["role"], "content": msg["content"]}
-                    for msg in conversation.get("messages", [])
-                    if msg["timestamp"] >= cutoff_time
-                ]
-
-                logger.info(
-                    f"📥 [OPTIMIZED] Retrieved {len(recent_messages)} messages using {used_identifier}"
-                )
-                return recent_messages
-
-            else:
-                # Fallback for in-memory storage (development)
-                identifiers = [user_id, device_id, session_id]
-
-                for identifier in identifiers:
-                    if (
-                        identifier
-                        and identifier != "unknown"
-                        and identifier in self.conversations
-                    ):
-                        conversation = self.conversations[identifier]
-                        recent_messages = [
-                            {"role": msg["role"], "content": msg["content"]}
-                            for msg in conversation["messages"]
-                            if msg["timestamp"] >= cutoff_time
-                        ]
-                        logger.info(
-                            f"📥 [OPTIMIZED] Retrieved {len(recent_messages)} messages from memory using: {identifier}"
-                        )
-                        return recent_messages
-
-                return []
-
-        except Exception as e:
-            logger.error(f"❌ [OPTIMIZED] Error getting messages: {e}")
-            return []
+        return [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in self.get_recent_messages_with_tokens(
+                user_id, device_id, session_id, hours, fallthrough=False
+            )
+        ]
 
     def cleanup_old_conversations(self, days: int = 3) -> int:
         """
@@ -440,9 +419,10 @@ class DBManager:
 
         try:
             if self.client:
-                result = self.conversations.delete_many(
-                    {"lastMessageTime": {"$lt": cutoff_time}}
-                )
+                old_filter = {"lastMessageTime": {"$lt": cutoff_time}}
+                primary_keys = self.conversations.distinct("primary_key", old_filter)
+                self.message_store.delete(primary_keys)
+                result = self.conversations.delete_many(old_filter)
                 return result.deleted_count
             else:
                 # Fallback khi không có MongoDB
@@ -474,7 +454,10 @@ class DBManager:
         """
         try:
             if self.client:
-                result = self.conversations.delete_one({"userID": user_id})
+                result = self.conversations.delete_many(
+                    {"$or": [{"userID": user_id}, {"primary_key": user_id}]}
+                )
+                self.message_store.delete([user_id])
                 return result.deleted_count > 0
             else:
                 # Fallback khi không có MongoDB
@@ -202,6 +202,17 @@ class SlideGenerationStatus(BaseModel):
     # Error details (if failed)
     error_message: Optional[str] = Field(None, description="Error message if failed")
 
+    # Batch progress (batches finish out of order after batch 1)
+    batches_completed: Optional[int] = Field(None, description="Batches generated so far")
+    total_batches: Optional[int] = Field(None, description="Total AI batches")
+    ready_batches: Optional[List[int]] = Field(
+        None, description="1-based batch numbers already generated"
+    )
+    failed_batches: Optional[List[int]] = Field(
+        None, description="1-based batch numbers that failed (regenerated on retry)"
+    )
+    can_retry: Optional[bool] = Field(None, description="Retry resumes missing batches")
+
     # Content (if completed)
     content_html: Optional[str] = Field(
         None, description="Generated HTML content (only when completed)"
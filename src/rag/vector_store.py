@@ -4,7 +4,6 @@ import os
 import gc
 import time
 import traceback
-from sentence_transformers import SentenceTransformer
 
 os.environ["OMP_NUM_THREADS"] = "1"  # Quan trọng để tránh xung đột FAISS
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -81,6 +80,8 @@ class VectorStore:
 
         if self._model is None and not self.use_mock_embedding:
             try:
+                from sentence_transformers import SentenceTransformer
+
                 # Sử dụng model 768 dimensions như config
                 self._model = SentenceTransformer(
                     "paraphrase-multilingual-mpnet-base-v2", device="cpu"
@@ -10,11 +10,8 @@ from enum import Enum
 import json
 from datetime import datetime
 
-# AI Clients
+# AI Clients - every provider here is reached via OpenAI-compatible endpoints
 import openai
-from cerebras.cloud.sdk import Cerebras
-import google.generativeai as genai
-from openai import OpenAI
 
 from src.utils.logger import setup_logger
 
@@ -32,6 +32,7 @@ import uuid
 
 from src.providers.ai_provider_manager import AIProviderManager
 from src.services.extraction_templates.template_factory import ExtractionTemplateFactory
+from src.services.r2_object_cache import get_r2_object_cache, key_from_url
 from config.config import DEEPSEEK_API_KEY, CHATGPT_API_KEY
 import config.config as config
 from src.models.unified_models import (
@@ -398,9 +399,18 @@ class AIExtractionService:
             raise Exception(f"Text extraction failed: {str(e)}")
 
     async def _download_from_r2(self, r2_url: str) -> bytes:
-        """Download file content from R2 URL"""
+        """Download file content from R2 URL (CDN URLs via the shared R2 object cache)"""
         try:
             logger.info(f"🌐 [DOWNLOAD] Starting download from: {r2_url}")
+            r2_key = key_from_url(r2_url)
+            cache = get_r2_object_cache()
+            if r2_key and cache:
+                try:
+                    content = await cache.aread_bytes(r2_key)
+                    logger.info(f"✅ [DOWNLOAD] Read {len(content)} bytes via R2 cache")
+                    return content
+                except Exception as e:
+                    logger.warning(f"⚠️ [DOWNLOAD] R2 cache read failed, using CDN: {e}")
             async with aiohttp.ClientSession() as session:
                 async with session.get(r2_url) as response:
                     logger.info(f"📡 [DOWNLOAD] Response status: {response.status}")
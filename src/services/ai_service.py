@@ -6,7 +6,6 @@ Dịch vụ AI tập trung cho embeddings và xử lý dữ liệu
 from typing import List, Dict, Any, Optional
 import asyncio
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from src.utils.logger import setup_logger
 from config.config import EMBEDDING_MODEL, VECTOR_SIZE
@@ -30,6 +29,8 @@ class UnifiedAIService:
         self.logger.info(
             f"🚀 Initializing AI Service with model: {self.embedding_model_name}"
         )
+        from sentence_transformers import SentenceTransformer
+
         self.embedder = SentenceTransformer(self.embedding_model_name)
         self.logger.info(f"✅ AI Service initialized - Vector size: {self.vector_size}")
 
@@ -0,0 +1,89 @@
+"""
+Artifact Cache — local disk cache for render artifacts keyed by input hash
+
+Used by the video render pipeline (frames/segments) and the slide capture engine
+(slide screenshots). Files live at {root}/{kind}/{key[:2]}/{key}{suffix} and are
+trimmed least-recently-used first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def hash_inputs(*parts: Any) -> str:
+    """Stable hash of artifact inputs"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ArtifactCache:
+    """Disk cache: {root}/{kind}/{key[:2]}/{key}{suffix}, evicted by least-recent use"""
+
+    def __init__(self, root: str, max_mb: int):
+        self.root = Path(root)
+        self.max_bytes = max_mb * 1_048_576
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, kind: str, key: str, suffix: str) -> Path:
+        return self.root / kind / key[:2] / f"{key}{suffix}"
+
+    def fetch(self, kind: str, key: str, suffix: str, dest: Path) -> bool:
+        """Materialize a cached artifact at `dest` (hardlink, copy fallback)"""
+        cached = self._path(kind, key, suffix)
+        if not cached.exists():
+            return False
+        try:
+            os.utime(cached)  # mark as recently used
+            dest.unlink(missing_ok=True)
+            try:
+                os.link(cached, dest)
+            except OSError:
+                shutil.copyfile(cached, dest)
+            return True
+        except FileNotFoundError:
+            # Evicted between exists() and link
+            return False
+
+    def store(self, kind: str, key: str, suffix: str, src: Path):
+        """Atomically add `src` to the cache"""
+        cached = self._path(kind, key, suffix)
+        if cached.exists():
+            return
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f".{cached.name}.{uuid.uuid4().hex}")
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, cached)
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            logger.warning(f"⚠️ Artifact cache store failed ({kind}/{key[:12]}): {e}")
+
+    def evict(self):
+        """Trim the cache to max size, oldest (least recently used) first"""
+        entries = []
+        total = 0
+        for path in self.root.rglob("*"):
+            if path.is_file():
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        freed = 0
+        for _, size, path in entries:
+            if total - freed <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            freed += size
+        logger.info(f"🧹 Artifact cache {self.root} evicted {freed / 1_048_576:.0f}MB")
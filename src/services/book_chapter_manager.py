@@ -13,6 +13,8 @@ import logging
 from pymongo.errors import DuplicateKeyError
 from pymongo import ReturnDocument
 
+from src.services.r2_object_cache import get_r2_object_cache, key_from_url
+
 logger = logging.getLogger("chatbot")
 
 
@@ -2347,7 +2349,7 @@ class GuideBookBookChapterManager:
 
     async def _download_file_from_r2(self, file_url: str, suffix: str = "") -> str:
         """
-        Download file from R2 to temp file
+        Download file from R2 to temp file (via the shared R2 object cache for CDN URLs)
 
         Args:
             file_url: R2 CDN URL
@@ -2365,6 +2367,16 @@ class GuideBookBookChapterManager:
             temp_path = temp_file.name
             temp_file.close()
 
+            r2_key = key_from_url(file_url)
+            cache = get_r2_object_cache()
+            if r2_key and cache:
+                try:
+                    await cache.acopy_to(r2_key, temp_path)
+                    logger.info(f"✅ Copied {r2_key} from R2 cache to {temp_path}")
+                    return temp_path
+                except Exception as e:
+                    logger.warning(f"⚠️ R2 cache read failed, downloading from CDN: {e}")
+
             async with aiohttp.ClientSession() as session:
                 async with session.get(file_url) as response:
                     if response.status != 200:
@@ -454,6 +454,7 @@ class BookPageAudioService:
             language=language,
             version=version,
             use_pro_model=use_pro_model,
+            force_regenerate=force_regenerate,
         )
         return job_id
 
@@ -465,9 +466,11 @@ class BookPageAudioService:
         language: str,
         version: int,
         use_pro_model: bool = False,
+        force_regenerate: bool = False,
     ) -> None:
         """
         Core audio generation logic that updates an existing job record.
+        force_regenerate re-synthesizes every chunk instead of using the TTS cache.
 
         Designed to run as a FastAPI background task via:
             background_tasks.add_task(svc._run_generation, job_id=..., ...)
@@ -582,6 +585,8 @@ class BookPageAudioService:
                             language=tts_language,
                             voice_name=voice_name,
                             use_pro_model=use_pro_model,
+                            cache_path="book_page_audio",
+                            use_cache=not force_regenerate,
                         )
                         break
                     except Exception as e:
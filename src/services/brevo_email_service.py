@@ -6,7 +6,7 @@ Handles email sending through Brevo REST API (more reliable than SMTP)
 import logging
 import os
 import requests
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +100,127 @@ class BrevoEmailService:
             logger.error(f"❌ Failed to send email to {to_email}: {e}")
             return False
 
+    def queue_email(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None,
+        category: str = "notification",
+    ) -> bool:
+        """
+        Queue email in the outbox (delivered in batches by the email sender worker)
+
+        Falls back to sending inline when the outbox is disabled or unavailable.
+
+        Returns:
+            True if queued or sent
+        """
+        from src.services.email_outbox import EMAIL_OUTBOX_ENABLED, get_email_outbox
+
+        if EMAIL_OUTBOX_ENABLED:
+            try:
+                get_email_outbox().enqueue(
+                    [
+                        {
+                            "to_email": to_email,
+                            "subject": subject,
+                            "html_body": html_body,
+                            "text_body": text_body,
+                        }
+                    ],
+                    category=category,
+                )
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Email outbox unavailable, sending inline: {e}")
+        return self.send_email(to_email, subject, html_body, text_body)
+
+    def render_email(self, template: str, **kwargs) -> Dict[str, Any]:
+        """
+        Render one of the send_* templates without sending it
+
+        Args:
+            template: Method name, e.g. "send_test_invitation"
+            **kwargs: Arguments of that method
+
+        Returns:
+            {"to_email", "subject", "html_body", "text_body"} for EmailOutbox.enqueue
+        """
+        return getattr(_EmailRenderer(), template)(**kwargs)
+
+    def send_batch(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send many emails in one Brevo request (messageVersions)
+
+        Args:
+            messages: [{"to_email", "subject", "html_body", "text_body"?}]
+
+        Returns:
+            {"sent": bool, "status": HTTP status, "retry_after": seconds or None,
+             "error": str or None}
+        """
+        if not self.api_key:
+            return {
+                "sent": False,
+                "status": 0,
+                "retry_after": None,
+                "error": "Brevo not configured",
+            }
+
+        versions = []
+        for m in messages:
+            version = {
+                "to": [{"email": m["to_email"]}],
+                "subject": m["subject"],
+                "htmlContent": m["html_body"],
+            }
+            if m.get("text_body"):
+                version["textContent"] = m["text_body"]
+            versions.append(version)
+
+        data = {
+            "sender": {"name": self.sender_name, "email": self.sender_email},
+            "subject": messages[0]["subject"],
+            "htmlContent": messages[0]["html_body"],
+            "messageVersions": versions,
+        }
+
+        try:
+            response = requests.post(
+                self.api_url,
+                headers={
+                    "accept": "application/json",
+                    "api-key": self.api_key,
+                    "content-type": "application/json",
+                },
+                json=data,
+                timeout=30,
+            )
+        except requests.exceptions.RequestException as e:
+            return {"sent": False, "status": 0, "retry_after": None, "error": str(e)}
+
+        if response.status_code == 201:
+            logger.info(f"✅ Batch of {len(messages)} emails accepted by Brevo")
+            return {"sent": True, "status": 201, "retry_after": None, "error": None}
+
+        retry_after = None
+        if response.status_code == 429:
+            try:
+                retry_after = float(
+                    response.headers.get("Retry-After")
+                    or response.headers.get("x-sib-ratelimit-reset")
+                    or 10
+                )
+            except ValueError:
+                retry_after = 10.0
+        return {
+            "sent": False,
+            "status": response.status_code,
+            "retry_after": retry_after,
+            "error": f"{response.status_code}: {response.text[:300]}",
+        }
+
     def send_welcome_email(self, to_email: str, user_name: str) -> bool:
         """
         Send welcome email when user registers
@@ -300,7 +421,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="file_share"
+        )
 
     def send_test_invitation(
         self,
@@ -442,7 +565,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="test_invitation"
+        )
 
     def send_test_deadline_reminder(
         self,
@@ -537,7 +662,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="test_deadline"
+        )
 
     def send_test_completion_notification(
         self,
@@ -647,7 +774,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="test_completion"
+        )
 
     def send_grading_complete_notification(
         self,
@@ -747,7 +876,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="test_grading"
+        )
 
     def send_grade_updated_notification(
         self,
@@ -844,7 +975,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="test_grading"
+        )
 
     def send_new_submission_notification(
         self,
@@ -937,7 +1070,9 @@ class BrevoEmailService:
         Đội ngũ WordAI
         """
 
-        return self.send_email(to_email, subject, html_body, text_body)
+        return self.queue_email(
+            to_email, subject, html_body, text_body, category="test_submission"
+        )
 
     def send_social_plan_content_done_email(
         self,
@@ -1007,6 +1142,24 @@ class BrevoEmailService:
         return self.send_email(to_email, subject, html_body, text_body)
 
 
+class _EmailRenderer(BrevoEmailService):
+    """Runs a send_* template and returns the message instead of sending it"""
+
+    def __init__(self):
+        pass  # no credentials needed, and no init logging per render
+
+    def send_email(self, to_email, subject, html_body, text_body=None):
+        return {
+            "to_email": to_email,
+            "subject": subject,
+            "html_body": html_body,
+            "text_body": text_body,
+        }
+
+    def queue_email(self, to_email, subject, html_body, text_body=None, category=None):
+        return self.send_email(to_email, subject, html_body, text_body)
+
+
 # Singleton instance
 _brevo_service: Optional[BrevoEmailService] = None
 
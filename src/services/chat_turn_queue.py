@@ -0,0 +1,238 @@
+"""
+Chat Turn Queue - write-behind persistence for completed chat turns
+
+After the AI response is streamed, the chat path used to save both messages,
+re-read the history to decide whether the user is new, verify the save and send
+the backend callback + conversation/order webhooks - all inside the SSE
+generator, so the connection stayed open until every write and webhook finished.
+
+Now the chat path appends one compact "turn completed" event to the Redis stream
+`chat:turns` and closes the stream. The chat persistence worker
+(src/workers/chat_persistence_worker.py, consumer group `chat-persistence`):
+
+- reads batches with XREADGROUP and reclaims entries left pending by a dead
+  consumer (XAUTOCLAIM after CHAT_TURN_CLAIM_IDLE_MS)
+- saves the whole batch at once (one header update per conversation + one
+  bucket bulk_write) and takes "new user" from the header's message_count
+- dispatches webhooks per turn with retries; turns that still fail go to the
+  dead-letter stream `chat:turns:dead`
+- marks saved turns (`chat:turn:saved:{turn_id}`) so a redelivered entry never
+  stores its messages twice, and XACKs only when a turn is fully handled
+
+If Redis is unavailable, publish() returns None and the caller processes the
+turn inline as before.
+
+Usage:
+    queue = get_chat_turn_queue()
+    if not await queue.publish(event):
+        await unified_chat_service.process_completed_turns([event])
+
+    # Pending / dead-letter counts
+    python -m src.services.chat_turn_queue stats
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+TURN_STREAM = "chat:turns"
+DEAD_LETTER_STREAM = "chat:turns:dead"
+CONSUMER_GROUP = "chat-persistence"
+SAVED_KEY_PREFIX = "chat:turn:saved:"
+
+CHAT_WRITE_BEHIND_ENABLED = os.getenv("CHAT_WRITE_BEHIND_ENABLED", "true").lower() == "true"
+CHAT_TURN_STREAM_MAXLEN = int(os.getenv("CHAT_TURN_STREAM_MAXLEN", "100000"))
+# Entries pending this long on a consumer are taken over by another one (must
+# exceed a batch's worst-case webhook time: 3 callbacks x 30s timeout + backoff)
+CHAT_TURN_CLAIM_IDLE_MS = int(os.getenv("CHAT_TURN_CLAIM_IDLE_MS", "300000"))
+SAVED_MARKER_TTL = 24 * 3600
+# Backend callback attempts per turn (exponential backoff from the base delay)
+CHAT_WEBHOOK_MAX_ATTEMPTS = int(os.getenv("CHAT_WEBHOOK_MAX_ATTEMPTS", "3"))
+CHAT_WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv("CHAT_WEBHOOK_RETRY_BASE_SECONDS", "2"))
+
+
+class ChatTurnQueue:
+    """Redis stream of completed chat turns (producer + consumer-group helpers)"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://redis-server:6379")
+        self._redis: Optional[aioredis.Redis] = None
+        self._group_ready = False
+
+    @property
+    def redis(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                self.redis_url, decode_responses=True, socket_timeout=2
+            )
+        return self._redis
+
+    # ------------------------------------------------------------------
+    # Producer (API process)
+    # ------------------------------------------------------------------
+
+    async def publish(self, event: Dict[str, Any]) -> Optional[str]:
+        """
+        Append a turn event; None when disabled or Redis is down (process inline)
+
+        Args:
+            event: JSON-serializable turn (see UnifiedChatService._build_turn_event)
+
+        Returns:
+            Stream entry ID or None
+        """
+        if not CHAT_WRITE_BEHIND_ENABLED:
+            return None
+        try:
+            entry_id = await self.redis.xadd(
+                TURN_STREAM,
+                {"event": json.dumps(event, ensure_ascii=False)},
+                maxlen=CHAT_TURN_STREAM_MAXLEN,
+                approximate=True,
+            )
+            logger.info(f"📨 [CHAT_TURNS] Queued turn {event.get('turn_id')} as {entry_id}")
+            return entry_id
+        except Exception as e:
+            logger.warning(f"⚠️ [CHAT_TURNS] Queue unavailable, processing inline: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Consumer (chat persistence worker)
+    # ------------------------------------------------------------------
+
+    async def ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.redis.xgroup_create(TURN_STREAM, CONSUMER_GROUP, id="0", mkstream=True)
+            logger.info(f"✅ [CHAT_TURNS] Created consumer group {CONSUMER_GROUP}")
+        except aioredis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def read_batch(
+        self, consumer: str, count: int, block_ms: int
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Next batch for this consumer: stale entries of dead consumers first,
+        then new entries (blocks up to block_ms when the stream is empty)
+
+        Returns:
+            [(entry_id, event)] - undecodable entries are dead-lettered and acked
+        """
+        await self.ensure_group()
+        raw: List[Tuple[str, Dict[str, str]]] = []
+
+        claimed = await self.redis.xautoclaim(
+            TURN_STREAM,
+            CONSUMER_GROUP,
+            consumer,
+            min_idle_time=CHAT_TURN_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=count,
+        )
+        raw.extend(claimed[1])
+        if raw:
+            logger.warning(f"♻️ [CHAT_TURNS] Reclaimed {len(raw)} stale turns")
+
+        if len(raw) < count:
+            response = await self.redis.xreadgroup(
+                CONSUMER_GROUP,
+                consumer,
+                {TURN_STREAM: ">"},
+                count=count - len(raw),
+                block=None if raw else block_ms,
+            )
+            for _, entries in response or []:
+                raw.extend(entries)
+
+        batch = []
+        for entry_id, fields in raw:
+            try:
+                batch.append((entry_id, json.loads(fields["event"])))
+            except (KeyError, TypeError, ValueError) as e:
+                await self.dead_letter(entry_id, fields.get("event") if fields else None, f"decode: {e}")
+        return batch
+
+    async def ack(self, *entry_ids: str):
+        if entry_ids:
+            await self.redis.xack(TURN_STREAM, CONSUMER_GROUP, *entry_ids)
+
+    async def mark_saved(self, turn_ids: List[str], first_turn: List[bool]):
+        """Remember saved turns with their "new user" flag for a redelivery"""
+        if not turn_ids:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for turn_id, is_new in zip(turn_ids, first_turn):
+            pipe.set(SAVED_KEY_PREFIX + turn_id, "1" if is_new else "0", ex=SAVED_MARKER_TTL)
+        await pipe.execute()
+
+    async def saved_flags(self, turn_ids: List[str]) -> List[Optional[bool]]:
+        """Stored "new user" flag per turn (None = not saved yet, redelivery guard)"""
+        if not turn_ids:
+            return []
+        values = await self.redis.mget([SAVED_KEY_PREFIX + t for t in turn_ids])
+        return [None if v is None else v == "1" for v in values]
+
+    async def dead_letter(self, entry_id: str, raw_event: Optional[str], error: str):
+        """Park a turn that cannot be handled and ack the original entry"""
+        await self.redis.xadd(
+            DEAD_LETTER_STREAM,
+            {"entry_id": entry_id, "event": raw_event or "", "error": error[:500]},
+            maxlen=10000,
+            approximate=True,
+        )
+        await self.ack(entry_id)
+        logger.error(f"☠️ [CHAT_TURNS] Dead-lettered {entry_id}: {error}")
+
+    async def stats(self) -> Dict[str, Any]:
+        await self.ensure_group()
+        pending = await self.redis.xpending(TURN_STREAM, CONSUMER_GROUP)
+        return {
+            "stream_length": await self.redis.xlen(TURN_STREAM),
+            "pending": pending.get("pending", 0) if isinstance(pending, dict) else pending[0],
+            "dead_letters": await self.redis.xlen(DEAD_LETTER_STREAM),
+        }
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+_queue: Optional[ChatTurnQueue] = None
+
+
+def get_chat_turn_queue() -> ChatTurnQueue:
+    global _queue
+    if _queue is None:
+        _queue = ChatTurnQueue()
+    return _queue
+
+
+def main() -> int:
+    if sys.argv[1:] != ["stats"]:
+        print("Usage: python -m src.services.chat_turn_queue stats")
+        return 1
+
+    async def _stats():
+        queue = get_chat_turn_queue()
+        try:
+            print(json.dumps(await queue.stats(), indent=2))
+        finally:
+            await queue.close()
+
+    asyncio.run(_stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+Company Prompt Cache - per-company static prompt sections for UnifiedChatService
+
+Every chat turn used to re-read the company document twice (context + name),
+re-format FAQs/scenarios/contact info, re-run the catalog `$text` search and
+re-render the ~10 KB static body of the unified prompt. Per company this cache
+keeps:
+
+- company_name and the formatted company context (one `companies.find_one`)
+- the unified prompt template pre-rendered around them, split into static text
+  parts and query-dependent slots (user_name, history, RAG data, products, query)
+- catalog snapshots: the formatted products section per normalized query
+
+Invalidation is versioned: writers call bump_company_version(company_id, scope)
+("context" for the companies document, "catalog" for internal_products_catalog),
+which increments a Redis hash `company:prompt_ver:{company_id}` shared by all
+workers. Each turn reads both versions in one HMGET; an entry built for another
+version is rebuilt. Entries also expire after COMPANY_PROMPT_CACHE_TTL seconds,
+which bounds staleness if Redis is down or a writer bypasses the hooks.
+
+Usage:
+    cache = get_company_prompt_cache()
+    ctx = await cache.get_context(company_id, load_company)       # CompanyPromptContext
+    products = await cache.get_products(company_id, query, load_products)
+    prompt = fill_template(ctx.prompt_parts, {"user_query": query, ...})
+
+    bump_company_version(company_id, "context")  # after updating companies
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPANY_PROMPT_CACHE_TTL = float(os.getenv("COMPANY_PROMPT_CACHE_TTL", "300"))
+COMPANY_PROMPT_CACHE_SIZE = int(os.getenv("COMPANY_PROMPT_CACHE_SIZE", "1000"))
+# Distinct product queries remembered per company and catalog version
+CATALOG_QUERY_CACHE_SIZE = int(os.getenv("CATALOG_QUERY_CACHE_SIZE", "64"))
+
+VERSION_SCOPES = ("context", "catalog")
+_VERSION_PREFIX = "company:prompt_ver:"
+_SLOT_PATTERN = re.compile("\x00([a-z_]+)\x00")
+
+
+# ============================================================================
+# TEMPLATE SPLITTING
+# ============================================================================
+
+
+def slot_marker(name: str) -> str:
+    """Placeholder rendered into the template where a per-turn value goes"""
+    return f"\x00{name}\x00"
+
+
+def split_template(rendered: str) -> List[str]:
+    """
+    Template rendered with slot_marker() values → [text, slot, text, slot, ..., text]
+
+    Even indexes are static text, odd indexes are slot names.
+    """
+    return _SLOT_PATTERN.split(rendered)
+
+
+def fill_template(parts: List[str], values: Dict[str, str]) -> str:
+    """Join static parts with this turn's slot values"""
+    out = []
+    for i, part in enumerate(parts):
+        out.append(str(values[part]) if i % 2 else part)
+    return "".join(out)
+
+
+def normalize_catalog_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+
+class CompanyPromptContext:
+    """Static prompt data of one company at one context version"""
+
+    __slots__ = ("company_name", "company_context", "prompt_parts", "version", "expires_at")
+
+    def __init__(
+        self,
+        company_name: str,
+        company_context: str,
+        prompt_parts: Optional[List[str]],
+        version: Optional[int],
+    ):
+        self.company_name = company_name
+        self.company_context = company_context
+        self.prompt_parts = prompt_parts
+        self.version = version
+        self.expires_at = time.monotonic() + COMPANY_PROMPT_CACHE_TTL
+
+
+class _CatalogSnapshots:
+    __slots__ = ("version", "expires_at", "queries")
+
+    def __init__(self, version: Optional[int]):
+        self.version = version
+        self.expires_at = time.monotonic() + COMPANY_PROMPT_CACHE_TTL
+        self.queries: "OrderedDict[str, str]" = OrderedDict()
+
+
+class CompanyPromptCache:
+    """Versioned in-process cache of per-company prompt sections"""
+
+    def __init__(self, max_companies: int = COMPANY_PROMPT_CACHE_SIZE):
+        self.max_companies = max_companies
+        self._contexts: "OrderedDict[str, CompanyPromptContext]" = OrderedDict()
+        self._catalogs: "OrderedDict[str, _CatalogSnapshots]" = OrderedDict()
+        self._building: Dict[str, asyncio.Future] = {}
+        self._redis = None
+        self._redis_ok = True
+        self._retry_at = 0.0  # back off after a failed call
+        self.hits = self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Versions (Redis)
+    # ------------------------------------------------------------------
+
+    def _client(self):
+        if time.monotonic() < self._retry_at:
+            return None
+        if self._redis is None and self._redis_ok:
+            try:
+                import redis
+
+                self._redis = redis.Redis(
+                    host=os.getenv("REDIS_HOST", "localhost"),
+                    port=int(os.getenv("REDIS_PORT", 6379)),
+                    db=int(os.getenv("REDIS_DB", 0)),
+                    decode_responses=True,
+                    socket_timeout=0.2,
+                    socket_connect_timeout=0.2,
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Company prompt cache: Redis unavailable ({e})")
+                self._redis_ok = False
+        return self._redis
+
+    def versions(self, company_id: str) -> Tuple[Optional[int], Optional[int]]:
+        """(context_version, catalog_version); None when Redis is unavailable"""
+        client = self._client()
+        if client is None:
+            return None, None
+        try:
+            raw = client.hmget(_VERSION_PREFIX + company_id, *VERSION_SCOPES)
+        except Exception as e:
+            logger.debug(f"Company prompt version read failed: {e}")
+            self._retry_at = time.monotonic() + 30
+            return None, None
+        return tuple(int(v) if v else 0 for v in raw)
+
+    def bump(self, company_id: str, scope: str):
+        """New version for one scope of a company (all workers rebuild on next turn)"""
+        if scope not in VERSION_SCOPES:
+            raise ValueError(f"Unknown company prompt scope: {scope}")
+        (self._contexts if scope == "context" else self._catalogs).pop(company_id, None)
+        client = self._client()
+        if client is not None:
+            try:
+                client.hincrby(_VERSION_PREFIX + company_id, scope, 1)
+            except Exception as e:
+                logger.warning(f"⚠️ Company prompt version bump failed for {company_id}: {e}")
+        logger.info(f"🔄 [PROMPT_CACHE] {scope} changed for company {company_id}")
+
+    @staticmethod
+    def _fresh(entry, version: Optional[int]) -> bool:
+        return (
+            entry is not None
+            and entry.expires_at > time.monotonic()
+            and (version is None or entry.version == version)
+        )
+
+    def _remember(self, store: OrderedDict, company_id: str, entry):
+        store[company_id] = entry
+        store.move_to_end(company_id)
+        while len(store) > self.max_companies:
+            store.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    async def get_context(
+        self,
+        company_id: str,
+        build: Callable[[Optional[int]], Awaitable[CompanyPromptContext]],
+        version: Optional[int] = None,
+    ) -> CompanyPromptContext:
+        """
+        Cached static context of a company, or `build(version)` once per version
+
+        Args:
+            company_id: Company ID
+            build: Loads the company and renders its CompanyPromptContext
+            version: Context version from versions() (read here if None)
+        """
+        if version is None:
+            version = self.versions(company_id)[0]
+        entry = self._contexts.get(company_id)
+        if self._fresh(entry, version):
+            self._contexts.move_to_end(company_id)
+            self.hits += 1
+            return entry
+
+        # Concurrent turns of the same company share one build
+        pending = self._building.get(company_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._building[company_id] = future
+        try:
+            entry = await build(version)
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else waits
+            raise
+        finally:
+            self._building.pop(company_id, None)
+        self._remember(self._contexts, company_id, entry)
+        return entry
+
+    async def get_products(
+        self,
+        company_id: str,
+        query: str,
+        load: Callable[[], Awaitable[str]],
+        version: Optional[int] = None,
+    ) -> str:
+        """
+        Formatted products section for (company, query) at the current catalog version
+
+        `load` should raise instead of returning an error text, so failures are
+        never cached.
+        """
+        if version is None:
+            version = self.versions(company_id)[1]
+        snapshots = self._catalogs.get(company_id)
+        if not self._fresh(snapshots, version):
+            snapshots = _CatalogSnapshots(version)
+            self._remember(self._catalogs, company_id, snapshots)
+
+        key = normalize_catalog_query(query)
+        cached = snapshots.queries.get(key)
+        if cached is not None:
+            snapshots.queries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        products = await load()
+        snapshots.queries[key] = products
+        while len(snapshots.queries) > CATALOG_QUERY_CACHE_SIZE:
+            snapshots.queries.popitem(last=False)
+        return products
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "companies": len(self._contexts),
+            "catalogs": len(self._catalogs),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_cache: Optional[CompanyPromptCache] = None
+
+
+def get_company_prompt_cache() -> CompanyPromptCache:
+    global _cache
+    if _cache is None:
+        _cache = CompanyPromptCache()
+    return _cache
+
+
+def bump_company_version(company_id: str, scope: str = "context"):
+    """
+    Invalidate cached prompt sections of a company after a write
+
+    Args:
+        company_id: Company ID
+        scope: "context" (companies document) or "catalog" (product catalog)
+    """
+    if not company_id:
+        return
+    try:
+        get_company_prompt_cache().bump(company_id, scope)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to invalidate prompt cache for {company_id}: {e}")
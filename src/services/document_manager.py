@@ -6,12 +6,32 @@ Using synchronous PyMongo to maintain compatibility with production
 
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import logging
 
+from src.services.document_version_store import (
+    SNAPSHOT_FIELDS,
+    DocumentVersionStore,
+)
+from src.utils.pagination import keyset_page
+
 # Use 'chatbot' logger to match app.py logging configuration
 logger = logging.getLogger("chatbot")
 
+# Fields rendered by document list views (no content_html / slide data)
+DOCUMENT_LIST_FIELDS = {
+    "document_id": 1,
+    "title": 1,
+    "last_saved_at": 1,
+    "updated_at": 1,
+    "last_opened_at": 1,
+    "version": 1,
+    "file_size_bytes": 1,
+    "source_type": 1,
+    "document_type": 1,
+    "folder_id": 1,
+}
+
 
 class DocumentManager:
     """Quản lý documents trong MongoDB - Synchronous PyMongo"""
@@ -25,6 +45,7 @@ class DocumentManager:
         """
         self.db = db
         self.documents = db["documents"]
+        self.version_store = DocumentVersionStore(db)
 
     def create_indexes(self):
         """Tạo indexes cho collection documents"""
@@ -66,6 +87,8 @@ class DocumentManager:
                 )
                 logger.info("✅ Created index: user_id_1_folder_id_1")
 
+            self.version_store.create_indexes()
+
             logger.info("✅ Document indexes verified/created")
         except Exception as e:
             logger.error(f"❌ Error creating indexes: {e}")
@@ -139,8 +162,7 @@ class DocumentManager:
             "title": title,
             "content_html": content_html,
             "content_text": content_text,
-            "version": 1,
-            "version_history": [],  # ✅ Empty until first generation completes
+            "version": 1,  # Snapshots live in document_versions (first one after AI generation)
             "auto_save_count": 0,
             "manual_save_count": 1,  # Lần tạo = manual save
             # Source tracking
@@ -178,7 +200,8 @@ class DocumentManager:
     def get_document(self, document_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """Lấy document theo ID và update last_opened_at"""
         document = self.documents.find_one(
-            {"document_id": document_id, "user_id": user_id, "is_deleted": False}
+            {"document_id": document_id, "user_id": user_id, "is_deleted": False},
+            {"version_history": 0},  # Legacy embedded history (not yet migrated)
         )
 
         if document:
@@ -329,49 +352,121 @@ class DocumentManager:
         logger.warning(f"⚠️ Document {document_id} not found or not modified")
         return False
 
-    def save_version_snapshot(
-        self, document_id: str, user_id: str, description: str = "Version snapshot"
-    ) -> int:
+    def migrate_embedded_history(self, document_id: str) -> int:
         """
-        Save current document state as a version in history.
-        Creates a snapshot of content_html, slides_outline, slide_backgrounds, slide_elements.
+        Move a legacy embedded `version_history` array into the version store
 
-        Returns: new version number
+        Documents written before the version store carry their snapshots inline;
+        they are migrated on first version access (or by
+        scripts/migrate_version_history_to_store.py).
+
+        Returns: number of versions moved
         """
-        # Get current document
         doc = self.documents.find_one(
-            {"document_id": document_id, "user_id": user_id, "is_deleted": False}
+            {"document_id": document_id, "version_history": {"$exists": True}},
+            {"user_id": 1, "version_history": 1},
+        )
+        if not doc:
+            return 0
+
+        history = sorted(doc.get("version_history") or [], key=lambda v: v["version"])
+        for entry in history:
+            # Duplicated version numbers (pre-store bug): the last entry wins
+            self.version_store.put(
+                document_id=document_id,
+                user_id=doc["user_id"],
+                version=entry["version"],
+                snapshot=entry,
+                description=entry.get("description", ""),
+                created_at=entry.get("created_at"),
+            )
+
+        self.documents.update_one(
+            {"document_id": document_id}, {"$unset": {"version_history": ""}}
         )
+        if history:
+            logger.info(
+                f"📦 Migrated {len(history)} embedded versions of {document_id} to version store"
+            )
+        return len(history)
 
+    def _get_owned_document(self, document_id: str, user_id: str) -> Dict[str, Any]:
+        doc = self.documents.find_one(
+            {"document_id": document_id, "user_id": user_id, "is_deleted": False},
+            {"version_history": 0},
+        )
         if not doc:
             raise ValueError(f"Document {document_id} not found")
+        self.migrate_embedded_history(document_id)
+        return doc
 
-        # Create version snapshot
-        version_snapshot = {
-            "version": doc.get("version", 1),
-            "created_at": datetime.utcnow(),
-            "description": description,
-            "content_html": doc.get("content_html", ""),
-            "slides_outline": doc.get("slides_outline", []),
-            "slide_backgrounds": doc.get("slide_backgrounds", []),
-            "slide_elements": doc.get("slide_elements", []),
-            "slide_count": len(doc.get("slides_outline", [])),
-        }
+    def save_version(
+        self,
+        document_id: str,
+        user_id: str,
+        version: int,
+        snapshot: Dict[str, Any],
+        description: str = "Version snapshot",
+    ) -> Dict[str, Any]:
+        """Store (or replace) a version snapshot without touching the current version"""
+        self.migrate_embedded_history(document_id)
+        return self.version_store.put(
+            document_id=document_id,
+            user_id=user_id,
+            version=version,
+            snapshot=snapshot,
+            description=description,
+        )
 
-        # Increment version and save snapshot
-        new_version = doc.get("version", 1) + 1
+    def update_version_fields(
+        self, document_id: str, user_id: str, version: int, fields: Dict[str, Any]
+    ) -> bool:
+        """Update snapshot fields of a stored version (e.g. current version outline)"""
+        self.migrate_embedded_history(document_id)
+        return self.version_store.update_fields(document_id, user_id, version, fields)
+
+    def get_version_snapshot(
+        self, document_id: str, user_id: str, version: int
+    ) -> Optional[Dict[str, Any]]:
+        """Full snapshot of one version (None if document or version not found)"""
+        try:
+            self._get_owned_document(document_id, user_id)
+        except ValueError:
+            return None
+        return self.version_store.get(document_id, version)
+
+    def save_version_snapshot(
+        self, document_id: str, user_id: str, description: str = "Version snapshot"
+    ) -> int:
+        """
+        Save current document state as a version in the version store.
+        Creates a snapshot of content_html, slides_outline, slide_backgrounds, slide_elements.
+
+        Returns: new version number
+        """
+        doc = self._get_owned_document(document_id, user_id)
+
+        current_version = doc.get("version", 1)
+        stats = self.version_store.put(
+            document_id=document_id,
+            user_id=user_id,
+            version=current_version,
+            snapshot={field: doc.get(field) for field in SNAPSHOT_FIELDS},
+            description=description,
+        )
+
+        # After a restore the current version is an old number - never reuse a later one
+        latest = self.version_store.latest_version(document_id) or current_version
+        new_version = max(current_version, latest) + 1
 
         self.documents.update_one(
-            {"document_id": document_id},
-            {
-                "$set": {"version": new_version},
-                "$push": {"version_history": version_snapshot},
-            },
+            {"document_id": document_id}, {"$set": {"version": new_version}}
         )
 
         logger.info(
-            f"📸 Saved version {version_snapshot['version']} snapshot "
-            f"for {document_id} (new version: {new_version})"
+            f"📸 Saved version {current_version} snapshot "
+            f"for {document_id} (new version: {new_version}, {stats['kind']} "
+            f"{stats['stored_bytes']}/{stats['full_bytes']} bytes)"
         )
 
         return new_version
@@ -380,25 +475,14 @@ class DocumentManager:
         self, document_id: str, user_id: str, target_version: int
     ) -> bool:
         """
-        Restore document to a specific version from history.
+        Restore document to a specific version from the version store.
         Updates current content_html, slides_outline, slide_backgrounds, slide_elements.
 
         Returns: True if successful
         """
-        doc = self.documents.find_one(
-            {"document_id": document_id, "user_id": user_id, "is_deleted": False}
-        )
-
-        if not doc:
-            raise ValueError(f"Document {document_id} not found")
-
-        # Find target version in history
-        target_snapshot = None
-        for v in doc.get("version_history", []):
-            if v["version"] == target_version:
-                target_snapshot = v
-                break
+        self._get_owned_document(document_id, user_id)
 
+        target_snapshot = self.version_store.get(document_id, target_version)
         if not target_snapshot:
             raise ValueError(f"Version {target_version} not found in history")
 
@@ -429,15 +513,13 @@ class DocumentManager:
         Get all version history for a document.
         Returns list of version snapshots with is_current flag.
         """
-        doc = self.documents.find_one(
-            {"document_id": document_id, "user_id": user_id, "is_deleted": False}
-        )
-
-        if not doc:
+        try:
+            doc = self._get_owned_document(document_id, user_id)
+        except ValueError:
             return []
 
         current_version = doc.get("version", 1)
-        history = doc.get("version_history", [])
+        history = self.version_store.list(document_id)
 
         # Mark current version
         for v in history:
@@ -448,6 +530,27 @@ class DocumentManager:
 
         return history
 
+    def _list_query(
+        self,
+        user_id: str,
+        source_type: Optional[str],
+        document_type: Optional[str],
+        folder_id: Optional[str],
+    ) -> Dict[str, Any]:
+        query = {"user_id": user_id, "is_deleted": False}
+
+        # Add filters
+        if source_type:
+            query["source_type"] = source_type
+
+        if document_type:
+            query["document_type"] = document_type
+
+        if folder_id is not None:
+            query["folder_id"] = folder_id
+
+        return query
+
     def list_user_documents(
         self,
         user_id: str,
@@ -460,25 +563,17 @@ class DocumentManager:
         """
         Lấy danh sách documents của user, sắp xếp theo last_opened_at
 
+        Offset pagination - kept for old clients; new clients use page_user_documents.
+
         Args:
             source_type: Filter by "file" hoặc "created"
             document_type: Filter by "doc", "slide", "note" (chỉ cho created)
             folder_id: Filter by folder ID
         """
-        query = {"user_id": user_id, "is_deleted": False}
-
-        # Add filters
-        if source_type:
-            query["source_type"] = source_type
-
-        if document_type:
-            query["document_type"] = document_type
-
-        if folder_id is not None:
-            query["folder_id"] = folder_id
+        query = self._list_query(user_id, source_type, document_type, folder_id)
 
         documents = list(
-            self.documents.find(query)
+            self.documents.find(query, DOCUMENT_LIST_FIELDS)
             .sort("last_opened_at", -1)
             .skip(offset)
             .limit(limit)
@@ -490,6 +585,38 @@ class DocumentManager:
         )
         return documents
 
+    def page_user_documents(
+        self,
+        user_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        source_type: Optional[str] = None,
+        document_type: Optional[str] = None,
+        folder_id: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset page of the user's documents (last_opened_at desc)
+
+        Returns:
+            (documents with list fields only, next_cursor or None)
+        """
+        query = self._list_query(user_id, source_type, document_type, folder_id)
+        documents, next_cursor = keyset_page(
+            self.documents,
+            query,
+            sort=[("last_opened_at", -1)],
+            projection=DOCUMENT_LIST_FIELDS,
+            limit=limit,
+            cursor=cursor,
+        )
+
+        logger.info(
+            f"📋 Listed {len(documents)} documents for user {user_id} "
+            f"(source={source_type}, type={document_type}, folder={folder_id}, "
+            f"more={next_cursor is not None})"
+        )
+        return documents, next_cursor
+
     def delete_document(
         self, document_id: str, user_id: str, soft_delete: bool = True
     ) -> bool:
@@ -508,6 +635,7 @@ class DocumentManager:
             )
             success = result.deleted_count > 0
             if success:
+                self.version_store.delete_document(document_id)
                 logger.info(f"🗑️ Document {document_id} permanently deleted")
 
         return success
@@ -610,7 +738,15 @@ class DocumentManager:
 
     def empty_trash(self, user_id: str) -> int:
         """Xóa vĩnh viễn tất cả documents trong trash"""
+        trashed_ids = [
+            doc["document_id"]
+            for doc in self.documents.find(
+                {"user_id": user_id, "is_deleted": True}, {"document_id": 1}
+            )
+        ]
         result = self.documents.delete_many({"user_id": user_id, "is_deleted": True})
+        if trashed_ids:
+            self.version_store.versions.delete_many({"document_id": {"$in": trashed_ids}})
 
         deleted_count = result.deleted_count
         logger.info(
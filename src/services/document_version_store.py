@@ -0,0 +1,303 @@
+"""
+Document Version Store - version snapshots outside the document
+
+Version snapshots (content_html, slides_outline, slide_backgrounds, slide_elements)
+used to be `$push`ed into the document's own `version_history` array, so every
+regeneration grew the document and every `find_one` carried the whole history.
+They now live in the `document_versions` collection, one record per
+(document_id, version):
+
+- keyframe: the full snapshot
+- delta: line/item-level edit script against the previous stored version
+  (`difflib.SequenceMatcher` opcodes - copy ranges from the base, insert new runs)
+
+Payloads are zlib-compressed JSON. A keyframe is written every
+VERSION_KEYFRAME_INTERVAL versions, or when the delta would not be meaningfully
+smaller than the full snapshot, so reconstructing any version replays a short chain.
+
+Usage:
+    store = DocumentVersionStore(db)
+    store.put(document_id, user_id, version, snapshot, description)
+    snapshot = store.get(document_id, version)
+"""
+
+import json
+import logging
+import os
+import zlib
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("chatbot")
+
+VERSIONS_COLLECTION = "document_versions"
+VERSION_KEYFRAME_INTERVAL = int(os.getenv("VERSION_KEYFRAME_INTERVAL", "10"))
+# Store a keyframe when delta size >= this fraction of the full snapshot
+VERSION_DELTA_MAX_RATIO = float(os.getenv("VERSION_DELTA_MAX_RATIO", "0.6"))
+
+SNAPSHOT_FIELDS = ("content_html", "slides_outline", "slide_backgrounds", "slide_elements")
+_EMPTY = {"content_html": "", "slides_outline": [], "slide_backgrounds": [], "slide_elements": []}
+
+
+def _tokens(field: str, value: Any) -> List[str]:
+    """Diff units: HTML lines, or one canonical JSON string per list item"""
+    if field == "content_html":
+        return (value or "").splitlines(keepends=True)
+    return [json.dumps(item, sort_keys=True, default=str) for item in (value or [])]
+
+
+def _from_tokens(field: str, tokens: List[str]) -> Any:
+    if field == "content_html":
+        return "".join(tokens)
+    return [json.loads(token) for token in tokens]
+
+
+def _diff(base: List[str], target: List[str]) -> List[list]:
+    """Edit script: ["=", i1, i2] copies base[i1:i2], ["+", [...]] inserts tokens"""
+    ops: List[list] = []
+    matcher = SequenceMatcher(None, base, target, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i1, i2])
+        elif j2 > j1:  # replace / insert ("delete" just skips base tokens)
+            ops.append(["+", target[j1:j2]])
+    return ops
+
+
+def _patch(base: List[str], ops: List[list]) -> List[str]:
+    result: List[str] = []
+    for op in ops:
+        if op[0] == "=":
+            result.extend(base[op[1] : op[2]])
+        else:
+            result.extend(op[1])
+    return result
+
+
+def _pack(payload: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(payload, default=str).encode("utf-8"), 6)
+
+
+def _unpack(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def normalize_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: snapshot.get(field) or _EMPTY[field] for field in SNAPSHOT_FIELDS}
+
+
+class DocumentVersionStore:
+    """Keyframe + delta version records in `document_versions`"""
+
+    def __init__(self, db):
+        self.versions = db[VERSIONS_COLLECTION]
+
+    def create_indexes(self):
+        self.versions.create_index(
+            [("document_id", 1), ("version", 1)], unique=True, name="document_version_unique"
+        )
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def _records(self, document_id: str) -> Dict[int, Dict[str, Any]]:
+        return {
+            record["version"]: record
+            for record in self.versions.find({"document_id": document_id}, {"_id": 0})
+        }
+
+    def _materialize(
+        self,
+        records: Dict[int, Dict[str, Any]],
+        version: int,
+        memo: Optional[Dict[int, Dict[str, List[str]]]] = None,
+    ) -> Dict[str, List[str]]:
+        """Token lists of `version`, replaying deltas from the nearest keyframe"""
+        memo = {} if memo is None else memo
+        chain = []
+        current = version
+        while current not in memo:
+            record = records[current]
+            chain.append(record)
+            if record["kind"] == "keyframe":
+                break
+            current = record["base_version"]
+
+        state = memo.get(current)
+        for record in reversed(chain):
+            payload = _unpack(record["data"])
+            if record["kind"] == "keyframe":
+                state = {
+                    field: _tokens(field, payload.get(field)) for field in SNAPSHOT_FIELDS
+                }
+            else:
+                state = {
+                    field: _patch(state[field], payload[field]) if field in payload else state[field]
+                    for field in SNAPSHOT_FIELDS
+                }
+            memo[record["version"]] = state
+        return state
+
+    def _snapshot(self, record: Dict[str, Any], tokens: Dict[str, List[str]]) -> Dict[str, Any]:
+        snapshot = {field: _from_tokens(field, tokens[field]) for field in SNAPSHOT_FIELDS}
+        snapshot.update(
+            version=record["version"],
+            created_at=record.get("created_at"),
+            description=record.get("description", ""),
+            slide_count=record.get("slide_count", len(snapshot["slides_outline"])),
+        )
+        return snapshot
+
+    def get(self, document_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Full snapshot of one version, or None if it was never stored"""
+        records = self._records(document_id)
+        if version not in records:
+            return None
+        return self._snapshot(records[version], self._materialize(records, version))
+
+    def list(self, document_id: str, include_content: bool = True) -> List[Dict[str, Any]]:
+        """All versions, oldest first (content reconstructed in one pass)"""
+        records = self._records(document_id)
+        memo: Dict[int, Dict[str, List[str]]] = {}
+        history = []
+        for version in sorted(records):
+            record = records[version]
+            if include_content:
+                history.append(self._snapshot(record, self._materialize(records, version, memo)))
+            else:
+                history.append(
+                    {
+                        "version": version,
+                        "created_at": record.get("created_at"),
+                        "description": record.get("description", ""),
+                        "slide_count": record.get("slide_count", 0),
+                    }
+                )
+        return history
+
+    def exists(self, document_id: str, version: int) -> bool:
+        return self.versions.count_documents(
+            {"document_id": document_id, "version": version}, limit=1
+        ) > 0
+
+    def latest_version(self, document_id: str) -> Optional[int]:
+        record = self.versions.find_one(
+            {"document_id": document_id}, {"version": 1}, sort=[("version", -1)]
+        )
+        return record["version"] if record else None
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+
+    def put(
+        self,
+        document_id: str,
+        user_id: str,
+        version: int,
+        snapshot: Dict[str, Any],
+        description: str = "Version snapshot",
+        created_at: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Store (or replace) one version
+
+        Args:
+            snapshot: content_html / slides_outline / slide_backgrounds / slide_elements
+
+        Returns:
+            Stats: kind, stored_bytes, full_bytes
+        """
+        records = self._records(document_id)
+        existing = records.get(version)
+        snapshot = normalize_snapshot(snapshot)
+        tokens = {field: _tokens(field, snapshot[field]) for field in SNAPSHOT_FIELDS}
+
+        # A delta that was built on this version must not outlive its old content
+        for dependent in records.values():
+            if dependent.get("base_version") == version and dependent["version"] != version:
+                self._rewrite_as_keyframe(records, dependent)
+
+        full_data = _pack(snapshot)
+        base_version = max((v for v in records if v < version), default=None)
+        record = {
+            "kind": "keyframe",
+            "base_version": None,
+            "chain": 0,
+            "data": full_data,
+        }
+        if base_version is not None:
+            base = records[base_version]
+            chain = base.get("chain", 0) + 1
+            if chain < VERSION_KEYFRAME_INTERVAL:
+                base_tokens = self._materialize(records, base_version)
+                delta = {
+                    field: _diff(base_tokens[field], tokens[field])
+                    for field in SNAPSHOT_FIELDS
+                    if base_tokens[field] != tokens[field]
+                }
+                delta_data = _pack(delta)
+                if len(delta_data) < len(full_data) * VERSION_DELTA_MAX_RATIO:
+                    record = {
+                        "kind": "delta",
+                        "base_version": base_version,
+                        "chain": chain,
+                        "data": delta_data,
+                    }
+
+        record.update(
+            document_id=document_id,
+            user_id=user_id,
+            version=version,
+            description=description,
+            slide_count=len(snapshot["slides_outline"]),
+            created_at=created_at or (existing or {}).get("created_at") or datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+            stored_bytes=len(record["data"]),
+            full_bytes=len(full_data),
+        )
+        self.versions.replace_one(
+            {"document_id": document_id, "version": version}, record, upsert=True
+        )
+        return {
+            "kind": record["kind"],
+            "stored_bytes": record["stored_bytes"],
+            "full_bytes": record["full_bytes"],
+        }
+
+    def update_fields(
+        self, document_id: str, user_id: str, version: int, fields: Dict[str, Any]
+    ) -> bool:
+        """
+        Change some snapshot fields of a stored version (e.g. the current version's
+        outline after an outline edit). Returns False if the version is not stored.
+        """
+        current = self.get(document_id, version)
+        if current is None:
+            return False
+        current.update({k: v for k, v in fields.items() if k in SNAPSHOT_FIELDS})
+        self.put(
+            document_id,
+            user_id,
+            version,
+            current,
+            description=current.get("description", ""),
+            created_at=current.get("created_at"),
+        )
+        return True
+
+    def _rewrite_as_keyframe(self, records: Dict[int, Dict[str, Any]], record: Dict[str, Any]):
+        tokens = self._materialize(records, record["version"])
+        snapshot = {field: _from_tokens(field, tokens[field]) for field in SNAPSHOT_FIELDS}
+        data = _pack(snapshot)
+        update = {"kind": "keyframe", "base_version": None, "chain": 0, "data": data, "stored_bytes": len(data)}
+        self.versions.update_one(
+            {"document_id": record["document_id"], "version": record["version"]},
+            {"$set": update},
+        )
+        record.update(update)
+
+    def delete_document(self, document_id: str) -> int:
+        return self.versions.delete_many({"document_id": document_id}).deleted_count
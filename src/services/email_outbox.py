@@ -0,0 +1,230 @@
+"""
+Email Outbox - batched, retried delivery of notification emails
+
+Routes used to send every email inline: one synchronous Brevo HTTP call per
+recipient (through asyncio.to_thread), so sharing a test with 50 people took
+50 sequential API round trips inside the request.
+
+Now callers render the email and insert it into the `email_outbox` collection
+(one insert_many for a whole fan-out). The email sender worker
+(src/workers/email_sender_worker.py):
+
+- claims due jobs in batches with a lease (EMAIL_LEASE_SECONDS), so a crashed
+  worker's jobs are picked up again after the lease expires
+- sends each batch with one Brevo request (messageVersions), rate limited to
+  EMAIL_SEND_RATE emails per second and pausing on HTTP 429
+- retries failed jobs with exponential backoff; after EMAIL_MAX_ATTEMPTS a job
+  becomes "dead" and stays in the collection for inspection
+
+With EMAIL_OUTBOX_ENABLED=false (or if the insert fails) emails are sent inline
+as before.
+
+Usage:
+    outbox = get_email_outbox()
+    outbox.enqueue([{"to_email": ..., "subject": ..., "html_body": ..., "text_body": ...}],
+                   category="test_invitation")
+
+    # Pending / dead counts
+    python -m src.services.email_outbox stats
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "email_outbox"
+
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+# Claimed jobs not finished within this time are claimed again
+EMAIL_LEASE_SECONDS = int(os.getenv("EMAIL_LEASE_SECONDS", "120"))
+# Sent jobs are kept this long (TTL index on sent_at)
+EMAIL_SENT_RETENTION_DAYS = int(os.getenv("EMAIL_SENT_RETENTION_DAYS", "7"))
+
+
+class EmailOutbox:
+    """Mongo-backed queue of rendered emails"""
+
+    def __init__(self, db):
+        self.db = db
+        self.jobs = db[OUTBOX_COLLECTION]
+
+    def create_indexes(self):
+        """Indexes for claiming due jobs and expiring sent ones"""
+        self.jobs.create_index([("status", 1), ("next_attempt_at", 1)])
+        self.jobs.create_index(
+            "sent_at", expireAfterSeconds=EMAIL_SENT_RETENTION_DAYS * 86400
+        )
+
+    # ------------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------------
+
+    def enqueue(self, messages: List[Dict[str, Any]], category: str = "notification") -> int:
+        """
+        Queue rendered emails for the sender worker
+
+        Args:
+            messages: [{"to_email", "subject", "html_body", "text_body"?}]
+            category: Label for stats/logs (test_invitation, test_grading, ...)
+
+        Returns:
+            Number of queued emails
+        """
+        if not messages:
+            return 0
+        now = datetime.now(timezone.utc)
+        docs = [
+            {
+                "to_email": m["to_email"],
+                "subject": m["subject"],
+                "html_body": m["html_body"],
+                "text_body": m.get("text_body"),
+                "category": category,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for m in messages
+        ]
+        self.jobs.insert_many(docs, ordered=False)
+        logger.info(f"📨 [EMAIL_OUTBOX] Queued {len(docs)} {category} emails")
+        return len(docs)
+
+    # ------------------------------------------------------------------
+    # Consumer (email sender worker)
+    # ------------------------------------------------------------------
+
+    def claim_batch(self, worker_id: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` due jobs (pending, or sending with an expired lease)
+
+        Returns:
+            Claimed job documents
+        """
+        now = datetime.now(timezone.utc)
+        due = {
+            "$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lt": now}},
+            ]
+        }
+        ids = [
+            d["_id"]
+            for d in self.jobs.find(due, {"_id": 1})
+            .sort("next_attempt_at", 1)
+            .limit(limit)
+        ]
+        if not ids:
+            return []
+        lease_until = now + timedelta(seconds=EMAIL_LEASE_SECONDS)
+        # Re-check the due condition so two workers never lease the same job
+        self.jobs.update_many(
+            {"_id": {"$in": ids}, **due},
+            {
+                "$set": {
+                    "status": "sending",
+                    "lease_owner": worker_id,
+                    "lease_until": lease_until,
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        return list(
+            self.jobs.find(
+                {
+                    "_id": {"$in": ids},
+                    "lease_owner": worker_id,
+                    "lease_until": lease_until,
+                }
+            )
+        )
+
+    def mark_sent(self, job_ids: List[Any]):
+        if job_ids:
+            self.jobs.update_many(
+                {"_id": {"$in": job_ids}},
+                {
+                    "$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)},
+                    "$unset": {"lease_owner": "", "lease_until": "", "last_error": ""},
+                },
+            )
+
+    def mark_failed(self, jobs: List[Dict[str, Any]], error: str):
+        """Schedule a retry with exponential backoff, or mark dead"""
+        now = datetime.now(timezone.utc)
+        for job in jobs:
+            attempts = job.get("attempts", 1)
+            if attempts >= EMAIL_MAX_ATTEMPTS:
+                update = {"status": "dead", "last_error": error[:500], "dead_at": now}
+                logger.error(
+                    f"☠️ [EMAIL_OUTBOX] Giving up on email to {job['to_email']} "
+                    f"after {attempts} attempts: {error}"
+                )
+            else:
+                delay = EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+                update = {
+                    "status": "pending",
+                    "last_error": error[:500],
+                    "next_attempt_at": now + timedelta(seconds=delay),
+                }
+            self.jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": update, "$unset": {"lease_owner": "", "lease_until": ""}},
+            )
+
+    def release(self, jobs: List[Dict[str, Any]], delay_seconds: float):
+        """Put claimed jobs back without counting an attempt (provider rate limit)"""
+        if jobs:
+            self.jobs.update_many(
+                {"_id": {"$in": [job["_id"] for job in jobs]}},
+                {
+                    "$set": {
+                        "status": "pending",
+                        "next_attempt_at": datetime.now(timezone.utc)
+                        + timedelta(seconds=delay_seconds),
+                    },
+                    "$inc": {"attempts": -1},
+                    "$unset": {"lease_owner": "", "lease_until": ""},
+                },
+            )
+
+    def stats(self) -> Dict[str, int]:
+        counts = {
+            row["_id"]: row["n"]
+            for row in self.jobs.aggregate(
+                [{"$group": {"_id": "$status", "n": {"$sum": 1}}}]
+            )
+        }
+        return {s: counts.get(s, 0) for s in ("pending", "sending", "sent", "dead")}
+
+
+_outbox: Optional[EmailOutbox] = None
+
+
+def get_email_outbox() -> EmailOutbox:
+    global _outbox
+    if _outbox is None:
+        from src.database.db_manager import DBManager
+
+        _outbox = EmailOutbox(DBManager().db)
+    return _outbox
+
+
+def main() -> int:
+    if sys.argv[1:] != ["stats"]:
+        print("Usage: python -m src.services.email_outbox stats")
+        return 1
+    print(json.dumps(get_email_outbox().stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,6 @@ Uses unified multilingual model for consistent vector representations
 
 import asyncio
 from typing import List, Optional
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import os
 
@@ -29,6 +28,8 @@ class EmbeddingService:
 
     def _initialize_model(self):
         """Initialize the embedding model"""
+        from sentence_transformers import SentenceTransformer
+
         try:
             logger.info(f"🧠 Initializing embedding model from system config:")
             logger.info(f"   📊 Model: {self.model_name}")
@@ -0,0 +1,586 @@
+"""
+FFmpeg Scheduler — host-wide admission control for ffmpeg jobs
+
+Every ffmpeg invocation (video export encodes, AI video segments/merges/concat, TTS
+conversions) goes through one scheduler so concurrent jobs on the same host share
+the CPU instead of oversubscribing it:
+
+- Jobs wait in a priority queue (high > normal > low, FIFO within a priority).
+- Admission takes a core lease from a Redis hash shared by every worker container
+  on the host (`ffmpeg:leases:{host}`), so the sum of `-threads` of running jobs
+  stays within FFMPEG_CORE_BUDGET. Low-priority jobs leave FFMPEG_HIGH_PRIORITY_RESERVE
+  cores free for interactive work. Jobs also wait while MemAvailable is below
+  FFMPEG_MIN_FREE_MEMORY_MB.
+- Encode jobs get `-threads` / `-preset` from their priority profile.
+- `-progress pipe:1` is parsed and forwarded to an on_progress(fraction) callback.
+- Queue depth, wait time and encode time are published to `ffmpeg:stats:{host}`.
+
+Leases expire (FFMPEG_LEASE_TTL) if a worker dies mid-encode. Without Redis the
+scheduler falls back to in-process accounting and reconnects after
+REDIS_RETRY_SECONDS.
+
+Usage:
+    scheduler = get_ffmpeg_scheduler()
+    await scheduler.run(cmd, "FFmpeg encode", priority="high", encode=True,
+                        duration=120.0, on_progress=cb)
+
+    # Host-wide queue depth / timing stats
+    python -m src.services.ffmpeg_scheduler stats
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+_PRIORITY_RANK = {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 1, PRIORITY_LOW: 2}
+
+# All worker containers on one machine share a host id (set per machine if scaled out)
+FFMPEG_HOST_ID = os.getenv("FFMPEG_SCHEDULER_HOST", "shared")
+FFMPEG_CORE_BUDGET = int(os.getenv("FFMPEG_CORE_BUDGET", str(os.cpu_count() or 2)))
+FFMPEG_HIGH_PRIORITY_RESERVE = int(
+    os.getenv("FFMPEG_HIGH_PRIORITY_RESERVE", str(max(1, FFMPEG_CORE_BUDGET // 4)))
+)
+FFMPEG_MIN_FREE_MEMORY_MB = int(os.getenv("FFMPEG_MIN_FREE_MEMORY_MB", "512"))
+FFMPEG_LEASE_TTL = int(os.getenv("FFMPEG_LEASE_TTL", "60"))
+FFMPEG_PROGRESS_INTERVAL = float(os.getenv("FFMPEG_PROGRESS_INTERVAL", "2"))
+REDIS_RETRY_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class EncodeProfile:
+    threads: int
+    preset: Optional[str]
+
+
+# Interactive exports favour wall-clock time; background jobs favour compression
+PRIORITY_PROFILES: Dict[str, EncodeProfile] = {
+    PRIORITY_HIGH: EncodeProfile(
+        threads=int(os.getenv("FFMPEG_HIGH_THREADS", "4")),
+        preset=os.getenv("FFMPEG_HIGH_PRESET", "fast"),
+    ),
+    PRIORITY_NORMAL: EncodeProfile(
+        threads=int(os.getenv("FFMPEG_NORMAL_THREADS", "2")),
+        preset=os.getenv("FFMPEG_NORMAL_PRESET", "fast"),
+    ),
+    PRIORITY_LOW: EncodeProfile(
+        threads=int(os.getenv("FFMPEG_LOW_THREADS", "1")),
+        preset=os.getenv("FFMPEG_LOW_PRESET", "slow"),
+    ),
+}
+
+# Admit a lease if (cores in use + requested + reserve) fits the budget.
+# An idle host always admits, so a job larger than the budget cannot starve.
+# Lease value: "{expires_ms}:{cores}". Returns cores in use after admission,
+# or -(cores in use) when rejected.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cores = tonumber(ARGV[3])
+local budget = tonumber(ARGV[4])
+local reserve = tonumber(ARGV[5])
+local ttl_ms = tonumber(ARGV[6])
+local used = 0
+local leases = redis.call('HGETALL', KEYS[1])
+for i = 1, #leases, 2 do
+    local expires, c = string.match(leases[i + 1], '^(%d+):(%d+)$')
+    if (not expires) or tonumber(expires) < now then
+        redis.call('HDEL', KEYS[1], leases[i])
+    else
+        used = used + tonumber(c)
+    end
+end
+if used > 0 and used + cores + reserve > budget then
+    return -used
+end
+redis.call('HSET', KEYS[1], ARGV[2], (now + ttl_ms) .. ':' .. cores)
+redis.call('PEXPIRE', KEYS[1], ttl_ms * 2)
+return used + cores
+"""
+
+# Extend a lease only if it still exists (not already reaped)
+_RENEW_SCRIPT = """
+local value = redis.call('HGET', KEYS[1], ARGV[1])
+if not value then return 0 end
+local cores = string.match(value, ':(%d+)$')
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. ':' .. cores)
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+ProgressCallback = Callable[[float], Awaitable[None]]
+
+
+def available_memory_mb() -> Optional[int]:
+    """MemAvailable from /proc/meminfo (None if unknown)"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _set_option(cmd: List[str], flag: str, value: str) -> List[str]:
+    """Replace `flag value` in an ffmpeg command, or insert it before the output path"""
+    cmd = list(cmd)
+    if flag in cmd:
+        idx = cmd.index(flag)
+        if idx + 1 < len(cmd):
+            cmd[idx + 1] = value
+            return cmd
+    cmd[-1:-1] = [flag, value]
+    return cmd
+
+
+def prepare_command(
+    cmd: List[str],
+    profile: Optional[EncodeProfile],
+    threads: int,
+    with_progress: bool,
+) -> List[str]:
+    """Apply the encode profile and machine-readable progress to an ffmpeg command"""
+    cmd = list(cmd)
+    if profile is not None:
+        cmd = _set_option(cmd, "-threads", str(threads))
+        if profile.preset:
+            cmd = _set_option(cmd, "-preset", profile.preset)
+    if with_progress and "-progress" not in cmd:
+        cmd[1:1] = ["-progress", "pipe:1", "-nostats"]
+    return cmd
+
+
+class FFmpegScheduler:
+    """Priority queue + host-wide core leases for ffmpeg subprocesses"""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        host_id: str = FFMPEG_HOST_ID,
+        core_budget: int = FFMPEG_CORE_BUDGET,
+        high_priority_reserve: int = FFMPEG_HIGH_PRIORITY_RESERVE,
+    ):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://redis-server:6379")
+        self.host_id = host_id
+        self.core_budget = max(1, core_budget)
+        self.high_priority_reserve = max(0, min(high_priority_reserve, self.core_budget - 1))
+
+        self.leases_key = f"ffmpeg:leases:{host_id}"
+        self.waiting_key = f"ffmpeg:waiting:{host_id}"
+        self.stats_key = f"ffmpeg:stats:{host_id}"
+
+        self.redis: Optional[aioredis.Redis] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._connected = False
+        self._retry_at = 0.0
+        self._acquire = None
+        self._renew = None
+
+        # In-process priority queue: (rank, seq, ticket)
+        self._queue: List = []
+        self._seq = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+
+        # Leases held by this process (the whole ledger without Redis)
+        self._local_leases: Dict[str, int] = {}
+
+        self._stats: Dict[str, float] = {}
+
+    # ------------------------------------------------------------------
+    # Redis
+    # ------------------------------------------------------------------
+
+    async def _client(self) -> Optional[aioredis.Redis]:
+        if self._connected:
+            return self.redis
+        if time.monotonic() < self._retry_at:
+            return None
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self._connected:
+                return self.redis
+            if time.monotonic() < self._retry_at:
+                return None
+            try:
+                client = aioredis.from_url(
+                    self.redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=5,
+                    socket_timeout=5,
+                )
+                await client.ping()
+                self.redis = client
+                self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+                self._renew = client.register_script(_RENEW_SCRIPT)
+                self._connected = True
+                logger.info(
+                    f"✅ FFmpeg scheduler connected (host {self.host_id}, "
+                    f"{self.core_budget} cores, reserve {self.high_priority_reserve})"
+                )
+            except Exception as e:
+                self.redis = None
+                self._retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+                logger.warning(
+                    f"⚠️ FFmpeg scheduler: Redis unavailable ({e}) - "
+                    f"using in-process admission (this worker only), "
+                    f"retrying in {REDIS_RETRY_SECONDS}s"
+                )
+        return self.redis
+
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.close()
+        self.redis = None
+        self._connected = False
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def _reserve_for(self, priority: str) -> int:
+        return self.high_priority_reserve if priority == PRIORITY_LOW else 0
+
+    async def _try_acquire(self, lease_id: str, cores: int, priority: str) -> bool:
+        # Low memory: wait for this process's own jobs to finish (never blocks an idle worker)
+        free_mb = available_memory_mb()
+        if free_mb is not None and free_mb < FFMPEG_MIN_FREE_MEMORY_MB and self._local_leases:
+            return False
+
+        reserve = self._reserve_for(priority)
+        client = await self._client()
+        if client is not None:
+            try:
+                result = await self._acquire(
+                    keys=[self.leases_key],
+                    args=[
+                        int(time.time() * 1000), lease_id, cores, self.core_budget,
+                        reserve, FFMPEG_LEASE_TTL * 1000,
+                    ],
+                )
+                if int(result) <= 0:
+                    return False
+                self._local_leases[lease_id] = cores
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ FFmpeg lease acquire failed, admitting locally: {e}")
+
+        used = sum(self._local_leases.values())
+        if used > 0 and used + cores + reserve > self.core_budget:
+            return False
+        self._local_leases[lease_id] = cores
+        return True
+
+    async def _release(self, lease_id: str):
+        self._local_leases.pop(lease_id, None)
+        if self.redis is not None:
+            try:
+                await self.redis.hdel(self.leases_key, lease_id)
+            except Exception as e:
+                logger.warning(f"⚠️ FFmpeg lease release failed ({lease_id}): {e}")
+
+    async def _renew_loop(self, lease_id: str):
+        while True:
+            await asyncio.sleep(FFMPEG_LEASE_TTL / 3)
+            if self.redis is None:
+                return
+            try:
+                await self._renew(
+                    keys=[self.leases_key],
+                    args=[
+                        lease_id,
+                        int(time.time() * 1000) + FFMPEG_LEASE_TTL * 1000,
+                        FFMPEG_LEASE_TTL * 2000,
+                    ],
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ FFmpeg lease renew failed ({lease_id}): {e}")
+
+    async def _mark_waiting(self, lease_id: str, waiting: bool):
+        if self.redis is None:
+            return
+        try:
+            if waiting:
+                expires = time.time() + FFMPEG_LEASE_TTL
+                await self.redis.zadd(self.waiting_key, {lease_id: expires})
+                await self.redis.expire(self.waiting_key, FFMPEG_LEASE_TTL * 2)
+            else:
+                await self.redis.zrem(self.waiting_key, lease_id)
+        except Exception:
+            pass
+
+    async def _admit(self, lease_id: str, cores: int, priority: str):
+        """Wait in the local priority queue, then poll the host-wide lease table"""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+
+        ticket = (_PRIORITY_RANK.get(priority, 1), next(self._seq), lease_id)
+        heapq.heappush(self._queue, ticket)
+        await self._client()
+        await self._mark_waiting(lease_id, True)
+
+        poll = 0.2 if priority == PRIORITY_HIGH else 0.5
+        last_mark = time.monotonic()
+        try:
+            while True:
+                async with self._cond:
+                    # Only the head of the local queue competes for a lease
+                    await self._cond.wait_for(lambda: self._queue[0] is ticket)
+                if await self._try_acquire(lease_id, cores, priority):
+                    return
+                if time.monotonic() - last_mark > FFMPEG_LEASE_TTL / 3:
+                    await self._mark_waiting(lease_id, True)
+                    last_mark = time.monotonic()
+                await asyncio.sleep(poll)
+        finally:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            async with self._cond:
+                self._cond.notify_all()
+            await self._mark_waiting(lease_id, False)
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    async def _record(self, priority: str, label: str, wait_s: float, run_s: float, ok: bool):
+        fields = {
+            f"{priority}:jobs": 1,
+            f"{priority}:failed": 0 if ok else 1,
+            f"{priority}:wait_seconds": wait_s,
+            f"{priority}:encode_seconds": run_s,
+        }
+        for field, value in fields.items():
+            self._stats[field] = self._stats.get(field, 0) + value
+
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            for field, value in fields.items():
+                pipe.hincrbyfloat(self.stats_key, field, value)
+            pipe.hset(
+                self.stats_key,
+                "last_job",
+                json.dumps(
+                    {"label": label, "priority": priority, "wait_s": round(wait_s, 2),
+                     "encode_s": round(run_s, 2), "ok": ok, "at": int(time.time())}
+                ),
+            )
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ FFmpeg stats update failed: {e}")
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Queue depth, cores in use and per-priority timing stats for this host"""
+        client = await self._client()
+        data: Dict[str, Any] = {
+            "host": self.host_id,
+            "core_budget": self.core_budget,
+            "high_priority_reserve": self.high_priority_reserve,
+            "local_waiting": len(self._queue),
+        }
+        if client is None:
+            data.update(
+                running=len(self._local_leases),
+                cores_in_use=sum(self._local_leases.values()),
+                waiting=len(self._queue),
+                stats=self._summarize(self._stats),
+            )
+            return data
+
+        now_ms = int(time.time() * 1000)
+        leases = await client.hgetall(self.leases_key)
+        live = []
+        for value in leases.values():
+            expires, _, cores = value.partition(":")
+            if expires.isdigit() and int(expires) >= now_ms:
+                live.append(int(cores or 0))
+        await client.zremrangebyscore(self.waiting_key, 0, time.time())
+        raw = await client.hgetall(self.stats_key)
+
+        data.update(
+            running=len(live),
+            cores_in_use=sum(live),
+            waiting=await client.zcard(self.waiting_key),
+            stats=self._summarize(
+                {k: float(v) for k, v in raw.items() if k != "last_job"}
+            ),
+            last_job=json.loads(raw["last_job"]) if raw.get("last_job") else None,
+        )
+        return data
+
+    @staticmethod
+    def _summarize(counters: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for priority in _PRIORITY_RANK:
+            jobs = counters.get(f"{priority}:jobs", 0)
+            if not jobs:
+                continue
+            summary[priority] = {
+                "jobs": int(jobs),
+                "failed": int(counters.get(f"{priority}:failed", 0)),
+                "avg_wait_s": round(counters.get(f"{priority}:wait_seconds", 0) / jobs, 2),
+                "avg_encode_s": round(counters.get(f"{priority}:encode_seconds", 0) / jobs, 2),
+            }
+        return summary
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    async def run(
+        self,
+        cmd: List[str],
+        label: str,
+        priority: str = PRIORITY_NORMAL,
+        encode: bool = False,
+        duration: Optional[float] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        timeout: Optional[float] = None,
+        cwd: Optional[str] = None,
+    ) -> None:
+        """
+        Queue, admit and run one ffmpeg command
+
+        Args:
+            cmd: ffmpeg argv (output path last)
+            label: Used in logs, stats and the error message
+            priority: high (user waiting) | normal | low (batch/background)
+            encode: Video encode - apply the priority's -threads/-preset
+            duration: Expected output duration (seconds) for progress fractions
+            on_progress: Awaited with 0..1 at most every FFMPEG_PROGRESS_INTERVAL
+            timeout: Kill ffmpeg after this many seconds (queue time not included)
+            cwd: Working directory
+
+        Raises:
+            RuntimeError: ffmpeg exited non-zero
+        """
+        profile = PRIORITY_PROFILES.get(priority, PRIORITY_PROFILES[PRIORITY_NORMAL])
+        threads = max(1, min(profile.threads, self.core_budget)) if encode else 1
+        cmd = prepare_command(
+            cmd,
+            profile if encode else None,
+            threads,
+            with_progress=bool(on_progress and duration),
+        )
+
+        lease_id = f"{label[:40]}:{uuid.uuid4().hex[:12]}"
+        queued_at = time.perf_counter()
+        await self._admit(lease_id, threads, priority)
+        wait_s = time.perf_counter() - queued_at
+        if wait_s > 1:
+            logger.info(f"⏳ {label}: waited {wait_s:.1f}s for {threads} core(s) ({priority})")
+
+        renew_task = asyncio.create_task(self._renew_loop(lease_id))
+        started = time.perf_counter()
+        ok = False
+        try:
+            await self._execute(cmd, label, duration, on_progress, timeout, cwd)
+            ok = True
+        finally:
+            renew_task.cancel()
+            await self._release(lease_id)
+            await self._record(priority, label, wait_s, time.perf_counter() - started, ok)
+
+    async def _execute(
+        self,
+        cmd: List[str],
+        label: str,
+        duration: Optional[float],
+        on_progress: Optional[ProgressCallback],
+        timeout: Optional[float],
+        cwd: Optional[str],
+    ):
+        track = bool(on_progress and duration)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE if track else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+        )
+        stderr_tail: deque = deque(maxlen=40)
+
+        async def read_stderr():
+            async for line in proc.stderr:
+                stderr_tail.append(line.decode(errors="replace"))
+
+        async def read_progress():
+            last_sent = 0.0
+            async for raw in proc.stdout:
+                key, _, value = raw.decode(errors="replace").strip().partition("=")
+                if key in ("out_time_us", "out_time_ms") and value.isdigit():
+                    # Both keys are microseconds in ffmpeg's -progress output
+                    fraction = min(1.0, int(value) / 1_000_000 / duration)
+                    now = time.monotonic()
+                    if now - last_sent >= FFMPEG_PROGRESS_INTERVAL:
+                        last_sent = now
+                        await self._emit(on_progress, fraction)
+                elif key == "progress" and value == "end":
+                    await self._emit(on_progress, 1.0)
+
+        readers = [read_stderr()] + ([read_progress()] if track else [])
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*readers, proc.wait()), timeout=timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"{label} failed: {''.join(stderr_tail)[-500:]}")
+
+    @staticmethod
+    async def _emit(on_progress: ProgressCallback, fraction: float):
+        try:
+            await on_progress(fraction)
+        except Exception as e:
+            logger.warning(f"⚠️ FFmpeg progress callback failed: {e}")
+
+
+_scheduler: Optional[FFmpegScheduler] = None
+
+
+def get_ffmpeg_scheduler() -> FFmpegScheduler:
+    """Process-wide scheduler (leases are shared host-wide through Redis)"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FFmpegScheduler()
+    return _scheduler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="FFmpeg scheduler stats")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Print host-wide queue depth and encode timings")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        snapshot = asyncio.run(get_ffmpeg_scheduler().snapshot())
+        print(json.dumps(snapshot, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
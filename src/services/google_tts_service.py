@@ -15,6 +15,8 @@ from google.genai import types  # type: ignore
 from google.auth import default
 from google.auth.transport.requests import Request
 
+from src.services.tts_cache import get_tts_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -276,9 +278,11 @@ class GoogleTTSService:
         pitch: float = 0.0,
         prompt: Optional[str] = None,
         use_pro_model: bool = False,
+        cache_path: str = "google_tts",
+        use_cache: bool = True,
     ) -> Tuple[bytes, Dict]:
         """
-        Generate audio using Gemini TTS
+        Generate audio using Gemini TTS (served from the TTS cache when possible)
 
         Args:
             text: Text to convert
@@ -287,10 +291,39 @@ class GoogleTTSService:
             speaking_rate: Not used in Gemini TTS (kept for compatibility)
             pitch: Not used in Gemini TTS (kept for compatibility)
             prompt: Optional style prompt (e.g., "Say in a curious way")
+            cache_path: Caller name for TTS cache hit-rate reporting
+            use_cache: False forces a fresh synthesis
 
         Returns:
             (audio_bytes, metadata)
         """
+        return await get_tts_cache().get_or_generate(
+            cache_path,
+            lambda: self._generate_audio_uncached(
+                text, language, voice_name, prompt, use_pro_model
+            ),
+            text=text,
+            voice=voice_name or "Enceladus",
+            language=self.get_language_code(language),
+            rate=speaking_rate,
+            model=(
+                "gemini-2.5-pro-preview-tts"
+                if use_pro_model
+                else "gemini-2.5-flash-preview-tts"
+            ),
+            extra={"prompt": prompt} if prompt else None,
+            use_cache=use_cache,
+        )
+
+    async def _generate_audio_uncached(
+        self,
+        text: str,
+        language: str,
+        voice_name: Optional[str],
+        prompt: Optional[str],
+        use_pro_model: bool,
+    ) -> Tuple[bytes, Dict]:
+        """Gemini TTS provider call (see generate_audio)"""
         try:
             if not text or len(text.strip()) == 0:
                 raise ValueError("Text cannot be empty")
@@ -418,6 +451,7 @@ class GoogleTTSService:
         pitch: float = 0.0,
         prompt: Optional[str] = None,
         use_pro_model: bool = False,
+        cache_path: str = "google_tts",
     ) -> Tuple[bytes, Dict]:
         """Generate audio from HTML content"""
         text = self.extract_text_from_html(html_content, max_length=8000)
@@ -433,6 +467,7 @@ class GoogleTTSService:
             pitch=pitch,
             prompt=prompt,
             use_pro_model=use_pro_model,
+            cache_path=cache_path,
         )
 
     async def generate_multi_speaker_audio(
@@ -442,9 +477,11 @@ class GoogleTTSService:
         language: str = "en",
         speaking_rate: float = 1.0,
         use_pro_model: bool = False,
+        cache_path: str = "google_tts_multi",
+        use_cache: bool = True,
     ) -> Tuple[bytes, Dict]:
         """
-        Generate multi-speaker audio using Gemini TTS
+        Generate multi-speaker audio using Gemini TTS (served from the TTS cache when possible)
 
         Args:
             script: Dict with 'speaker_roles' (list of names) and 'lines' (list of {speaker: int, text: str})
@@ -452,6 +489,8 @@ class GoogleTTSService:
             language: Language code
             speaking_rate: Not used (kept for compatibility)
             use_pro_model: Use pro model for higher quality
+            cache_path: Caller name for TTS cache hit-rate reporting
+            use_cache: False forces a fresh synthesis
 
         Returns:
             (audio_bytes, metadata)
@@ -466,6 +505,30 @@ class GoogleTTSService:
             }
             voice_names = ["Kore", "Puck"]
         """
+        speaker_roles = script.get("speaker_roles", [])
+        lines = script.get("lines", [])
+        # The audio depends on roles, line order/text and each speaker's voice
+        cache_text = "\n".join(
+            f"{line.get('speaker')}: {line.get('text', '')}" for line in lines
+        )
+        return await get_tts_cache().get_or_generate(
+            cache_path,
+            lambda: self._generate_multi_speaker_audio_uncached(
+                script, voice_names, language
+            ),
+            text=cache_text,
+            voice="|".join(voice_names[: len(speaker_roles)]),
+            language=self.get_language_code(language),
+            rate=speaking_rate,
+            model="gemini-2.5-pro-preview-tts",
+            extra={"speaker_roles": speaker_roles},
+            use_cache=use_cache,
+        )
+
+    async def _generate_multi_speaker_audio_uncached(
+        self, script: Dict, voice_names: List[str], language: str
+    ) -> Tuple[bytes, Dict]:
+        """Gemini multi-speaker provider call (see generate_multi_speaker_audio)"""
         try:
             speaker_roles = script.get("speaker_roles", [])
             lines = script.get("lines", [])
@@ -5,13 +5,34 @@ Handles library files (Type 3) - Reference materials, templates, guides
 
 import logging
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from pymongo import MongoClient
 from pymongo.database import Database
 import uuid
 
+from src.utils.pagination import keyset_page
+
 logger = logging.getLogger("chatbot")
 
+# Fields rendered by library list views (+ keys needed to build file_url)
+LIBRARY_LIST_FIELDS = {
+    "_id": 0,
+    "library_id": 1,
+    "user_id": 1,
+    "filename": 1,
+    "file_type": 1,
+    "file_size": 1,
+    "category": 1,
+    "description": 1,
+    "tags": 1,
+    "metadata": 1,
+    "is_deleted": 1,
+    "uploaded_at": 1,
+    "updated_at": 1,
+    "r2_key": 1,
+    "cf_image_id": 1,
+}
+
 
 class LibraryManager:
     """
@@ -236,6 +257,19 @@ class LibraryManager:
             logger.error(f"❌ Error uploading library file: {e}")
             raise
 
+    def _list_query(
+        self, user_id: str, category: Optional[str], tags: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        query = {"user_id": user_id, "is_deleted": False}
+
+        if category:
+            query["category"] = category
+
+        if tags and len(tags) > 0:
+            query["tags"] = {"$all": tags}
+
+        return query
+
     def list_library_files(
         self,
         user_id: str,
@@ -245,7 +279,7 @@ class LibraryManager:
         offset: int = 0,
     ) -> List[Dict[str, Any]]:
         """
-        List library files with optional filters
+        List library files with optional filters (offset pagination, legacy)
 
         Args:
             user_id: Firebase UID
@@ -258,16 +292,10 @@ class LibraryManager:
             List of library file documents
         """
         try:
-            query = {"user_id": user_id, "is_deleted": False}
-
-            if category:
-                query["category"] = category
-
-            if tags and len(tags) > 0:
-                query["tags"] = {"$all": tags}
+            query = self._list_query(user_id, category, tags)
 
             files = list(
-                self.library_files.find(query)
+                self.library_files.find(query, LIBRARY_LIST_FIELDS)
                 .sort("uploaded_at", -1)
                 .skip(offset)
                 .limit(limit)
@@ -283,6 +311,37 @@ class LibraryManager:
             logger.error(f"❌ Error listing library files: {e}")
             return []
 
+    def page_library_files(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Keyset page of library files (uploaded_at desc)
+
+        Returns:
+            (files with list fields only, next_cursor or None)
+
+        Raises:
+            InvalidCursorError: Cursor is malformed
+        """
+        files, next_cursor = keyset_page(
+            self.library_files,
+            self._list_query(user_id, category, tags),
+            sort=[("uploaded_at", -1)],
+            projection=LIBRARY_LIST_FIELDS,
+            limit=limit,
+            cursor=cursor,
+        )
+        logger.info(
+            f"📚 Listed {len(files)} library files for user {user_id} "
+            f"(category={category}, tags={tags}, more={next_cursor is not None})"
+        )
+        return files, next_cursor
+
     def get_library_file(
         self, library_id: str, user_id: str
     ) -> Optional[Dict[str, Any]]:
@@ -518,9 +577,11 @@ class LibraryManager:
 
     def empty_library_trash(self, user_id: str) -> int:
         """
-        Permanently delete ALL library files in trash
+        Permanently delete ALL library files in trash (R2 objects + records)
         ⚠️ WARNING: This cannot be undone!
 
+        Runs a bulk purge job (batched R2 deletes + delete_many), see r2_purge_service.
+
         Args:
             user_id: Firebase UID
 
@@ -528,20 +589,23 @@ class LibraryManager:
             Number of files deleted
         """
         try:
-            # 1. Get all deleted files
-            deleted_files = self.list_deleted_library_files(
-                user_id=user_id, limit=10000
+            from src.services.r2_purge_service import LIBRARY_KEY_FIELDS, R2PurgeService
+
+            purger = R2PurgeService(db=self.db, s3_client=self.s3_client)
+            job_id = purger.create_records_job(
+                kind="library_trash",
+                user_id=user_id,
+                collection="library_files",
+                query={"user_id": user_id, "is_deleted": True},
+                key_fields=LIBRARY_KEY_FIELDS,
             )
-
-            deleted_count = 0
-
-            # 2. Delete each file from R2 and MongoDB
-            for file_doc in deleted_files:
-                library_id = file_doc.get("library_id")
-                if library_id and self.delete_library_file_permanent(
-                    library_id=library_id, user_id=user_id
-                ):
-                    deleted_count += 1
+            job = purger.claim(job_id)
+            if job is None:
+                # The r2_purge_worker claimed the pending job first and runs it
+                logger.info(f"🗑️ Library trash purge {job_id} is running in the worker")
+                return 0
+            job = purger.run(job) or {}
+            deleted_count = job.get("deleted_records", 0)
 
             logger.info(
                 f"🗑️ Emptied library trash: {deleted_count} files deleted for user {user_id}"
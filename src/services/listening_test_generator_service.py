@@ -758,6 +758,7 @@ Now, generate the listening test. Return ONLY the JSON object, no additional tex
                     language=language,
                     speaking_rate=speaking_rate,
                     use_pro_model=use_pro_model,
+                    cache_path="listening_test",
                 )
             )
             duration_seconds = metadata.get("duration_seconds", 0)
@@ -781,6 +782,7 @@ Now, generate the listening test. Return ONLY the JSON object, no additional tex
                 voice_name=voice_name,
                 speaking_rate=speaking_rate,
                 use_pro_model=use_pro_model,
+                cache_path="listening_test",
             )
 
             # Estimate duration
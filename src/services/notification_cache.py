@@ -0,0 +1,367 @@
+"""
+Notification Cache - Redis unread counters and recent feed per user
+
+Every open client tab polls /api/notifications/unread-count (and often /list),
+and each poll used to run count_documents / find on the `notifications`
+collection. MongoDB stays the source of truth; Redis keeps per user:
+
+    notif:unread:{user_id}  (string)  unread count
+    notif:feed:{user_id}    (list)    newest NOTIFICATION_FEED_SIZE notifications
+                                      as JSON, newest first
+    notif:gen:{user_id}     (string)  bumped by every write
+
+NotificationManager updates the keys after each MongoDB write (create: INCRBY +
+LPUSH, read: DECRBY + entry rewrite, delete: DECRBY + feed dropped) but only if
+they already exist. A missing key is rebuilt from MongoDB on the next read; the
+rebuild is written under WATCH on the generation key, so a write that lands
+while MongoDB is being read makes the rebuild skip caching instead of storing a
+stale value. Keys expire after NOTIFICATION_CACHE_TTL, which bounds any drift.
+
+If a write cannot update the keys (Redis error, or the 30s back-off after
+one), the user's keys are deleted instead - bypassing the back-off - and users
+whose delete failed too are remembered and invalidated once Redis answers again.
+
+The feed always holds the newest min(total, NOTIFICATION_FEED_SIZE)
+notifications, so pages inside it (and is_read filters when it holds all of
+them) are served from Redis; anything else falls through to MongoDB.
+
+Without Redis every call falls back to the loader (MongoDB) transparently.
+
+Usage:
+    cache = get_notification_cache()
+    count = cache.unread_count(user_id, loader=lambda: collection.count_documents(...))
+    cache.on_created(user_id, [notification], unread=1)
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_CACHE_ENABLED = (
+    os.getenv("NOTIFICATION_CACHE_ENABLED", "true").lower() == "true"
+)
+NOTIFICATION_FEED_SIZE = int(os.getenv("NOTIFICATION_FEED_SIZE", "50"))
+NOTIFICATION_CACHE_TTL = int(os.getenv("NOTIFICATION_CACHE_TTL", "3600"))
+
+_UNREAD_PREFIX = "notif:unread:"
+_FEED_PREFIX = "notif:feed:"
+_GEN_PREFIX = "notif:gen:"
+
+# KEYS: unread, feed, gen - ARGV: ttl, feed_size, unread delta, entries...
+# Counters/feed are only touched if present; a missing key is rebuilt on read
+_CREATED_SCRIPT = """
+redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], ARGV[1] * 2)
+if tonumber(ARGV[3]) ~= 0 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCRBY', KEYS[1], ARGV[3])
+end
+if #ARGV > 3 and redis.call('EXISTS', KEYS[2]) == 1 then
+    for i = 4, #ARGV do
+        redis.call('LPUSH', KEYS[2], ARGV[i])
+    end
+    redis.call('LTRIM', KEYS[2], 0, ARGV[2] - 1)
+end
+return 1
+"""
+
+# KEYS: unread, gen - ARGV: ttl, unread decrement (never goes below 0)
+_DECREMENT_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1] * 2)
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local value = redis.call('DECRBY', KEYS[1], ARGV[2])
+    if value < 0 then
+        redis.call('SET', KEYS[1], 0, 'KEEPTTL')
+    end
+end
+return 1
+"""
+
+
+def _encode(notification: Dict[str, Any]) -> str:
+    entry = {k: v for k, v in notification.items() if k != "_id"}
+    for field in ("created_at", "read_at"):
+        if isinstance(entry.get(field), datetime):
+            entry[field] = entry[field].isoformat()
+    return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _decode(raw: str) -> Dict[str, Any]:
+    entry = json.loads(raw)
+    for field in ("created_at", "read_at"):
+        if entry.get(field):
+            entry[field] = datetime.fromisoformat(entry[field])
+    return entry
+
+
+class NotificationCache:
+    """Per-user unread counter and recent feed in Redis (MongoDB is authoritative)"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://redis-server:6379")
+        self._redis = None
+        self._redis_ok = NOTIFICATION_CACHE_ENABLED
+        self._retry_at = 0.0  # back off after a failed call
+        self._dirty = set()  # users whose keys could not be invalidated
+        self._created = None
+        self._decrement = None
+
+    def _client(self, force: bool = False):
+        if not force and time.monotonic() < self._retry_at:
+            return None
+        if self._redis is None and self._redis_ok:
+            try:
+                import redis
+
+                client = redis.Redis.from_url(
+                    self.redis_url,
+                    decode_responses=True,
+                    socket_timeout=0.2,
+                    socket_connect_timeout=0.2,
+                )
+                self._created = client.register_script(_CREATED_SCRIPT)
+                self._decrement = client.register_script(_DECREMENT_SCRIPT)
+                self._redis = client
+            except Exception as e:
+                logger.warning(f"⚠️ Notification cache: Redis unavailable ({e})")
+                self._redis_ok = False
+        if self._dirty and self._redis is not None and not force:
+            if not self._flush_dirty():
+                return None
+        return self._redis
+
+    def _failed(self, action: str, e: Exception):
+        logger.debug(f"Notification cache {action} failed: {e}")
+        self._retry_at = time.monotonic() + 30
+
+    def _rebuild(self, client, user_id: str, loader: Callable[[], Any], store):
+        """
+        Run `loader` (MongoDB) and cache its result via `store(pipe, value)`,
+        unless a write for this user happened meanwhile.
+        Loader exceptions propagate; Redis errors only skip caching.
+        """
+        from redis.exceptions import WatchError
+
+        pipe = client.pipeline()
+        try:
+            try:
+                pipe.watch(_GEN_PREFIX + user_id)
+            except Exception as e:
+                self._failed("watch", e)
+                return loader()
+            value = loader()
+            try:
+                pipe.multi()
+                store(pipe, value)
+                pipe.execute()
+            except WatchError:
+                pass  # concurrent write - the next read rebuilds again
+            except Exception as e:
+                self._failed("rebuild", e)
+            return value
+        finally:
+            pipe.reset()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def unread_count(self, user_id: str, loader: Callable[[], int]) -> int:
+        """Cached unread count; `loader` counts in MongoDB on a miss"""
+        client = self._client()
+        if client is None:
+            return loader()
+        key = _UNREAD_PREFIX + user_id
+        try:
+            cached = client.get(key)
+        except Exception as e:
+            self._failed("read", e)
+            return loader()
+        if cached is not None:
+            return int(cached)
+
+        def store(pipe, count):
+            pipe.set(key, count, ex=NOTIFICATION_CACHE_TTL)
+
+        return self._rebuild(client, user_id, loader, store)
+
+    def feed(
+        self,
+        user_id: str,
+        loader: Callable[[int], List[Dict[str, Any]]],
+        is_read: Optional[bool] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Page of the user's newest notifications from the cached feed
+
+        Args:
+            loader: loader(n) returns the newest n notifications from MongoDB
+            is_read, limit, offset: Same as NotificationManager.list_user_notifications
+
+        Returns:
+            The page, or None if it cannot be answered from the feed
+        """
+        if offset + limit > NOTIFICATION_FEED_SIZE:
+            return None
+        client = self._client()
+        if client is None:
+            return None
+        key = _FEED_PREFIX + user_id
+        try:
+            raw = client.lrange(key, 0, -1)
+        except Exception as e:
+            self._failed("read", e)
+            return None
+
+        if raw:
+            items = [_decode(r) for r in raw]
+        else:
+            # Empty feed is not cached (an empty list key cannot exist in Redis)
+            def store(pipe, docs):
+                if docs:
+                    pipe.delete(key)
+                    pipe.rpush(key, *[_encode(d) for d in docs])
+                    pipe.expire(key, NOTIFICATION_CACHE_TTL)
+
+            items = [
+                dict(d)
+                for d in self._rebuild(
+                    client, user_id, lambda: loader(NOTIFICATION_FEED_SIZE), store
+                )
+            ]
+
+        if is_read is not None:
+            if len(items) >= NOTIFICATION_FEED_SIZE:
+                return None  # feed may not hold every matching notification
+            items = [n for n in items if n.get("is_read") == is_read]
+        return items[offset : offset + limit]
+
+    # ------------------------------------------------------------------
+    # Writes (called after the MongoDB write succeeded)
+    # ------------------------------------------------------------------
+
+    def on_created(self, user_id: str, notifications: List[Dict[str, Any]], unread: int):
+        """New notifications for one user, oldest first"""
+        client = self._client()
+        if client is None:
+            self._invalidate(user_id)
+            return
+        try:
+            self._created(
+                keys=[_UNREAD_PREFIX + user_id, _FEED_PREFIX + user_id, _GEN_PREFIX + user_id],
+                args=[NOTIFICATION_CACHE_TTL, NOTIFICATION_FEED_SIZE, unread]
+                + [_encode(n) for n in notifications],
+            )
+        except Exception as e:
+            self._failed("create", e)
+            self._invalidate(user_id)
+
+    def on_read(
+        self,
+        user_id: str,
+        count: int,
+        read_at: datetime,
+        notification_id: Optional[str] = None,
+    ):
+        """`count` notifications marked read (one, or all if notification_id is None)"""
+        client = self._client()
+        if client is None:
+            self._invalidate(user_id)
+            return
+        key = _FEED_PREFIX + user_id
+
+        def rewrite(pipe):
+            raw = pipe.lrange(key, 0, -1)
+            if not raw:
+                return
+            entries = []
+            for item in raw:
+                entry = json.loads(item)
+                if not entry.get("is_read") and notification_id in (
+                    None,
+                    entry.get("notification_id"),
+                ):
+                    entry["is_read"] = True
+                    entry["read_at"] = read_at.isoformat()
+                entries.append(json.dumps(entry, ensure_ascii=False))
+            pipe.multi()
+            pipe.delete(key)
+            pipe.rpush(key, *entries)
+            pipe.expire(key, NOTIFICATION_CACHE_TTL)
+
+        try:
+            self._decrement(
+                keys=[_UNREAD_PREFIX + user_id, _GEN_PREFIX + user_id],
+                args=[NOTIFICATION_CACHE_TTL, count],
+            )
+            client.transaction(rewrite, key)
+        except Exception as e:
+            self._failed("read", e)
+            self._invalidate(user_id)
+
+    def on_deleted(self, user_id: str, was_unread: bool):
+        """Deleting shifts the feed window, so the feed is rebuilt on the next read"""
+        client = self._client()
+        if client is None:
+            self._invalidate(user_id)
+            return
+        try:
+            self._decrement(
+                keys=[_UNREAD_PREFIX + user_id, _GEN_PREFIX + user_id],
+                args=[NOTIFICATION_CACHE_TTL, 1 if was_unread else 0],
+            )
+            client.delete(_FEED_PREFIX + user_id)
+        except Exception as e:
+            self._failed("delete", e)
+            self._invalidate(user_id)
+
+    def _delete_keys(self, client, user_ids):
+        pipe = client.pipeline(transaction=False)
+        for user_id in user_ids:
+            # Bumping the generation also aborts a rebuild already reading MongoDB
+            pipe.incr(_GEN_PREFIX + user_id)
+            pipe.expire(_GEN_PREFIX + user_id, NOTIFICATION_CACHE_TTL * 2)
+            pipe.delete(_UNREAD_PREFIX + user_id, _FEED_PREFIX + user_id)
+        pipe.execute()
+
+    def _invalidate(self, user_id: str):
+        """Drop the user's cached count and feed, even while backing off"""
+        client = self._client(force=True)
+        if client is None:
+            return  # no Redis at all - nothing cached
+        try:
+            self._delete_keys(client, [user_id])
+        except Exception as e:
+            self._failed("invalidate", e)
+            self._dirty.add(user_id)
+
+    def _flush_dirty(self) -> bool:
+        """Invalidate users whose writes were missed while Redis was failing"""
+        user_ids, self._dirty = self._dirty, set()
+        try:
+            self._delete_keys(self._redis, user_ids)
+        except Exception as e:
+            self._failed("invalidate", e)
+            self._dirty |= user_ids
+            return False
+        logger.info(
+            f"🔄 Notification cache: invalidated {len(user_ids)} users after recovery"
+        )
+        return True
+
+
+_cache: Optional[NotificationCache] = None
+
+
+def get_notification_cache() -> NotificationCache:
+    global _cache
+    if _cache is None:
+        _cache = NotificationCache()
+    return _cache
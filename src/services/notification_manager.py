@@ -1,6 +1,9 @@
 """
 Notification Manager Service
 Handles InApp notifications and Email notifications for file sharing
+
+Unread counts and the recent feed are served from Redis
+(src/services/notification_cache.py); every write below keeps them in sync.
 """
 
 import logging
@@ -9,14 +12,16 @@ from typing import Dict, List, Any, Optional
 from pymongo.database import Database
 import uuid
 
+from src.services.notification_cache import get_notification_cache
+
 logger = logging.getLogger(__name__)
 
 
 class NotificationManager:
     """
     Quản lý notifications cho file sharing system
-    - InApp notifications (lưu MongoDB)
-    - Email notifications (gửi qua SMTP)
+    - InApp notifications (lưu MongoDB, unread count + feed cache trong Redis)
+    - Email notifications (email outbox → Brevo batch API)
     """
 
     def __init__(self, db: Database):
@@ -29,6 +34,7 @@ class NotificationManager:
         self.db = db
         self.notifications = db["notifications"]
         self.users = db["users"]
+        self.cache = get_notification_cache()
 
         logger.info("✅ NotificationManager initialized")
 
@@ -111,6 +117,7 @@ class NotificationManager:
             result = self.notifications.insert_one(notification)
 
             if result.inserted_id:
+                self.cache.on_created(recipient_id, [notification], unread=1)
                 logger.info(
                     f"✅ Created share notification {notification_id} for user {recipient_id}"
                 )
@@ -155,6 +162,7 @@ class NotificationManager:
 
             result = self.notifications.insert_one(notification)
             if result.inserted_id:
+                self.cache.on_created(user_id, [notification], unread=1)
                 logger.info(
                     f"✅ Created social plan content done notification for user {user_id}"
                 )
@@ -167,6 +175,51 @@ class NotificationManager:
             )
             return None
 
+    def create_notifications(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Tạo nhiều InApp notifications bằng một insert_many (fan-out)
+
+        Args:
+            items: [{"user_id", "type", "title", "message", "data"?}]
+
+        Returns:
+            Số notification đã tạo
+        """
+        if not items:
+            return 0
+        try:
+            now = datetime.now(timezone.utc)
+            notifications = [
+                {
+                    "notification_id": f"notif_{uuid.uuid4().hex[:16]}",
+                    "user_id": item["user_id"],
+                    "type": item["type"],
+                    "title": item["title"],
+                    "message": item["message"],
+                    "data": item.get("data", {}),
+                    "is_read": False,
+                    "created_at": now,
+                    "read_at": None,
+                }
+                for item in items
+            ]
+            result = self.notifications.insert_many(notifications, ordered=False)
+
+            by_user: Dict[str, List[Dict[str, Any]]] = {}
+            for notification in notifications:
+                by_user.setdefault(notification["user_id"], []).append(notification)
+            for user_id, user_notifications in by_user.items():
+                self.cache.on_created(
+                    user_id, user_notifications, unread=len(user_notifications)
+                )
+
+            logger.info(f"✅ Created {len(result.inserted_ids)} notifications")
+            return len(result.inserted_ids)
+
+        except Exception as e:
+            logger.error(f"❌ Error creating notifications: {e}")
+            return 0
+
     def list_user_notifications(
         self,
         user_id: str,
@@ -176,6 +229,7 @@ class NotificationManager:
     ) -> List[Dict[str, Any]]:
         """
         Lấy danh sách notifications của user
+        (trang nằm trong feed gần nhất được đọc từ Redis)
 
         Args:
             user_id: User ID
@@ -187,6 +241,20 @@ class NotificationManager:
             List of notification documents
         """
         try:
+            cached = self.cache.feed(
+                user_id,
+                loader=lambda n: list(
+                    self.notifications.find({"user_id": user_id})
+                    .sort("created_at", -1)
+                    .limit(n)
+                ),
+                is_read=is_read,
+                limit=limit,
+                offset=offset,
+            )
+            if cached is not None:
+                return cached
+
             query = {"user_id": user_id}
             if is_read is not None:
                 query["is_read"] = is_read
@@ -198,7 +266,7 @@ class NotificationManager:
                 .limit(limit)
             )
 
-            logger.info(
+            logger.debug(
                 f"✅ Listed {len(notifications)} notifications for user {user_id}"
             )
             return notifications
@@ -227,6 +295,7 @@ class NotificationManager:
             )
 
             if result.modified_count > 0:
+                self.cache.on_read(user_id, 1, now, notification_id=notification_id)
                 logger.info(f"✅ Marked notification {notification_id} as read")
                 return True
             else:
@@ -254,6 +323,8 @@ class NotificationManager:
                 {"user_id": user_id, "is_read": False},
                 {"$set": {"is_read": True, "read_at": now}},
             )
+            if result.modified_count:
+                self.cache.on_read(user_id, result.modified_count, now)
 
             logger.info(
                 f"✅ Marked {result.modified_count} notifications as read for user {user_id}"
@@ -266,7 +337,7 @@ class NotificationManager:
 
     def get_unread_count(self, user_id: str) -> int:
         """
-        Lấy số lượng notifications chưa đọc
+        Lấy số lượng notifications chưa đọc (Redis counter, rebuild từ MongoDB khi miss)
 
         Args:
             user_id: User ID
@@ -275,11 +346,14 @@ class NotificationManager:
             Number of unread notifications
         """
         try:
-            count = self.notifications.count_documents(
-                {"user_id": user_id, "is_read": False}
+            count = self.cache.unread_count(
+                user_id,
+                loader=lambda: self.notifications.count_documents(
+                    {"user_id": user_id, "is_read": False}
+                ),
             )
 
-            logger.info(f"✅ User {user_id} has {count} unread notifications")
+            logger.debug(f"✅ User {user_id} has {count} unread notifications")
             return count
 
         except Exception as e:
@@ -298,11 +372,13 @@ class NotificationManager:
             True if successful
         """
         try:
-            result = self.notifications.delete_one(
-                {"notification_id": notification_id, "user_id": user_id}
+            deleted = self.notifications.find_one_and_delete(
+                {"notification_id": notification_id, "user_id": user_id},
+                projection={"is_read": 1},
             )
 
-            if result.deleted_count > 0:
+            if deleted:
+                self.cache.on_deleted(user_id, was_unread=not deleted.get("is_read"))
                 logger.info(f"✅ Deleted notification {notification_id}")
                 return True
             else:
@@ -368,6 +444,7 @@ class NotificationManager:
             result = self.notifications.insert_one(notification)
 
             if result.inserted_id:
+                self.cache.on_created(student_id, [notification], unread=1)
                 logger.info(
                     f"✅ Created test grading notification {notification_id} for user {student_id}"
                 )
@@ -389,7 +466,7 @@ class NotificationManager:
         permission: str,
     ) -> bool:
         """
-        Gửi email notification khi file được share (sử dụng Brevo)
+        Gửi email notification khi file được share (qua email outbox, Brevo batch)
 
         Args:
             recipient_email: Email người nhận
@@ -414,9 +491,9 @@ class NotificationManager:
             )
 
             if success:
-                logger.info(f"✅ Share email sent to {recipient_email}")
+                logger.info(f"✅ Share email queued for {recipient_email}")
             else:
-                logger.warning(f"⚠️ Failed to send share email to {recipient_email}")
+                logger.warning(f"⚠️ Failed to queue share email to {recipient_email}")
 
             return success
 
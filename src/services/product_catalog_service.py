@@ -23,6 +23,7 @@ from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 import pymongo
 
 from src.utils.logger import setup_logger
+from src.services.company_prompt_cache import bump_company_version
 
 logger = setup_logger(__name__)
 
@@ -162,6 +163,7 @@ class ProductCatalogService:
             result = await self.collection.insert_one(document)
 
             if result.inserted_id:
+                bump_company_version(company_id, "catalog")
                 logger.info(
                     f"💾 [CATALOG] Registered {item_type}: '{name}' with ID {item_id}"
                 )
@@ -328,7 +330,8 @@ class ProductCatalogService:
         Update item quantity (for inventory management)
         """
         try:
-            result = await self.collection.update_one(
+            # find_one_and_update: company_id is needed to invalidate prompt caches
+            item = await self.collection.find_one_and_update(
                 {"$or": [{"product_id": item_id}, {"service_id": item_id}]},
                 {
                     "$set": {
@@ -336,9 +339,11 @@ class ProductCatalogService:
                         "updated_at": datetime.now().isoformat(),
                     }
                 },
+                projection={"company_id": 1},
             )
 
-            if result.modified_count > 0:
+            if item:
+                bump_company_version(item.get("company_id"), "catalog")
                 logger.info(
                     f"✅ [CATALOG] Updated quantity for {item_id}: {new_quantity}"
                 )
@@ -498,6 +503,7 @@ class ProductCatalogService:
             # Perform deletion
             delete_result = await self.collection.delete_many(query)
             deleted_count = delete_result.deleted_count
+            bump_company_version(company_id, "catalog")
 
             logger.info(
                 f"🗑️ [CATALOG] Deleted {deleted_count} items for file_id: {file_id}"
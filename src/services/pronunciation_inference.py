@@ -0,0 +1,405 @@
+"""
+Pronunciation Inference Pool - off-loop, micro-batched model inference
+
+faster-whisper and Wav2Vec2 are CPU-bound and take hundreds of milliseconds per
+clip; running them inside an async handler blocks every other request on the
+event loop. Pronunciation requests are instead executed by a small process pool:
+
+- Worker processes (spawn) preload both models in their initializer, so no user
+  request pays the ~370 MB model load.
+- Requests arriving within PRONUNCIATION_BATCH_WINDOW_MS (or while every worker
+  is busy) are grouped, up to PRONUNCIATION_MAX_BATCH per batch. Wav2Vec2 runs
+  once per batch on zero-padded clips of similar length; Whisper and alignment
+  run per clip.
+- At most PRONUNCIATION_MAX_PENDING requests may be queued or running; beyond
+  that submit() raises InferenceOverloadedError (HTTP 429 in the routes).
+- Every result carries per-stage timings (queue/decode/asr/phoneme/alignment, ms);
+  stats() returns recent p50/p95 per stage.
+
+Usage:
+    pool = get_inference_pool()
+    pool.start()                                   # app startup (preloads models)
+    result = await pool.score(audio_bytes, "hello world")
+    result = await pool.transcribe(audio_bytes)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRONUNCIATION_POOL_WORKERS = int(os.getenv("PRONUNCIATION_POOL_WORKERS", "1"))
+PRONUNCIATION_MAX_BATCH = int(os.getenv("PRONUNCIATION_MAX_BATCH", "8"))
+PRONUNCIATION_BATCH_WINDOW_MS = float(os.getenv("PRONUNCIATION_BATCH_WINDOW_MS", "25"))
+PRONUNCIATION_MAX_PENDING = int(os.getenv("PRONUNCIATION_MAX_PENDING", "32"))
+PRONUNCIATION_TIMEOUT = float(os.getenv("PRONUNCIATION_TIMEOUT", "120"))
+# torch intra-op threads per worker (0 = share the host's cores between workers)
+PRONUNCIATION_TORCH_THREADS = int(os.getenv("PRONUNCIATION_TORCH_THREADS", "0"))
+# Clips are only padded together while longest <= shortest * this ratio
+PRONUNCIATION_PAD_RATIO = float(os.getenv("PRONUNCIATION_PAD_RATIO", "2.0"))
+
+KIND_SCORE = "score"
+KIND_TRANSCRIBE = "transcribe"
+STAGES = ("queue", "decode", "asr", "phoneme", "alignment", "total")
+
+
+class InferenceOverloadedError(Exception):
+    """Too many pronunciation requests queued - client should retry later"""
+
+
+# ============================================================================
+# WORKER PROCESS SIDE
+# ============================================================================
+
+
+def _init_worker(torch_threads: int):
+    """Process initializer: pin thread count and load both models once"""
+    try:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    except Exception as e:  # torch missing → scoring fails later with a clear error
+        logging.getLogger(__name__).warning(f"⚠️ torch thread setup failed: {e}")
+
+    from src.services.pronunciation_service import preload_models
+
+    start = time.perf_counter()
+    preload_models()
+    logging.getLogger(__name__).info(
+        f"✅ Pronunciation worker {os.getpid()} ready "
+        f"({time.perf_counter() - start:.1f}s model load, {torch_threads} threads)"
+    )
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _padding_groups(lengths: List[int], max_ratio: float) -> List[List[int]]:
+    """Indices grouped by similar length, so padding stays within max_ratio"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    groups: List[List[int]] = []
+    for i in order:
+        if groups and lengths[i] <= max(lengths[groups[-1][0]], 1) * max_ratio:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    return groups
+
+
+def _run_batch(
+    items: List[Tuple[str, bytes, Optional[str]]], pad_ratio: float
+) -> List[Dict[str, Any]]:
+    """
+    Execute one micro-batch inside a worker process
+
+    Args:
+        items: [(kind, audio_bytes, expected_text), ...]
+
+    Returns:
+        One entry per item: {"ok", "result" | "error", "timings"}
+    """
+    from src.services import pronunciation_service as ps
+
+    n = len(items)
+    out: List[Dict[str, Any]] = [
+        {"ok": False, "error": None, "timings": {}} for _ in range(n)
+    ]
+    arrays: Dict[int, Any] = {}
+    transcripts: Dict[int, str] = {}
+
+    def fail(i: int, e: Exception):
+        out[i]["error"] = f"{type(e).__name__}: {e}"
+
+    # 1. Decode + ASR (per clip)
+    for i, (kind, audio_bytes, _) in enumerate(items):
+        timings = out[i]["timings"]
+        try:
+            t0 = time.perf_counter()
+            arrays[i] = ps._decode_audio(audio_bytes)
+            t1 = time.perf_counter()
+            asr = ps._transcribe_array(arrays[i])
+            t2 = time.perf_counter()
+            timings.update(decode=(t1 - t0) * 1000, asr=(t2 - t1) * 1000)
+            if kind == KIND_TRANSCRIBE:
+                out[i].update(ok=True, result=asr)
+                arrays.pop(i)
+            else:
+                transcripts[i] = asr["transcript"]
+        except Exception as e:
+            arrays.pop(i, None)
+            fail(i, e)
+
+    # 2. Phonemes (Wav2Vec2, one padded forward pass per length group)
+    score_idx = list(arrays)
+    lengths = [len(arrays[i]) for i in score_idx]
+    for group in _padding_groups(lengths, pad_ratio):
+        members = [score_idx[g] for g in group]
+        t0 = time.perf_counter()
+        try:
+            phonemes = ps._get_user_phonemes_batch([arrays[i] for i in members])
+        except Exception as e:
+            for i in members:
+                fail(i, e)
+            continue
+        phoneme_ms = (time.perf_counter() - t0) * 1000
+
+        # 3. Alignment (per clip)
+        for i, user_phonemes in zip(members, phonemes):
+            timings = out[i]["timings"]
+            timings.update(phoneme=phoneme_ms, phoneme_batch=len(members))
+            try:
+                t0 = time.perf_counter()
+                result = ps._score_phonemes(user_phonemes, items[i][2], transcripts[i])
+                timings["alignment"] = (time.perf_counter() - t0) * 1000
+                out[i].update(ok=True, result=result)
+            except Exception as e:
+                fail(i, e)
+    return out
+
+
+# ============================================================================
+# EVENT LOOP SIDE
+# ============================================================================
+
+
+@dataclass
+class _Request:
+    kind: str
+    audio: bytes
+    text: Optional[str]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class PronunciationInferencePool:
+    """Bounded request queue → micro-batches → process pool with preloaded models"""
+
+    def __init__(
+        self,
+        workers: int = PRONUNCIATION_POOL_WORKERS,
+        max_batch: int = PRONUNCIATION_MAX_BATCH,
+        batch_window_ms: float = PRONUNCIATION_BATCH_WINDOW_MS,
+        max_pending: int = PRONUNCIATION_MAX_PENDING,
+        torch_threads: int = PRONUNCIATION_TORCH_THREADS,
+    ):
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window_ms / 1000
+        self.max_pending = max_pending
+        self.torch_threads = torch_threads or max(
+            1, (os.cpu_count() or 1) // self.workers
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()  # strong refs to running batches
+        self._pending = 0
+        self._timings: Dict[str, Deque[float]] = {s: deque(maxlen=500) for s in STAGES}
+        self._batches = 0
+        self._batched_requests = 0
+        self._rejected = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.torch_threads,),
+        )
+
+    def start(self, preload: bool = True):
+        """Create the pool; with preload, spawn every worker now (loads models)"""
+        if self._executor is None:
+            self._executor = self._new_executor()
+            logger.info(
+                f"🎙️ Pronunciation pool: {self.workers} worker(s), batch<={self.max_batch}, "
+                f"window={self.batch_window * 1000:.0f}ms, max_pending={self.max_pending}"
+            )
+            if preload:
+                for _ in range(self.workers):
+                    self._executor.submit(_warmup)
+
+    async def shutdown(self):
+        if self._batcher:
+            self._batcher.cancel()
+            self._batcher = None
+        if self._executor:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+    def _ensure_running(self):
+        if self._executor is None:
+            self.start(preload=False)
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.create_task(self._batch_loop())
+
+    # ------------------------------------------------------------------
+    # Submit
+    # ------------------------------------------------------------------
+
+    def has_capacity(self) -> bool:
+        return self._pending < self.max_pending
+
+    async def score(self, audio_bytes: bytes, expected_text: str) -> Dict[str, Any]:
+        return await self._submit(KIND_SCORE, audio_bytes, expected_text)
+
+    async def transcribe(self, audio_bytes: bytes) -> Dict[str, Any]:
+        return await self._submit(KIND_TRANSCRIBE, audio_bytes, None)
+
+    async def _submit(
+        self, kind: str, audio_bytes: bytes, text: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Queue one request and wait for its result
+
+        Returns:
+            Result dict of the pronunciation service plus `timings_ms`
+
+        Raises:
+            InferenceOverloadedError: queue is full
+            RuntimeError: inference failed in the worker
+        """
+        if not self.has_capacity():
+            self._rejected += 1
+            raise InferenceOverloadedError(
+                f"{self._pending} pronunciation requests in progress"
+            )
+        self._ensure_running()
+        self._pending += 1
+        try:
+            request = _Request(kind, audio_bytes, text, asyncio.get_running_loop().create_future())
+            self._queue.put_nowait(request)
+            return await asyncio.wait_for(request.future, PRONUNCIATION_TIMEOUT)
+        finally:
+            self._pending -= 1
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+
+    async def _batch_loop(self):
+        while True:
+            first = await self._queue.get()
+            # Wait for a free worker first: requests arriving meanwhile join this batch
+            await self._slots.acquire()
+            batch = [first]
+            deadline = first.enqueued_at + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout <= 0:
+                        batch.append(self._queue.get_nowait())
+                    else:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+            batch = [r for r in batch if not r.future.done()]  # caller timed out
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[_Request]):
+        started = time.perf_counter()
+        try:
+            payload = [(r.kind, r.audio, r.text) for r in batch]
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                self._executor, _run_batch, payload, PRONUNCIATION_PAD_RATIO
+            )
+        except BrokenProcessPool as e:
+            logger.error(f"❌ Pronunciation worker died, restarting pool: {e}")
+            self._executor = self._new_executor()
+            results = [{"ok": False, "error": "inference worker crashed", "timings": {}}] * len(batch)
+        except Exception as e:
+            logger.error(f"❌ Pronunciation batch failed: {e}")
+            results = [{"ok": False, "error": str(e), "timings": {}}] * len(batch)
+        finally:
+            self._slots.release()
+
+        total_ms = (time.perf_counter() - started) * 1000
+        self._batches += 1
+        self._batched_requests += len(batch)
+        for request, item in zip(batch, results):
+            timings = dict(item["timings"])
+            timings["queue"] = (started - request.enqueued_at) * 1000
+            timings["total"] = timings["queue"] + total_ms
+            for stage in STAGES:
+                if stage in timings:
+                    self._timings[stage].append(timings[stage])
+            if request.future.done():
+                continue
+            if item["ok"]:
+                result = dict(item["result"])
+                result["timings_ms"] = {k: round(v, 1) for k, v in timings.items()}
+                request.future.set_result(result)
+            else:
+                request.future.set_exception(RuntimeError(item["error"]))
+
+        logger.info(
+            f"🎙️ Pronunciation batch n={len(batch)} in {total_ms:.0f}ms "
+            f"(pending={self._pending})"
+        )
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def reset_stats(self):
+        for values in self._timings.values():
+            values.clear()
+        self._batches = 0
+        self._batched_requests = 0
+        self._rejected = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Recent per-stage p50/p95 (ms), queue depth and batching efficiency"""
+
+        def pct(values: List[float], q: float) -> Optional[float]:
+            if not values:
+                return None
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_requests / self._batches, 2)
+            if self._batches
+            else 0,
+            "stages_ms": {
+                stage: {"p50": pct(list(v), 0.5), "p95": pct(list(v), 0.95)}
+                for stage, v in self._timings.items()
+            },
+        }
+
+
+_pool: Optional[PronunciationInferencePool] = None
+
+
+def get_inference_pool() -> PronunciationInferencePool:
+    global _pool
+    if _pool is None:
+        _pool = PronunciationInferencePool()
+    return _pool
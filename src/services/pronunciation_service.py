@@ -1,21 +1,31 @@
 """
 Pronunciation Scoring Service
 
-Two lazy-loaded singletons:
+Two model singletons:
   - faster-whisper tiny (already cached from alignment batch)   → transcription
   - facebook/wav2vec2-lv-60-espeak-cv-ft                        → phoneme recognition
 
 Reference IPA is derived from eng_to_ipa (pure Python, ships own dict).
 
 Supports: single word, phrase, full sentence (any length).
+
+The API does not call this module directly: requests go through
+src/services/pronunciation_inference.py, whose worker processes preload the
+models (preload_models) and run the stages below on micro-batches:
+decode → ASR → phonemes (batched Wav2Vec2) → alignment.
 """
 
 from __future__ import annotations
 
+import hashlib
 import io
+import json
+import os
 import re
 import logging
-import tempfile
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional
 
 import numpy as np
@@ -47,6 +57,11 @@ _MULTIGRAPHS = [
     "eː",
 ]
 
+# Reference phonemes: in-process LRU (per normalized text) + Redis (shared, survives restarts)
+REF_PHONEME_CACHE_SIZE = int(os.getenv("PRONUNCIATION_REF_CACHE_SIZE", "5000"))
+REF_PHONEME_CACHE_TTL = int(os.getenv("PRONUNCIATION_REF_CACHE_TTL", str(30 * 86400)))
+_REF_CACHE_PREFIX = "pronunciation:ref:v1:"
+
 # ── Lazy singletons ─────────────────────────────────────────────────────────
 _whisper_model = None
 _wav2vec2_processor = None
@@ -79,6 +94,12 @@ def _get_wav2vec2():
     return _wav2vec2_processor, _wav2vec2_model
 
 
+def preload_models():
+    """Load both models now instead of on the first request (worker start)."""
+    _get_whisper()
+    _get_wav2vec2()
+
+
 # ── Audio decoding ───────────────────────────────────────────────────────────
 
 
@@ -125,6 +146,120 @@ def _normalize_phoneme(p: str) -> str:
     return result
 
 
+@lru_cache(maxsize=20000)
+def _word_to_tokens(word_clean: str) -> tuple[str, ...]:
+    """One cleaned word → normalized phoneme tokens (eng_to_ipa lookup, cached)."""
+    import eng_to_ipa as ipa
+
+    ipa_raw = ipa.convert(word_clean)
+    # eng_to_ipa returns '*' for unknown words – fall back to letter spelling
+    if "*" in ipa_raw:
+        tokens = list(word_clean)
+    else:
+        tokens = _tokenize_ipa(ipa_raw)
+    return tuple(t for t in (_normalize_phoneme(t) for t in tokens if t))
+
+
+def _phonemize(normalized_text: str) -> list[tuple[str, list[str]]]:
+    word_details: list[tuple[str, list[str]]] = []
+    for word in normalized_text.split():
+        word_clean = re.sub(r"[^a-z'-]", "", word)
+        word_details.append((word_clean, list(_word_to_tokens(word_clean))))
+    return word_details
+
+
+class _ReferencePhonemeCache:
+    """
+    normalized expected text → [(word, [tokens])]
+
+    Learners score the same daily-vocab / song / conversation sentences over and
+    over; phonemizing them once per text (instead of per request) removes the
+    eng_to_ipa lookups from the hot path. Redis shares entries between inference
+    workers and keeps them across restarts; it is optional.
+    """
+
+    def __init__(self, max_size: int = REF_PHONEME_CACHE_SIZE):
+        self.max_size = max_size
+        self._lru: OrderedDict[str, tuple] = OrderedDict()
+        self._redis = None
+        self._redis_ok = True
+        self._redis_retry_at = 0.0  # back off after a failed call
+        self.hits = self.redis_hits = self.misses = 0
+
+    def _client(self):
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None and self._redis_ok:
+            try:
+                import redis
+
+                self._redis = redis.Redis(
+                    host=os.getenv("REDIS_HOST", "localhost"),
+                    port=int(os.getenv("REDIS_PORT", 6379)),
+                    db=int(os.getenv("REDIS_DB", 0)),
+                    decode_responses=True,
+                    socket_timeout=0.2,
+                    socket_connect_timeout=0.2,
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Reference phoneme cache: Redis unavailable ({e})")
+                self._redis_ok = False
+        return self._redis
+
+    def _remember(self, key: str, word_details: tuple):
+        self._lru[key] = word_details
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def get(self, normalized_text: str) -> tuple:
+        cached = self._lru.get(normalized_text)
+        if cached is not None:
+            self._lru.move_to_end(normalized_text)
+            self.hits += 1
+            return cached
+
+        redis_key = _REF_CACHE_PREFIX + hashlib.sha1(
+            normalized_text.encode("utf-8")
+        ).hexdigest()
+        client = self._client()
+        if client is not None:
+            try:
+                raw = client.get(redis_key)
+                if raw:
+                    word_details = tuple((w, tuple(t)) for w, t in json.loads(raw))
+                    self._remember(normalized_text, word_details)
+                    self.redis_hits += 1
+                    return word_details
+            except Exception as e:
+                logger.debug(f"Reference phoneme cache read failed: {e}")
+                self._redis_retry_at = time.monotonic() + 60
+                client = None
+
+        self.misses += 1
+        word_details = tuple((w, tuple(t)) for w, t in _phonemize(normalized_text))
+        self._remember(normalized_text, word_details)
+        if client is not None:
+            try:
+                client.set(
+                    redis_key,
+                    json.dumps(word_details, ensure_ascii=False),
+                    ex=REF_PHONEME_CACHE_TTL,
+                )
+            except Exception as e:
+                logger.debug(f"Reference phoneme cache write failed: {e}")
+                self._redis_retry_at = time.monotonic() + 60
+        return word_details
+
+
+_reference_cache = _ReferencePhonemeCache()
+
+
+def normalize_expected_text(text: str) -> str:
+    """Cache key: the phonemization only depends on lowercase words."""
+    return " ".join(text.lower().split())
+
+
 def _text_to_phoneme_tokens(text: str) -> tuple[list[str], list[tuple[str, list[str]]]]:
     """
     Convert text → (flat_phoneme_list, word_boundaries).
@@ -135,45 +270,76 @@ def _text_to_phoneme_tokens(text: str) -> tuple[list[str], list[tuple[str, list[
       all_tokens    — flat list of phonemes for the whole text
       word_details  — per-word list: [(word_str, [tokens_for_that_word])]
     """
-    import eng_to_ipa as ipa
-
-    word_details: list[tuple[str, list[str]]] = []
-    all_tokens: list[str] = []
-
-    for word in text.lower().split():
-        word_clean = re.sub(r"[^a-z'-]", "", word)
-        ipa_raw = ipa.convert(word_clean)
-        # eng_to_ipa returns '*' for unknown words – fall back to letter spelling
-        if "*" in ipa_raw:
-            tokens = list(word_clean)
-        else:
-            tokens = _tokenize_ipa(ipa_raw)
-        tokens = [_normalize_phoneme(t) for t in tokens if t]
-        word_details.append((word_clean, tokens))
-        all_tokens.extend(tokens)
-
+    cached = _reference_cache.get(normalize_expected_text(text))
+    word_details = [(word, list(tokens)) for word, tokens in cached]
+    all_tokens = [t for _, tokens in word_details for t in tokens]
     return all_tokens, word_details
 
 
-def _get_user_phonemes(audio_array: np.ndarray) -> list[str]:
-    """Run Wav2Vec2 on audio → list of eSpeak phoneme tokens."""
+def _get_user_phonemes_batch(audio_arrays: list[np.ndarray]) -> list[list[str]]:
+    """
+    Run Wav2Vec2 on several clips in one forward pass → eSpeak phoneme tokens per clip.
+
+    Clips are zero-padded to the longest one (with attention mask); each clip's
+    logits are cut back to its own frame count before CTC decoding, so padding
+    never produces phonemes.
+    """
     import torch
 
+    if not audio_arrays:
+        return []
     processor, model = _get_wav2vec2()
     inputs = processor(
-        audio_array, sampling_rate=16000, return_tensors="pt", padding=True
+        audio_arrays, sampling_rate=16000, return_tensors="pt", padding=True
     )
     with torch.no_grad():
         logits = model(**inputs).logits
     predicted_ids = torch.argmax(logits, dim=-1)
-    raw = processor.batch_decode(predicted_ids)[0]
-    tokens = [_normalize_phoneme(p) for p in raw.strip().split() if p]
-    return [t for t in tokens if t]
+
+    lengths = torch.tensor([len(a) for a in audio_arrays])
+    frame_counts = model._get_feat_extract_output_lengths(lengths).tolist()
+
+    results: list[list[str]] = []
+    for row, frames in zip(predicted_ids, frame_counts):
+        raw = processor.decode(row[: int(frames)])
+        tokens = [_normalize_phoneme(p) for p in raw.strip().split() if p]
+        results.append([t for t in tokens if t])
+    return results
+
+
+def _get_user_phonemes(audio_array: np.ndarray) -> list[str]:
+    """Run Wav2Vec2 on audio → list of eSpeak phoneme tokens."""
+    return _get_user_phonemes_batch([audio_array])[0]
 
 
 # ── Sequence alignment (edit distance + backtrace) ──────────────────────────
 
 
+def _edit_distance_table(ref: list[str], hyp: list[str]) -> np.ndarray:
+    """
+    Full Levenshtein DP table, one vectorized NumPy pass per reference row.
+
+    Within a row, dp[i][j] = min(diag/up candidates, dp[i][j-1] + 1) is a
+    running minimum: min_k(cand[k] + j - k) = cummin(cand - j) + j.
+    """
+    n, m = len(ref), len(hyp)
+    vocab: dict[str, int] = {}
+    ref_ids = np.array([vocab.setdefault(p, len(vocab)) for p in ref], dtype=np.int32)
+    hyp_ids = np.array([vocab.setdefault(p, len(vocab)) for p in hyp], dtype=np.int32)
+
+    dp = np.empty((n + 1, m + 1), dtype=np.int32)
+    dp[0] = np.arange(m + 1, dtype=np.int32)
+    offsets = np.arange(m + 1, dtype=np.int32)
+    for i in range(1, n + 1):
+        prev = dp[i - 1]
+        cand = np.empty(m + 1, dtype=np.int32)
+        cand[0] = i
+        # match → dp[i-1][j-1]; otherwise 1 + min(substitution, deletion)
+        cand[1:] = np.minimum(prev[:-1] + (hyp_ids != ref_ids[i - 1]), prev[1:] + 1)
+        dp[i] = np.minimum.accumulate(cand - offsets) + offsets
+    return dp
+
+
 def _align(ref: list[str], hyp: list[str]) -> list[dict]:
     """
     Levenshtein alignment between reference and hypothesis phoneme lists.
@@ -182,41 +348,26 @@ def _align(ref: list[str], hyp: list[str]) -> list[dict]:
       {"expected": str|None, "actual": str|None, "correct": bool}
     """
     n, m = len(ref), len(hyp)
-    # Build DP table
-    dp = [[0] * (m + 1) for _ in range(n + 1)]
-    for i in range(n + 1):
-        dp[i][0] = i
-    for j in range(m + 1):
-        dp[0][j] = j
-    for i in range(1, n + 1):
-        for j in range(1, m + 1):
-            if ref[i - 1] == hyp[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1]
-            else:
-                dp[i][j] = 1 + min(dp[i - 1][j - 1], dp[i - 1][j], dp[i][j - 1])
+    dp = _edit_distance_table(ref, hyp)
 
     # Backtrace
     pairs: list[dict] = []
     i, j = n, m
     while i > 0 or j > 0:
-        if (
-            i > 0
-            and j > 0
-            and ref[i - 1] == hyp[j - 1]
-            and dp[i][j] == dp[i - 1][j - 1]
-        ):
+        here = int(dp[i, j])
+        if i > 0 and j > 0 and ref[i - 1] == hyp[j - 1] and here == dp[i - 1, j - 1]:
             pairs.append(
                 {"expected": ref[i - 1], "actual": hyp[j - 1], "correct": True}
             )
             i -= 1
             j -= 1
-        elif i > 0 and j > 0 and dp[i][j] == dp[i - 1][j - 1] + 1:
+        elif i > 0 and j > 0 and here == dp[i - 1, j - 1] + 1:
             pairs.append(
                 {"expected": ref[i - 1], "actual": hyp[j - 1], "correct": False}
             )
             i -= 1
             j -= 1
-        elif i > 0 and dp[i][j] == dp[i - 1][j] + 1:
+        elif i > 0 and here == dp[i - 1, j] + 1:
             pairs.append({"expected": ref[i - 1], "actual": None, "correct": False})
             i -= 1
         else:
@@ -267,6 +418,46 @@ def _per_word_scores(
     return result
 
 
+# ── Pipeline stages ─────────────────────────────────────────────────────────
+
+
+def _transcribe_array(audio_array: np.ndarray) -> dict:
+    """faster-whisper on a 16 kHz mono array (no temp WAV round trip)."""
+    model = _get_whisper()
+    segments, info = model.transcribe(audio_array, beam_size=5, language="en")
+    transcript = " ".join(s.text.strip() for s in segments).strip()
+    return {
+        "transcript": transcript,
+        "language": info.language,
+        "duration_s": round(info.duration, 2),
+    }
+
+
+def _score_phonemes(
+    user_phonemes: list[str], expected_text: str, transcript: str
+) -> dict:
+    """Alignment stage: reference IPA vs recognized phonemes → score payload."""
+    # Reference phonemes from expected_text
+    ref_phonemes, word_details = _text_to_phoneme_tokens(expected_text)
+
+    # Global alignment
+    global_pairs = _align(ref_phonemes, user_phonemes)
+    overall_score = _score_from_pairs(global_pairs, len(ref_phonemes))
+
+    # Per-word breakdown
+    words = _per_word_scores(word_details, global_pairs)
+
+    return {
+        "overall_score": overall_score,
+        "transcript": transcript,
+        "expected_text": expected_text,
+        "expected_ipa": "".join(ref_phonemes),
+        "actual_ipa": " ".join(user_phonemes),
+        "phoneme_alignment": global_pairs,
+        "words": words,
+    }
+
+
 # ── Public API ───────────────────────────────────────────────────────────────
 
 
@@ -274,25 +465,14 @@ def transcribe_audio(audio_bytes: bytes) -> dict:
     """
     Transcribe audio → English text using faster-whisper.
 
+    Blocking — call from an inference worker, never from the event loop.
+
     Returns:
       transcript   — recognized English text
       language     — detected language code (should be "en")
       duration_s   — audio length in seconds
     """
-    import soundfile as sf
-
-    arr = _decode_audio(audio_bytes)
-    model = _get_whisper()
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as f:
-        sf.write(f.name, arr, 16000)
-        segments, info = model.transcribe(f.name, beam_size=5, language="en")
-        transcript = " ".join(s.text.strip() for s in segments).strip()
-
-    return {
-        "transcript": transcript,
-        "language": info.language,
-        "duration_s": round(info.duration, 2),
-    }
+    return _transcribe_array(_decode_audio(audio_bytes))
 
 
 def score_pronunciation(audio_bytes: bytes, expected_text: str) -> dict:
@@ -300,6 +480,7 @@ def score_pronunciation(audio_bytes: bytes, expected_text: str) -> dict:
     Score pronunciation of audio against expected_text.
 
     Works for a single word, phrase, or full sentence.
+    Blocking — call from an inference worker, never from the event loop.
 
     Returns:
       overall_score   — 0.0–1.0
@@ -310,36 +491,7 @@ def score_pronunciation(audio_bytes: bytes, expected_text: str) -> dict:
       phoneme_alignment — [{expected, actual, correct}, ...]  (global)
       words           — [{word, expected_ipa, score, phonemes}, ...]
     """
-    import soundfile as sf
-
     arr = _decode_audio(audio_bytes)
-
-    # 1. Transcribe via Whisper (for feedback / sanity)
-    model = _get_whisper()
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as f:
-        sf.write(f.name, arr, 16000)
-        segments, _ = model.transcribe(f.name, beam_size=5, language="en")
-        transcript = " ".join(s.text.strip() for s in segments).strip()
-
-    # 2. Get user phonemes via Wav2Vec2
+    transcript = _transcribe_array(arr)["transcript"]
     user_phonemes = _get_user_phonemes(arr)
-
-    # 3. Get reference phonemes from expected_text
-    ref_phonemes, word_details = _text_to_phoneme_tokens(expected_text)
-
-    # 4. Global alignment
-    global_pairs = _align(ref_phonemes, user_phonemes)
-    overall_score = _score_from_pairs(global_pairs, len(ref_phonemes))
-
-    # 5. Per-word breakdown
-    words = _per_word_scores(word_details, global_pairs)
-
-    return {
-        "overall_score": overall_score,
-        "transcript": transcript,
-        "expected_text": expected_text,
-        "expected_ipa": "".join(ref_phonemes),
-        "actual_ipa": " ".join(user_phonemes),
-        "phoneme_alignment": global_pairs,
-        "words": words,
-    }
+    return _score_phonemes(user_phonemes, expected_text, transcript)
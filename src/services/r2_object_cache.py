@@ -0,0 +1,427 @@
+"""
+R2 Object Cache - shared read-through disk cache for R2 object reads
+
+Social post images re-downloaded the same brand logo for every post, and book
+imports, document processing, AI extraction, video export and the document chat
+downloader each fetched R2 objects on their own, every time. This cache sits in
+front of all of them:
+
+- blobs live under R2_OBJECT_CACHE_DIR, content-addressed by
+  sha256(bucket, key, ETag); a changed object gets a new blob, and the
+  superseded one is left to LRU eviction like any other entry
+- the index (entries + hit/miss counters) is a SQLite file in the same directory,
+  so every worker process on the host shares it and it survives restarts
+- a cached entry younger than R2_OBJECT_CACHE_REVALIDATE_SECONDS is served
+  without contacting R2; older ones are revalidated with a conditional GET
+  (If-None-Match: ETag), so an unchanged object costs a 304 instead of a download
+- downloads are single-flight per (bucket, key) across threads and processes
+  (flock on a lock file) and are streamed to disk in chunks
+- total size is bounded by R2_OBJECT_CACHE_MAX_MB with LRU eviction; entries
+  used in the last R2_OBJECT_CACHE_PIN_SECONDS are never evicted, so a path
+  returned by fetch() stays valid while the caller uses it
+
+Public CDN URLs (R2_PUBLIC_URL/...) map to keys in the WordAI bucket through
+key_from_url(); other URLs are not cached and callers download them as before.
+Callers also fall back to that download when a cache read fails (no R2
+credentials in the process, an object in another bucket behind the same CDN
+host, a full disk, ...).
+
+Usage:
+    cache = get_r2_object_cache()
+    data = await cache.aread_bytes("users/u1/logo.png")
+    await cache.acopy_to(key, "/tmp/job/audio.mp3")          # private copy
+    path = cache.fetch(key, bucket="aivungtau", s3_client=client)
+
+    key = key_from_url(file_url)  # None if the URL is not an R2 CDN URL
+
+    # Hit rate / size, manual eviction
+    python -m src.services.r2_object_cache stats
+    python -m src.services.r2_object_cache prune --max-mb 1024
+"""
+
+import argparse
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import unquote, urlsplit
+
+from config.config import R2_BUCKET_NAME, get_r2_client
+
+logger = logging.getLogger(__name__)
+
+R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL", "https://static.wordai.pro")
+R2_OBJECT_CACHE_ENABLED = os.getenv("R2_OBJECT_CACHE_ENABLED", "true").lower() == "true"
+R2_OBJECT_CACHE_DIR = os.getenv(
+    "R2_OBJECT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "wordai-r2-cache")
+)
+R2_OBJECT_CACHE_MAX_MB = int(os.getenv("R2_OBJECT_CACHE_MAX_MB", "2048"))
+# Cached entries younger than this are served without asking R2
+R2_OBJECT_CACHE_REVALIDATE_SECONDS = int(
+    os.getenv("R2_OBJECT_CACHE_REVALIDATE_SECONDS", "300")
+)
+# Entries used more recently than this are never evicted
+R2_OBJECT_CACHE_PIN_SECONDS = int(os.getenv("R2_OBJECT_CACHE_PIN_SECONDS", "600"))
+
+CHUNK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    digest TEXT PRIMARY KEY,
+    bucket TEXT NOT NULL,
+    key TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    validated_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_object ON entries (bucket, key);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+COUNTERS = (
+    "hits",
+    "misses",
+    "revalidated",
+    "bytes_saved",
+    "bytes_downloaded",
+    "evictions",
+)
+
+
+def key_from_url(url: Optional[str], public_url: str = R2_PUBLIC_URL) -> Optional[str]:
+    """Object key of a WordAI CDN URL (query string such as HMAC tokens ignored)"""
+    if not url:
+        return None
+    base = urlsplit(public_url)
+    parts = urlsplit(url)
+    if parts.netloc != base.netloc:
+        return None
+    path = unquote(parts.path)
+    prefix = base.path.rstrip("/") + "/"
+    if not path.startswith(prefix) or len(path) == len(prefix):
+        return None
+    return path[len(prefix) :]
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def _not_modified(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    code = response.get("Error", {}).get("Code")
+    return status == 304 or code in ("304", "NotModified")
+
+
+class R2ObjectCache:
+    """Host-wide disk cache of R2 objects keyed by bucket/key/ETag"""
+
+    def __init__(
+        self,
+        cache_dir: str = R2_OBJECT_CACHE_DIR,
+        max_bytes: int = R2_OBJECT_CACHE_MAX_MB * 1024 * 1024,
+        s3_client=None,
+        bucket: Optional[str] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.bucket = bucket or R2_BUCKET_NAME or "wordai"
+        self._s3_client = s3_client
+        self._client_lock = threading.Lock()
+        self._local = threading.local()
+
+        for sub in ("blobs", "locks", "tmp"):
+            (self.cache_dir / sub).mkdir(parents=True, exist_ok=True)
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            with self._client_lock:
+                if self._s3_client is None:
+                    self._s3_client = get_r2_client()
+        return self._s3_client
+
+    # ------------------------------------------------------------------
+    # Index (SQLite, shared by all processes on the host)
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                str(self.cache_dir / "index.sqlite3"), timeout=30, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        yield conn
+
+    def _count(self, db, **deltas: int):
+        for name, delta in deltas.items():
+            if delta:
+                db.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, delta),
+                )
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / digest
+
+    def _lookup(self, db, bucket: str, key: str) -> Optional[sqlite3.Row]:
+        row = db.execute(
+            "SELECT * FROM entries WHERE bucket = ? AND key = ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (bucket, key),
+        ).fetchone()
+        if row is not None and not self._blob_path(row["digest"]).exists():
+            db.execute("DELETE FROM entries WHERE digest = ?", (row["digest"],))
+            return None
+        return row
+
+    def _hit(self, db, row: sqlite3.Row, revalidated: bool = False) -> Path:
+        now = time.time()
+        if revalidated:
+            db.execute(
+                "UPDATE entries SET validated_at = ?, last_access = ? WHERE digest = ?",
+                (now, now, row["digest"]),
+            )
+        else:
+            db.execute(
+                "UPDATE entries SET last_access = ? WHERE digest = ?",
+                (now, row["digest"]),
+            )
+        self._count(
+            db, hits=1, revalidated=int(revalidated), bytes_saved=row["size"]
+        )
+        return self._blob_path(row["digest"])
+
+    # ------------------------------------------------------------------
+    # Read-through
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _object_lock(self, bucket: str, key: str):
+        """Single-flight per object, across threads and processes"""
+        lock_path = self.cache_dir / "locks" / _digest(bucket, key)[:32]
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def fetch(self, key: str, bucket: Optional[str] = None, s3_client=None) -> str:
+        """
+        Local path of the cached object, downloading it on a miss
+
+        The file is shared - read it, do not modify or delete it (use copy_to
+        for a private copy).
+
+        Raises:
+            botocore ClientError (e.g. NoSuchKey) like get_object
+        """
+        bucket = bucket or self.bucket
+        with self._db() as db:
+            row = self._lookup(db, bucket, key)
+            fresh_after = time.time() - R2_OBJECT_CACHE_REVALIDATE_SECONDS
+            if row is not None and row["validated_at"] >= fresh_after:
+                return str(self._hit(db, row))
+
+            with self._object_lock(bucket, key):
+                # Another thread/process may have fetched it while we waited
+                row = self._lookup(db, bucket, key)
+                if row is not None and row["validated_at"] >= fresh_after:
+                    return str(self._hit(db, row))
+
+                client = s3_client or self.s3_client
+                params = {"Bucket": bucket, "Key": key}
+                if row is not None:
+                    params["IfNoneMatch"] = f'"{row["etag"]}"'
+                try:
+                    response = client.get_object(**params)
+                except Exception as e:
+                    if row is not None and _not_modified(e):
+                        return str(self._hit(db, row, revalidated=True))
+                    raise
+
+                path = self._store(db, bucket, key, response)
+
+        self._evict()
+        return str(path)
+
+    def _store(self, db, bucket: str, key: str, response) -> Path:
+        etag = (response.get("ETag") or "").strip('"')
+        digest = _digest(bucket, key, etag)
+        path = self._blob_path(digest)
+        path.parent.mkdir(exist_ok=True)
+
+        # Stream to a temp file, then publish atomically
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir / "tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response["Body"].iter_chunks(CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        # Blobs of older ETags stay until evicted: a path fetch() returned for
+        # them moments ago must remain readable while it is pinned
+        now = time.time()
+        db.execute(
+            "INSERT OR REPLACE INTO entries "
+            "(digest, bucket, key, etag, size, created_at, validated_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (digest, bucket, key, etag, size, now, now, now),
+        )
+        self._count(db, misses=1, bytes_downloaded=size)
+
+        logger.info(f"📥 [R2_CACHE] Cached {bucket}/{key} ({size:,} bytes)")
+        return path
+
+    def _remove(self, db, digest: str):
+        db.execute("DELETE FROM entries WHERE digest = ?", (digest,))
+        try:
+            self._blob_path(digest).unlink()
+        except FileNotFoundError:
+            pass
+
+    def read_bytes(self, key: str, bucket: Optional[str] = None, s3_client=None) -> bytes:
+        with open(self.fetch(key, bucket, s3_client), "rb") as f:
+            return f.read()
+
+    def copy_to(
+        self, key: str, dest_path: str, bucket: Optional[str] = None, s3_client=None
+    ) -> str:
+        """Private copy of the object at dest_path (callers may modify/delete it)"""
+        Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.fetch(key, bucket, s3_client), dest_path)
+        return dest_path
+
+    async def afetch(self, key: str, bucket: Optional[str] = None, s3_client=None) -> str:
+        return await asyncio.to_thread(self.fetch, key, bucket, s3_client)
+
+    async def aread_bytes(
+        self, key: str, bucket: Optional[str] = None, s3_client=None
+    ) -> bytes:
+        return await asyncio.to_thread(self.read_bytes, key, bucket, s3_client)
+
+    async def acopy_to(
+        self, key: str, dest_path: str, bucket: Optional[str] = None, s3_client=None
+    ) -> str:
+        return await asyncio.to_thread(self.copy_to, key, dest_path, bucket, s3_client)
+
+    # ------------------------------------------------------------------
+    # Eviction / metrics
+    # ------------------------------------------------------------------
+
+    def _evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least recently used entries until the cache fits (down to 90%)"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._db() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            target = int(max_bytes * 0.9)
+            pinned_after = time.time() - R2_OBJECT_CACHE_PIN_SECONDS
+            evicted = 0
+            for row in db.execute(
+                "SELECT digest, size FROM entries WHERE last_access < ? "
+                "ORDER BY last_access",
+                (pinned_after,),
+            ).fetchall():
+                if total <= target:
+                    break
+                self._remove(db, row["digest"])
+                total -= row["size"]
+                evicted += 1
+            self._count(db, evictions=evicted)
+
+        if evicted:
+            logger.info(f"🧹 [R2_CACHE] Evicted {evicted} objects ({total:,} bytes left)")
+        return evicted
+
+    def prune(self, max_bytes: int) -> int:
+        return self._evict(max_bytes)
+
+    def stats(self) -> Dict[str, float]:
+        with self._db() as db:
+            counters = dict.fromkeys(COUNTERS, 0)
+            counters.update(
+                {r["name"]: r["value"] for r in db.execute("SELECT * FROM counters")}
+            )
+            entries, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "cache_dir": str(self.cache_dir),
+        }
+
+
+_cache: Optional[R2ObjectCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_r2_object_cache() -> Optional[R2ObjectCache]:
+    """Shared cache, or None when disabled / the cache directory is unusable"""
+    global _cache
+    if _cache is None and R2_OBJECT_CACHE_ENABLED:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = R2ObjectCache()
+                except Exception as e:
+                    logger.warning(f"⚠️ R2 object cache disabled: {e}")
+                    return None
+    return _cache
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="R2 object cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Hit rate, bytes saved, size")
+    prune = sub.add_parser("prune", help="Evict LRU entries down to --max-mb")
+    prune.add_argument("--max-mb", type=int, required=True)
+    args = parser.parse_args()
+
+    cache = R2ObjectCache()
+    if args.command == "prune":
+        print(f"Evicted {cache.prune(args.max_mb * 1024 * 1024)} objects")
+    print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""
+R2 Purge Service - bulk R2 deletion + Mongo cleanup with resumable checkpoints
+
+Shared by the trash flows (library / secret images / upload files) and Software Lab
+project deletion. A purge job lives in `r2_purge_jobs` and is one of:
+
+- records: page through a Mongo query (keyset on _id), delete the R2 keys stored in
+  `key_fields` of each record, then `delete_many` the records whose keys are gone.
+- prefix: page through `list_objects_v2` for an R2 prefix and delete everything.
+
+R2 keys are deleted with `delete_objects` in batches of 1,000 (the S3 limit), with
+R2_PURGE_CONCURRENCY batches in flight. After every page the job document is
+updated (counts + checkpoint), which is both the progress report and the resume
+point. Jobs are claimed with a lease; if the process running a job dies, the
+r2_purge_worker picks it up again once the lease expires.
+
+Usage:
+    service = get_r2_purge_service()
+    job_id = service.create_records_job(
+        kind="library_trash", user_id=uid, collection="library_files",
+        query={"user_id": uid, "is_deleted": True}, key_fields=LIBRARY_KEY_FIELDS,
+        update_storage=True,
+    )
+    job = await run_purge_job(job_id)
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+PURGE_JOBS_COLLECTION = "r2_purge_jobs"
+DELETE_BATCH_SIZE = 1000  # S3 DeleteObjects limit
+R2_PURGE_CONCURRENCY = int(os.getenv("R2_PURGE_CONCURRENCY", "4"))
+R2_PURGE_LEASE_SECONDS = int(os.getenv("R2_PURGE_LEASE_SECONDS", "120"))
+# How long trash endpoints wait before answering "still purging in the background"
+R2_PURGE_INLINE_TIMEOUT = float(os.getenv("R2_PURGE_INLINE_TIMEOUT", "20"))
+
+# R2 object keys stored on library_files documents (regular files + secret images)
+LIBRARY_KEY_FIELDS = ["r2_key", "r2_image_path", "r2_thumbnail_path"]
+USER_FILE_KEY_FIELDS = ["r2_key"]
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class R2PurgeService:
+    """Creates, claims and runs purge jobs"""
+
+    def __init__(self, db=None, s3_client=None, bucket: Optional[str] = None):
+        if db is None:
+            from src.database.db_manager import DBManager
+
+            db = DBManager().db
+        if s3_client is None:
+            from config.config import get_r2_client
+
+            s3_client = get_r2_client()
+        if bucket is None:
+            from config.config import R2_BUCKET_NAME
+
+            bucket = R2_BUCKET_NAME
+
+        self.db = db
+        self.jobs = db[PURGE_JOBS_COLLECTION]
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.concurrency = max(1, R2_PURGE_CONCURRENCY)
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+
+    def create_indexes(self):
+        self.jobs.create_index("job_id", unique=True)
+        self.jobs.create_index([("status", 1), ("lease_until", 1)])
+        self.jobs.create_index([("user_id", 1), ("created_at", -1)])
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def _create_job(self, kind: str, user_id: Optional[str], spec: Dict[str, Any]) -> str:
+        job_id = f"purge_{uuid.uuid4().hex[:16]}"
+        now = _now()
+        self.jobs.insert_one(
+            {
+                "job_id": job_id,
+                "kind": kind,
+                "user_id": user_id,
+                "spec": spec,
+                "status": STATUS_PENDING,
+                "checkpoint": {},
+                "deleted_objects": 0,
+                "failed_objects": 0,
+                "deleted_records": 0,
+                "failed_records": 0,
+                "bytes_freed": 0,
+                "owner": None,
+                "lease_until": now,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        return job_id
+
+    def create_records_job(
+        self,
+        kind: str,
+        user_id: Optional[str],
+        collection: str,
+        query: Dict[str, Any],
+        key_fields: Sequence[str],
+        update_storage: bool = False,
+    ) -> str:
+        """
+        Purge Mongo records and the R2 objects they reference
+
+        Args:
+            kind: Flow name (library_trash, files_trash, secret_images_trash, ...)
+            user_id: Owner (for progress lookups / storage accounting)
+            collection: Mongo collection holding the records
+            query: Records to purge
+            key_fields: Record fields holding R2 keys
+            update_storage: Decrease the user's storage_mb by the freed bytes when done
+        """
+        return self._create_job(
+            kind,
+            user_id,
+            {
+                "type": "records",
+                "collection": collection,
+                "query": query,
+                "key_fields": list(key_fields),
+                "update_storage": update_storage,
+            },
+        )
+
+    def create_prefix_job(self, kind: str, user_id: Optional[str], prefix: str) -> str:
+        """Purge every R2 object under `prefix` (no Mongo records)"""
+        if not prefix or not prefix.endswith("/"):
+            raise ValueError(f"Refusing to purge non-directory prefix: {prefix!r}")
+        return self._create_job(kind, user_id, {"type": "prefix", "prefix": prefix})
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.find_one({"job_id": job_id}, {"_id": 0})
+
+    def claim(self, job_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease a job that is pending, or running with an expired lease (crashed owner)
+
+        Args:
+            job_id: Claim this job only; None claims the oldest claimable job
+
+        Returns:
+            The claimed job, or None if nothing is claimable (e.g. another worker
+            holds the lease). Its `owner` is unique to this claim.
+        """
+        now = _now()
+        query: Dict[str, Any] = {
+            "status": {"$in": [STATUS_PENDING, STATUS_RUNNING]},
+            "lease_until": {"$lte": now},
+        }
+        if job_id:
+            query["job_id"] = job_id
+        return self.jobs.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": STATUS_RUNNING,
+                    "owner": f"{self.owner}-{uuid.uuid4().hex[:8]}",
+                    "lease_until": now + timedelta(seconds=R2_PURGE_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+            },
+            sort=[("created_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _checkpoint(
+        self, job: Dict[str, Any], checkpoint: Dict[str, Any], counts: Dict[str, int]
+    ):
+        """Persist progress and extend the lease (only while this claim holds it)"""
+        now = _now()
+        return self.jobs.find_one_and_update(
+            {"job_id": job["job_id"], "owner": job["owner"]},
+            {
+                "$set": {
+                    "checkpoint": checkpoint,
+                    "lease_until": now + timedelta(seconds=R2_PURGE_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": counts,
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _finish(self, job: Dict[str, Any], status: str, error: Optional[str] = None):
+        """Close the job; None if the lease was lost (the new owner finishes it)"""
+        now = _now()
+        return self.jobs.find_one_and_update(
+            {"job_id": job["job_id"], "owner": job["owner"]},
+            {
+                "$set": {
+                    "status": status,
+                    "error": error,
+                    "lease_until": now,
+                    "completed_at": now,
+                    "updated_at": now,
+                }
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    # ------------------------------------------------------------------
+    # R2
+    # ------------------------------------------------------------------
+
+    def _delete_batch(self, keys: List[str]) -> Tuple[Set[str], Dict[str, str]]:
+        response = self.s3_client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+        )
+        errors = {
+            err["Key"]: err.get("Code", "Error")
+            for err in response.get("Errors", [])
+            # Already gone is what we want
+            if err.get("Code") != "NoSuchKey"
+        }
+        return {key for key in keys if key not in errors}, errors
+
+    def delete_keys(
+        self, keys: Sequence[str], executor: ThreadPoolExecutor
+    ) -> Tuple[Set[str], Dict[str, str]]:
+        """
+        Delete R2 keys in 1,000-key batches, up to `concurrency` batches at a time
+
+        Returns:
+            (deleted keys, {failed key: error code})
+        """
+        unique = list(dict.fromkeys(k for k in keys if k))
+        batches = [
+            unique[i : i + DELETE_BATCH_SIZE]
+            for i in range(0, len(unique), DELETE_BATCH_SIZE)
+        ]
+        deleted: Set[str] = set()
+        failed: Dict[str, str] = {}
+
+        futures = [(batch, executor.submit(self._delete_batch, batch)) for batch in batches]
+        for batch, future in futures:
+            try:
+                ok, errors = future.result()
+            except Exception as e:
+                logger.error(f"❌ R2 delete_objects failed ({len(batch)} keys): {e}")
+                failed.update({key: "BatchError" for key in batch})
+                continue
+            deleted |= ok
+            failed.update(errors)
+        return deleted, failed
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(
+        self, job: Dict[str, Any], on_progress: Optional[ProgressCallback] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run a claimed job to completion from its checkpoint (blocking)
+
+        Returns:
+            Final job document, or None if the lease was lost to another worker
+        """
+        job_id = job["job_id"]
+        spec = job["spec"]
+        logger.info(f"🗑️ Purge {job_id} ({job['kind']}) started for {job.get('user_id')}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                if spec["type"] == "records":
+                    self._run_records(job, executor, on_progress)
+                else:
+                    self._run_prefix(job, executor, on_progress)
+        except Exception as e:
+            logger.error(f"❌ Purge {job_id} failed: {e}")
+            return self._finish(job, STATUS_FAILED, str(e)[:500])
+
+        result = self._finish(job, STATUS_COMPLETED)
+        if result is None:
+            logger.warning(f"⚠️ Purge {job_id} lease lost - another worker finishes it")
+            return None
+        logger.info(
+            f"✅ Purge {job_id} done: {result['deleted_records']} records, "
+            f"{result['deleted_objects']} objects "
+            f"({result['failed_objects']} failed, {result['bytes_freed'] / 1_048_576:.1f}MB)"
+        )
+        return result
+
+    def _run_records(self, job, executor, on_progress):
+        spec = job["spec"]
+        collection = self.db[spec["collection"]]
+        key_fields = spec["key_fields"]
+        projection = {field: 1 for field in key_fields}
+        projection["file_size"] = 1
+        page_size = DELETE_BATCH_SIZE * self.concurrency
+        last_id = job.get("checkpoint", {}).get("last_id")
+
+        while True:
+            query = dict(spec["query"])
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            records = list(collection.find(query, projection).sort("_id", 1).limit(page_size))
+            if not records:
+                return
+
+            keys = [record.get(field) for record in records for field in key_fields]
+            _, failed = self.delete_keys(keys, executor)
+
+            # Keep records whose objects could not be deleted (retried on the next purge)
+            done = [
+                record for record in records
+                if not any(record.get(field) in failed for field in key_fields)
+            ]
+            removed = 0
+            if done:
+                removed = collection.delete_many(
+                    {"_id": {"$in": [record["_id"] for record in done]}}
+                ).deleted_count
+
+            last_id = records[-1]["_id"]
+            progress = self._checkpoint(
+                job,
+                {"last_id": last_id},
+                {
+                    "deleted_objects": sum(
+                        1 for r in done for f in key_fields if r.get(f)
+                    ),
+                    "failed_objects": len(failed),
+                    "deleted_records": removed,
+                    "failed_records": len(records) - len(done),
+                    "bytes_freed": sum(int(r.get("file_size") or 0) for r in done),
+                },
+            )
+            if progress is None:
+                raise RuntimeError("Purge lease lost to another worker")
+            if on_progress:
+                on_progress(progress)
+
+    def _run_prefix(self, job, executor, on_progress):
+        prefix = job["spec"]["prefix"]
+        start_after = job.get("checkpoint", {}).get("start_after")
+        token = None
+
+        while True:
+            # Collect up to `concurrency` listing pages, then delete them together
+            keys: List[str] = []
+            sizes: Dict[str, int] = {}
+            truncated = True
+            for _ in range(self.concurrency):
+                params = {"Bucket": self.bucket, "Prefix": prefix, "MaxKeys": DELETE_BATCH_SIZE}
+                if token:
+                    params["ContinuationToken"] = token
+                elif start_after:
+                    params["StartAfter"] = start_after
+                page = self.s3_client.list_objects_v2(**params)
+                for obj in page.get("Contents", []):
+                    keys.append(obj["Key"])
+                    sizes[obj["Key"]] = obj.get("Size", 0)
+                truncated = page.get("IsTruncated", False)
+                token = page.get("NextContinuationToken")
+                if not truncated:
+                    break
+
+            if keys:
+                deleted, failed = self.delete_keys(keys, executor)
+                # Resume listing after the last key rather than on a token that
+                # predates the deletes
+                start_after = keys[-1]
+                token = None
+                progress = self._checkpoint(
+                    job,
+                    {"start_after": start_after},
+                    {
+                        "deleted_objects": len(deleted),
+                        "failed_objects": len(failed),
+                        "bytes_freed": sum(sizes[k] for k in deleted),
+                    },
+                )
+                if progress is None:
+                    raise RuntimeError("Purge lease lost to another worker")
+                if on_progress:
+                    on_progress(progress)
+
+            if not truncated:
+                return
+
+
+_purge_service: Optional[R2PurgeService] = None
+# Strong references to purges outliving their request
+_background_purges: Set[asyncio.Task] = set()
+
+
+def get_r2_purge_service() -> R2PurgeService:
+    global _purge_service
+    if _purge_service is None:
+        _purge_service = R2PurgeService()
+    return _purge_service
+
+
+async def _apply_storage_update(job: Dict[str, Any]):
+    """Give the freed storage back to the user (trash flows)"""
+    mb_freed = job.get("bytes_freed", 0) / (1024 * 1024)
+    if not job["spec"].get("update_storage") or not job.get("user_id") or mb_freed <= 0:
+        return
+    try:
+        from src.models.subscription import SubscriptionUsageUpdate
+        from src.services.subscription_service import get_subscription_service
+
+        await get_subscription_service().update_usage(
+            user_id=job["user_id"],
+            update=SubscriptionUsageUpdate(storage_mb=-mb_freed),
+        )
+        logger.info(
+            f"📊 Decreased storage by {mb_freed:.2f}MB ({job['deleted_records']} files, {job['kind']})"
+        )
+    except Exception as e:
+        logger.error(f"❌ Error updating storage counter after purge {job['job_id']}: {e}")
+
+
+async def run_purge_job(
+    job_id: Optional[str] = None, service: Optional[R2PurgeService] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Claim and run a purge job off the event loop, then apply storage accounting
+
+    Args:
+        job_id: Job to run; None runs the oldest pending/abandoned job
+
+    Returns:
+        Final job document, or None if nothing was claimable
+    """
+    service = service or get_r2_purge_service()
+    job = await asyncio.to_thread(service.claim, job_id)
+    if job is None:
+        return None
+    result = await asyncio.to_thread(service.run, job)
+    if result and result["status"] in (STATUS_COMPLETED, STATUS_FAILED):
+        # Only the claim that closed the job gets here (`_finish` matches the lease
+        # owner), so storage is given back once. bytes_freed only counts records
+        # actually deleted, so partial runs count too
+        await _apply_storage_update(result)
+    return result
+
+
+async def purge_with_deadline(job_id: str, timeout: float) -> Dict[str, Any]:
+    """
+    Start a purge in the background and wait up to `timeout` seconds for it
+
+    Returns the final job document, or the in-progress one if the deadline passes
+    (the purge keeps running; poll `get_job` for progress).
+    """
+    task = asyncio.create_task(run_purge_job(job_id))
+    _background_purges.add(task)
+    task.add_done_callback(_background_purges.discard)
+    try:
+        result = await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        if result is not None:
+            return result
+    except asyncio.TimeoutError:
+        pass
+    return await asyncio.to_thread(get_r2_purge_service().get_job, job_id)
+
+
+def purge_summary(job: Dict[str, Any], label: str) -> Dict[str, Any]:
+    """API response for a trash purge (finished or still running in the background)"""
+    finished = job["status"] == STATUS_COMPLETED
+    deleted = job.get("deleted_records", 0)
+    message = (
+        f"Permanently deleted {deleted} {label} from trash"
+        if finished
+        else f"Deleting {label} from trash in the background ({deleted} so far)"
+    )
+    return {
+        "success": job["status"] != STATUS_FAILED,
+        "message": message,
+        "deleted_count": deleted,
+        "failed_count": job.get("failed_records", 0),
+        "storage_freed_mb": round(job.get("bytes_freed", 0) / (1024 * 1024), 2),
+        "purge_job_id": job["job_id"],
+        "status": job["status"],
+    }
@@ -0,0 +1,275 @@
+"""
+R2 URL Service - cached, batched URL signing for R2 objects
+
+List endpoints used to sign every object URL on every request, inline in the async
+handler (boto3 presigning is synchronous HMAC work) and usually with a brand new
+boto3 client per request. This service:
+
+- keeps one shared boto3 client,
+- caches presigned GET URLs per (key, variant, scope, expires_in) and reuses them
+  while at least R2_URL_MIN_REMAINING_FRACTION of their lifetime is left,
+- signs cache misses of a listing in one batch off the event loop (asyncio.to_thread),
+- builds CDN URLs for public assets: plain `R2_PUBLIC_URL/key`, or HMAC-token URLs
+  (Cloudflare `is_timed_hmac_valid_v0` format) when R2_CDN_SIGNING_KEY is set.
+
+`scope` is usually the requesting user id, so a URL handed to one user is never
+served from cache to another.
+
+Usage:
+    url_service = get_r2_url_service()
+    urls = await url_service.presign_many(keys, scope=user_id)
+    url = url_service.presign(key, download_name="report.pdf")
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from config.config import R2_BUCKET_NAME, get_r2_client
+
+logger = logging.getLogger(__name__)
+
+R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL", "https://static.wordai.pro")
+R2_URL_CACHE_SIZE = int(os.getenv("R2_URL_CACHE_SIZE", "50000"))
+# A cached URL is reused while at least this fraction of its lifetime remains
+R2_URL_MIN_REMAINING_FRACTION = float(os.getenv("R2_URL_MIN_REMAINING_FRACTION", "0.25"))
+R2_CDN_SIGNING_KEY = os.getenv("R2_CDN_SIGNING_KEY", "")
+R2_CDN_TOKEN_PARAM = os.getenv("R2_CDN_TOKEN_PARAM", "verify")
+# CDN tokens are issued per time window so URLs stay stable (browser/CDN cacheable)
+R2_CDN_TOKEN_WINDOW = int(os.getenv("R2_CDN_TOKEN_WINDOW", "3600"))
+
+DEFAULT_EXPIRES_IN = 3600
+
+# (key, variant, scope, expires_in)
+CacheKey = Tuple[str, str, str, int]
+
+
+def _content_disposition(download_name: str) -> str:
+    return f'attachment; filename="{download_name}"'
+
+
+class R2UrlService:
+    """Presigned/CDN URL builder with an in-process LRU of signed URLs"""
+
+    def __init__(
+        self,
+        s3_client=None,
+        bucket: Optional[str] = None,
+        public_url: str = R2_PUBLIC_URL,
+        cdn_signing_key: str = R2_CDN_SIGNING_KEY,
+        cache_size: int = R2_URL_CACHE_SIZE,
+    ):
+        self._s3_client = s3_client
+        self.bucket = bucket or R2_BUCKET_NAME
+        self.public_url = public_url.rstrip("/")
+        self.cdn_signing_key = cdn_signing_key.encode() if cdn_signing_key else b""
+        self.cache_size = cache_size
+
+        # cache_key -> (url, reuse_until, expires_at)
+        self._cache: "OrderedDict[CacheKey, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def s3_client(self):
+        # One client per process - creating a boto3 client costs far more than signing
+        if self._s3_client is None:
+            with self._lock:
+                if self._s3_client is None:
+                    self._s3_client = get_r2_client()
+        return self._s3_client
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _cache_get(
+        self, cache_key: CacheKey, now: float
+    ) -> Optional[Tuple[str, float]]:
+        """(url, expires_at) of a reusable cached URL, else None"""
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            url, reuse_until, expires_at = entry
+            if now >= reuse_until:
+                del self._cache[cache_key]
+                self.misses += 1
+                return None
+            self._cache.move_to_end(cache_key)
+            self.hits += 1
+            return url, expires_at
+
+    def _cache_put(self, cache_key: CacheKey, url: str, signed_at: float):
+        expires_in = cache_key[3]
+        reuse_until = signed_at + expires_in * (1 - R2_URL_MIN_REMAINING_FRACTION)
+        with self._lock:
+            self._cache[cache_key] = (url, reuse_until, signed_at + expires_in)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    # ------------------------------------------------------------------
+    # Signing
+    # ------------------------------------------------------------------
+
+    def _sign(self, key: str, expires_in: int, download_name: Optional[str]) -> str:
+        params = {"Bucket": self.bucket, "Key": key}
+        if download_name:
+            params["ResponseContentDisposition"] = _content_disposition(download_name)
+        return self.s3_client.generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=expires_in
+        )
+
+    def _sign_batch(
+        self, requests: List[Tuple[CacheKey, Optional[str]]]
+    ) -> Dict[CacheKey, Optional[str]]:
+        signed_at = time.time()
+        results: Dict[CacheKey, Optional[str]] = {}
+        for cache_key, download_name in requests:
+            key, _, _, expires_in = cache_key
+            try:
+                url = self._sign(key, expires_in, download_name)
+            except Exception as e:
+                logger.error(f"❌ Failed to presign {key}: {e}")
+                results[cache_key] = None
+                continue
+            self._cache_put(cache_key, url, signed_at)
+            results[cache_key] = url
+        return results
+
+    def presign(
+        self,
+        key: str,
+        expires_in: int = DEFAULT_EXPIRES_IN,
+        scope: str = "",
+        download_name: Optional[str] = None,
+    ) -> str:
+        """
+        Presigned GET URL for one object (cached)
+
+        Args:
+            key: R2 object key
+            expires_in: URL lifetime in seconds
+            scope: Cache partition, usually the requesting user id
+            download_name: Force `Content-Disposition: attachment` with this filename
+
+        Returns:
+            Presigned URL
+        """
+        return self.presign_with_expiry(key, expires_in, scope, download_name)[0]
+
+    def presign_with_expiry(
+        self,
+        key: str,
+        expires_in: int = DEFAULT_EXPIRES_IN,
+        scope: str = "",
+        download_name: Optional[str] = None,
+    ) -> Tuple[str, int]:
+        """
+        Like presign, plus the seconds the returned URL stays valid
+
+        A URL served from cache may have only part of expires_in left.
+        """
+        cache_key = (key, download_name or "", scope, expires_in)
+        now = time.time()
+        cached = self._cache_get(cache_key, now)
+        if cached is not None:
+            url, expires_at = cached
+            return url, int(expires_at - now)
+        url = self._sign(key, expires_in, download_name)
+        self._cache_put(cache_key, url, now)
+        return url, expires_in
+
+    async def presign_many(
+        self,
+        keys: Iterable[Optional[str]],
+        expires_in: int = DEFAULT_EXPIRES_IN,
+        scope: str = "",
+        download_names: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Presigned GET URLs for a listing; cache misses are signed in one thread hop
+
+        Args:
+            keys: R2 object keys (None/empty entries are skipped)
+            expires_in: URL lifetime in seconds
+            scope: Cache partition, usually the requesting user id
+            download_names: Optional {key: filename} for attachment downloads
+
+        Returns:
+            {key: url}; a key maps to None if signing failed
+        """
+        download_names = download_names or {}
+        now = time.time()
+        urls: Dict[str, Optional[str]] = {}
+        missing: List[Tuple[CacheKey, Optional[str]]] = []
+
+        for key in keys:
+            if not key or key in urls:
+                continue
+            download_name = download_names.get(key)
+            cache_key = (key, download_name or "", scope, expires_in)
+            cached = self._cache_get(cache_key, now)
+            urls[key] = cached[0] if cached else None
+            if cached is None:
+                missing.append((cache_key, download_name))
+
+        if missing:
+            signed = await asyncio.to_thread(self._sign_batch, missing)
+            for cache_key, url in signed.items():
+                urls[cache_key[0]] = url
+
+        return urls
+
+    # ------------------------------------------------------------------
+    # Public assets (CDN)
+    # ------------------------------------------------------------------
+
+    def cdn_url(self, key: str) -> str:
+        """
+        CDN URL for a public asset - no S3 signing
+
+        With R2_CDN_SIGNING_KEY set, appends an HMAC token
+        (`?verify={timestamp}-{base64(hmac_sha256(key, path + timestamp))}`) for a
+        Cloudflare `is_timed_hmac_valid_v0` rule. The token lifetime is enforced by
+        that rule; timestamps are rounded to R2_CDN_TOKEN_WINDOW so the URL is stable.
+        """
+        path = "/" + quote(key.lstrip("/"))
+        if not self.cdn_signing_key:
+            return f"{self.public_url}{path}"
+
+        timestamp = int(time.time()) // R2_CDN_TOKEN_WINDOW * R2_CDN_TOKEN_WINDOW
+        mac = hmac.new(
+            self.cdn_signing_key, f"{path}{timestamp}".encode(), hashlib.sha256
+        ).digest()
+        token = f"{timestamp}-{base64.b64encode(mac).decode()}"
+        return f"{self.public_url}{path}?{R2_CDN_TOKEN_PARAM}={quote(token, safe='-')}"
+
+
+_url_service: Optional[R2UrlService] = None
+
+
+def get_r2_url_service() -> R2UrlService:
+    """Process-wide URL service (shared boto3 client + URL cache)"""
+    global _url_service
+    if _url_service is None:
+        _url_service = R2UrlService()
+    return _url_service
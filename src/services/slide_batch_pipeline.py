@@ -0,0 +1,120 @@
+"""
+Slide Batch Pipeline - batch persistence + concurrency limits for slide HTML generation
+
+Step 2 of AI slide generation produces HTML in batches of SLIDE_HTML_BATCH_SIZE
+slides. Batch 1 runs first because it provides the style sample (slide 1) passed to
+every other batch; the remaining batches then run concurrently, bounded by:
+
+- SLIDE_BATCH_CONCURRENCY: batches in flight per user (all of the user's jobs)
+- SLIDE_PROVIDER_CONCURRENCY: batches in flight per LLM provider (whole worker)
+
+Every finished batch is stored in `slide_generation_batches`, keyed by document and
+an outline fingerprint, so a retry regenerates only the batches that are missing.
+Editing the outline changes the fingerprint and therefore starts from scratch.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+BATCHES_COLLECTION = "slide_generation_batches"
+SLIDE_HTML_BATCH_SIZE = 10  # Claude token limits - keep in sync with billing in routes
+SLIDE_BATCH_CONCURRENCY = int(os.getenv("SLIDE_BATCH_CONCURRENCY", "3"))
+SLIDE_PROVIDER_CONCURRENCY = int(os.getenv("SLIDE_PROVIDER_CONCURRENCY", "8"))
+
+_user_slots: Dict[str, asyncio.Semaphore] = {}
+_user_slot_users: Dict[str, int] = {}  # holders + waiters, to drop idle semaphores
+_provider_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def outline_fingerprint(slides_outline: List[dict]) -> str:
+    """Stable hash of the outline - stored batches are only reused for the same outline"""
+    payload = json.dumps(slides_outline, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def split_batches(slides_outline: List[dict]) -> List[List[dict]]:
+    return [
+        slides_outline[i : i + SLIDE_HTML_BATCH_SIZE]
+        for i in range(0, len(slides_outline), SLIDE_HTML_BATCH_SIZE)
+    ]
+
+
+@asynccontextmanager
+async def batch_slot(user_id: str, provider: str):
+    """Hold one per-user and one per-provider generation slot"""
+    user_sem = _user_slots.setdefault(
+        user_id, asyncio.Semaphore(SLIDE_BATCH_CONCURRENCY)
+    )
+    provider_sem = _provider_slots.setdefault(
+        provider, asyncio.Semaphore(SLIDE_PROVIDER_CONCURRENCY)
+    )
+    _user_slot_users[user_id] = _user_slot_users.get(user_id, 0) + 1
+    try:
+        async with user_sem:
+            async with provider_sem:
+                yield
+    finally:
+        # Forget the user's semaphore once nobody holds or waits for it
+        _user_slot_users[user_id] -= 1
+        if not _user_slot_users[user_id]:
+            del _user_slot_users[user_id]
+            _user_slots.pop(user_id, None)
+
+
+class SlideBatchStore:
+    """Finished slide HTML batches, per document + outline fingerprint"""
+
+    def __init__(self, db):
+        self.collection = db[BATCHES_COLLECTION]
+        self._indexes_ready = False
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        self.collection.create_index(
+            [("document_id", 1), ("fingerprint", 1), ("batch_index", 1)], unique=True
+        )
+        self.collection.create_index("created_at", expireAfterSeconds=7 * 86400)
+        self._indexes_ready = True
+
+    def load(self, document_id: str, fingerprint: str) -> Dict[int, List[str]]:
+        """
+        Batches already generated for this document/outline
+
+        Returns:
+            {batch_index: [slide html, ...]}
+        """
+        self._ensure_indexes()
+        return {
+            doc["batch_index"]: doc["slides_html"]
+            for doc in self.collection.find(
+                {"document_id": document_id, "fingerprint": fingerprint},
+                {"batch_index": 1, "slides_html": 1},
+            )
+        }
+
+    def save(
+        self, document_id: str, fingerprint: str, batch_index: int, slides_html: List[str]
+    ):
+        self._ensure_indexes()
+        self.collection.update_one(
+            {
+                "document_id": document_id,
+                "fingerprint": fingerprint,
+                "batch_index": batch_index,
+            },
+            {"$set": {"slides_html": slides_html, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    def clear(self, document_id: str):
+        """Drop stored batches once the full deck is saved on the document"""
+        self.collection.delete_many({"document_id": document_id})
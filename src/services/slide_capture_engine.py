@@ -0,0 +1,337 @@
+"""
+Slide Capture Engine — parallel, event-driven Playwright capture for video export
+
+- Slides are sharded across several browser pages (each with its own context) that
+  pull slide indexes from a shared queue.
+- Instead of a fixed sleep, each slide waits for an animation-complete signal:
+    1. `window.waitForSlideReady(index)` if the frontend provides it (Promise), else
+    2. all finite Web Animations / CSS animations on the page (`document.getAnimations()`)
+  bounded by a timeout (the old fixed wait).
+- Still screenshots are cached by the hash of the slide's rendered HTML, so slides that
+  did not change since the last export are not waited on / recaptured.
+- Every slide reports navigate / wait / capture timings.
+
+Frontend contract: `window.goToSlide(index)` (required), `window.waitForSlideReady(index)`
+and `window.getSlideHtml(index)` (optional).
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.services.artifact_cache import ArtifactCache, hash_inputs
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_PARALLEL_PAGES = int(os.getenv("SLIDE_CAPTURE_PARALLEL_PAGES", "4"))
+SLIDE_READY_TIMEOUT = float(os.getenv("SLIDE_READY_TIMEOUT", "6"))
+SLIDE_MIN_SETTLE = float(os.getenv("SLIDE_MIN_SETTLE", "0.3"))
+SLIDE_CAPTURE_CACHE_DIR = os.getenv(
+    "SLIDE_CAPTURE_CACHE_DIR", "/tmp/wordai_slide_capture_cache"
+)
+SLIDE_CAPTURE_CACHE_MAX_MB = int(os.getenv("SLIDE_CAPTURE_CACHE_MAX_MB", "2048"))
+
+# Bump when the screenshot for identical HTML changes (viewport, wait logic)
+CAPTURE_VERSION = "1"
+VIEWPORT = {"width": 1920, "height": 1080}
+
+_BROWSER_ARGS = ["--no-sandbox", "--disable-setuid-sandbox", "--disable-dev-shm-usage"]
+
+# Navigate, then wait two frames so the new slide is in the DOM and its animations registered
+_NAVIGATE_JS = """async (idx) => {
+    window.goToSlide(idx);
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+}"""
+
+# Animation-complete signal: frontend hook, else all finite animations on the page
+_WAIT_READY_JS = """async (idx) => {
+    if (typeof window.waitForSlideReady === "function") {
+        await window.waitForSlideReady(idx);
+        return "signal";
+    }
+    const animations = document.getAnimations ? document.getAnimations() : [];
+    const finite = animations.filter(a => {
+        const timing = a.effect && a.effect.getComputedTiming();
+        return timing && Number.isFinite(timing.endTime);
+    });
+    await Promise.all(finite.map(a => a.finished.catch(() => null)));
+    return "animations";
+}"""
+
+# Rendered slide HTML for the cache key. Inline styles stay in (style-only edits must
+# change the key) minus the properties animations drive while the slide enters
+_SLIDE_HTML_JS = """(idx) => {
+    if (typeof window.getSlideHtml === "function") return window.getSlideHtml(idx);
+    const root = document.querySelector('[data-slide-index="' + idx + '"]') || document.body;
+    const clone = root.cloneNode(true);
+    const animated = /^(transform|translate|rotate|scale|opacity|visibility|filter|clip-path|transition|animation|will-change)/;
+    const elements = clone.style ? [clone] : [];
+    clone.querySelectorAll("[style]").forEach(el => elements.push(el));
+    elements.forEach(el => {
+        Array.from(el.style).filter(p => animated.test(p)).forEach(p => el.style.removeProperty(p));
+        if (!el.style.length) el.removeAttribute("style");
+    });
+    return clone.outerHTML;
+}"""
+
+
+@dataclass
+class SlideTiming:
+    slide_index: int
+    page: int
+    navigate_ms: float = 0.0
+    wait_ms: float = 0.0
+    capture_ms: float = 0.0
+    ready: str = ""  # signal | animations | timeout | cached | fixed
+    cached: bool = False
+    frames: int = 0
+    error: Optional[str] = None
+
+
+def summarize_timings(timings: List[SlideTiming]) -> Dict[str, Any]:
+    """Aggregate per-slide timings for logs / job metadata"""
+    captured = [t for t in timings if not t.error]
+    waits = [t.wait_ms for t in captured if not t.cached]
+    return {
+        "slides": len(timings),
+        "failed": sum(1 for t in timings if t.error),
+        "cached": sum(1 for t in captured if t.cached),
+        "timeouts": sum(1 for t in captured if t.ready == "timeout"),
+        "avg_wait_ms": round(sum(waits) / len(waits), 1) if waits else 0.0,
+        "max_wait_ms": round(max(waits), 1) if waits else 0.0,
+        "avg_capture_ms": (
+            round(sum(t.capture_ms for t in captured) / len(captured), 1) if captured else 0.0
+        ),
+    }
+
+
+def _ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class SlideCaptureEngine:
+    """Captures slides of one public presentation with parallel pages"""
+
+    def __init__(
+        self,
+        presentation_url: str,
+        output_dir: Path,
+        parallel_pages: int = CAPTURE_PARALLEL_PAGES,
+        ready_timeout: float = SLIDE_READY_TIMEOUT,
+        cache: Optional[ArtifactCache] = None,
+        cache_scope: str = "",
+        on_progress: Optional[ProgressCallback] = None,
+    ):
+        """
+        Args:
+            presentation_url: Public presentation URL (exposes window.goToSlide)
+            output_dir: Where screenshots/frames are written
+            parallel_pages: Browser pages capturing concurrently
+            ready_timeout: Max seconds to wait for the animation-complete signal
+            cache: Screenshot cache (stills only); None disables skipping
+            cache_scope: Extra cache key part (e.g. public token)
+            on_progress: Awaited with (completed_slides, slide_count)
+        """
+        self.presentation_url = presentation_url
+        self.output_dir = output_dir
+        self.parallel_pages = max(1, parallel_pages)
+        self.ready_timeout = ready_timeout
+        self.cache = cache
+        self.cache_scope = cache_scope
+        self.on_progress = on_progress
+        self._completed = 0
+
+    # ── Page helpers ─────────────────────────────────────────────────────
+
+    async def _open_page(self, browser):
+        context = await browser.new_context(viewport=VIEWPORT, device_scale_factor=1)
+        page = await context.new_page()
+        await page.goto(self.presentation_url, wait_until="networkidle")
+        try:
+            await page.wait_for_function(
+                "typeof window.goToSlide === 'function'", timeout=15000
+            )
+        except Exception:
+            logger.warning("   ⚠️ window.goToSlide not found - frontend may not support export")
+        return context, page
+
+    async def _navigate(self, page, slide_idx: int, timing: SlideTiming):
+        start = time.perf_counter()
+        await page.evaluate(_NAVIGATE_JS, slide_idx)
+        timing.navigate_ms = _ms(start)
+
+    async def _wait_ready(self, page, slide_idx: int, timing: SlideTiming):
+        start = time.perf_counter()
+        try:
+            timing.ready = await asyncio.wait_for(
+                page.evaluate(_WAIT_READY_JS, slide_idx), timeout=self.ready_timeout
+            )
+        except asyncio.TimeoutError:
+            timing.ready = "timeout"
+        # Let the last animation frame paint
+        remaining = SLIDE_MIN_SETTLE - (time.perf_counter() - start)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        timing.wait_ms = _ms(start)
+
+    async def _slide_key(self, page, slide_idx: int) -> Optional[str]:
+        if self.cache is None:
+            return None
+        try:
+            html = await page.evaluate(_SLIDE_HTML_JS, slide_idx)
+        except Exception:
+            return None
+        if not html:
+            return None
+        html_hash = hashlib.sha256(str(html).encode()).hexdigest()
+        return hash_inputs("slide_still", CAPTURE_VERSION, VIEWPORT, self.cache_scope, html_hash)
+
+    async def _report_progress(self, slide_count: int):
+        self._completed += 1
+        if self.on_progress:
+            try:
+                await self.on_progress(self._completed, slide_count)
+            except Exception as e:
+                logger.warning(f"   ⚠️ Progress update failed: {e}")
+
+    async def _run(
+        self,
+        slide_count: int,
+        capture_slide: Callable[[Any, int, SlideTiming], Awaitable[None]],
+    ) -> List[SlideTiming]:
+        """Shard slides over parallel pages (work queue); returns timings by slide index"""
+        from playwright.async_api import async_playwright
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for slide_idx in range(slide_count):
+            queue.put_nowait(slide_idx)
+
+        timings: Dict[int, SlideTiming] = {}
+        n_pages = min(self.parallel_pages, max(1, slide_count))
+        self._completed = 0
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=_BROWSER_ARGS)
+            try:
+
+                async def page_worker(page_no: int):
+                    context, page = await self._open_page(browser)
+                    try:
+                        while True:
+                            try:
+                                slide_idx = queue.get_nowait()
+                            except asyncio.QueueEmpty:
+                                return
+                            timing = SlideTiming(slide_index=slide_idx, page=page_no)
+                            timings[slide_idx] = timing
+                            try:
+                                await capture_slide(page, slide_idx, timing)
+                            except Exception as e:
+                                timing.error = str(e)[:200]
+                                logger.error(f"   ❌ Failed to capture slide {slide_idx}: {e}")
+                            await self._report_progress(slide_count)
+                    finally:
+                        await context.close()
+
+                await asyncio.gather(*(page_worker(i) for i in range(n_pages)))
+            finally:
+                await browser.close()
+
+        return [timings[i] for i in sorted(timings)]
+
+    # ── Public API ───────────────────────────────────────────────────────
+
+    async def capture_stills(self, slide_count: int) -> Tuple[List[Path], List[SlideTiming]]:
+        """One PNG per slide after its animations complete (optimized export)"""
+        paths: Dict[int, Path] = {}
+
+        async def capture_slide(page, slide_idx: int, timing: SlideTiming):
+            screenshot_path = self.output_dir / f"slide_{slide_idx:03d}.png"
+            await self._navigate(page, slide_idx, timing)
+
+            key = await self._slide_key(page, slide_idx)
+            if key and self.cache.fetch("slide_still", key, ".png", screenshot_path):
+                timing.cached = True
+                timing.ready = "cached"
+                paths[slide_idx] = screenshot_path
+                logger.info(f"   ♻️  Slide {slide_idx + 1}/{slide_count}: unchanged (cached)")
+                return
+
+            await self._wait_ready(page, slide_idx, timing)
+
+            start = time.perf_counter()
+            await page.screenshot(path=str(screenshot_path), type="png", full_page=False)
+            timing.capture_ms = _ms(start)
+            paths[slide_idx] = screenshot_path
+
+            if key:
+                self.cache.store("slide_still", key, ".png", screenshot_path)
+
+            logger.info(
+                f"   ✅ Slide {slide_idx + 1}/{slide_count}: {screenshot_path.name} "
+                f"(wait {timing.wait_ms:.0f}ms/{timing.ready}, page {timing.page})"
+            )
+
+        timings = await self._run(slide_count, capture_slide)
+
+        if self.cache is not None:
+            try:
+                await asyncio.to_thread(self.cache.evict)
+            except Exception as e:
+                logger.warning(f"   ⚠️ Slide capture cache eviction failed: {e}")
+
+        return [paths[i] for i in sorted(paths)], timings
+
+    async def capture_animated(
+        self, slide_count: int, fps: int = 30, duration: int = 5
+    ) -> Tuple[Dict[int, List[Path]], List[SlideTiming]]:
+        """Record `duration` seconds of frames per slide at `fps` (animated export)"""
+        frames_per_slide = fps * duration
+        frame_interval = 1 / fps
+        slide_frames: Dict[int, List[Path]] = {}
+
+        async def capture_slide(page, slide_idx: int, timing: SlideTiming):
+            slide_frames[slide_idx] = []
+            # Navigation resolves once the new slide is painted (animation started)
+            await self._navigate(page, slide_idx, timing)
+            timing.ready = "fixed"
+
+            slide_dir = self.output_dir / f"slide_{slide_idx:03d}"
+            slide_dir.mkdir(parents=True, exist_ok=True)
+
+            frames = []
+            start = time.perf_counter()
+            for frame_idx in range(frames_per_slide):
+                frame_path = slide_dir / f"frame_{frame_idx:04d}.jpg"
+                # JPEG for 10x faster disk I/O (2-3MB PNG → 200-300KB JPEG)
+                await page.screenshot(
+                    path=str(frame_path), type="jpeg", quality=85, full_page=False
+                )
+                frames.append(frame_path)
+
+                # Maintain frame timing
+                sleep_time = (frame_idx + 1) * frame_interval - (time.perf_counter() - start)
+                if sleep_time > 0:
+                    await asyncio.sleep(sleep_time)
+
+            timing.capture_ms = _ms(start)
+            timing.frames = len(frames)
+            slide_frames[slide_idx] = frames
+            logger.info(
+                f"   ✅ Slide {slide_idx + 1}/{slide_count}: {len(frames)} frames (page {timing.page})"
+            )
+
+        timings = await self._run(slide_count, capture_slide)
+        return {i: slide_frames.get(i, []) for i in range(slide_count)}, timings
+
+
+def timings_as_dicts(timings: List[SlideTiming]) -> List[Dict[str, Any]]:
+    return [asdict(t) for t in timings]
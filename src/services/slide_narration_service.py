@@ -661,6 +661,7 @@ Generate the complete narration in {language_name} now:"""
                     language=language,
                     speaking_rate=speaking_rate,
                     use_pro_model=use_pro_model,
+                    cache_path="slide_narration",
                 )
 
                 # Upload to R2 and library_audio (same pattern as listening test)
@@ -1292,6 +1293,8 @@ Generate the complete narration in {language_name} now:"""
                         language=tts_language,  # Use BCP-47 code (e.g., "en-US")
                         voice_name=voice_name,
                         use_pro_model=use_pro_model,
+                        cache_path="slide_narration",
+                        use_cache=not force_regenerate,
                     )
                     break  # Success, exit retry loop
 
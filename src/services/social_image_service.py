@@ -16,6 +16,7 @@ import boto3
 from botocore.client import Config
 
 from src.services.gemini_image_service import GeminiImageService, GEMINI_MODEL
+from src.services.r2_object_cache import get_r2_object_cache
 from src.models.image_generation_models import ImageGenerationMetadata
 
 logger = logging.getLogger(__name__)
@@ -56,16 +57,24 @@ class SocialImageService:
         )
 
     async def _download_image_from_r2(self, r2_key: str):
-        """Download image from R2 and return as PIL Image."""
+        """Download image from R2 (shared disk cache) and return as PIL Image."""
         try:
             from PIL import Image as PILImage
 
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.s3_client.get_object(Bucket=self.r2_bucket, Key=r2_key),
-            )
-            image_bytes = response["Body"].read()
+            cache = get_r2_object_cache()
+            if cache:
+                image_bytes = await cache.aread_bytes(
+                    r2_key, bucket=self.r2_bucket, s3_client=self.s3_client
+                )
+            else:
+                loop = asyncio.get_event_loop()
+                response = await loop.run_in_executor(
+                    None,
+                    lambda: self.s3_client.get_object(
+                        Bucket=self.r2_bucket, Key=r2_key
+                    ),
+                )
+                image_bytes = response["Body"].read()
             return PILImage.open(BytesIO(image_bytes))
         except Exception as e:
             logger.warning(f"Failed to download asset from R2 ({r2_key}): {e}")
@@ -217,31 +217,28 @@ class SoftwareLabStorage:
         """
         Delete all files of a project from R2.
 
+        Pages through the whole prefix with batched DeleteObjects (the old
+        version only deleted the first 1000-key listing page).
+
         Args:
             project_id: Project ID
 
         Returns:
             Number of files deleted
         """
+        from src.services.r2_purge_service import R2PurgeService
+
         prefix = f"software-lab/{project_id}/"
 
         try:
-            # List all objects with prefix
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name, Prefix=prefix
-            )
-
-            if "Contents" not in response:
+            purger = R2PurgeService(s3_client=self.s3_client, bucket=self.bucket_name)
+            job_id = purger.create_prefix_job("software_lab_project", None, prefix)
+            job = purger.claim(job_id)
+            if job is None:
+                # The r2_purge_worker claimed the pending job first and runs it
                 return 0
-
-            # Delete all objects
-            objects = [{"Key": obj["Key"]} for obj in response["Contents"]]
-
-            self.s3_client.delete_objects(
-                Bucket=self.bucket_name, Delete={"Objects": objects}
-            )
-
-            return len(objects)
+            result = purger.run(job)
+            return result.get("deleted_objects", 0) if result else 0
 
         except Exception as e:
             print(f"Error deleting project files for {project_id}: {e}")
@@ -10,6 +10,7 @@ from datetime import datetime, timezone
 
 from src.database.db_manager import DBManager
 from src.services.studyhub_permissions import StudyHubPermissions
+from src.services.studyhub_progress_counters import StudyHubProgressCounters
 
 
 class StudyHubContentManager:
@@ -20,6 +21,7 @@ class StudyHubContentManager:
         self.db = db or self.db_manager.db
         self.user_id = user_id
         self.permissions = StudyHubPermissions()
+        self.progress_counters = StudyHubProgressCounters(self.db)
 
     # ==================== DOCUMENT CONTENT ====================
 
@@ -82,6 +84,7 @@ class StudyHubContentManager:
 
         result = self.db.studyhub_module_contents.insert_one(content_doc)
         content_doc["_id"] = result.inserted_id
+        self.progress_counters.content_added(content_doc["module_id"])
 
         # Update studyhub_context in original document
         await self.permissions.update_content_studyhub_context(
@@ -227,6 +230,7 @@ class StudyHubContentManager:
 
         # Delete content record
         self.db.studyhub_module_contents.delete_one({"_id": ObjectId(content_id)})
+        self.progress_counters.content_removed(content["module_id"], content["_id"])
 
         return True
 
@@ -319,6 +323,7 @@ class StudyHubContentManager:
 
         result = self.db.studyhub_module_contents.insert_one(content_doc)
         content_doc["_id"] = result.inserted_id
+        self.progress_counters.content_added(content_doc["module_id"])
 
         return content_doc
 
@@ -421,6 +426,7 @@ class StudyHubContentManager:
             )
 
         self.db.studyhub_module_contents.delete_one({"_id": ObjectId(content_id)})
+        self.progress_counters.content_removed(content["module_id"], content["_id"])
         return True
 
     # ==================== BOOK CONTENT ====================
@@ -467,6 +473,7 @@ class StudyHubContentManager:
 
         result = self.db.studyhub_module_contents.insert_one(content_doc)
         content_doc["_id"] = result.inserted_id
+        self.progress_counters.content_added(content_doc["module_id"])
 
         await self.permissions.update_content_studyhub_context(
             collection_name="online_books",
@@ -577,6 +584,7 @@ class StudyHubContentManager:
             )
 
         self.db.studyhub_module_contents.delete_one({"_id": ObjectId(content_id)})
+        self.progress_counters.content_removed(content["module_id"], content["_id"])
         return True
 
     # ==================== FILE CONTENT ====================
@@ -664,6 +672,7 @@ class StudyHubContentManager:
 
         result = self.db.studyhub_module_contents.insert_one(content_doc)
         content_doc["_id"] = result.inserted_id
+        self.progress_counters.content_added(content_doc["module_id"])
 
         # Update studyhub_context in file
         await self.permissions.update_content_studyhub_context(
@@ -749,4 +758,5 @@ class StudyHubContentManager:
             )
 
         self.db.studyhub_module_contents.delete_one({"_id": ObjectId(content_id)})
+        self.progress_counters.content_removed(content["module_id"], content["_id"])
         return True
@@ -7,6 +7,7 @@ from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
 from fastapi import HTTPException
+from pymongo import ReturnDocument
 
 from src.database.db_manager import DBManager
 from src.models.studyhub_models import (
@@ -22,6 +23,7 @@ from src.models.studyhub_models import (
     ActivityItem,
     RecentActivityResponse,
 )
+from src.services.studyhub_progress_counters import StudyHubProgressCounters
 
 
 class StudyHubEnrollmentManager:
@@ -30,6 +32,7 @@ class StudyHubEnrollmentManager:
     def __init__(self):
         self.db_manager = DBManager()
         self.db = self.db_manager.db
+        self.progress_counters = StudyHubProgressCounters(self.db)
 
     # ==================== ENROLLMENT OPERATIONS ====================
 
@@ -170,9 +173,9 @@ class StudyHubEnrollmentManager:
             if not subject:
                 continue
 
-            # Calculate progress
+            # Calculate progress (counter lookup)
             progress = await self._calculate_progress(
-                user_id, str(enrollment["subject_id"])
+                user_id, str(enrollment["subject_id"]), subject=subject
             )
 
             enrollment_list.append(
@@ -396,7 +399,7 @@ class StudyHubEnrollmentManager:
                 "created_at": now,
                 "updated_at": now,
             }
-            self.db.studyhub_learning_progress.update_one(
+            previous = self.db.studyhub_learning_progress.find_one_and_update(
                 {
                     "user_id": user_id,
                     "subject_id": ObjectId(subject_id),
@@ -404,8 +407,14 @@ class StudyHubEnrollmentManager:
                     "content_id": ObjectId(content_id),
                 },
                 {"$set": progress_doc},
+                projection={"status": 1},
                 upsert=True,
+                return_document=ReturnDocument.BEFORE,
             )
+            if not previous or previous.get("status") != "completed":
+                self.progress_counters.record_transition(
+                    user_id, subject_id, module_id, 1
+                )
         elif module_id:
             # Mark all contents in module as complete
             contents = list(
@@ -413,6 +422,7 @@ class StudyHubEnrollmentManager:
                     {"module_id": ObjectId(module_id), "deleted_at": None}
                 )
             )
+            newly_completed = 0
             for content in contents:
                 progress_doc = {
                     "user_id": user_id,
@@ -424,7 +434,7 @@ class StudyHubEnrollmentManager:
                     "created_at": now,
                     "updated_at": now,
                 }
-                self.db.studyhub_learning_progress.update_one(
+                previous = self.db.studyhub_learning_progress.find_one_and_update(
                     {
                         "user_id": user_id,
                         "subject_id": ObjectId(subject_id),
@@ -432,8 +442,15 @@ class StudyHubEnrollmentManager:
                         "content_id": content["_id"],
                     },
                     {"$set": progress_doc},
+                    projection={"status": 1},
                     upsert=True,
+                    return_document=ReturnDocument.BEFORE,
                 )
+                if not previous or previous.get("status") != "completed":
+                    newly_completed += 1
+            self.progress_counters.record_transition(
+                user_id, subject_id, module_id, newly_completed
+            )
 
         # Update last accessed
         self.db.studyhub_enrollments.update_one(
@@ -471,22 +488,32 @@ class StudyHubEnrollmentManager:
 
         if content_id:
             # Delete progress record
-            self.db.studyhub_learning_progress.delete_one(
+            removed = self.db.studyhub_learning_progress.find_one_and_delete(
                 {
                     "user_id": user_id,
                     "subject_id": ObjectId(subject_id),
                     "module_id": ObjectId(module_id),
                     "content_id": ObjectId(content_id),
-                }
+                },
+                projection={"status": 1},
             )
+            if removed and removed.get("status") == "completed":
+                self.progress_counters.record_transition(
+                    user_id, subject_id, module_id, -1
+                )
         elif module_id:
-            # Delete all content progress in module
-            self.db.studyhub_learning_progress.delete_many(
-                {
-                    "user_id": user_id,
-                    "subject_id": ObjectId(subject_id),
-                    "module_id": ObjectId(module_id),
-                }
+            # Delete all content progress in module (completed first, to count them)
+            module_filter = {
+                "user_id": user_id,
+                "subject_id": ObjectId(subject_id),
+                "module_id": ObjectId(module_id),
+            }
+            completed = self.db.studyhub_learning_progress.delete_many(
+                {**module_filter, "status": "completed"}
+            ).deleted_count
+            self.db.studyhub_learning_progress.delete_many(module_filter)
+            self.progress_counters.record_transition(
+                user_id, subject_id, module_id, -completed
             )
 
         # Update enrollment status back to active if was completed
@@ -592,15 +619,24 @@ class StudyHubEnrollmentManager:
 
         progress["updated_at"] = now
 
-        # Upsert progress
-        self.db.studyhub_learning_progress.update_one(
+        # Upsert progress (the previous status decides the counter transition,
+        # so concurrent trackers count a completion once)
+        previous = self.db.studyhub_learning_progress.find_one_and_update(
             {
                 "user_id": user_id,
                 "content_id": ObjectId(content_id),
             },
             {"$set": progress},
+            projection={"status": 1},
             upsert=True,
+            return_document=ReturnDocument.BEFORE,
         )
+        if progress["status"] == "completed" and (
+            not previous or previous.get("status") != "completed"
+        ):
+            self.progress_counters.record_transition(
+                user_id, progress["subject_id"], progress["module_id"], 1
+            )
 
         # Update enrollment last_accessed_at
         self.db.studyhub_enrollments.update_one(
@@ -877,31 +913,8 @@ class StudyHubEnrollmentManager:
         }
 
     async def _calculate_module_progress(self, user_id: str, module_id: str) -> float:
-        """Calculate module completion percentage"""
-        # Get all contents in module
-        contents = list(
-            self.db.studyhub_module_contents.find(
-                {"module_id": ObjectId(module_id), "deleted_at": None}
-            )
-        )
-
-        if not contents:
-            return 0.0
-
-        # Count completed contents
-        completed = 0
-        for content in contents:
-            progress = self.db.studyhub_learning_progress.find_one(
-                {
-                    "user_id": user_id,
-                    "content_id": content["_id"],
-                    "status": "completed",
-                }
-            )
-            if progress:
-                completed += 1
-
-        return completed / len(contents) if contents else 0.0
+        """Calculate module completion percentage (counter lookup)"""
+        return self.progress_counters.module_progress(user_id, module_id)
 
     # ==================== LEARNER MANAGEMENT ====================
 
@@ -928,15 +941,27 @@ class StudyHubEnrollmentManager:
             ).sort("enrolled_at", -1)
         )
 
+        # Batch user info and progress counters (one query each, not per learner)
+        users = {
+            u["_id"]: u
+            for u in self.db.users.find(
+                {"_id": {"$in": [e["user_id"] for e in enrollments]}},
+                {"display_name": 1, "avatar_url": 1},
+            )
+        }
+        counters = self.progress_counters.get_counters(
+            [str(e["user_id"]) for e in enrollments], subject_id
+        )
+        total_contents = self.progress_counters.subject_total(subject_id, subject)
+
         learners = []
         for enrollment in enrollments:
             user_id = str(enrollment["user_id"])
-
-            # Get user info
-            user = self.db.users.find_one({"_id": enrollment["user_id"]})
-
-            # Calculate progress
-            progress = await self._calculate_progress(user_id, subject_id)
+            user = users.get(enrollment["user_id"])
+            completed = counters.get(user_id, {}).get("completed_contents", 0)
+            progress = (
+                min(completed / total_contents, 1.0) if total_contents > 0 else 0.0
+            )
 
             learners.append(
                 SubjectLearnerItem(
@@ -1061,33 +1086,15 @@ class StudyHubEnrollmentManager:
 
     # ==================== HELPER METHODS ====================
 
-    async def _calculate_progress(self, user_id: str, subject_id: str) -> float:
-        """Calculate progress percentage for subject"""
-        # Get total contents
-        total_contents = self.db.studyhub_module_contents.count_documents(
-            {
-                "module_id": {
-                    "$in": [
-                        m["_id"]
-                        for m in self.db.studyhub_modules.find(
-                            {"subject_id": ObjectId(subject_id), "deleted_at": None}
-                        )
-                    ]
-                },
-                "deleted_at": None,
-            }
+    async def _calculate_progress(
+        self, user_id: str, subject_id: str, subject: Optional[dict] = None
+    ) -> float:
+        """Calculate progress percentage for subject (counter lookup)"""
+        completed, total_contents = self.progress_counters.subject_progress(
+            user_id, subject_id, subject
         )
 
         if total_contents == 0:
             return 0.0
 
-        # Get completed contents
-        completed_contents = self.db.studyhub_learning_progress.count_documents(
-            {
-                "user_id": user_id,
-                "subject_id": ObjectId(subject_id),
-                "status": "completed",
-            }
-        )
-
-        return completed_contents / total_contents
+        return min(completed / total_contents, 1.0)
@@ -13,6 +13,7 @@ from src.models.studyhub_models import (
     ModuleContentResponse,
     ContentType,
 )
+from src.services.studyhub_progress_counters import StudyHubProgressCounters
 
 logger = logging.getLogger("chatbot")
 
@@ -34,6 +35,7 @@ class StudyHubModuleManager:
         self.modules = db["studyhub_modules"]
         self.contents = db["studyhub_module_contents"]
         self.enrollments = db["studyhub_enrollments"]
+        self.progress_counters = StudyHubProgressCounters(db)
 
     def _to_object_id(self, id_str: str) -> ObjectId:
         """Convert string to ObjectId"""
@@ -242,10 +244,11 @@ class StudyHubModuleManager:
             return False
 
         # Delete all contents
-        self.contents.delete_many({"module_id": module_oid})
+        removed = self.contents.delete_many({"module_id": module_oid})
 
         # Delete module
         self.modules.delete_one({"_id": module_oid})
+        self.progress_counters.module_removed(module, removed.deleted_count)
 
         # Re-index remaining modules
         remaining_modules = list(
@@ -391,6 +394,7 @@ class StudyHubModuleManager:
 
         # Update module
         self.modules.update_one({"_id": module_oid}, {"$set": {"updated_at": now}})
+        self.progress_counters.content_added(module_oid)
 
         logger.info(f"Added content {result.inserted_id} to module {module_id}")
 
@@ -465,6 +469,7 @@ class StudyHubModuleManager:
 
         # Delete content
         self.contents.delete_one({"_id": content_oid})
+        self.progress_counters.content_removed(module_oid, content_oid)
 
         # Re-index remaining contents
         remaining_contents = list(
@@ -0,0 +1,395 @@
+"""
+StudyHub Progress Counters
+Incrementally maintained completion counters for StudyHub learning progress
+
+Progress used to be recomputed on every read: one `studyhub_learning_progress`
+lookup per module content, a re-count of all contents of the subject, and for
+an instructor's learner page one `users.find_one` + full recount per learner.
+
+Now completion transitions keep counters up to date:
+
+- `studyhub_progress_counters` - one document per (user, subject):
+  {user_id, subject_id, completed_contents, modules: {"<module_id>": n}}
+  updated with a single atomic $inc when a content flips to/from "completed"
+- content totals cached on the content tree: `studyhub_modules.total_contents`
+  and `studyhub_subjects.metadata.total_contents`, updated when contents are
+  added or removed
+
+Counters are only incremented when they exist (no upsert); a missing counter or
+total is seeded from the source collections on first read. Removing a content
+or module also removes its progress records, so a counter always equals the
+number of "completed" progress records of live contents.
+
+Rebuild / check: python scripts/backfill_studyhub_progress_counters.py --check
+
+Usage:
+    counters = StudyHubProgressCounters(db)
+    counters.record_transition(user_id, subject_oid, module_oid, +1)
+    completed, total = counters.subject_progress(user_id, subject_id)
+    counters.content_added(module_oid)
+    counters.content_removed(module_oid, content_oid)
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+logger = logging.getLogger("chatbot")
+
+COUNTERS_COLLECTION = "studyhub_progress_counters"
+
+
+def _oid(value) -> ObjectId:
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+class StudyHubProgressCounters:
+    """Per-(user, subject) and per-(user, module) completion counters"""
+
+    def __init__(self, db):
+        self.db = db
+        self.counters = db[COUNTERS_COLLECTION]
+        self.progress = db["studyhub_learning_progress"]
+        self.modules = db["studyhub_modules"]
+        self.contents = db["studyhub_module_contents"]
+        self.subjects = db["studyhub_subjects"]
+
+    # ==================== COMPLETION TRANSITIONS ====================
+
+    def record_transition(
+        self, user_id: str, subject_id, module_id, delta: int
+    ) -> None:
+        """
+        Apply `delta` completed contents of one module (after a status flip)
+
+        Args:
+            user_id: Learner ID
+            subject_id: Subject ID
+            module_id: Module ID
+            delta: +n when contents became completed, -n when they stopped being
+        """
+        if not delta:
+            return
+        self.counters.update_one(
+            {"user_id": user_id, "subject_id": _oid(subject_id)},
+            {
+                "$inc": {
+                    "completed_contents": delta,
+                    f"modules.{module_id}": delta,
+                },
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+            },
+        )
+
+    # ==================== CONTENT TREE CHANGES ====================
+
+    def content_added(self, module_id, count: int = 1) -> None:
+        """Update cached totals after contents were inserted into a module"""
+        module = self.modules.find_one({"_id": _oid(module_id)}, {"subject_id": 1})
+        if module:
+            self._inc_totals(module["_id"], module["subject_id"], count)
+
+    def content_removed(self, module_id, content_id) -> None:
+        """
+        Update totals and learner counters after a content was deleted,
+        and drop its (now orphaned) progress records
+        """
+        module = self.modules.find_one({"_id": _oid(module_id)}, {"subject_id": 1})
+        if not module:
+            return
+        content_oid = _oid(content_id)
+        completed_by = self.progress.distinct(
+            "user_id", {"content_id": content_oid, "status": "completed"}
+        )
+        if completed_by:
+            self.counters.update_many(
+                {"subject_id": module["subject_id"], "user_id": {"$in": completed_by}},
+                {
+                    "$inc": {
+                        "completed_contents": -1,
+                        f"modules.{module['_id']}": -1,
+                    }
+                },
+            )
+        self.progress.delete_many({"content_id": content_oid})
+        self._inc_totals(module["_id"], module["subject_id"], -1)
+
+    def module_removed(self, module: Dict[str, Any], removed_contents: int) -> None:
+        """
+        Update subject total and learner counters after a module (and its
+        contents) was deleted
+
+        Args:
+            module: The deleted module document (needs _id and subject_id)
+            removed_contents: Number of contents deleted with it
+        """
+        module_id = module["_id"]
+        per_user = self.progress.aggregate(
+            [
+                {"$match": {"module_id": module_id, "status": "completed"}},
+                {"$group": {"_id": "$user_id", "n": {"$sum": 1}}},
+            ]
+        )
+        ops = [
+            UpdateOne(
+                {"user_id": row["_id"], "subject_id": module["subject_id"]},
+                {
+                    "$inc": {"completed_contents": -row["n"]},
+                    "$unset": {f"modules.{module_id}": ""},
+                },
+            )
+            for row in per_user
+        ]
+        if ops:
+            self.counters.bulk_write(ops, ordered=False)
+        self.progress.delete_many({"module_id": module_id})
+        if removed_contents:
+            self.subjects.update_one(
+                {
+                    "_id": module["subject_id"],
+                    "metadata.total_contents": {"$exists": True},
+                },
+                {"$inc": {"metadata.total_contents": -removed_contents}},
+            )
+
+    def _inc_totals(self, module_oid: ObjectId, subject_oid: ObjectId, delta: int):
+        # Totals not seeded yet are left alone (seeded from a count on first read)
+        self.modules.update_one(
+            {"_id": module_oid, "total_contents": {"$exists": True}},
+            {"$inc": {"total_contents": delta}},
+        )
+        self.subjects.update_one(
+            {"_id": subject_oid, "metadata.total_contents": {"$exists": True}},
+            {"$inc": {"metadata.total_contents": delta}},
+        )
+
+    # ==================== READS ====================
+
+    def subject_total(self, subject_id, subject: Optional[Dict] = None) -> int:
+        """Live contents of a subject (cached on the subject document)"""
+        if subject is None:
+            subject = self.subjects.find_one(
+                {"_id": _oid(subject_id)}, {"metadata.total_contents": 1}
+            )
+        total = ((subject or {}).get("metadata") or {}).get("total_contents")
+        if total is None:
+            total = self._count_subject_contents(_oid(subject_id))
+            self.subjects.update_one(
+                {"_id": _oid(subject_id), "metadata.total_contents": {"$exists": False}},
+                {"$set": {"metadata.total_contents": total}},
+            )
+        return max(total, 0)
+
+    def module_total(self, module: Dict[str, Any]) -> int:
+        """Live contents of a module (cached on the module document)"""
+        total = module.get("total_contents")
+        if total is None:
+            total = self.contents.count_documents(
+                {"module_id": module["_id"], "deleted_at": None}
+            )
+            self.modules.update_one(
+                {"_id": module["_id"], "total_contents": {"$exists": False}},
+                {"$set": {"total_contents": total}},
+            )
+        return max(total, 0)
+
+    def get_counters(
+        self, user_ids: Iterable[str], subject_id
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Counter documents of many learners of one subject (seeded when missing)
+
+        Returns:
+            {user_id: {"completed_contents": n, "modules": {module_id: n}}}
+        """
+        subject_oid = _oid(subject_id)
+        user_ids = list(user_ids)
+        found = {
+            doc["user_id"]: doc
+            for doc in self.counters.find(
+                {"subject_id": subject_oid, "user_id": {"$in": user_ids}},
+                {"user_id": 1, "completed_contents": 1, "modules": 1},
+            )
+        }
+        missing = [u for u in user_ids if u not in found]
+        if missing:
+            found.update(self.seed(missing, subject_oid))
+        return found
+
+    def subject_progress(
+        self, user_id: str, subject_id, subject: Optional[Dict] = None
+    ) -> Tuple[int, int]:
+        """(completed_contents, total_contents) of one learner"""
+        counter = self.get_counters([user_id], subject_id)[user_id]
+        total = self.subject_total(subject_id, subject)
+        return counter.get("completed_contents", 0), total
+
+    def module_progress(self, user_id: str, module_id) -> float:
+        """Completed fraction of one module"""
+        module = self.modules.find_one(
+            {"_id": _oid(module_id)}, {"subject_id": 1, "total_contents": 1}
+        )
+        if not module:
+            return 0.0
+        total = self.module_total(module)
+        if total == 0:
+            return 0.0
+        counter = self.get_counters([user_id], module["subject_id"])[user_id]
+        completed = (counter.get("modules") or {}).get(str(module["_id"]), 0)
+        return min(completed / total, 1.0)
+
+    # ==================== SEED / REBUILD / CHECK ====================
+
+    def _live_contents(self, subject_oid: ObjectId) -> Dict[ObjectId, List[ObjectId]]:
+        """{module_id: [content_id]} of the live content tree of a subject"""
+        module_ids = [
+            m["_id"]
+            for m in self.modules.find(
+                {"subject_id": subject_oid, "deleted_at": None}, {"_id": 1}
+            )
+        ]
+        tree = {m: [] for m in module_ids}
+        for c in self.contents.find(
+            {"module_id": {"$in": module_ids}, "deleted_at": None},
+            {"module_id": 1},
+        ):
+            tree[c["module_id"]].append(c["_id"])
+        return tree
+
+    def _count_subject_contents(self, subject_oid: ObjectId) -> int:
+        return sum(len(c) for c in self._live_contents(subject_oid).values())
+
+    def compute(
+        self, subject_oid: ObjectId, user_ids: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Counters recomputed from progress records of live contents
+
+        Args:
+            subject_oid: Subject ID
+            user_ids: Only these learners (all learners with progress if None)
+        """
+        live = {
+            content_id: module_id
+            for module_id, content_ids in self._live_contents(subject_oid).items()
+            for content_id in content_ids
+        }
+        match: Dict[str, Any] = {"subject_id": subject_oid, "status": "completed"}
+        if user_ids is not None:
+            match["user_id"] = {"$in": user_ids}
+
+        result: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {"completed_contents": 0, "modules": {}}
+        )
+        for user_id in user_ids or []:
+            result[user_id]  # learners without completions get zero counters
+        seen = set()
+        for record in self.progress.find(match, {"user_id": 1, "content_id": 1}):
+            module_id = live.get(record.get("content_id"))
+            key = (record["user_id"], record.get("content_id"))
+            if module_id is None or key in seen:
+                continue
+            seen.add(key)
+            counter = result[record["user_id"]]
+            counter["completed_contents"] += 1
+            modules = counter["modules"]
+            modules[str(module_id)] = modules.get(str(module_id), 0) + 1
+        return dict(result)
+
+    def seed(self, user_ids: List[str], subject_oid: ObjectId) -> Dict[str, Dict]:
+        """Create missing counter documents from progress records"""
+        computed = self.compute(subject_oid, user_ids)
+        now = datetime.now(timezone.utc)
+        self.counters.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id, "subject_id": subject_oid},
+                    {"$setOnInsert": {**counter, "updated_at": now}},
+                    upsert=True,
+                )
+                for user_id, counter in computed.items()
+            ],
+            ordered=False,
+        )
+        return computed
+
+    def rebuild_subject(self, subject_id, fix: bool = True) -> Dict[str, int]:
+        """
+        Recompute totals and every learner's counters of a subject
+
+        Args:
+            subject_id: Subject ID
+            fix: Overwrite stored values (False = only report mismatches)
+
+        Returns:
+            {"learners", "counter_mismatches", "total_mismatches"}
+        """
+        subject_oid = _oid(subject_id)
+        tree = self._live_contents(subject_oid)
+        stats = {"learners": 0, "counter_mismatches": 0, "total_mismatches": 0}
+
+        # Totals
+        subject = self.subjects.find_one({"_id": subject_oid}, {"metadata": 1}) or {}
+        total = sum(len(c) for c in tree.values())
+        if (subject.get("metadata") or {}).get("total_contents") != total:
+            stats["total_mismatches"] += 1
+            if fix:
+                self.subjects.update_one(
+                    {"_id": subject_oid}, {"$set": {"metadata.total_contents": total}}
+                )
+        for module in self.modules.find(
+            {"_id": {"$in": list(tree)}}, {"total_contents": 1}
+        ):
+            if module.get("total_contents") != len(tree[module["_id"]]):
+                stats["total_mismatches"] += 1
+                if fix:
+                    self.modules.update_one(
+                        {"_id": module["_id"]},
+                        {"$set": {"total_contents": len(tree[module["_id"]])}},
+                    )
+
+        # Learner counters (everyone with progress or a stored counter)
+        stored = {
+            doc["user_id"]: doc
+            for doc in self.counters.find({"subject_id": subject_oid})
+        }
+        user_ids = list(
+            set(stored) | set(self.progress.distinct("user_id", {"subject_id": subject_oid}))
+        )
+        computed = self.compute(subject_oid, user_ids)
+        now = datetime.now(timezone.utc)
+        ops = []
+        for user_id in user_ids:
+            expected = computed[user_id]
+            current = stored.get(user_id) or {}
+            current_modules = {
+                k: v for k, v in (current.get("modules") or {}).items() if v
+            }
+            if (
+                current.get("completed_contents") == expected["completed_contents"]
+                and current_modules == expected["modules"]
+            ):
+                continue
+            stats["counter_mismatches"] += 1
+            ops.append(
+                UpdateOne(
+                    {"user_id": user_id, "subject_id": subject_oid},
+                    {"$set": {**expected, "updated_at": now}},
+                    upsert=True,
+                )
+            )
+        if fix and ops:
+            self.counters.bulk_write(ops, ordered=False)
+        stats["learners"] = len(user_ids)
+
+        if stats["counter_mismatches"] or stats["total_mismatches"]:
+            logger.warning(
+                f"⚠️ [STUDYHUB_COUNTERS] Subject {subject_id}: "
+                f"{stats['counter_mismatches']} learner / {stats['total_mismatches']} "
+                f"total mismatches{' fixed' if fix else ''}"
+            )
+        return stats
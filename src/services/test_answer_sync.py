@@ -0,0 +1,389 @@
+"""
+Test Answer Sync - Delta protocol for online test auto-save
+
+Clients send per-question patches instead of the full answer map:
+
+    save_answers_delta {
+        session_id: str,
+        patches: [
+            {"question_id": "q1", "version": 3, "answer": {"question_type": "mcq", ...}},
+            {"question_id": "q7", "version": 12, "answer": {"question_type": "essay", ...}},
+            {"question_id": "q2", "version": 5, "deleted": true}
+        ]
+    }
+
+- `version` is a per-question counter owned by the client (monotonic). Patches with a
+  version <= the last accepted one are stale and ignored, so out-of-order or replayed
+  saves never overwrite newer answers.
+- Accepted patches are buffered and coalesced: one MongoDB write per session per
+  flush interval, using `$set`/`$unset` on the changed `current_answers.<qid>` paths only.
+- Persisted versions are stored in `test_progress.answer_versions` so a reconnecting
+  client (or another API replica) resumes from the right base versions.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ANSWER_FLUSH_INTERVAL_SECONDS = float(os.getenv("TEST_ANSWER_FLUSH_INTERVAL", "2.0"))
+
+
+def normalize_answer(question_id: str, answer_data: Any) -> Optional[Dict[str, Any]]:
+    """
+    Normalize one answer (supports object format and legacy string format)
+
+    Returns:
+        Normalized answer dict, or None if the format is invalid
+    """
+    if isinstance(answer_data, str):
+        # Legacy: simple string = MCQ answer key
+        return {"question_type": "mcq", "selected_answer_keys": [answer_data]}
+
+    if not isinstance(answer_data, dict):
+        logger.warning(f"Invalid answer format for {question_id}: {type(answer_data)}")
+        return None
+
+    q_type = answer_data.get("question_type", "mcq")
+
+    if q_type == "mcq":
+        # Normalize MCQ answers to use selected_answer_keys array
+        if "selected_answer_keys" not in answer_data and "selected_answer_key" in answer_data:
+            return {
+                "question_type": "mcq",
+                "selected_answer_keys": [answer_data["selected_answer_key"]],
+            }
+        return answer_data
+
+    if q_type not in (
+        "matching",
+        "map_labeling",
+        "completion",
+        "sentence_completion",
+        "short_answer",
+        "true_false_multiple",
+        "essay",
+    ):
+        logger.warning(f"Unknown question_type '{q_type}' for {question_id}")
+
+    return answer_data
+
+
+def _is_valid_question_id(question_id: Any) -> bool:
+    """Question ids become MongoDB field paths - reject anything that could escape"""
+    return (
+        isinstance(question_id, str)
+        and bool(question_id)
+        and "." not in question_id
+        and not question_id.startswith("$")
+    )
+
+
+def _answer_digest(answer: Dict[str, Any]) -> str:
+    return hashlib.blake2b(
+        json.dumps(answer, sort_keys=True, default=str).encode(), digest_size=12
+    ).hexdigest()
+
+
+@dataclass
+class _SessionState:
+    """Per-session sync state (digests only - answers are not kept in memory)"""
+
+    versions: Dict[str, int] = field(default_factory=dict)  # last accepted version
+    digests: Dict[str, str] = field(default_factory=dict)  # last persisted content
+    pending_sets: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    pending_unsets: Set[str] = field(default_factory=set)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending_sets or self.pending_unsets)
+
+
+FlushCallback = Callable[[str, Dict[str, int], bool], Awaitable[None]]
+
+
+class AnswerSyncBuffer:
+    """Buffers answer patches per session and flushes them as path-level updates"""
+
+    def __init__(
+        self,
+        collection_getter: Callable[[], Any],
+        flush_interval: float = ANSWER_FLUSH_INTERVAL_SECONDS,
+        on_flush: Optional[FlushCallback] = None,
+    ):
+        """
+        Args:
+            collection_getter: Returns the (pymongo) test_progress collection
+            flush_interval: Seconds between coalesced writes
+            on_flush: Called with (session_id, persisted_versions, ok) after each write
+        """
+        self._collection_getter = collection_getter
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.sessions: Dict[str, _SessionState] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Write-volume counters (exposed for monitoring)
+        self.stats = {"patches_received": 0, "patches_stale": 0, "writes": 0, "paths_written": 0}
+
+    # ------------------------------------------------------------------
+    # Session lifecycle
+    # ------------------------------------------------------------------
+
+    def load_session(self, session_id: str, progress_doc: Dict[str, Any]) -> Dict[str, int]:
+        """Initialize state from the test_progress document (on join)"""
+        state = _SessionState(
+            versions={
+                qid: int(v) for qid, v in (progress_doc.get("answer_versions") or {}).items()
+            },
+            digests={
+                qid: _answer_digest(answer)
+                for qid, answer in (progress_doc.get("current_answers") or {}).items()
+                if isinstance(answer, dict)
+            },
+        )
+        previous = self.sessions.get(session_id)
+        if previous and previous.dirty:
+            # Rejoin before the last flush - keep the buffered patches
+            state.versions.update(previous.versions)
+            state.pending_sets = previous.pending_sets
+            state.pending_unsets = previous.pending_unsets
+        self.sessions[session_id] = state
+        self._ensure_flush_loop()
+        return dict(state.versions)
+
+    async def close_session(self, session_id: str):
+        """Flush pending patches and drop the session state (leave/disconnect)"""
+        await self.flush_session(session_id)
+        self.sessions.pop(session_id, None)
+
+    # ------------------------------------------------------------------
+    # Staging
+    # ------------------------------------------------------------------
+
+    def apply_patches(self, session_id: str, patches: Any) -> Tuple[Dict[str, int], Dict[str, Any]]:
+        """
+        Stage versioned patches.
+
+        Returns:
+            (applied {qid: version}, rejected {qid: reason or current server version})
+        """
+        state = self.sessions.get(session_id)
+        if state is None:
+            raise KeyError(session_id)
+
+        applied: Dict[str, int] = {}
+        rejected: Dict[str, Any] = {}
+
+        for patch in patches or []:
+            if not isinstance(patch, dict):
+                continue
+            question_id = patch.get("question_id")
+            if not _is_valid_question_id(question_id):
+                rejected[str(question_id)] = "invalid_question_id"
+                continue
+
+            try:
+                version = int(patch.get("version"))
+            except (TypeError, ValueError):
+                rejected[question_id] = "invalid_version"
+                continue
+
+            self.stats["patches_received"] += 1
+            current = state.versions.get(question_id, 0)
+            if version <= current:
+                self.stats["patches_stale"] += 1
+                rejected[question_id] = current
+                continue
+
+            if patch.get("deleted"):
+                state.pending_sets.pop(question_id, None)
+                state.pending_unsets.add(question_id)
+            else:
+                answer = normalize_answer(question_id, patch.get("answer"))
+                if answer is None:
+                    rejected[question_id] = "invalid_answer"
+                    continue
+                state.pending_unsets.discard(question_id)
+                state.pending_sets[question_id] = answer
+
+            state.versions[question_id] = version
+            applied[question_id] = version
+
+        return applied, rejected
+
+    def stage_answer(
+        self, session_id: str, question_id: str, answer: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Stage a single-answer save (save_answer) with a server-side version bump.
+
+        Replaces any patch still pending for the question, so an older buffered
+        delta can never be flushed over it.
+
+        Returns:
+            The question's new version, or None if the session is not loaded
+            (caller should fall back to a direct write)
+        """
+        state = self.sessions.get(session_id)
+        if state is None or not _is_valid_question_id(question_id):
+            return None
+
+        state.pending_unsets.discard(question_id)
+        state.pending_sets[question_id] = answer
+        state.versions[question_id] = state.versions.get(question_id, 0) + 1
+        return state.versions[question_id]
+
+    def stage_full_map(self, session_id: str, answers: Dict[str, Any]) -> Optional[int]:
+        """
+        Stage a legacy full-map save as a diff against the last persisted content.
+
+        Versions are bumped server-side for every changed question.
+
+        Returns:
+            Number of changed question paths, or None if the session is not loaded
+            (caller should fall back to a full overwrite)
+        """
+        state = self.sessions.get(session_id)
+        if state is None:
+            return None
+
+        normalized = {}
+        for question_id, answer_data in (answers or {}).items():
+            if not _is_valid_question_id(question_id):
+                continue
+            answer = normalize_answer(question_id, answer_data)
+            if answer is not None:
+                normalized[question_id] = answer
+
+        changed = 0
+        for question_id, answer in normalized.items():
+            if state.digests.get(question_id) != _answer_digest(answer) or question_id in state.pending_unsets:
+                state.pending_unsets.discard(question_id)
+                state.pending_sets[question_id] = answer
+                state.versions[question_id] = state.versions.get(question_id, 0) + 1
+                changed += 1
+
+        # Full-map semantics: questions missing from the map are removed
+        for question_id in set(state.digests) | set(state.pending_sets):
+            if question_id not in normalized:
+                state.pending_sets.pop(question_id, None)
+                state.pending_unsets.add(question_id)
+                state.versions[question_id] = state.versions.get(question_id, 0) + 1
+                changed += 1
+
+        return changed
+
+    def mark_persisted(self, session_id: str, answers: Dict[str, Any]):
+        """Record answers written by the non-delta path (sync_progress)"""
+        state = self.sessions.get(session_id)
+        if state is None:
+            return
+        for question_id, answer in answers.items():
+            if isinstance(answer, dict):
+                state.digests[question_id] = _answer_digest(answer)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    async def flush_session(self, session_id: str) -> Optional[bool]:
+        """
+        Write pending patches of one session in a single update_one.
+
+        Returns:
+            True if written, False if the session is completed/missing, None if nothing to do
+        """
+        state = self.sessions.get(session_id)
+        if state is None or not state.dirty:
+            return None
+
+        async with state.lock:
+            if not state.dirty:
+                return None
+
+            sets = state.pending_sets
+            unsets = state.pending_unsets
+            state.pending_sets = {}
+            state.pending_unsets = set()
+
+            touched = set(sets) | unsets
+            versions = {qid: state.versions[qid] for qid in touched if qid in state.versions}
+
+            update: Dict[str, Any] = {
+                "$set": {
+                    **{f"current_answers.{qid}": answer for qid, answer in sets.items()},
+                    **{f"answer_versions.{qid}": v for qid, v in versions.items()},
+                    "last_saved_at": datetime.utcnow(),
+                }
+            }
+            if unsets:
+                update["$unset"] = {f"current_answers.{qid}": "" for qid in unsets}
+
+            try:
+                collection = self._collection_getter()
+                result = await asyncio.to_thread(
+                    collection.update_one,
+                    {"session_id": session_id, "is_completed": False},
+                    update,
+                )
+                ok = result.matched_count > 0
+            except Exception as e:
+                logger.error(f"❌ Answer flush failed for session {session_id[:8]}...: {e}")
+                # Re-queue without overwriting newer patches staged meanwhile
+                for qid, answer in sets.items():
+                    if qid not in state.pending_unsets:
+                        state.pending_sets.setdefault(qid, answer)
+                for qid in unsets:
+                    if qid not in state.pending_sets:
+                        state.pending_unsets.add(qid)
+                return False
+
+            self.stats["writes"] += 1
+            self.stats["paths_written"] += len(touched)
+
+            if ok:
+                for qid, answer in sets.items():
+                    state.digests[qid] = _answer_digest(answer)
+                for qid in unsets:
+                    state.digests.pop(qid, None)
+                logger.debug(
+                    f"💾 Flushed {len(touched)} answer path(s) for session {session_id[:8]}..."
+                )
+            else:
+                logger.warning(f"⚠️ Session {session_id[:8]}... completed or missing - patches dropped")
+
+        if self.on_flush:
+            try:
+                await self.on_flush(session_id, versions, ok)
+            except Exception as e:
+                logger.error(f"Error in answer flush callback: {e}")
+
+        return ok
+
+    async def flush_all(self):
+        dirty = [sid for sid, state in self.sessions.items() if state.dirty]
+        if dirty:
+            await asyncio.gather(*(self.flush_session(sid) for sid in dirty))
+
+    def _ensure_flush_loop(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush_all()
+            except asyncio.CancelledError:
+                await self.flush_all()
+                raise
+            except Exception as e:
+                logger.error(f"Error in answer flush loop: {e}", exc_info=True)
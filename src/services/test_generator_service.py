@@ -1658,6 +1658,10 @@ class TestGeneratorService:
         """
         Get test details for taking (without correct answers)
 
+        The stripped view is built once per test version and cached
+        (see test_taker_view_cache); routes that only relay it to the client
+        should use get_taker_view_cache().get_view_bytes() directly.
+
         Args:
             test_id: Test ID
             user_id: User ID (for access control)
@@ -1665,200 +1669,10 @@ class TestGeneratorService:
         Returns:
             Test details (questions without correct answers)
         """
-        # Use shared MongoDB connection (not a new client!)
-        from src.services.online_test_utils import get_mongodb_service
-
-        mongo_service = get_mongodb_service()
-        collection = mongo_service.db["online_tests"]
-
-        # Get test from database
-        test_doc = collection.find_one({"_id": ObjectId(test_id)})
-        if not test_doc:
-            raise ValueError(f"Test not found: {test_id}")
-
-        if not test_doc.get("is_active", False):
-            raise ValueError(f"Test is not active: {test_id}")
-
-        # Remove correct answers and explanations
-        questions_for_user = []
-        for q in test_doc["questions"]:
-            # Skip questions without question_id (malformed data)
-            if "question_id" not in q:
-                logger.warning(
-                    f"⚠️ Skipping question without question_id in test {test_id}"
-                )
-                continue
-
-            # Get question_type (default to 'mcq' for backward compatibility)
-            q_type = q.get("question_type", "mcq")
-
-            question_data = {
-                "question_id": q["question_id"],
-                "question_text": q.get("question_text", ""),
-                "question_type": q_type,
-                "max_points": q.get("max_points", 1),
-                # Do NOT include: correct_answer_key, explanation, correct_answers, correct_matches, correct_labels
-            }
-
-            # Add instruction if present (IELTS questions)
-            if q.get("instruction"):
-                question_data["instruction"] = q["instruction"]
-
-            # MCQ-specific fields (both single and multiple answer)
-            if q_type in ("mcq", "mcq_multiple"):
-                question_data["options"] = q.get("options", [])
-
-            # Matching-specific fields
-            elif q_type == "matching":
-                question_data["left_items"] = q.get("left_items", [])
-                question_data["right_options"] = q.get("right_options", [])
-
-            # Map Labeling-specific fields
-            elif q_type == "map_labeling":
-                question_data["diagram_url"] = q.get("diagram_url")
-                question_data["diagram_description"] = q.get("diagram_description")
-                question_data["label_positions"] = q.get("label_positions", [])
-                question_data["options"] = q.get("options", [])
-
-            # Completion-specific fields
-            elif q_type == "completion":
-                question_data["template"] = q.get("template")
-                question_data["blanks"] = q.get("blanks", [])
-
-                # Listening tests may have questions array (without correct_answers)
-                if q.get("questions"):
-                    questions_list = q.get("questions", [])
-                    question_data["questions"] = [
-                        {
-                            "key": qq.get("key"),
-                            "text": qq.get("text"),
-                            "word_limit": qq.get("word_limit"),
-                        }
-                        for qq in questions_list
-                    ]
-
-            # Sentence Completion-specific fields
-            elif q_type == "sentence_completion":
-                # Sentence completion has 2 valid formats:
-                # Format 1 (Simple): Single template field
-                # Format 2 (IELTS): sentences array with multiple templates
-
-                if q.get("template") and not q.get("sentences"):
-                    # Format 1: Single template
-                    question_data["template"] = q.get("template")
-                elif q.get("sentences"):
-                    # Format 2: Multiple sentences (IELTS)
-                    # Remove correct_answers from sentences
-                    sentences = q.get("sentences", [])
-                    question_data["sentences"] = [
-                        {
-                            "key": s.get("key"),
-                            "template": s.get("template"),
-                            "word_limit": s.get("word_limit"),
-                        }
-                        for s in sentences
-                    ]
+        from src.services.test_taker_view_cache import get_taker_view_cache
 
-            # Short Answer-specific fields
-            elif q_type == "short_answer":
-                # Remove correct_answers from questions
-                questions_list = q.get("questions", [])
-                question_data["questions"] = [
-                    {
-                        "key": qq.get("key"),
-                        "text": qq.get("text"),
-                        "word_limit": qq.get("word_limit"),
-                    }
-                    for qq in questions_list
-                ]
-
-            # True/False Multiple-specific fields
-            elif q_type == "true_false_multiple":
-                # Support both NEW format (options) and LEGACY format (statements)
-                options = q.get("options", [])
-                statements = q.get("statements", [])
-
-                if options:
-                    # NEW FORMAT: Just send options (do NOT include correct_answers)
-                    question_data["options"] = [
-                        {
-                            "option_key": opt.get("option_key"),
-                            "option_text": opt.get("option_text"),
-                        }
-                        for opt in options
-                    ]
-                elif statements:
-                    # LEGACY FORMAT: Remove correct_value from statements (SECURITY)
-                    question_data["statements"] = [
-                        {
-                            "key": s.get("key"),
-                            "text": s.get("text"),
-                            # Do NOT include: correct_value
-                        }
-                        for s in statements
-                    ]
-
-                # Include scoring_mode so students know how it's graded
-                question_data["scoring_mode"] = q.get("scoring_mode", "partial")
-
-            # Essay-specific fields
-            elif q_type == "essay":
-                # Do NOT include grading_rubric or sample_answer during test taking
-                # These are only for grading and should be hidden from students
-                pass
-
-            # Include media if present (for all question types)
-            if q.get("media_type"):
-                question_data["media_type"] = q["media_type"]
-                question_data["media_url"] = q.get("media_url")
-                question_data["media_description"] = q.get("media_description", "")
-
-            # Include audio_section for listening tests
-            if q.get("audio_section"):
-                question_data["audio_section"] = q["audio_section"]
-
-            questions_for_user.append(question_data)
-
-        # Get attachments (reading comprehension materials)
-        attachments = test_doc.get("attachments", [])
-
-        # Format attachments for response (remove internal IDs, keep public info)
-        formatted_attachments = []
-        for att in attachments:
-            formatted_attachments.append(
-                {
-                    "attachment_id": att.get("attachment_id"),
-                    "title": att.get("title"),
-                    "description": att.get("description"),
-                    "file_url": att.get("file_url"),
-                }
-            )
-
-        # Get audio sections for listening tests
-        audio_sections = test_doc.get("audio_sections", [])
-
-        # Format audio sections for response (include audio_url, hide script/transcript)
-        formatted_audio_sections = []
-        for section in audio_sections:
-            formatted_audio_sections.append(
-                {
-                    "section_number": section.get("section_number"),
-                    "section_title": section.get("section_title"),
-                    "audio_url": section.get("audio_url"),
-                    "duration_seconds": section.get("duration_seconds"),
-                    # Do NOT include: script, transcript (owner-only)
-                }
-            )
-
-        return {
-            "test_id": test_id,
-            "title": test_doc["title"],
-            "time_limit_minutes": test_doc["time_limit_minutes"],
-            "num_questions": len(questions_for_user),
-            "questions": questions_for_user,
-            "attachments": formatted_attachments,  # PDF attachments for reading comprehension
-            "audio_sections": formatted_audio_sections,  # Audio files for listening tests
-        }
+        view_bytes = await get_taker_view_cache().get_view_bytes(test_id)
+        return json.loads(view_bytes)
 
     def _build_essay_generation_prompt(
         self,
@@ -0,0 +1,393 @@
+"""
+Test Scoring Engine - Precompiled answer keys for online test submission
+
+The answer key of a test version is compiled once (correct-answer sets, matching maps,
+normalized accepted variants) and cached by test id + version, so a submission is
+scored in a single pass without re-normalizing correct answers.
+
+Results are identical to ielts_scoring.score_question: a question that cannot be
+compiled, or raises while scoring, is scored by score_question itself.
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.services.ielts_scoring import normalize_text, score_question
+
+logger = logging.getLogger(__name__)
+
+SCORING_CACHE_SIZE = int(os.getenv("TEST_SCORING_CACHE_SIZE", "256"))
+
+ScoreResult = Tuple[bool, Any, str]
+
+_NO_ANSWER: ScoreResult = (False, 0, "No answer provided")
+
+
+def build_user_answers_map(user_answers: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert submitted answers to the per-question format used by the scorers
+
+    Args:
+        user_answers: [{"question_id": "q1", "question_type": "mcq", ...}, ...]
+
+    Returns:
+        {question_id: {"type": ..., <type-specific fields>}}
+    """
+    user_answers_map = {}
+    for ans in user_answers:
+        q_id = ans.get("question_id")
+        ans_type = ans.get("question_type", "mcq")
+
+        if ans_type == "mcq":
+            # Support both new (selected_answer_keys) and legacy (selected_answer_key)
+            selected_answers = ans.get("selected_answer_keys", [])
+            if not selected_answers and "selected_answer_key" in ans:
+                selected_answers = [ans.get("selected_answer_key")]
+
+            user_answers_map[q_id] = {
+                "type": "mcq",
+                "selected_answer_keys": selected_answers,
+            }
+
+        elif ans_type == "matching":
+            user_answers_map[q_id] = {
+                "type": "matching",
+                "matches": ans.get("matches", {}),
+            }
+
+        elif ans_type == "map_labeling":
+            user_answers_map[q_id] = {
+                "type": "map_labeling",
+                "labels": ans.get("labels", {}),
+            }
+
+        elif ans_type in ["completion", "sentence_completion", "short_answer"]:
+            user_answers_map[q_id] = {
+                "type": ans_type,
+                "answers": ans.get("answers", {}),
+            }
+
+        elif ans_type == "essay":
+            user_answers_map[q_id] = {
+                "type": "essay",
+                "essay_answer": ans.get("essay_answer", ""),
+                "media_attachments": ans.get(
+                    "media_attachments", []
+                ),  # Store media attachments (images, audio, documents)
+            }
+
+        elif ans_type == "true_false_multiple":
+            user_answers_map[q_id] = {
+                "type": "true_false_multiple",
+                "user_answer": ans.get("user_answer", {}),
+            }
+
+    return user_answers_map
+
+
+def _proportional(correct_count: int, total: int, max_points: Any, unit: str) -> ScoreResult:
+    points_earned = round((correct_count / total) * max_points, 2)
+    is_correct = correct_count == total
+
+    feedback = f"{correct_count}/{total} {unit} correct"
+    if not is_correct:
+        feedback += f". Score: {points_earned}/{max_points} points"
+
+    return is_correct, points_earned, feedback
+
+
+# ============================================================================
+# Compiled question types
+# ============================================================================
+
+
+class CompiledQuestion:
+    """Base: scores by delegating to score_question (uncompilable/unknown questions)"""
+
+    __slots__ = ("question",)
+
+    def __init__(self, question: Dict[str, Any]):
+        self.question = question
+
+    def score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        try:
+            return self._score(user_answer)
+        except Exception:
+            # Malformed answer - let the reference scorer produce its exact result
+            return score_question(self.question, user_answer)
+
+    def _score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        return score_question(self.question, user_answer)
+
+
+class _StaticQuestion(CompiledQuestion):
+    """Essay - fixed result (cannot be auto-scored)"""
+
+    __slots__ = ("result",)
+
+    def __init__(self, question: Dict[str, Any], result: ScoreResult):
+        super().__init__(question)
+        self.result = result
+
+    def _score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        return self.result
+
+
+class _MCQQuestion(CompiledQuestion):
+    __slots__ = ("correct", "correct_set", "max_points", "wrong_feedback")
+
+    def __init__(self, question: Dict[str, Any]):
+        super().__init__(question)
+        self.correct = (
+            question.get("correct_answer_keys")
+            or question.get("correct_answers")
+            or (
+                [question["correct_answer_key"]]
+                if "correct_answer_key" in question
+                else []
+            )
+        )
+        self.correct_set = set(self.correct)
+        self.max_points = question.get("max_points", 1)
+        self.wrong_feedback = f"Incorrect. Correct answer(s): {', '.join(self.correct)}"
+
+    def _score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        selected = user_answer.get("selected_answer_keys", [])
+        if not selected and "selected_answer_key" in user_answer:
+            selected = [user_answer["selected_answer_key"]]
+
+        # All-or-nothing scoring: user must select ALL correct answers
+        if self.correct and selected and set(selected) == self.correct_set:
+            return True, self.max_points, "Correct!"
+        return False, 0, self.wrong_feedback
+
+
+class _KeyMapQuestion(CompiledQuestion):
+    """Matching / map labeling: {item_key: expected_value}"""
+
+    __slots__ = ("expected", "answer_field", "unit", "max_points")
+
+    def __init__(self, question: Dict[str, Any], expected: Dict[Any, Any], answer_field: str, unit: str):
+        super().__init__(question)
+        self.expected = tuple(expected.items())
+        self.answer_field = answer_field
+        self.unit = unit
+        self.max_points = question.get("max_points", len(self.expected))
+
+    def _score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        user_values = user_answer.get(self.answer_field, {})
+        if not self.expected or not user_values:
+            return _NO_ANSWER
+
+        get = user_values.get
+        correct_count = sum(1 for key, value in self.expected if get(key) == value)
+        return _proportional(correct_count, len(self.expected), self.max_points, self.unit)
+
+
+class _TextBlanksQuestion(CompiledQuestion):
+    """Completion / sentence completion / short answer: blank -> accepted variants"""
+
+    __slots__ = ("blanks", "case_sensitive", "unit", "max_points")
+
+    def __init__(self, question: Dict[str, Any], blanks: List[Tuple[Any, Any]], unit: str):
+        super().__init__(question)
+        self.case_sensitive = question.get("case_sensitive", False)
+        # Accepted variants normalized once per test version
+        self.blanks = tuple(
+            (key, frozenset(normalize_text(a, self.case_sensitive) for a in accepted))
+            for key, accepted in blanks
+        )
+        self.unit = unit
+        self.max_points = question.get("max_points", len(self.blanks))
+
+    def _score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        user_answers = user_answer.get("answers", {})
+        if not self.blanks or not user_answers:
+            return _NO_ANSWER
+
+        case_sensitive = self.case_sensitive
+        correct_count = 0
+        for key, accepted in self.blanks:
+            if normalize_text(user_answers.get(key, ""), case_sensitive) in accepted:
+                correct_count += 1
+
+        return _proportional(correct_count, len(self.blanks), self.max_points, self.unit)
+
+
+class _TrueFalseMultipleQuestion(CompiledQuestion):
+    __slots__ = ("statements", "scoring_mode", "max_points", "invalid_format")
+
+    def __init__(self, question: Dict[str, Any]):
+        super().__init__(question)
+        self.scoring_mode = question.get("scoring_mode", "partial")
+        self.max_points = question.get("points", 1)
+
+        statements = question.get("statements", [])
+        options = question.get("options", [])
+        correct_answers = question.get("correct_answers", [])
+
+        self.invalid_format = False
+        if options and correct_answers:
+            self.statements = tuple(
+                (opt.get("option_key"), opt.get("option_key") in correct_answers)
+                for opt in options
+            )
+        elif not statements:
+            self.invalid_format = True
+            self.statements = ()
+        else:
+            self.statements = tuple(
+                (stmt.get("key"), stmt.get("correct_value")) for stmt in statements
+            )
+
+    def _score(self, user_answer: Dict[str, Any]) -> ScoreResult:
+        user_answers = user_answer.get("user_answer", {})
+
+        if self.invalid_format:
+            return (
+                False,
+                0.0,
+                "Invalid question format: missing both 'statements' and 'options'",
+            )
+        if not isinstance(user_answers, dict):
+            return False, 0.0, "Invalid answer format (expected dict)"
+
+        get = user_answers.get
+        correct_count = sum(1 for key, value in self.statements if get(key) == value)
+        total_count = len(self.statements)
+
+        if self.scoring_mode == "all_or_nothing":
+            all_correct = correct_count == total_count
+            feedback = (
+                f"All {total_count}/{total_count} correct"
+                if all_correct
+                else f"{correct_count}/{total_count} correct (need all for points)"
+            )
+            return all_correct, float(self.max_points) if all_correct else 0.0, feedback
+
+        points_earned = round((correct_count / total_count) * self.max_points, 2)
+        is_correct = correct_count == total_count
+        feedback = f"{correct_count}/{total_count} statements correct"
+        if correct_count < total_count:
+            feedback += f". Score: {points_earned}/{self.max_points} points"
+        return is_correct, points_earned, feedback
+
+
+def compile_question(question: Dict[str, Any]) -> CompiledQuestion:
+    """Compile one question; falls back to the reference scorer if the key is malformed"""
+    question_type = question.get("question_type", "mcq")
+
+    try:
+        if question_type == "mcq":
+            return _MCQQuestion(question)
+
+        if question_type == "matching":
+            raw = question.get("correct_answers") or question.get("correct_matches", {})
+            if isinstance(raw, list):
+                raw = {item["left_key"]: item["right_key"] for item in raw}
+            return _KeyMapQuestion(question, raw, "matches", "matches")
+
+        if question_type == "map_labeling":
+            raw = question.get("correct_answers") or question.get("correct_labels", {})
+            if isinstance(raw, list):
+                raw = {
+                    item.get("label_key")
+                    or item.get("position_key"): item.get("option_key")
+                    or item.get("label")
+                    for item in raw
+                }
+            return _KeyMapQuestion(question, raw, "labels", "labels")
+
+        if question_type == "completion":
+            raw = question.get("correct_answers", {})
+            if isinstance(raw, list):
+                raw = {item["blank_key"]: item["answers"] for item in raw}
+            return _TextBlanksQuestion(question, list(raw.items()), "blanks")
+
+        if question_type == "sentence_completion":
+            blanks = [
+                (s.get("key"), s.get("correct_answers", []))
+                for s in question.get("sentences", [])
+            ]
+            return _TextBlanksQuestion(question, blanks, "sentences")
+
+        if question_type == "short_answer":
+            blanks = [
+                (q.get("key"), q.get("correct_answers", []))
+                for q in question.get("questions", [])
+            ]
+            return _TextBlanksQuestion(question, blanks, "questions")
+
+        if question_type == "true_false_multiple":
+            return _TrueFalseMultipleQuestion(question)
+
+        if question_type == "essay":
+            return _StaticQuestion(question, (False, 0, "Essay requires manual grading"))
+
+    except Exception as e:
+        logger.debug(f"Answer key not compilable ({question_type}): {e}")
+        return CompiledQuestion(question)
+
+    # Unknown type: score_question logs and returns its fixed result
+    return CompiledQuestion(question)
+
+
+class CompiledAnswerKey:
+    """Answer key of one test version (compiled questions aligned with test_doc["questions"])"""
+
+    def __init__(self, questions: List[Dict[str, Any]]):
+        self.question_ids = [q.get("question_id") for q in questions]
+        self.compiled = [compile_question(q) for q in questions]
+
+    def score_submission(self, user_answers_map: Dict[str, Dict[str, Any]]) -> List[ScoreResult]:
+        """
+        Score every question of the test in one pass
+
+        Returns:
+            [(is_correct, points_earned, feedback), ...] in test question order
+        """
+        empty: Dict[str, Any] = {}
+        return [
+            compiled.score(user_answers_map.get(question_id, empty))
+            for question_id, compiled in zip(self.question_ids, self.compiled)
+        ]
+
+
+# ============================================================================
+# Cache
+# ============================================================================
+
+_answer_key_cache: "OrderedDict[Tuple, CompiledAnswerKey]" = OrderedDict()
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def _version_key(test_id: str, test_doc: Dict[str, Any]) -> Optional[Tuple]:
+    """Tests are versioned by updated_at (every edit sets it) and marketplace version"""
+    updated_at = test_doc.get("updated_at")
+    if not updated_at:
+        return None
+    marketplace_version = (test_doc.get("marketplace_config") or {}).get("version")
+    return (test_id, str(updated_at), marketplace_version, len(test_doc.get("questions", [])))
+
+
+def get_compiled_answer_key(test_id: str, test_doc: Dict[str, Any]) -> CompiledAnswerKey:
+    """Compiled answer key for this test version (LRU cached)"""
+    key = _version_key(test_id, test_doc)
+    if key is not None:
+        compiled = _answer_key_cache.get(key)
+        if compiled is not None:
+            _answer_key_cache.move_to_end(key)
+            cache_stats["hits"] += 1
+            return compiled
+
+    cache_stats["misses"] += 1
+    compiled = CompiledAnswerKey(test_doc.get("questions", []))
+
+    if key is not None:
+        _answer_key_cache[key] = compiled
+        while len(_answer_key_cache) > SCORING_CACHE_SIZE:
+            _answer_key_cache.popitem(last=False)
+
+    return compiled
@@ -0,0 +1,325 @@
+"""
+Test Session Store - Shared ownership/timer state for test WebSocket sessions
+
+Session ownership lives in Redis so any API pod can serve any test session:
+
+    test_ws:session:{session_id}  (hash, TTL refreshed on every heartbeat)
+        sid, pod_id, user_id, test_id, started_at, time_limit_seconds,
+        joined_at, last_heartbeat_at
+    test_ws:pod:{pod_id}          (string, TTL) - liveness of each API pod
+
+- join claims the session for (sid, pod).
+- disconnect/leave releases the sid but keeps the record, so a reconnecting
+  client on another pod can adopt the session on its next event without rejoining.
+- If the owning pod dies, its liveness key expires and the session can be adopted.
+
+Without Redis (local dev) the store falls back to an in-process dict, which only
+works with a single API replica.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import redis.asyncio as aioredis
+import socketio
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = "test_ws:session:"
+POD_KEY_PREFIX = "test_ws:pod:"
+
+SESSION_TTL_SECONDS = int(os.getenv("TEST_WS_SESSION_TTL", "3600"))
+POD_TTL_SECONDS = int(os.getenv("TEST_WS_POD_TTL", "30"))
+# After a failed connect, retry Redis this many seconds later
+REDIS_RETRY_SECONDS = 30
+
+# Claim result codes (adopt script)
+ADOPT_MISSING = 0
+ADOPT_ALREADY_OWNER = 1
+ADOPT_ADOPTED = 2
+ADOPT_OWNED_ELSEWHERE = -1
+ADOPT_WRONG_USER = -2
+
+# Take over a session if its sid was released or its pod is gone
+# (only for the user who owns the session - ARGV[6])
+_ADOPT_SCRIPT = """
+local pod = redis.call('HGET', KEYS[1], 'pod_id')
+if not pod then return 0 end
+local sid = redis.call('HGET', KEYS[1], 'sid')
+if sid == ARGV[1] then return 1 end
+if redis.call('HGET', KEYS[1], 'user_id') ~= ARGV[6] then return -2 end
+if sid ~= '' and redis.call('EXISTS', ARGV[5] .. pod) == 1 then return -1 end
+redis.call('HSET', KEYS[1], 'sid', ARGV[1], 'pod_id', ARGV[2], 'last_heartbeat_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 2
+"""
+
+# Release the sid only if this client still owns the session
+_RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'sid') == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'sid', '', 'last_heartbeat_at', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def default_pod_id() -> str:
+    """POD_ID env (k8s downward API) or hostname-pid"""
+    return os.getenv("POD_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class TestSessionStore:
+    """Redis-backed session ownership shared by all API pods"""
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        pod_id: Optional[str] = None,
+        session_ttl: int = SESSION_TTL_SECONDS,
+        pod_ttl: int = POD_TTL_SECONDS,
+    ):
+        self.redis_url = redis_url or os.getenv(
+            "TEST_WS_REDIS_URL", os.getenv("REDIS_URL", "redis://redis-server:6379")
+        )
+        self.pod_id = pod_id or default_pod_id()
+        self.session_ttl = session_ttl
+        self.pod_ttl = pod_ttl
+
+        self.redis: Optional[aioredis.Redis] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._connected = False
+        self._retry_at = 0.0
+        self._adopt = None
+        self._release = None
+        self._pod_task: Optional[asyncio.Task] = None
+
+        # In-process fallback when Redis is unavailable (single replica only)
+        self._local: Dict[str, Dict[str, str]] = {}
+
+    # ------------------------------------------------------------------
+    # Connection / pod liveness
+    # ------------------------------------------------------------------
+
+    async def _client(self) -> Optional[aioredis.Redis]:
+        if self._connected:
+            return self.redis
+        if time.monotonic() < self._retry_at:
+            return None
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self._connected:
+                return self.redis
+            if time.monotonic() < self._retry_at:
+                return None
+            try:
+                client = aioredis.from_url(
+                    self.redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=5,
+                    socket_timeout=5,
+                )
+                await client.ping()
+                self.redis = client
+                self._adopt = client.register_script(_ADOPT_SCRIPT)
+                self._release = client.register_script(_RELEASE_SCRIPT)
+                self._connected = True
+                logger.info(f"✅ Test session store connected (pod {self.pod_id})")
+            except Exception as e:
+                self.redis = None
+                self._retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+                logger.warning(
+                    f"⚠️ Test session store: Redis unavailable ({e}) - "
+                    f"using in-process sessions (single replica only), "
+                    f"retrying in {REDIS_RETRY_SECONDS}s"
+                )
+
+        if self.redis is not None and (self._pod_task is None or self._pod_task.done()):
+            self._pod_task = asyncio.create_task(self._pod_heartbeat_loop())
+        return self.redis
+
+    async def _pod_heartbeat_loop(self):
+        key = f"{POD_KEY_PREFIX}{self.pod_id}"
+        interval = max(1, self.pod_ttl // 3)
+        while True:
+            try:
+                await self.redis.set(key, datetime.utcnow().isoformat(), ex=self.pod_ttl)
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing pod liveness: {e}")
+                await asyncio.sleep(interval)
+
+    async def close(self):
+        """Stop the liveness loop and drop this pod's liveness key"""
+        if self._pod_task:
+            self._pod_task.cancel()
+        if self.redis is not None:
+            try:
+                await self.redis.delete(f"{POD_KEY_PREFIX}{self.pod_id}")
+                await self.redis.close()
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------
+    # Session ownership
+    # ------------------------------------------------------------------
+
+    async def claim(
+        self,
+        session_id: str,
+        sid: str,
+        user_id: str,
+        test_id: str,
+        started_at: Optional[datetime],
+        time_limit_seconds: int,
+    ) -> Dict[str, Any]:
+        """Take ownership of a session for this sid/pod (join)"""
+        now = datetime.utcnow().isoformat()
+        record = {
+            "sid": sid,
+            "pod_id": self.pod_id,
+            "user_id": user_id,
+            "test_id": test_id,
+            "started_at": started_at.isoformat() if started_at else "",
+            "time_limit_seconds": str(int(time_limit_seconds)),
+            "joined_at": now,
+            "last_heartbeat_at": now,
+        }
+
+        client = await self._client()
+        if client is None:
+            self._local[session_id] = record
+        else:
+            key = f"{SESSION_KEY_PREFIX}{session_id}"
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping=record)
+                pipe.expire(key, self.session_ttl)
+                await pipe.execute()
+
+        return self._decode(record)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        client = await self._client()
+        if client is None:
+            record = self._local.get(session_id)
+        else:
+            record = await client.hgetall(f"{SESSION_KEY_PREFIX}{session_id}")
+        return self._decode(record) if record else None
+
+    async def adopt(self, session_id: str, sid: str, user_id: Optional[str]) -> int:
+        """
+        Attach `sid` to a session whose previous client disconnected or whose pod died
+
+        Args:
+            user_id: User claiming the session - must match the session owner
+
+        Returns:
+            ADOPT_ALREADY_OWNER, ADOPT_ADOPTED, ADOPT_OWNED_ELSEWHERE,
+            ADOPT_WRONG_USER or ADOPT_MISSING
+        """
+        now = datetime.utcnow().isoformat()
+        client = await self._client()
+        if client is None:
+            record = self._local.get(session_id)
+            if not record:
+                return ADOPT_MISSING
+            if record["sid"] == sid:
+                return ADOPT_ALREADY_OWNER
+            if record["user_id"] != user_id:
+                return ADOPT_WRONG_USER
+            if record["sid"]:
+                return ADOPT_OWNED_ELSEWHERE
+            record.update({"sid": sid, "pod_id": self.pod_id, "last_heartbeat_at": now})
+            return ADOPT_ADOPTED
+
+        return int(
+            await self._adopt(
+                keys=[f"{SESSION_KEY_PREFIX}{session_id}"],
+                args=[
+                    sid,
+                    self.pod_id,
+                    now,
+                    self.session_ttl,
+                    POD_KEY_PREFIX,
+                    user_id or "",
+                ],
+            )
+        )
+
+    async def touch(self, session_id: str):
+        """Heartbeat: refresh last_heartbeat_at and the session TTL"""
+        now = datetime.utcnow().isoformat()
+        client = await self._client()
+        if client is None:
+            if session_id in self._local:
+                self._local[session_id]["last_heartbeat_at"] = now
+            return
+
+        key = f"{SESSION_KEY_PREFIX}{session_id}"
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, "last_heartbeat_at", now)
+            pipe.expire(key, self.session_ttl)
+            await pipe.execute()
+
+    async def release(self, session_id: str, sid: str) -> bool:
+        """Detach `sid` but keep the record so another pod can adopt the session"""
+        now = datetime.utcnow().isoformat()
+        client = await self._client()
+        if client is None:
+            record = self._local.get(session_id)
+            if record and record["sid"] == sid:
+                record.update({"sid": "", "last_heartbeat_at": now})
+                return True
+            return False
+
+        return bool(
+            await self._release(keys=[f"{SESSION_KEY_PREFIX}{session_id}"], args=[sid, now])
+        )
+
+    async def delete(self, session_id: str):
+        """Forget a session entirely (submitted/expired)"""
+        client = await self._client()
+        if client is None:
+            self._local.pop(session_id, None)
+        else:
+            await client.delete(f"{SESSION_KEY_PREFIX}{session_id}")
+
+    @staticmethod
+    def _decode(record: Dict[str, str]) -> Dict[str, Any]:
+        decoded: Dict[str, Any] = dict(record)
+        decoded["started_at"] = _parse_datetime(record.get("started_at"))
+        decoded["time_limit_seconds"] = int(record.get("time_limit_seconds") or 0)
+        return decoded
+
+
+def create_client_manager() -> Optional[socketio.AsyncRedisManager]:
+    """
+    Socket.IO Redis pub/sub manager so emits/rooms reach clients on any pod.
+
+    Disabled with TEST_WS_REDIS_MANAGER=false (single-replica / local dev).
+    """
+    if os.getenv("TEST_WS_REDIS_MANAGER", "true").lower() != "true":
+        return None
+
+    url = os.getenv("TEST_WS_REDIS_URL", os.getenv("REDIS_URL", "redis://redis-server:6379"))
+    logger.info(f"🔌 Socket.IO Redis manager enabled ({url})")
+    return socketio.AsyncRedisManager(url, channel="test_ws")
@@ -0,0 +1,515 @@
+"""
+Test Taker View Cache - precomputed "questions without answers" per test version
+
+Opening or starting a test used to load the full `online_tests` document (answer
+keys, explanations, rubrics, transcripts) and rebuild the stripped question list
+in Python on every request - exactly what thousands of students hit at once when
+a popular marketplace test is shared. The taker view is now:
+
+- built once per test version (answers stripped, media URLs resolved)
+- serialized to JSON bytes once and served as-is
+- cached in-process (LRU) and in Redis (`test:taker_view:{test_id}`, one hash
+  field per version) so other workers and restarts reuse it
+
+The version stamp is (updated_at, status, marketplace version/current_version):
+every edit route bumps `updated_at`, so a stale view is never served even if an
+explicit invalidation is missed. TestVersionService.invalidate_taker_view() drops
+the cached views right away (publish, question/attachment edits, delete).
+
+Routes only need the small test metadata (`load_test_meta`, questions excluded)
+for access checks; the question payload comes from the cache.
+
+Usage:
+    from src.services.test_taker_view_cache import get_taker_view_cache, load_test_meta
+
+    meta = load_test_meta(db["online_tests"], test_id)
+    view_bytes = await get_taker_view_cache().get_view_bytes(test_id, meta)
+    body = embed_json({"success": True}, {"test": view_bytes})
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+TAKER_VIEW_CACHE_SIZE = int(os.getenv("TEST_TAKER_VIEW_CACHE_SIZE", "256"))
+TAKER_VIEW_REDIS_TTL = int(os.getenv("TEST_TAKER_VIEW_REDIS_TTL", "86400"))
+R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL", "https://static.wordai.pro")
+
+_REDIS_PREFIX = "test:taker_view:"
+
+# Everything a route needs before deciding to serve the taker view
+_META_PIPELINE_EXCLUDE = {"questions": 0, "audio_sections": 0}
+
+# Everything build_taker_view() and taker_view_version() read
+_VIEW_SOURCE_FIELDS = {
+    "title": 1,
+    "time_limit_minutes": 1,
+    "is_active": 1,
+    "status": 1,
+    "updated_at": 1,
+    "questions": 1,
+    "attachments": 1,
+    "audio_sections": 1,
+    "marketplace_config.version": 1,
+    "marketplace_config.current_version": 1,
+}
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+
+def load_test_meta(collection, test_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Test document without `questions` / `audio_sections`, plus `question_count`
+
+    Access checks, pricing and retry limits only need these fields; the heavy
+    question payload stays in MongoDB (or in the taker view cache).
+    """
+    docs = list(
+        collection.aggregate(
+            [
+                {"$match": {"_id": ObjectId(test_id)}},
+                {
+                    "$addFields": {
+                        "question_count": {"$size": {"$ifNull": ["$questions", []]}}
+                    }
+                },
+                {"$project": _META_PIPELINE_EXCLUDE},
+            ]
+        )
+    )
+    return docs[0] if docs else None
+
+
+def taker_view_version(test_doc: Dict[str, Any]) -> str:
+    """Version stamp of the content a taker sees"""
+    marketplace_config = test_doc.get("marketplace_config") or {}
+    stamp = [
+        str(test_doc.get("updated_at")),
+        test_doc.get("status", "ready"),
+        str(marketplace_config.get("version")),
+        str(marketplace_config.get("current_version")),
+    ]
+    return hashlib.sha1("|".join(stamp).encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_media_url(url: Optional[str]) -> Optional[str]:
+    """Bare R2 keys (older uploads) → public URL; full URLs unchanged"""
+    if not url or url.startswith(("http://", "https://", "data:")):
+        return url
+    return f"{R2_PUBLIC_URL.rstrip('/')}/{url.lstrip('/')}"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def embed_json(obj: Dict[str, Any], raw_fields: Dict[str, bytes]) -> bytes:
+    """
+    Serialize `obj` and splice already-serialized JSON values in as extra keys
+
+    Lets a route wrap the cached view bytes without parsing them again.
+    """
+    body = dumps_bytes(obj)
+    parts = [body[:-1]]
+    for key, raw in raw_fields.items():
+        parts.append(b"," if len(parts) > 1 or len(body) > 2 else b"")
+        parts.append(dumps_bytes(key) + b":" + raw)
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+def merge_json(raw_object: bytes, extra: Dict[str, Any]) -> bytes:
+    """Add top-level keys to a serialized JSON object (keys must not exist yet)"""
+    if not extra:
+        return raw_object
+    tail = dumps_bytes(extra)[1:]
+    separator = b"," if raw_object.strip() != b"{}" else b""
+    return raw_object.rstrip()[:-1] + separator + tail
+
+
+# ============================================================================
+# VIEW BUILDER
+# ============================================================================
+
+
+def _strip_question(q: Dict[str, Any]) -> Dict[str, Any]:
+    # Get question_type (default to 'mcq' for backward compatibility)
+    q_type = q.get("question_type", "mcq")
+
+    question_data = {
+        "question_id": q["question_id"],
+        "question_text": q.get("question_text", ""),
+        "question_type": q_type,
+        "max_points": q.get("max_points", 1),
+        # Do NOT include: correct_answer_key, explanation, correct_answers, correct_matches, correct_labels
+    }
+
+    # Add instruction if present (IELTS questions)
+    if q.get("instruction"):
+        question_data["instruction"] = q["instruction"]
+
+    # MCQ-specific fields (both single and multiple answer)
+    if q_type in ("mcq", "mcq_multiple"):
+        question_data["options"] = q.get("options", [])
+
+    # Matching-specific fields
+    elif q_type == "matching":
+        question_data["left_items"] = q.get("left_items", [])
+        question_data["right_options"] = q.get("right_options", [])
+
+    # Map Labeling-specific fields
+    elif q_type == "map_labeling":
+        question_data["diagram_url"] = resolve_media_url(q.get("diagram_url"))
+        question_data["diagram_description"] = q.get("diagram_description")
+        question_data["label_positions"] = q.get("label_positions", [])
+        question_data["options"] = q.get("options", [])
+
+    # Completion-specific fields
+    elif q_type == "completion":
+        question_data["template"] = q.get("template")
+        question_data["blanks"] = q.get("blanks", [])
+
+        # Listening tests may have questions array (without correct_answers)
+        if q.get("questions"):
+            question_data["questions"] = [
+                {
+                    "key": qq.get("key"),
+                    "text": qq.get("text"),
+                    "word_limit": qq.get("word_limit"),
+                }
+                for qq in q.get("questions", [])
+            ]
+
+    # Sentence Completion-specific fields
+    elif q_type == "sentence_completion":
+        # Format 1 (Simple): Single template field
+        # Format 2 (IELTS): sentences array with multiple templates
+        if q.get("template") and not q.get("sentences"):
+            question_data["template"] = q.get("template")
+        elif q.get("sentences"):
+            # Remove correct_answers from sentences
+            question_data["sentences"] = [
+                {
+                    "key": s.get("key"),
+                    "template": s.get("template"),
+                    "word_limit": s.get("word_limit"),
+                }
+                for s in q.get("sentences", [])
+            ]
+
+    # Short Answer-specific fields
+    elif q_type == "short_answer":
+        # Remove correct_answers from questions
+        question_data["questions"] = [
+            {
+                "key": qq.get("key"),
+                "text": qq.get("text"),
+                "word_limit": qq.get("word_limit"),
+            }
+            for qq in q.get("questions", [])
+        ]
+
+    # True/False Multiple-specific fields
+    elif q_type == "true_false_multiple":
+        # Support both NEW format (options) and LEGACY format (statements)
+        options = q.get("options", [])
+        statements = q.get("statements", [])
+
+        if options:
+            # NEW FORMAT: Just send options (do NOT include correct_answers)
+            question_data["options"] = [
+                {
+                    "option_key": opt.get("option_key"),
+                    "option_text": opt.get("option_text"),
+                }
+                for opt in options
+            ]
+        elif statements:
+            # LEGACY FORMAT: Remove correct_value from statements (SECURITY)
+            question_data["statements"] = [
+                {"key": s.get("key"), "text": s.get("text")} for s in statements
+            ]
+
+        # Include scoring_mode so students know how it's graded
+        question_data["scoring_mode"] = q.get("scoring_mode", "partial")
+
+    # Essay: grading_rubric / sample_answer are grading-only, never sent to takers
+
+    # Include media if present (for all question types)
+    if q.get("media_type"):
+        question_data["media_type"] = q["media_type"]
+        question_data["media_url"] = resolve_media_url(q.get("media_url"))
+        question_data["media_description"] = q.get("media_description", "")
+
+    # Include audio_section for listening tests
+    if q.get("audio_section"):
+        question_data["audio_section"] = q["audio_section"]
+
+    return question_data
+
+
+def build_taker_view(test_id: str, test_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Questions for taking (without correct answers) from a full test document
+
+    Args:
+        test_id: Test ID
+        test_doc: Full `online_tests` document
+
+    Returns:
+        {test_id, title, time_limit_minutes, num_questions, questions, attachments, audio_sections}
+    """
+    questions_for_user = []
+    for q in test_doc.get("questions") or []:
+        # Skip questions without question_id (malformed data)
+        if "question_id" not in q:
+            logger.warning(f"⚠️ Skipping question without question_id in test {test_id}")
+            continue
+        questions_for_user.append(_strip_question(q))
+
+    # Attachments (reading comprehension materials): public info only
+    formatted_attachments = [
+        {
+            "attachment_id": att.get("attachment_id"),
+            "title": att.get("title"),
+            "description": att.get("description"),
+            "file_url": resolve_media_url(att.get("file_url")),
+        }
+        for att in test_doc.get("attachments") or []
+    ]
+
+    # Audio sections for listening tests: audio_url, no script/transcript (owner-only)
+    formatted_audio_sections = [
+        {
+            "section_number": section.get("section_number"),
+            "section_title": section.get("section_title"),
+            "audio_url": resolve_media_url(section.get("audio_url")),
+            "duration_seconds": section.get("duration_seconds"),
+        }
+        for section in test_doc.get("audio_sections") or []
+    ]
+
+    return {
+        "test_id": test_id,
+        "title": test_doc["title"],
+        "time_limit_minutes": test_doc["time_limit_minutes"],
+        "num_questions": len(questions_for_user),
+        "questions": questions_for_user,
+        "attachments": formatted_attachments,  # PDF attachments for reading comprehension
+        "audio_sections": formatted_audio_sections,  # Audio files for listening tests
+    }
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+
+class TestTakerViewCache:
+    """In-process LRU + Redis cache of serialized taker views"""
+
+    def __init__(self, db=None, max_size: int = TAKER_VIEW_CACHE_SIZE):
+        self._db = db
+        self.max_size = max_size
+        self._lru: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._redis = None
+        self._redis_ok = True
+        self.hits = self.redis_hits = self.builds = 0
+
+    @property
+    def collection(self):
+        if self._db is None:
+            from src.services.online_test_utils import get_mongodb_service
+
+            self._db = get_mongodb_service().db
+        return self._db["online_tests"]
+
+    def _client(self):
+        if self._redis is None and self._redis_ok:
+            try:
+                import redis
+
+                self._redis = redis.Redis(
+                    host=os.getenv("REDIS_HOST", "localhost"),
+                    port=int(os.getenv("REDIS_PORT", 6379)),
+                    db=int(os.getenv("REDIS_DB", 0)),
+                    socket_timeout=0.5,
+                    socket_connect_timeout=0.5,
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Taker view cache: Redis unavailable ({e})")
+                self._redis_ok = False
+        return self._redis
+
+    def _local_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            view = self._lru.get(key)
+            if view is not None:
+                self._lru.move_to_end(key)
+            return view
+
+    def _local_put(self, key: str, view: bytes):
+        with self._lock:
+            self._lru[key] = view
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def _redis_get(self, test_id: str, version: str) -> Optional[bytes]:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            return client.hget(_REDIS_PREFIX + test_id, version)
+        except Exception as e:
+            logger.debug(f"Taker view cache read failed: {e}")
+            return None
+
+    def _redis_put(self, test_id: str, version: str, view: bytes):
+        client = self._client()
+        if client is None:
+            return
+        try:
+            # Only the current version is kept per test
+            pipe = client.pipeline()
+            pipe.delete(_REDIS_PREFIX + test_id)
+            pipe.hset(_REDIS_PREFIX + test_id, version, view)
+            pipe.expire(_REDIS_PREFIX + test_id, TAKER_VIEW_REDIS_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.debug(f"Taker view cache write failed: {e}")
+
+    def get_view_bytes_sync(
+        self, test_id: str, meta: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """
+        Serialized taker view of the test's current version (blocking)
+
+        Args:
+            test_id: Test ID
+            meta: Test document from load_test_meta()/find_one (loaded if None)
+
+        Raises:
+            ValueError: Test not found or not active
+        """
+        if meta is None:
+            meta = load_test_meta(self.collection, test_id)
+        if not meta:
+            raise ValueError(f"Test not found: {test_id}")
+        if not meta.get("is_active", False):
+            raise ValueError(f"Test is not active: {test_id}")
+
+        version = taker_view_version(meta)
+        key = f"{test_id}:{version}"
+        view = self._local_get(key)
+        if view is not None:
+            self.hits += 1
+            return view
+
+        # One build per key per process; concurrent requests wait for it
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            view = self._local_get(key)
+            if view is not None:
+                self.hits += 1
+                return view
+
+            view = self._redis_get(test_id, version)
+            if view is not None:
+                self.redis_hits += 1
+                self._local_put(key, view)
+            else:
+                view = self._build(test_id, key, version)
+
+        with self._lock:
+            self._build_locks.pop(key, None)
+        return view
+
+    def _build(self, test_id: str, key: str, version: str) -> bytes:
+        test_doc = self.collection.find_one(
+            {"_id": ObjectId(test_id)}, _VIEW_SOURCE_FIELDS
+        )
+        if not test_doc:
+            raise ValueError(f"Test not found: {test_id}")
+        if not test_doc.get("is_active", False):
+            raise ValueError(f"Test is not active: {test_id}")
+
+        view = dumps_bytes(build_taker_view(test_id, test_doc))
+        self.builds += 1
+        built_version = taker_view_version(test_doc)
+        if built_version != version:
+            # Edited between the metadata read and this read: cache what we built
+            key = f"{test_id}:{built_version}"
+        self._local_put(key, view)
+        self._redis_put(test_id, built_version, view)
+        logger.info(
+            f"🧩 Built taker view for test {test_id} v{built_version[:8]} ({len(view)} bytes)"
+        )
+        return view
+
+    async def get_view_bytes(
+        self, test_id: str, meta: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """Async wrapper: local hits return inline, misses go to a worker thread"""
+        if meta is not None and meta.get("is_active", False):
+            view = self._local_get(f"{test_id}:{taker_view_version(meta)}")
+            if view is not None:
+                self.hits += 1
+                return view
+        return await asyncio.to_thread(self.get_view_bytes_sync, test_id, meta)
+
+    def invalidate(self, test_id: str):
+        """Drop every cached version of a test (local + Redis)"""
+        prefix = f"{test_id}:"
+        with self._lock:
+            for key in [k for k in self._lru if k.startswith(prefix)]:
+                del self._lru[key]
+        client = self._client()
+        if client is not None:
+            try:
+                client.delete(_REDIS_PREFIX + test_id)
+            except Exception as e:
+                logger.debug(f"Taker view cache invalidation failed: {e}")
+        logger.info(f"🧹 Invalidated taker view cache for test {test_id}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._lru),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "builds": self.builds,
+        }
+
+
+_cache: Optional[TestTakerViewCache] = None
+
+
+def get_taker_view_cache() -> TestTakerViewCache:
+    global _cache
+    if _cache is None:
+        _cache = TestTakerViewCache()
+    return _cache
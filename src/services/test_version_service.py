@@ -104,6 +104,8 @@ class TestVersionService:
                 },
             )
 
+            self.invalidate_taker_view(test_id)
+
             logger.info(f"✅ Created version snapshot: {test_id} {version_string}")
             return True, None, version_string
 
@@ -114,6 +116,21 @@ class TestVersionService:
             traceback.print_exc()
             return False, f"Version creation error: {str(e)}", None
 
+    def invalidate_taker_view(self, test_id: str):
+        """
+        Drop cached taker views of a test after its content changed
+
+        Call after publishing a version or editing questions/attachments. Views
+        are also keyed by updated_at, so a missed call never serves stale content;
+        this only frees the old entries right away.
+        """
+        try:
+            from src.services.test_taker_view_cache import get_taker_view_cache
+
+            get_taker_view_cache().invalidate(test_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to invalidate taker view for {test_id}: {e}")
+
     def _get_latest_version_number(self, test_id: str) -> int:
         """
         Get the latest version number for a test
@@ -17,6 +17,15 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from services.online_test_utils import get_mongodb_service
+from services.test_answer_sync import AnswerSyncBuffer, normalize_answer
+from services.test_session_store import (
+    ADOPT_ADOPTED,
+    ADOPT_MISSING,
+    ADOPT_OWNED_ELSEWHERE,
+    ADOPT_WRONG_USER,
+    TestSessionStore,
+    create_client_manager,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -42,23 +51,39 @@ def calculate_time_remaining(started_at: datetime, time_limit_seconds: int) -> i
 
 
 class TestWebSocketService:
-    """Service for managing WebSocket connections for online tests"""
+    """
+    Service for managing WebSocket connections for online tests
+
+    Session ownership and timer state live in TestSessionStore (Redis) and emits go
+    through the Socket.IO Redis manager, so the service runs on any number of API pods.
+    Clients should use the websocket transport (or sticky sessions for long-polling).
+    """
 
     def __init__(self):
         """Initialize WebSocket service with Socket.IO server"""
         self.sio = socketio.AsyncServer(
             async_mode="asgi",
             cors_allowed_origins="*",  # TODO: Restrict in production
+            client_manager=create_client_manager(),
             logger=False,
             engineio_logger=False,
         )
 
-        # Track active sessions: {session_id: {sid: str, user_id: str, test_id: str}}
-        self.active_sessions: Dict[str, Dict] = {}
+        # Shared session ownership: {session_id: {sid, pod_id, user_id, test_id, started_at, ...}}
+        self.session_store = TestSessionStore()
 
-        # Track which socket IDs belong to which sessions
+        # Sessions owned by sockets connected to THIS pod: {session_id: sid}
+        self.local_sessions: Dict[str, str] = {}
+
+        # Track which socket IDs belong to which sessions (local sockets only)
         self.sid_to_session: Dict[str, str] = {}
 
+        # Delta answer sync: buffers per-question patches, one write per session per interval
+        self.answer_sync = AnswerSyncBuffer(
+            collection_getter=lambda: get_mongodb_service().db["test_progress"],
+            on_flush=self._on_answers_flushed,
+        )
+
         self._register_event_handlers()
         logger.info("🔌 WebSocket Service initialized (Socket.IO)")
 
@@ -74,33 +99,16 @@ class TestWebSocketService:
         @self.sio.event
         async def disconnect(sid):
             """Handle client disconnection"""
-            # Remove from active sessions
+            # Remove from local sessions
             session_id = self.sid_to_session.pop(sid, None)
-            if session_id and session_id in self.active_sessions:
-                session_info = self.active_sessions[session_id]
-                logger.info(
-                    f"❌ Client {sid} disconnected from session {session_id} "
-                    f"(user: {session_info.get('user_id')}, test: {session_info.get('test_id')})"
-                )
+            if session_id:
+                logger.info(f"❌ Client {sid} disconnected from session {session_id}")
 
                 # Update connection status in database
                 try:
-                    mongo = get_mongodb_service()
-                    await asyncio.to_thread(
-                        mongo.db["test_progress"].update_one,
-                        {"session_id": session_id},
-                        {
-                            "$set": {
-                                "connection_status": "disconnected",
-                                "last_heartbeat_at": datetime.utcnow(),
-                            }
-                        },
-                    )
+                    await self._release_session(sid, session_id)
                 except Exception as e:
                     logger.error(f"Error updating disconnect status: {e}")
-
-                # Remove from active sessions (but keep in DB for reconnection)
-                del self.active_sessions[session_id]
             else:
                 logger.info(f"❌ Client {sid} disconnected (no active session)")
 
@@ -213,14 +221,13 @@ class TestWebSocketService:
                     f"time_remaining={time_remaining}s - OK to rejoin"
                 )
 
-                # Add to active sessions (after time check passes)
-                self.active_sessions[session_id] = {
-                    "sid": sid,
-                    "user_id": user_id,
-                    "test_id": test_id,
-                    "joined_at": datetime.utcnow(),
-                }
+                # Claim session ownership for this client (after time check passes)
+                await self.session_store.claim(
+                    session_id, sid, user_id, test_id, started_at, time_limit_seconds
+                )
+                self.local_sessions[session_id] = sid
                 self.sid_to_session[sid] = session_id
+                answer_versions = self.answer_sync.load_session(session_id, session)
 
                 # Update connection status AND calculated time_remaining in database
                 await asyncio.to_thread(
@@ -241,6 +248,7 @@ class TestWebSocketService:
                     {
                         "session_id": session_id,
                         "current_answers": session.get("current_answers", {}),
+                        "answer_versions": answer_versions,  # Base versions for save_answers_delta
                         "time_remaining_seconds": time_remaining,
                         "started_at": (started_at.isoformat() if started_at else None),
                     },
@@ -299,93 +307,40 @@ class TestWebSocketService:
                     )
                     return
 
-                # Verify session is active for this client
-                if session_id not in self.active_sessions:
-                    await self.sio.emit(
-                        "error",
-                        {"message": "Session not active. Please rejoin."},
-                        to=sid,
-                    )
+                # Verify session is active for this client (adopts it after a failover)
+                if not await self._authorize_session(
+                    sid, session_id, data.get("user_id")
+                ):
                     return
 
-                if self.active_sessions[session_id]["sid"] != sid:
-                    await self.sio.emit(
-                        "error",
+                # Diff against the last persisted answers and $set/$unset only the
+                # changed question paths (full overwrite if the session is not loaded)
+                changed = self.answer_sync.stage_full_map(session_id, answers)
+                if changed is None:
+                    normalized_answers = {}
+                    for question_id, answer_data in answers.items():
+                        answer = normalize_answer(question_id, answer_data)
+                        if answer is not None:
+                            normalized_answers[question_id] = answer
+
+                    mongo = get_mongodb_service()
+                    result = await asyncio.to_thread(
+                        mongo.db["test_progress"].update_one,
+                        {"session_id": session_id, "is_completed": False},
                         {
-                            "message": "Unauthorized: Session belongs to different client"
+                            "$set": {
+                                "current_answers": normalized_answers,
+                                "last_saved_at": datetime.utcnow(),
+                            }
                         },
-                        to=sid,
                     )
-                    return
-
-                # Normalize answers (support both object and legacy string format)
-                normalized_answers = {}
-                for question_id, answer_data in answers.items():
-                    if isinstance(answer_data, str):
-                        # Legacy: simple string = MCQ answer key
-                        normalized_answers[question_id] = {
-                            "question_type": "mcq",
-                            "selected_answer_keys": [answer_data],  # Convert to array
-                        }
-                    elif isinstance(answer_data, dict):
-                        # New: full answer object - validate and keep as is
-                        q_type = answer_data.get("question_type", "mcq")
-
-                        if q_type == "mcq":
-                            # Normalize MCQ answers to use selected_answer_keys array
-                            if "selected_answer_keys" in answer_data:
-                                normalized_answers[question_id] = answer_data
-                            elif "selected_answer_key" in answer_data:
-                                # Convert legacy single answer to array
-                                normalized_answers[question_id] = {
-                                    "question_type": "mcq",
-                                    "selected_answer_keys": [
-                                        answer_data["selected_answer_key"]
-                                    ],
-                                }
-                            else:
-                                normalized_answers[question_id] = answer_data
-                        elif q_type in ["matching", "map_labeling"]:
-                            # Matching/Map Labeling: {"matches": {...}} or {"labels": {...}}
-                            normalized_answers[question_id] = answer_data
-                        elif q_type in [
-                            "completion",
-                            "sentence_completion",
-                            "short_answer",
-                        ]:
-                            # Text-based types: {"answers": {...}}
-                            normalized_answers[question_id] = answer_data
-                        elif q_type == "true_false_multiple":
-                            # True/False Multiple: {"statements": {statement_id: true/false}}
-                            normalized_answers[question_id] = answer_data
-                        elif q_type == "essay":
-                            # Essay: {"essay_answer": "...", "media_attachments": [...]}
-                            normalized_answers[question_id] = answer_data
-                        else:
-                            logger.warning(
-                                f"Unknown question_type '{q_type}' for {question_id}"
-                            )
-                            normalized_answers[question_id] = answer_data
-                    else:
-                        logger.warning(
-                            f"Invalid answer format for {question_id}: {type(answer_data)}"
-                        )
-                        continue
-
-                # Update ALL answers in database (overwrite)
-                mongo = get_mongodb_service()
-                result = await asyncio.to_thread(
-                    mongo.db["test_progress"].update_one,
-                    {"session_id": session_id, "is_completed": False},
-                    {
-                        "$set": {
-                            "current_answers": normalized_answers,
-                            "last_saved_at": datetime.utcnow(),
-                        }
-                    },
-                )
+                    saved = result.modified_count > 0
+                else:
+                    flushed = await self.answer_sync.flush_session(session_id)
+                    # Nothing changed since the last save is still a successful save
+                    saved = flushed is not False
 
-                if result.modified_count > 0:
+                if saved:
                     # Acknowledge batch save
                     await self.sio.emit(
                         "answers_saved_batch",
@@ -519,46 +474,44 @@ class TestWebSocketService:
                     )
                     return
 
-                # Verify session is active for this client
-                if session_id not in self.active_sessions:
-                    await self.sio.emit(
-                        "error",
-                        {"message": "Session not active. Please rejoin."},
-                        to=sid,
-                    )
+                # Verify session is active for this client (adopts it after a failover)
+                if not await self._authorize_session(
+                    sid, session_id, data.get("user_id")
+                ):
                     return
 
-                if self.active_sessions[session_id]["sid"] != sid:
-                    await self.sio.emit(
-                        "error",
+                # Go through the versioned delta buffer so a delta patch still
+                # pending for this question cannot be flushed over this answer
+                version = self.answer_sync.stage_answer(
+                    session_id, question_id, answer_data
+                )
+                if version is None:
+                    mongo = get_mongodb_service()
+                    result = await asyncio.to_thread(
+                        mongo.db["test_progress"].update_one,
+                        {"session_id": session_id, "is_completed": False},
                         {
-                            "message": "Unauthorized: Session belongs to different client"
+                            "$set": {
+                                f"current_answers.{question_id}": answer_data,
+                                "last_saved_at": datetime.utcnow(),
+                            }
                         },
-                        to=sid,
                     )
-                    return
-
-                # Update answer in database
-                mongo = get_mongodb_service()
-                result = await asyncio.to_thread(
-                    mongo.db["test_progress"].update_one,
-                    {"session_id": session_id, "is_completed": False},
-                    {
-                        "$set": {
-                            f"current_answers.{question_id}": answer_data,
-                            "last_saved_at": datetime.utcnow(),
-                        }
-                    },
-                )
+                    saved = result.modified_count > 0
+                else:
+                    saved = (
+                        await self.answer_sync.flush_session(session_id) is not False
+                    )
 
-                if result.modified_count > 0:
-                    # Acknowledge save
+                if saved:
+                    # Acknowledge save (version = new base for save_answers_delta)
                     await self.sio.emit(
                         "answer_saved",
                         {
                             "session_id": session_id,
                             "question_id": question_id,
                             "answer_data": answer_data,
+                            "version": version,
                             "saved_at": datetime.utcnow().isoformat(),
                         },
                         to=sid,
@@ -581,52 +534,90 @@ class TestWebSocketService:
                 )
 
         @self.sio.event
-        async def heartbeat(sid, data):
+        async def save_answers_delta(sid, data):
             """
-            Heartbeat to maintain connection and calculate time remaining
+            Save per-question answer patches (delta protocol)
 
-            Backend tự động tính time_remaining dựa trên started_at và time_limit.
-            Frontend gửi heartbeat chỉ để duy trì kết nối, không cần gửi time_remaining.
+            Client chỉ gửi các câu đã thay đổi kèm version tăng dần cho từng câu.
+            Backend gộp các lần lưu liên tiếp thành 1 lần ghi MongoDB mỗi chu kỳ.
 
-            Data: {session_id: str}
+            Data: {
+                session_id: str,
+                patches: [
+                    {"question_id": "q1", "version": 3, "answer": {"question_type": "mcq", "selected_answer_keys": ["A"]}},
+                    {"question_id": "q7", "version": 12, "answer": {"question_type": "essay", "essay_answer": "..."}},
+                    {"question_id": "q2", "version": 5, "deleted": true}
+                ]
+            }
+
+            Emits:
+                answers_delta_ack: {session_id, applied: {qid: version}, rejected: {qid: server_version|reason}}
+                answers_persisted: {session_id, versions: {qid: version}, saved_at} (after the coalesced write)
             """
             try:
                 session_id = data.get("session_id")
+                patches = data.get("patches", [])
 
                 if not session_id:
-                    return
-
-                # Verify session is active
-                if session_id not in self.active_sessions:
                     await self.sio.emit(
                         "error",
-                        {"message": "Session not active. Please rejoin."},
+                        {"message": "Missing required field: session_id"},
                         to=sid,
                     )
                     return
 
-                # Get session and test data to calculate time_remaining
-                mongo = get_mongodb_service()
-                session = await asyncio.to_thread(
-                    mongo.db["test_progress"].find_one, {"session_id": session_id}
+                # Verify session is active for this client (adopts it after a failover)
+                if not await self._authorize_session(
+                    sid, session_id, data.get("user_id")
+                ):
+                    return
+
+                applied, rejected = self.answer_sync.apply_patches(session_id, patches)
+
+                await self.sio.emit(
+                    "answers_delta_ack",
+                    {
+                        "session_id": session_id,
+                        "applied": applied,
+                        "rejected": rejected,
+                        "received_at": datetime.utcnow().isoformat(),
+                    },
+                    to=sid,
                 )
 
-                if not session:
+            except Exception as e:
+                logger.error(f"Error in save_answers_delta: {e}", exc_info=True)
+                await self.sio.emit(
+                    "error", {"message": f"Failed to save answers: {str(e)}"}, to=sid
+                )
+
+        @self.sio.event
+        async def heartbeat(sid, data):
+            """
+            Heartbeat to maintain connection and calculate time remaining
+
+            Backend tự động tính time_remaining dựa trên started_at và time_limit.
+            Frontend gửi heartbeat chỉ để duy trì kết nối, không cần gửi time_remaining.
+
+            Data: {session_id: str}
+            """
+            try:
+                session_id = data.get("session_id")
+
+                if not session_id:
                     return
 
-                test_id = self.active_sessions[session_id]["test_id"]
-                test = await asyncio.to_thread(
-                    mongo.db["online_tests"].find_one, {"_id": ObjectId(test_id)}
+                # Verify session is active (adopts it after a failover)
+                session_info = await self._authorize_session(
+                    sid, session_id, data.get("user_id")
                 )
-
-                if not test:
+                if not session_info:
                     return
 
-                # Calculate time_remaining from elapsed time
-                time_limit_seconds = test.get("time_limit_minutes", 30) * 60
-                started_at = session.get("started_at")
+                # Timer state comes from the shared session store (no MongoDB reads)
+                await self.session_store.touch(session_id)
                 time_remaining = calculate_time_remaining(
-                    started_at, time_limit_seconds
+                    session_info["started_at"], session_info["time_limit_seconds"]
                 )
 
                 # Update heartbeat and calculated time_remaining in database
@@ -636,6 +627,7 @@ class TestWebSocketService:
                     "time_remaining_seconds": time_remaining,  # Backend-calculated value
                 }
 
+                mongo = get_mongodb_service()
                 await asyncio.to_thread(
                     mongo.db["test_progress"].update_one,
                     {"session_id": session_id},
@@ -686,26 +678,10 @@ class TestWebSocketService:
             try:
                 session_id = data.get("session_id")
 
-                if session_id in self.active_sessions:
-                    session_info = self.active_sessions[session_id]
-
-                    # Update status in database
-                    mongo = get_mongodb_service()
-                    await asyncio.to_thread(
-                        mongo.db["test_progress"].update_one,
-                        {"session_id": session_id},
-                        {
-                            "$set": {
-                                "connection_status": "disconnected",
-                                "last_heartbeat_at": datetime.utcnow(),
-                            }
-                        },
-                    )
-
-                    # Remove from tracking
-                    del self.active_sessions[session_id]
-                    if sid in self.sid_to_session:
-                        del self.sid_to_session[sid]
+                if session_id and self.sid_to_session.get(sid) == session_id:
+                    # Remove from tracking and update status in database
+                    del self.sid_to_session[sid]
+                    await self._release_session(sid, session_id)
 
                     logger.info(f"👋 Client {sid} left session {session_id}")
 
@@ -741,12 +717,9 @@ class TestWebSocketService:
                     return
 
                 # Verify session
-                if session_id not in self.active_sessions:
-                    await self.sio.emit(
-                        "error",
-                        {"message": "Session not active. Please rejoin first."},
-                        to=sid,
-                    )
+                if not await self._authorize_session(
+                    sid, session_id, data.get("user_id")
+                ):
                     return
 
                 # Merge answers with existing data
@@ -780,6 +753,8 @@ class TestWebSocketService:
                     },
                 )
 
+                self.answer_sync.mark_persisted(session_id, current_answers)
+
                 # Send updated progress back to client
                 await self.sio.emit(
                     "progress_synced",
@@ -803,6 +778,146 @@ class TestWebSocketService:
                     to=sid,
                 )
 
+    async def _authorize_session(
+        self, sid: str, session_id: str, user_id: Optional[str]
+    ) -> Optional[Dict]:
+        """
+        Check that `sid` owns the session, adopting it if the previous client
+        disconnected or its pod died (failover without rejoin). Adoption requires
+        the event's user_id to match the session owner.
+
+        Returns:
+            Session record from the store, or None (error already emitted)
+        """
+        status = await self.session_store.adopt(session_id, sid, user_id)
+
+        if status == ADOPT_MISSING:
+            await self.sio.emit(
+                "error",
+                {"message": "Session not active. Please rejoin."},
+                to=sid,
+            )
+            return None
+
+        if status == ADOPT_WRONG_USER:
+            await self.sio.emit(
+                "error",
+                {"message": "Unauthorized: Session does not belong to user"},
+                to=sid,
+            )
+            return None
+
+        if status == ADOPT_OWNED_ELSEWHERE:
+            await self.sio.emit(
+                "error",
+                {"message": "Unauthorized: Session belongs to different client"},
+                to=sid,
+            )
+            return None
+
+        if status == ADOPT_ADOPTED or self.local_sessions.get(session_id) != sid:
+            if not await self._resume_session(sid, session_id):
+                return None
+
+        return await self.session_store.get(session_id)
+
+    async def _resume_session(self, sid: str, session_id: str) -> bool:
+        """Load local state for a session adopted by this pod"""
+        mongo = get_mongodb_service()
+        session = await asyncio.to_thread(
+            mongo.db["test_progress"].find_one,
+            {"session_id": session_id, "is_completed": False},
+        )
+        if not session:
+            await self.session_store.delete(session_id)
+            await self.sio.emit(
+                "error",
+                {"message": "Session not active. Please rejoin."},
+                to=sid,
+            )
+            return False
+
+        self.local_sessions[session_id] = sid
+        self.sid_to_session[sid] = session_id
+        answer_versions = self.answer_sync.load_session(session_id, session)
+
+        await asyncio.to_thread(
+            mongo.db["test_progress"].update_one,
+            {"session_id": session_id},
+            {
+                "$set": {
+                    "connection_status": "active",
+                    "last_heartbeat_at": datetime.utcnow(),
+                }
+            },
+        )
+
+        # Patches buffered on a dead pod are lost - client resends anything above these versions
+        await self.sio.emit(
+            "session_resumed",
+            {"session_id": session_id, "answer_versions": answer_versions},
+            to=sid,
+        )
+        logger.info(
+            f"🔁 Session {session_id[:8]}... resumed by client {sid} "
+            f"on pod {self.session_store.pod_id}"
+        )
+        return True
+
+    async def _release_session(self, sid: str, session_id: str):
+        """Flush answers and detach the client; the record stays for failover/reconnect"""
+        if self.local_sessions.get(session_id) == sid:
+            del self.local_sessions[session_id]
+            # Persist buffered answer patches before dropping the session
+            await self.answer_sync.close_session(session_id)
+
+        if await self.session_store.release(session_id, sid):
+            mongo = get_mongodb_service()
+            await asyncio.to_thread(
+                mongo.db["test_progress"].update_one,
+                {"session_id": session_id},
+                {
+                    "$set": {
+                        "connection_status": "disconnected",
+                        "last_heartbeat_at": datetime.utcnow(),
+                    }
+                },
+            )
+
+    async def _on_answers_flushed(self, session_id: str, versions: Dict[str, int], ok: bool):
+        """Tell the client which answer versions are durable"""
+        sid = self.local_sessions.get(session_id)
+        if not sid:
+            return
+
+        if ok:
+            await self.sio.emit(
+                "answers_persisted",
+                {
+                    "session_id": session_id,
+                    "versions": versions,
+                    "saved_at": datetime.utcnow().isoformat(),
+                },
+                to=sid,
+            )
+        else:
+            await self.sio.emit(
+                "error",
+                {"message": "Failed to save answers. Session may be completed."},
+                to=sid,
+            )
+
+    async def shutdown(self):
+        """Flush buffered answers and release local sessions so other pods adopt them"""
+        for session_id, sid in list(self.local_sessions.items()):
+            try:
+                await self._release_session(sid, session_id)
+            except Exception as e:
+                logger.error(f"Error releasing session {session_id[:8]}... on shutdown: {e}")
+        self.sid_to_session.clear()
+        await self.session_store.close()
+        logger.info("🔌 WebSocket Service shut down (sessions released)")
+
     def get_asgi_app(self):
         """Get Socket.IO ASGI application for mounting"""
         return socketio.ASGIApp(self.sio)
@@ -0,0 +1,357 @@
+"""
+TTS Cache - content-addressed speech audio shared by every TTS path
+
+Speech for identical input (regenerated narrations, re-run jobs, repeated vocab
+words) used to be synthesized again on every request. Every TTS path now asks
+this cache first:
+
+- Key: sha256 of (normalized text, voice, language, rate, model, provider extras)
+- Audio: R2 object `tts-cache/{key[:2]}/{key}.{format}`
+- Index: `tts_cache` collection (r2_key, format, size, duration, provider metadata,
+  hit count) - an index entry is only written after the upload succeeded
+- Hit rate: daily hit/miss counters per path in `tts_cache_stats`
+
+Index entries expire TTS_CACHE_TTL_DAYS after their last hit; an R2 lifecycle rule
+on `tts-cache/` can reclaim the objects (a missing object is treated as a miss).
+Concurrent requests for the same key in one process share one provider call.
+A cache failure (R2/Mongo down) never fails the request - it falls back to the
+provider.
+
+Usage:
+    audio, metadata = await get_tts_cache().get_or_generate(
+        "slide_narration",
+        lambda: provider_call(...),
+        text=text, voice="Kore", language="vi", model="gemini-2.5-flash-preview-tts",
+    )
+
+    # Hit rate per path (last 7 days)
+    python -m src.services.tts_cache stats --days 7
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import unicodedata
+import wave
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_COLLECTION = "tts_cache"
+TTS_CACHE_STATS_COLLECTION = "tts_cache_stats"
+TTS_CACHE_PREFIX = "tts-cache"
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+# Entries not hit for this many days are dropped by the Mongo TTL index
+TTS_CACHE_TTL_DAYS = int(os.getenv("TTS_CACHE_TTL_DAYS", "90"))
+
+_CONTENT_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg"}
+
+Generator = Callable[[], Awaitable[Tuple[bytes, Dict[str, Any]]]]
+
+
+def normalize_tts_text(text: str) -> str:
+    """Unicode NFC + collapsed whitespace (case and punctuation affect prosody)"""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def tts_cache_key(
+    text: str,
+    voice: Optional[str],
+    language: Optional[str],
+    rate: float = 1.0,
+    model: Optional[str] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    payload = {
+        "text": normalize_tts_text(text),
+        "voice": voice or "",
+        "language": (language or "").lower(),
+        "rate": round(float(rate or 1.0), 3),
+        "model": model or "",
+        "extra": extra or {},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def audio_duration(audio: bytes, fmt: str) -> Optional[float]:
+    """Exact duration for WAV; None for compressed formats (provider estimate is kept)"""
+    if fmt != "wav":
+        return None
+    try:
+        with wave.open(io.BytesIO(audio)) as w:
+            return round(w.getnframes() / float(w.getframerate()), 2)
+    except Exception:
+        return None
+
+
+def _object_missing(error: Exception) -> bool:
+    """botocore ClientError for a deleted object (NoSuchKey / 404)"""
+    response = getattr(error, "response", None) or {}
+    code = response.get("Error", {}).get("Code")
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in ("NoSuchKey", "404", "NotFound") or status == 404
+
+
+class TTSCache:
+    """R2-backed speech cache with a Mongo index and per-path hit counters"""
+
+    def __init__(self, db=None, s3_client=None, bucket: Optional[str] = None):
+        self._db = db
+        self._s3 = s3_client
+        self._bucket = bucket
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._indexes_ready = False
+
+    # Lazy: importing the cache must not require R2/Mongo (video worker, scripts)
+    @property
+    def db(self):
+        if self._db is None:
+            from src.database.db_manager import DBManager
+
+            self._db = DBManager().db
+        return self._db
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            from config.config import get_r2_client
+
+            self._s3 = get_r2_client()
+        return self._s3
+
+    @property
+    def bucket(self) -> str:
+        if self._bucket is None:
+            from config.config import R2_BUCKET_NAME
+
+            self._bucket = R2_BUCKET_NAME
+        return self._bucket
+
+    def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        entries = self.db[TTS_CACHE_COLLECTION]
+        entries.create_index(
+            "last_hit_at", expireAfterSeconds=TTS_CACHE_TTL_DAYS * 86400
+        )
+        self.db[TTS_CACHE_STATS_COLLECTION].create_index([("date", -1), ("path", 1)])
+        self._indexes_ready = True
+
+    # ------------------------------------------------------------------
+    # Lookup / store (blocking - run via asyncio.to_thread)
+    # ------------------------------------------------------------------
+
+    def _load(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        self._ensure_indexes()
+        entries = self.db[TTS_CACHE_COLLECTION]
+        entry = entries.find_one({"_id": key})
+        if not entry:
+            return None
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=entry["r2_key"])
+            audio = obj["Body"].read()
+        except Exception as e:
+            if _object_missing(e):
+                # Object gone (bucket cleanup) → drop the index entry, regenerate
+                logger.warning(f"⚠️ TTS cache object missing for {key[:12]}: {e}")
+                entries.delete_one({"_id": key})
+            else:
+                # Transient R2 error: regenerate this time, keep the entry
+                logger.warning(f"⚠️ TTS cache read failed for {key[:12]}: {e}")
+            return None
+        entries.update_one(
+            {"_id": key},
+            {"$set": {"last_hit_at": datetime.utcnow()}, "$inc": {"hit_count": 1}},
+        )
+        metadata = dict(entry.get("metadata") or {})
+        if entry.get("duration_seconds") is not None:
+            metadata.setdefault("duration_seconds", entry["duration_seconds"])
+        return audio, metadata
+
+    def _store(
+        self, key: str, path: str, fmt: str, audio: bytes, metadata: Dict[str, Any]
+    ):
+        self._ensure_indexes()
+        r2_key = f"{TTS_CACHE_PREFIX}/{key[:2]}/{key}.{fmt}"
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=r2_key,
+            Body=audio,
+            ContentType=_CONTENT_TYPES.get(fmt, "application/octet-stream"),
+        )
+        duration = audio_duration(audio, fmt)
+        if duration is None:
+            duration = metadata.get("duration_seconds", metadata.get("duration"))
+        now = datetime.utcnow()
+        self.db[TTS_CACHE_COLLECTION].update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "r2_key": r2_key,
+                    "format": fmt,
+                    "size_bytes": len(audio),
+                    "duration_seconds": duration,
+                    "metadata": metadata,
+                    "last_hit_at": now,
+                },
+                "$setOnInsert": {"path": path, "created_at": now, "hit_count": 0},
+            },
+            upsert=True,
+        )
+
+    def _record(self, path: str, hit: bool, audio_bytes: int = 0):
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        inc = {"hits": 1, "bytes_served": audio_bytes} if hit else {"misses": 1}
+        self.db[TTS_CACHE_STATS_COLLECTION].update_one(
+            {"_id": f"{today}:{path}"},
+            {"$inc": inc, "$setOnInsert": {"date": today, "path": path}},
+            upsert=True,
+        )
+
+    async def _safe(self, fn, *args):
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            logger.warning(f"⚠️ TTS cache {fn.__name__} failed (ignored): {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get_or_generate(
+        self,
+        path: str,
+        generate: Generator,
+        *,
+        text: str,
+        voice: Optional[str],
+        language: Optional[str],
+        rate: float = 1.0,
+        model: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        fmt: str = "wav",
+        use_cache: bool = True,
+    ) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Cached audio for this input, or `generate()` once and cache the result
+
+        Args:
+            path: Caller name for hit-rate reporting (e.g. "slide_narration")
+            generate: Provider call returning (audio_bytes, metadata)
+            text/voice/language/rate/model/extra: Everything that changes the audio
+            fmt: Audio format returned by `generate` ("wav" | "mp3")
+            use_cache: False forces a fresh synthesis (result still refreshes the cache)
+
+        Returns:
+            (audio_bytes, metadata) - metadata["cache_hit"] tells where it came from
+        """
+        if not TTS_CACHE_ENABLED:
+            return await generate()
+
+        key = tts_cache_key(text, voice, language, rate, model, extra)
+
+        shared = self._inflight.get(key) if use_cache else None
+        if shared is not None:
+            audio, metadata = await asyncio.shield(shared)
+            await self._safe(self._record, path, True, len(audio))
+            return audio, {**metadata, "cache_hit": True}
+
+        # Registered before the lookup so concurrent callers wait for this one.
+        # Forced syntheses are not registered: they must not replace (and then
+        # drop) the entry another caller is already waiting on
+        future = asyncio.get_running_loop().create_future()
+        if use_cache:
+            self._inflight[key] = future
+        try:
+            cached = await self._safe(self._load, key) if use_cache else None
+            if cached:
+                audio, metadata = cached
+                hit = True
+                logger.info(f"🎯 TTS cache hit [{path}] {key[:12]} ({len(audio)} bytes)")
+            else:
+                audio, metadata = await generate()
+                hit = False
+            future.set_result((audio, metadata))
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else waits
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        if not hit:
+            await self._safe(self._store, key, path, fmt, audio, metadata)
+        await self._safe(self._record, path, hit, len(audio) if hit else 0)
+        return audio, {**metadata, "cache_hit": hit}
+
+    def hit_rates(self, days: int = 7) -> Dict[str, Dict[str, Any]]:
+        """{path: {hits, misses, hit_rate, bytes_served}} over the last `days` days"""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        report: Dict[str, Dict[str, Any]] = {}
+        for row in self.db[TTS_CACHE_STATS_COLLECTION].aggregate(
+            [
+                {"$match": {"date": {"$gte": since}}},
+                {
+                    "$group": {
+                        "_id": "$path",
+                        "hits": {"$sum": {"$ifNull": ["$hits", 0]}},
+                        "misses": {"$sum": {"$ifNull": ["$misses", 0]}},
+                        "bytes_served": {"$sum": {"$ifNull": ["$bytes_served", 0]}},
+                    }
+                },
+            ]
+        ):
+            total = row["hits"] + row["misses"]
+            report[row["_id"]] = {
+                "hits": row["hits"],
+                "misses": row["misses"],
+                "hit_rate": round(row["hits"] / total, 3) if total else 0.0,
+                "bytes_served": row["bytes_served"],
+            }
+        return report
+
+
+_cache: Optional[TTSCache] = None
+
+
+def get_tts_cache() -> TTSCache:
+    global _cache
+    if _cache is None:
+        _cache = TTSCache()
+    return _cache
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TTS cache tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stats = sub.add_parser("stats", help="Hit rate per TTS path")
+    stats.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        report = get_tts_cache().hit_rates(days=args.days)
+        if not report:
+            print("No TTS cache activity recorded")
+            return 0
+        print(f"\n🔊 TTS cache hit rate (last {args.days} days)\n")
+        print(f"{'path':<24} {'hits':>8} {'misses':>8} {'hit rate':>9} {'served MB':>10}")
+        for path, row in sorted(report.items()):
+            print(
+                f"{path:<24} {row['hits']:>8} {row['misses']:>8} "
+                f"{row['hit_rate'] * 100:>8.1f}% {row['bytes_served'] / 1_048_576:>10.1f}"
+            )
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
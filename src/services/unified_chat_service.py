@@ -4,6 +4,7 @@ Dịch vụ chat thống nhất với phát hiện ý định và định tuyế
 """
 
 import json
+import os
 import re
 import asyncio
 import uuid
@@ -27,12 +28,32 @@ from src.services.intent_detector import intent_detector
 from src.services.admin_service import AdminService
 from src.services.qdrant_company_service import get_qdrant_service
 from src.services.product_catalog_service import get_product_catalog_service
+from src.services.chat_turn_queue import (
+    CHAT_WEBHOOK_MAX_ATTEMPTS,
+    CHAT_WEBHOOK_RETRY_BASE_SECONDS,
+    get_chat_turn_queue,
+)
+from src.services.company_prompt_cache import (
+    CompanyPromptContext,
+    fill_template,
+    get_company_prompt_cache,
+    slot_marker,
+    split_template,
+)
 from src.providers.ai_provider_manager import AIProviderManager
 from src.services.webhook_service import webhook_service
 from src.core.config import APP_CONFIG
-from src.utils.logger import setup_logger
+from src.utils.logger import get_hot_logger, lazy, setup_logger
 
 logger = setup_logger()
+hot_logger = get_hot_logger()
+
+# Write every prompt / backend payload to logs/prompt and debug_webhook_payloads
+# (blocking file I/O on each turn - debugging only)
+CHAT_DEBUG_DUMPS = os.getenv("CHAT_DEBUG_DUMPS", "false").lower() == "true"
+
+# Per-turn values of the unified prompt; everything else is cached per company
+PROMPT_SLOTS = ("user_name", "user_context", "company_data", "products_list", "user_query")
 
 
 class UnifiedChatService:
@@ -625,16 +646,24 @@ class UnifiedChatService:
                 f"🚀 [FRONTEND_OPTIMIZED] User info - user_id: {user_id}, name: {user_name}"
             )
 
+            # Company context + catalog versions (one Redis round trip); cached
+            # company sections are only rebuilt after the company/catalog changed
+            context_version, catalog_version = get_company_prompt_cache().versions(
+                company_id
+            )
+
             # Steps 1, 2, 3, 4: Parallel data fetching with user name support and products list
             # Bước 1, 2, 3, 4: Thu thập dữ liệu song song với hỗ trợ tên người dùng và danh sách sản phẩm
-            company_data, user_context, company_context, products_list = (
+            company_data, user_context, company_prompt, products_list = (
                 await asyncio.gather(
                     self._hybrid_search_company_data_optimized(company_id, user_query),
                     self._get_user_context_optimized(
                         device_id, session_id, user_id, user_name
                     ),
-                    self._get_company_context_optimized(company_id),
-                    self._get_products_list_for_prompt(company_id, user_query),
+                    self._get_company_prompt_context(company_id, context_version),
+                    self._get_products_list_for_prompt(
+                        company_id, user_query, catalog_version
+                    ),
                     return_exceptions=True,
                 )
             )
@@ -648,9 +677,11 @@ class UnifiedChatService:
                 logger.warning(f"⚠️ User context retrieval failed: {user_context}")
                 user_context = "New user - no previous conversation history."
 
-            if isinstance(company_context, Exception):
-                logger.warning(f"⚠️ Company context retrieval failed: {company_context}")
-                company_context = "No company context available."
+            if isinstance(company_prompt, Exception):
+                logger.warning(f"⚠️ Company context retrieval failed: {company_prompt}")
+                company_prompt = CompanyPromptContext(
+                    "công ty", "No company context available.", None, None
+                )
 
             if isinstance(products_list, Exception):
                 logger.warning(f"⚠️ Products list retrieval failed: {products_list}")
@@ -659,20 +690,18 @@ class UnifiedChatService:
             # Step 4: Build unified prompt with intent detection and user name support
             # Bước 4: Xây dựng prompt thông minh với hỗ trợ tên người dùng
 
-            # Get company name directly from MongoDB instead of parsing text
-            company_name = self._get_company_name_from_db(company_id)
-
             unified_prompt = self._build_unified_prompt_with_intent(
                 user_context=user_context,
                 company_data=company_data,
-                company_context=company_context,
+                company_context=company_prompt.company_context,
                 products_list=products_list,
                 user_query=user_query,
                 industry=request.industry.value if request.industry else "general",
                 company_id=company_id,
                 session_id=request.session_id or "unknown",
                 user_name=user_name,
-                company_name=company_name,
+                company_name=company_prompt.company_name,
+                prompt_parts=company_prompt.prompt_parts,
             )
 
             logger.info(f"📝 Unified prompt built: {len(unified_prompt)} characters")
@@ -743,21 +772,6 @@ class UnifiedChatService:
                         }
                         yield f"data: {json.dumps(completion_data)}\n\n"
 
-                        # ✨ NEW: Send callback to backend for both chatdemo and chat-plugin
-                        # ✨ MỚI: Gửi callback về backend cho cả chatdemo và chat-plugin
-                        if channel in [ChannelType.CHATDEMO, ChannelType.CHAT_PLUGIN]:
-                            logger.info(
-                                f"📤 [CHANNEL_ROUTING] Sending callback to backend for {channel.value}"
-                            )
-                            # Send structured response to backend as callback
-                            await self._send_response_to_backend(
-                                request=request,
-                                ai_response=full_ai_response,
-                                parsed_response=parsed_ai_response,
-                                channel=channel,
-                                processing_start_time=processing_start_time,
-                            )
-
                     else:
                         # BACKEND CHANNELS: Collect full response and send to backend (messenger, instagram, whatsapp, zalo)
                         # CÁC KÊNH BACKEND: Thu thập full response và gửi về backend
@@ -834,15 +848,6 @@ class UnifiedChatService:
                                 }
                             )
 
-                        # Send structured response to backend for channel processing
-                        await self._send_response_to_backend(
-                            request=request,
-                            ai_response=full_ai_response,
-                            parsed_response=parsed_ai_response,
-                            channel=channel,
-                            processing_start_time=processing_start_time,
-                        )
-
                         # Return success signal to backend caller with structured data
                         success_response = {
                             "type": "backend_processed",
@@ -852,25 +857,23 @@ class UnifiedChatService:
                         }
                         yield f"data: {json.dumps(success_response)}\n\n"
 
-                    # Save conversation to database after processing - CRITICAL for user_context
                     logger.info(
                         f"💾 [STREAM_COMPLETE] Full AI response collected: {len(full_ai_response)} chars"
                     )
-                    logger.info(
-                        f"💾 [STREAM_COMPLETE] Saving conversation for future user_context retrieval"
-                    )
-
-                    # Use await instead of create_task to ensure conversation is saved
-                    # Sử dụng await thay vì create_task để đảm bảo conversation được lưu
-                    await self._save_complete_conversation_async(
-                        request=request,
-                        company_id=company_id,
-                        user_query=user_query,
-                        ai_response=full_ai_response,
-                    )
 
-                    logger.info(
-                        f"✅ [STREAM_COMPLETE] Conversation saved successfully for user_context"
+                    # Backend callback, conversation save and webhooks run write-behind
+                    # (chat persistence worker) so the stream closes right away
+                    # Callback, lưu hội thoại và webhook chạy nền - stream đóng ngay
+                    await self._complete_turn(
+                        self._build_turn_event(
+                            request=request,
+                            company_id=company_id,
+                            user_query=user_query,
+                            ai_response=full_ai_response,
+                            parsed_response=parsed_ai_response,
+                            channel=channel,
+                            processing_start_time=processing_start_time,
+                        )
                     )
 
                 except Exception as e:
@@ -903,11 +906,16 @@ class UnifiedChatService:
         channel: ChannelType,
         parsed_response: Dict[str, Any] = None,
         processing_start_time: float = None,
-    ):
+    ) -> bool:
         """
         Send AI response to backend for channel-specific processing
         Gửi AI response về backend để xử lý theo kênh cụ thể
+
+        Returns:
+            bool: True once the backend accepted the callback (order/intent
+            follow-ups after that are not retried)
         """
+        delivered = False
         try:
             logger.info(
                 f"📤 [BACKEND_ROUTING] Sending response to backend for channel: {channel.value}"
@@ -1220,24 +1228,21 @@ class UnifiedChatService:
             else:
                 logger.error(f"❌ [WEBHOOK_PAYLOAD] aiResponse field is MISSING!")
 
-            # 📄 Save full payload to file for debugging
-            import json
-            import os
-
-            # Create debug directory if it doesn't exist
-            debug_dir = "debug_webhook_payloads"
-            os.makedirs(debug_dir, exist_ok=True)
+            # 📄 Save full payload to file for debugging (CHAT_DEBUG_DUMPS)
+            if CHAT_DEBUG_DUMPS:
+                debug_dir = "debug_webhook_payloads"
+                os.makedirs(debug_dir, exist_ok=True)
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            payload_filename = f"webhook_payload_{request.company_id}_{request.session_id}_{timestamp}.json"
-            full_path = os.path.join(debug_dir, payload_filename)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                payload_filename = f"webhook_payload_{request.company_id}_{request.session_id}_{timestamp}.json"
+                full_path = os.path.join(debug_dir, payload_filename)
 
-            try:
-                with open(full_path, "w", encoding="utf-8") as f:
-                    json.dump(backend_payload, f, indent=2, ensure_ascii=False)
-                logger.info(f"📄 [WEBHOOK_PAYLOAD] Full payload saved to: {full_path}")
-            except Exception as e:
-                logger.error(f"❌ [WEBHOOK_PAYLOAD] Failed to save payload file: {e}")
+                try:
+                    with open(full_path, "w", encoding="utf-8") as f:
+                        json.dump(backend_payload, f, indent=2, ensure_ascii=False)
+                    logger.info(f"📄 [WEBHOOK_PAYLOAD] Full payload saved to: {full_path}")
+                except Exception as e:
+                    logger.error(f"❌ [WEBHOOK_PAYLOAD] Failed to save payload file: {e}")
 
             async with httpx.AsyncClient() as client:
                 response = await client.post(
@@ -1248,6 +1253,7 @@ class UnifiedChatService:
                 )
 
                 if response.status_code == 200:
+                    delivered = True
                     logger.info(
                         f"✅ [BACKEND_ROUTING] Successfully sent to backend for {channel.value}"
                     )
@@ -1420,6 +1426,7 @@ class UnifiedChatService:
             logger.error(f"❌ [BACKEND_ROUTING] Failed to send to backend: {e}")
             # Don't raise exception - this shouldn't break the main flow
             # Không raise exception - điều này không nên phá vỡ luồng chính
+        return delivered
 
     def _is_check_quantity_webhook_ready(
         self, parsed_response: Dict[str, Any], user_message: str
@@ -2417,17 +2424,17 @@ Chỉ trả về JSON, không có text khác.
                     chunk_id = item.get("chunk_id", "unknown")
                     file_id = item.get("file_id", "unknown")
 
-                    logger.info(f"   📄 Chunk {i+1}:")
-                    logger.info(f"      ID: {chunk_id}")
-                    logger.info(f"      File: {file_id}")
-                    logger.info(f"      Type: {data_type}")
-                    logger.info(f"      Score: {score:.3f}")
-                    logger.info(f"      Content length: {len(content)} chars")
-
-                    if len(content) > 100:
-                        logger.info(f"      Content preview: {content[:200]}...")
-                    else:
-                        logger.info(f"      Full content: {content}")
+                    # Per-chunk detail: rate limited, preview built only if emitted
+                    hot_logger.info(
+                        "   📄 Chunk %d: id=%s file=%s type=%s score=%.3f len=%d | %s",
+                        i + 1,
+                        chunk_id,
+                        file_id,
+                        data_type,
+                        score,
+                        len(content),
+                        lazy(lambda c=content: c[:200]),
+                    )
 
                     # Format for prompt with data type label
                     formatted_results.append(f"[{data_type.upper()}] {content.strip()}")
@@ -2456,9 +2463,11 @@ Chỉ trả về JSON, không có text khác.
             logger.error(f"❌ [COMPANY_DATA] Error in Qdrant search: {e}")
             return "No relevant company data found."
 
-    async def _get_products_list_for_prompt(self, company_id: str, query: str) -> str:
+    async def _get_products_list_for_prompt(
+        self, company_id: str, query: str, version: Optional[int] = None
+    ) -> str:
         """
-        Get products list from MongoDB catalog service for prompt
+        Get products list from MongoDB catalog service for prompt (cached per catalog version)
         Lấy danh sách sản phẩm từ MongoDB catalog service cho prompt
         """
         try:
@@ -2469,41 +2478,50 @@ Chỉ trả về JSON, không có text khác.
                 logger.warning("⚠️ Catalog service not available")
                 return "No products data available."
 
-            # Get catalog data from MongoDB
-            catalog_data = await self.catalog_service.get_catalog_for_prompt(
-                company_id=company_id,
-                query=query,
-                limit=20,  # Get more products for comprehensive inventory info
+            return await get_company_prompt_cache().get_products(
+                company_id,
+                query,
+                lambda: self._load_products_list_for_prompt(company_id, query),
+                version=version,
             )
 
-            if catalog_data and len(catalog_data) > 0:
-                # Format products for prompt with inventory labels
-                formatted_products = []
-                for item in catalog_data:
-                    item_id = item.get("item_id", "N/A")
-                    item_type = item.get("item_type", "unknown")
-                    name = item.get("name", "Unknown")
-                    quantity_display = item.get("quantity_display", "N/A")
-                    price_display = item.get("price_display", "N/A")
+        except Exception as e:
+            logger.error(f"❌ [PRODUCTS_LIST] Error getting products list: {e}")
+            return "Error retrieving products data."
 
-                    formatted_products.append(
-                        f"[{item_type.upper()}] {name} (ID: {item_id}) - Số lượng: {quantity_display}, Giá: {price_display}"
-                    )
+    async def _load_products_list_for_prompt(self, company_id: str, query: str) -> str:
+        """Catalog search + formatting (errors propagate so they are not cached)"""
+        # Get catalog data from MongoDB
+        catalog_data = await self.catalog_service.get_catalog_for_prompt(
+            company_id=company_id,
+            query=query,
+            limit=20,  # Get more products for comprehensive inventory info
+        )
 
-                result = "[DỮ LIỆU TỒN KHO - CHÍNH XÁC NHẤT]\n" + "\n".join(
-                    formatted_products
-                )
-                logger.info(
-                    f"✅ [PRODUCTS_LIST] Found {len(catalog_data)} products from MongoDB"
+        if catalog_data and len(catalog_data) > 0:
+            # Format products for prompt with inventory labels
+            formatted_products = []
+            for item in catalog_data:
+                item_id = item.get("item_id", "N/A")
+                item_type = item.get("item_type", "unknown")
+                name = item.get("name", "Unknown")
+                quantity_display = item.get("quantity_display", "N/A")
+                price_display = item.get("price_display", "N/A")
+
+                formatted_products.append(
+                    f"[{item_type.upper()}] {name} (ID: {item_id}) - Số lượng: {quantity_display}, Giá: {price_display}"
                 )
-                return result
-            else:
-                logger.info("📭 [PRODUCTS_LIST] No products found in catalog")
-                return "No products data available."
 
-        except Exception as e:
-            logger.error(f"❌ [PRODUCTS_LIST] Error getting products list: {e}")
-            return "Error retrieving products data."
+            result = "[DỮ LIỆU TỒN KHO - CHÍNH XÁC NHẤT]\n" + "\n".join(
+                formatted_products
+            )
+            logger.info(
+                f"✅ [PRODUCTS_LIST] Found {len(catalog_data)} products from MongoDB"
+            )
+            return result
+        else:
+            logger.info("📭 [PRODUCTS_LIST] No products found in catalog")
+            return "No products data available."
 
     async def _get_user_context_optimized(
         self,
@@ -2653,168 +2671,179 @@ Chỉ trả về JSON, không có text khác.
             else:
                 return "No previous conversation history."
 
-    def _get_company_name_from_db(self, company_id: str) -> str:
-        """
-        Get company name directly from MongoDB companies collection
-        Lấy tên công ty trực tiếp từ MongoDB companies collection
-        """
-        try:
-            from src.database.company_db_service import get_company_db_service
-
-            db_service = get_company_db_service()
-            company_data = db_service.companies.find_one({"company_id": company_id})
-
-            if company_data and company_data.get("company_name"):
-                company_name = company_data["company_name"].strip()
-                if company_name and company_name != "Chưa có thông tin":
-                    logger.info(f"✅ [COMPANY_NAME] Found: '{company_name}'")
-                    return company_name
-
-            logger.warning(f"⚠️ [COMPANY_NAME] Not found for company_id: {company_id}")
-            return "công ty"
+    @staticmethod
+    def _company_display_name(company_data: Optional[Dict[str, Any]]) -> str:
+        """Company name for the prompt ("công ty" when missing)"""
+        company_name = ((company_data or {}).get("company_name") or "").strip()
+        if company_name and company_name != "Chưa có thông tin":
+            return company_name
+        return "công ty"
 
-        except Exception as e:
-            logger.error(f"❌ [COMPANY_NAME] Error getting company name: {e}")
-            return "công ty"
-
-    async def _get_company_context_optimized(self, company_id: str) -> str:
+    @staticmethod
+    def _format_company_context(company_data: Dict[str, Any]) -> str:
         """
-        Get company context ONLY from MongoDB companies collection
-        Chỉ lấy company context từ MongoDB companies collection - KHÔNG fallback
+        Format a companies document into the prompt's company section
+        Định dạng thông tin công ty (liên hệ, địa chỉ, FAQs, kịch bản) cho prompt
         """
-        try:
-            logger.info(
-                f"🏢 [COMPANY_CONTEXT] Getting company context for: {company_id}"
-            )
-
-            # Get company data from companies collection
-            from src.database.company_db_service import get_company_db_service
-
-            db_service = get_company_db_service()
-            company_data = db_service.companies.find_one({"company_id": company_id})
-
-            if not company_data:
-                logger.warning(
-                    f"⚠️ Company {company_id} not found in companies collection"
-                )
-                return "No company context available."
-
-            # Format company context - always has company_name and industry
-            formatted_context = f"""=== THÔNG TIN CÔNG TY ===
+        # Format company context - always has company_name and industry
+        formatted_context = f"""=== THÔNG TIN CÔNG TY ===
 Tên công ty: {company_data.get('company_name', 'Chưa có thông tin')}
 Ngành nghề: {company_data.get('industry', 'Chưa có thông tin')}"""
 
-            # Add metadata information if available
-            metadata = company_data.get("metadata", {})
-            if metadata:
-                if metadata.get("description"):
-                    formatted_context += f"\nMô tả: {metadata['description']}"
-
-                # Contact info
+        # Add metadata information if available
+        metadata = company_data.get("metadata", {})
+        if metadata:
+            if metadata.get("description"):
+                formatted_context += f"\nMô tả: {metadata['description']}"
+
+            # Contact info
+            if (
+                metadata.get("email")
+                or metadata.get("phone")
+                or metadata.get("website")
+            ):
+                formatted_context += "\n\n=== THÔNG TIN LIÊN HỆ ==="
+                if metadata.get("email"):
+                    formatted_context += f"\nEmail: {metadata['email']}"
+                if metadata.get("phone"):
+                    formatted_context += f"\nSố điện thoại: {metadata['phone']}"
+                if metadata.get("website"):
+                    formatted_context += f"\nWebsite: {metadata['website']}"
+
+            # Location info
+            location = metadata.get("location", {})
+            if location:
                 if (
-                    metadata.get("email")
-                    or metadata.get("phone")
-                    or metadata.get("website")
+                    location.get("address")
+                    or location.get("city")
+                    or location.get("country")
                 ):
-                    formatted_context += "\n\n=== THÔNG TIN LIÊN HỆ ==="
-                    if metadata.get("email"):
-                        formatted_context += f"\nEmail: {metadata['email']}"
-                    if metadata.get("phone"):
-                        formatted_context += f"\nSố điện thoại: {metadata['phone']}"
-                    if metadata.get("website"):
-                        formatted_context += f"\nWebsite: {metadata['website']}"
-
-                # Location info
-                location = metadata.get("location", {})
-                if location:
-                    if (
-                        location.get("address")
-                        or location.get("city")
-                        or location.get("country")
-                    ):
-                        formatted_context += "\n\n=== ĐỊA CHỈ ==="
-                        if location.get("address"):
-                            formatted_context += f"\nĐịa chỉ: {location['address']}"
-                        if location.get("city"):
-                            formatted_context += f"\nThành phố: {location['city']}"
-                        if location.get("country"):
-                            formatted_context += f"\nQuốc gia: {location['country']}"
-
-                # Social links
-                social_links = metadata.get("social_links", {})
-                if social_links:
-                    formatted_context += "\n\n=== MẠNG XÃ HỘI ==="
-                    if social_links.get("facebook"):
-                        formatted_context += f"\nFacebook: {social_links['facebook']}"
-                    if social_links.get("instagram"):
-                        formatted_context += f"\nInstagram: {social_links['instagram']}"
-                    if social_links.get("zalo"):
-                        formatted_context += f"\nZalo: {social_links['zalo']}"
-                    if social_links.get("twitter"):
-                        formatted_context += f"\nTwitter: {social_links['twitter']}"
-                    if social_links.get("linkedin"):
-                        formatted_context += f"\nLinkedIn: {social_links['linkedin']}"
-                    if social_links.get("whatsapp"):
-                        formatted_context += f"\nWhatsApp: {social_links['whatsapp']}"
-                    if social_links.get("telegram"):
-                        formatted_context += f"\nTelegram: {social_links['telegram']}"
-
-                # FAQs
-                faqs = metadata.get("faqs", [])
-                if faqs:
-                    formatted_context += (
-                        f"\n\n=== CÂU HỎI THƯỜNG GẶP ({len(faqs)} câu) ==="
-                    )
-                    for i, faq in enumerate(faqs, 1):
-                        formatted_context += f"\n{i}. Q: {faq.get('question', '')}"
-                        formatted_context += f"\n   A: {faq.get('answer', '')}"
-
-                # Scenarios
-                scenarios = metadata.get("scenarios", [])
-                if scenarios:
-                    formatted_context += (
-                        f"\n\n=== KỊCH BẢN XỬ LÝ ({len(scenarios)} kịch bản) ==="
-                    )
-                    for i, scenario in enumerate(scenarios, 1):
-                        formatted_context += f"\n{i}. {scenario.get('name', '')}: {scenario.get('description', '')}"
+                    formatted_context += "\n\n=== ĐỊA CHỈ ==="
+                    if location.get("address"):
+                        formatted_context += f"\nĐịa chỉ: {location['address']}"
+                    if location.get("city"):
+                        formatted_context += f"\nThành phố: {location['city']}"
+                    if location.get("country"):
+                        formatted_context += f"\nQuốc gia: {location['country']}"
+
+            # Social links
+            social_links = metadata.get("social_links", {})
+            if social_links:
+                formatted_context += "\n\n=== MẠNG XÃ HỘI ==="
+                if social_links.get("facebook"):
+                    formatted_context += f"\nFacebook: {social_links['facebook']}"
+                if social_links.get("instagram"):
+                    formatted_context += f"\nInstagram: {social_links['instagram']}"
+                if social_links.get("zalo"):
+                    formatted_context += f"\nZalo: {social_links['zalo']}"
+                if social_links.get("twitter"):
+                    formatted_context += f"\nTwitter: {social_links['twitter']}"
+                if social_links.get("linkedin"):
+                    formatted_context += f"\nLinkedIn: {social_links['linkedin']}"
+                if social_links.get("whatsapp"):
+                    formatted_context += f"\nWhatsApp: {social_links['whatsapp']}"
+                if social_links.get("telegram"):
+                    formatted_context += f"\nTelegram: {social_links['telegram']}"
+
+            # FAQs
+            faqs = metadata.get("faqs", [])
+            if faqs:
+                formatted_context += (
+                    f"\n\n=== CÂU HỎI THƯỜNG GẶP ({len(faqs)} câu) ==="
+                )
+                for i, faq in enumerate(faqs, 1):
+                    formatted_context += f"\n{i}. Q: {faq.get('question', '')}"
+                    formatted_context += f"\n   A: {faq.get('answer', '')}"
+
+            # Scenarios
+            scenarios = metadata.get("scenarios", [])
+            if scenarios:
+                formatted_context += (
+                    f"\n\n=== KỊCH BẢN XỬ LÝ ({len(scenarios)} kịch bản) ==="
+                )
+                for i, scenario in enumerate(scenarios, 1):
+                    formatted_context += f"\n{i}. {scenario.get('name', '')}: {scenario.get('description', '')}"
+
+        return formatted_context
+
+    async def _load_company_prompt_context(
+        self, company_id: str, version: Optional[int]
+    ) -> CompanyPromptContext:
+        """
+        Build the cached static prompt data of a company (one companies.find_one)
+        Tạo dữ liệu prompt tĩnh của công ty: tên, context, các phần prompt đã render
+        """
+        from src.database.company_db_service import get_company_db_service
 
-            logger.info(
-                f"✅ [COMPANY_CONTEXT] Found company context: {len(formatted_context)} chars"
+        db_service = get_company_db_service()
+        company_data = await asyncio.to_thread(
+            db_service.companies.find_one, {"company_id": company_id}
+        )
+
+        if company_data:
+            company_context = self._format_company_context(company_data)
+        else:
+            logger.warning(f"⚠️ Company {company_id} not found in companies collection")
+            company_context = "No company context available."
+        company_name = self._company_display_name(company_data)
+
+        # Render the static prompt once; per-turn values are filled into the slots
+        prompt_parts = split_template(
+            self._render_unified_prompt(
+                company_name=company_name,
+                company_context=company_context,
+                **{slot: slot_marker(slot) for slot in PROMPT_SLOTS},
             )
-            return formatted_context
+        )
+        logger.info(
+            f"✅ [COMPANY_CONTEXT] Cached prompt context for {company_id}: "
+            f"'{company_name}', {len(company_context)} chars"
+        )
+        return CompanyPromptContext(
+            company_name, company_context, prompt_parts, version
+        )
 
+    async def _get_company_prompt_context(
+        self, company_id: str, version: Optional[int] = None
+    ) -> CompanyPromptContext:
+        """
+        Company name + context + pre-rendered prompt, cached per company version
+        Lấy context công ty từ cache (chỉ đọc MongoDB khi công ty thay đổi)
+        """
+        try:
+            return await get_company_prompt_cache().get_context(
+                company_id,
+                lambda v: self._load_company_prompt_context(company_id, v),
+                version=version,
+            )
         except Exception as e:
             logger.error(f"❌ [COMPANY_CONTEXT] Error getting company context: {e}")
-            return "No company context available."
+            return CompanyPromptContext(
+                "công ty", "No company context available.", None, None
+            )
 
-    def _build_unified_prompt_with_intent(
-        self,
+    async def _get_company_context_optimized(self, company_id: str) -> str:
+        """
+        Get company context ONLY from MongoDB companies collection (cached)
+        Chỉ lấy company context từ MongoDB companies collection - KHÔNG fallback
+        """
+        return (await self._get_company_prompt_context(company_id)).company_context
+
+    @staticmethod
+    def _render_unified_prompt(
+        company_name: Optional[str],
+        company_context: str,
+        user_name: Optional[str],
         user_context: str,
         company_data: str,
-        company_context: str,
         products_list: str,
         user_query: str,
-        industry: str,
-        company_id: str = "unknown",
-        session_id: str = "unknown",
-        user_name: str = None,
-        company_name: str = None,
     ) -> str:
         """
-        FRONTEND OPTIMIZED: Build comprehensive prompt with user name support
-        FRONTEND TỐI ƯU: Xây dựng prompt toàn diện với hỗ trợ tên người dùng
+        Unified prompt template (static per company except the per-turn slots)
+        Mẫu prompt chung - chỉ user_name, lịch sử, dữ liệu RAG, sản phẩm, câu hỏi thay đổi mỗi lượt
         """
-        from src.services.prompt_templates import PromptTemplates
-        import os
-
-        # Extract user name from context if provided
-        user_greeting = "Chào bạn"
-        if user_name and user_name.strip():
-            user_greeting = f"Chào {user_name.strip()}"
-            logger.info(f"📝 [PROMPT] Using personalized greeting: {user_greeting}")
-
-        # Build optimized prompt structure
-        unified_prompt = f"""Bạn là một AI Assistant chuyên nghiệp của công ty {company_name or "này"}, có khả năng phân tích ý định của khách hàng và đưa ra câu trả lời tự nhiên, hữu ích.
+        return f"""Bạn là một AI Assistant chuyên nghiệp của công ty {company_name or "này"}, có khả năng phân tích ý định của khách hàng và đưa ra câu trả lời tự nhiên, hữu ích.
 
 **THÔNG TIN NGƯỜI DÙNG:**
 - Tên (có thể rỗng): {user_name}
@@ -3047,188 +3076,282 @@ BẮT ĐẦU THỰC HIỆN.
 
 """
 
-        # 📝 LOG PROMPT FOR DEBUGGING - Ghi log prompt để debug
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            log_filename = f"prompt_{company_id}_{session_id}_{timestamp}.txt"
-
-            # Use relative path for server environment
-            log_dir = os.path.join(os.getcwd(), "logs", "prompt")
-            os.makedirs(log_dir, exist_ok=True)  # Ensure directory exists
-            log_path = os.path.join(log_dir, log_filename)
-
-            with open(log_path, "w", encoding="utf-8") as f:
-                f.write("=" * 80 + "\n")
-                f.write(f"PROMPT LOG - {timestamp}\n")
-                f.write("=" * 80 + "\n")
-                f.write(f"Company ID: {company_id}\n")
-                f.write(f"Session ID: {session_id}\n")
-                f.write(f"Industry: {industry}\n")
-                f.write(f"User Query: {user_query}\n")
-                f.write("=" * 80 + "\n")
-                f.write("FULL PROMPT:\n")
-                f.write("=" * 80 + "\n")
-                f.write(unified_prompt)
-                f.write("\n" + "=" * 80 + "\n")
-                f.write("CONTEXT BREAKDOWN:\n")
-                f.write("=" * 80 + "\n")
-                f.write(
-                    f"USER CONTEXT ({len(user_context)} chars):\n{user_context}\n\n"
-                )
-                f.write(
-                    f"COMPANY DATA ({len(company_data)} chars):\n{company_data}\n\n"
-                )
-                f.write(
-                    f"COMPANY CONTEXT ({len(company_context)} chars):\n{company_context}\n"
-                )
+    def _build_unified_prompt_with_intent(
+        self,
+        user_context: str,
+        company_data: str,
+        company_context: str,
+        products_list: str,
+        user_query: str,
+        industry: str,
+        company_id: str = "unknown",
+        session_id: str = "unknown",
+        user_name: str = None,
+        company_name: str = None,
+        prompt_parts: Optional[List[str]] = None,
+    ) -> str:
+        """
+        FRONTEND OPTIMIZED: Build comprehensive prompt with user name support
+        FRONTEND TỐI ƯU: Xây dựng prompt toàn diện với hỗ trợ tên người dùng
 
-            logger.info(f"📝 Prompt logged to: {log_filename}")
+        prompt_parts: Cached company template (CompanyPromptContext.prompt_parts) -
+        only the per-turn slots are filled instead of re-rendering the whole prompt
+        """
+        from src.services.prompt_templates import PromptTemplates
+        import os
 
-        except Exception as e:
-            logger.error(f"❌ Failed to log prompt: {e}")
+        # Extract user name from context if provided
+        user_greeting = "Chào bạn"
+        if user_name and user_name.strip():
+            user_greeting = f"Chào {user_name.strip()}"
+            logger.info(f"📝 [PROMPT] Using personalized greeting: {user_greeting}")
+
+        if prompt_parts:
+            unified_prompt = fill_template(
+                prompt_parts,
+                {
+                    "user_name": user_name,
+                    "user_context": user_context,
+                    "company_data": company_data,
+                    "products_list": products_list,
+                    "user_query": user_query,
+                },
+            )
+        else:
+            unified_prompt = self._render_unified_prompt(
+                company_name=company_name,
+                company_context=company_context,
+                user_name=user_name,
+                user_context=user_context,
+                company_data=company_data,
+                products_list=products_list,
+                user_query=user_query,
+            )
+
+        # 📝 LOG PROMPT FOR DEBUGGING - Ghi log prompt để debug (CHAT_DEBUG_DUMPS)
+        if CHAT_DEBUG_DUMPS:
+            try:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                log_filename = f"prompt_{company_id}_{session_id}_{timestamp}.txt"
+
+                # Use relative path for server environment
+                log_dir = os.path.join(os.getcwd(), "logs", "prompt")
+                os.makedirs(log_dir, exist_ok=True)  # Ensure directory exists
+                log_path = os.path.join(log_dir, log_filename)
+
+                with open(log_path, "w", encoding="utf-8") as f:
+                    f.write("=" * 80 + "\n")
+                    f.write(f"PROMPT LOG - {timestamp}\n")
+                    f.write("=" * 80 + "\n")
+                    f.write(f"Company ID: {company_id}\n")
+                    f.write(f"Session ID: {session_id}\n")
+                    f.write(f"Industry: {industry}\n")
+                    f.write(f"User Query: {user_query}\n")
+                    f.write("=" * 80 + "\n")
+                    f.write("FULL PROMPT:\n")
+                    f.write("=" * 80 + "\n")
+                    f.write(unified_prompt)
+                    f.write("\n" + "=" * 80 + "\n")
+                    f.write("CONTEXT BREAKDOWN:\n")
+                    f.write("=" * 80 + "\n")
+                    f.write(
+                        f"USER CONTEXT ({len(user_context)} chars):\n{user_context}\n\n"
+                    )
+                    f.write(
+                        f"COMPANY DATA ({len(company_data)} chars):\n{company_data}\n\n"
+                    )
+                    f.write(
+                        f"COMPANY CONTEXT ({len(company_context)} chars):\n{company_context}\n"
+                    )
+
+                logger.info(f"📝 Prompt logged to: {log_filename}")
+
+            except Exception as e:
+                logger.error(f"❌ Failed to log prompt: {e}")
 
         # Replace user_query placeholder in the prompt
         unified_prompt = unified_prompt.replace("{user_query}", user_query)
 
         return unified_prompt
 
-    async def _save_complete_conversation_async(
+    @staticmethod
+    def _turn_identifiers(request: UnifiedChatRequest):
+        """(user_id, device_id, session_id) of a request, "unknown" mapped to None"""
+        user_id = device_id = None
+        if request.user_info:
+            user_id = (
+                request.user_info.user_id
+                if request.user_info.user_id != "unknown"
+                else None
+            )
+            device_id = (
+                request.user_info.device_id
+                if request.user_info.device_id != "unknown"
+                else None
+            )
+        session_id = request.session_id if request.session_id != "unknown" else None
+        return user_id, device_id, session_id
+
+    def _build_turn_event(
         self,
         request: UnifiedChatRequest,
         company_id: str,
         user_query: str,
         ai_response: str,
-    ):
+        parsed_response: Dict[str, Any],
+        channel: ChannelType,
+        processing_start_time: float,
+    ) -> Dict[str, Any]:
         """
-        Save complete conversation and send appropriate webhooks AFTER streaming completes
-        Lưu hội thoại hoàn chỉnh và gửi webhook phù hợp SAU KHI streaming kết thúc
+        Compact, JSON-serializable "turn completed" event for the write-behind queue
+        Sự kiện "hoàn tất lượt chat" gửi vào hàng đợi write-behind
         """
-        try:
-            # Extract user identifiers
-            user_id = None
-            device_id = None
-            session_id = request.session_id
-
-            if request.user_info:
-                user_id = (
-                    request.user_info.user_id
-                    if request.user_info.user_id != "unknown"
-                    else None
-                )
-                device_id = (
-                    request.user_info.device_id
-                    if request.user_info.device_id != "unknown"
-                    else None
-                )
-
-            session_id = session_id if session_id != "unknown" else None
+        return {
+            "turn_id": uuid.uuid4().hex,
+            "company_id": company_id,
+            "channel": channel.value,
+            "request": request.model_dump(mode="json", by_alias=True),
+            "user_query": user_query,
+            "ai_response": ai_response,
+            "parsed_response": parsed_response,
+            "processing_time_ms": int((time.time() - processing_start_time) * 1000),
+            "completed_at": datetime.now().isoformat(),
+        }
 
-            logger.info(f"💾 [SAVE_COMPLETE] Processing with identifiers:")
-            logger.info(f"💾 [SAVE_COMPLETE] - user_id: {user_id}")
-            logger.info(f"💾 [SAVE_COMPLETE] - device_id: {device_id}")
-            logger.info(f"💾 [SAVE_COMPLETE] - session_id: {session_id}")
+    async def _complete_turn(self, event: Dict[str, Any]):
+        """Queue the turn for the persistence worker; process inline if Redis is down"""
+        if await get_chat_turn_queue().publish(event):
+            return
+        await self.process_completed_turns([event])
 
-            # Check if user/device exists in system
-            is_new_user = True
-            if self.conversation_manager and (user_id or device_id or session_id):
-                # Check if user has any previous messages
-                existing_messages = (
-                    self.conversation_manager.get_optimized_messages_for_frontend(
-                        user_id=user_id,
-                        device_id=device_id,
-                        session_id=session_id,
-                        rag_context="",
-                        current_query="",
-                    )
-                )
-                is_new_user = not existing_messages or len(existing_messages) == 0
-                logger.info(f"� [SAVE_COMPLETE] Is new user: {is_new_user}")
+    async def process_completed_turns(self, events: List[Dict[str, Any]]):
+        """
+        Save and dispatch turns in this process (fallback when the queue is unavailable)
+        Xử lý trực tiếp các lượt chat khi không có hàng đợi
+        """
+        first_turn = await self.save_completed_turns(events)
+        for event, is_new_user in zip(events, first_turn):
+            await self.dispatch_turn_webhooks(event, is_new_user)
 
-            # Save conversation to database
-            conversation_saved = False
-            if self.conversation_manager and ai_response and ai_response.strip():
-                if user_id or device_id or session_id:
-                    try:
-                        # Save user message
-                        user_saved = self.conversation_manager.add_message_enhanced(
-                            user_id=user_id,
-                            device_id=device_id,
-                            session_id=session_id,
-                            role="user",
-                            content=user_query,
-                        )
+    async def save_completed_turns(self, events: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Save user + AI messages of several turns in one batch
+        Lưu tin nhắn của nhiều lượt chat trong một lần ghi
 
-                        # Save AI response
-                        ai_saved = self.conversation_manager.add_message_enhanced(
-                            user_id=user_id,
-                            device_id=device_id,
-                            session_id=session_id,
-                            role="assistant",
-                            content=ai_response,
-                        )
+        New-user status comes from the conversation header's message_count (read
+        while reserving message numbers) instead of re-reading the history.
 
-                        conversation_saved = user_saved and ai_saved
-                        if conversation_saved:
-                            primary_identifier = user_id or device_id or session_id
-                            logger.info(
-                                f"💾 [SAVE_COMPLETE] ✅ Conversation saved for: {primary_identifier}"
-                            )
-                            logger.info(
-                                f"💾 [SAVE_COMPLETE] ✅ User message saved: {user_saved}"
-                            )
-                            logger.info(
-                                f"💾 [SAVE_COMPLETE] ✅ AI response saved: {ai_saved}"
-                            )
-                            logger.info(
-                                f"💾 [SAVE_COMPLETE] ✅ Future user_context will include this conversation"
-                            )
+        Args:
+            events: Turn events from _build_turn_event
 
-                            # Verify conversation was saved and can be retrieved for user_context
-                            verification_success = (
-                                await self._verify_conversation_saved(
-                                    user_id=user_id,
-                                    device_id=device_id,
-                                    session_id=session_id,
-                                    expected_messages=2,  # User + AI message
-                                )
-                            )
+        Returns:
+            List[bool]: Per turn, True if it is the user's first turn (new user);
+                False for turns that were not saved
+        """
+        first_turn = [False] * len(events)
+        turns, positions = [], []
+        for i, event in enumerate(events):
+            request = UnifiedChatRequest.model_validate(event["request"])
+            user_id, device_id, session_id = self._turn_identifiers(request)
+            ai_response = event.get("ai_response") or ""
+            if not (user_id or device_id or session_id):
+                logger.warning(
+                    f"⚠️ [SAVE_COMPLETE] No valid identifiers to save conversation"
+                )
+                continue
+            if not ai_response.strip():
+                logger.warning(f"⚠️ [SAVE_COMPLETE] Empty AI response, skipping save")
+                continue
+            timestamp = datetime.fromisoformat(event["completed_at"])
+            turns.append(
+                {
+                    "user_id": user_id,
+                    "device_id": device_id,
+                    "session_id": session_id,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": event["user_query"],
+                            "timestamp": timestamp,
+                        },
+                        {
+                            "role": "assistant",
+                            "content": ai_response,
+                            "timestamp": timestamp,
+                        },
+                    ],
+                }
+            )
+            positions.append(i)
 
-                            if verification_success:
-                                logger.info(
-                                    f"✅ [SAVE_COMPLETE] Conversation verification PASSED - user_context will work"
-                                )
-                            else:
-                                logger.error(
-                                    f"❌ [SAVE_COMPLETE] Conversation verification FAILED - user_context may be incomplete"
-                                )
+        if turns:
+            if not self.conversation_manager:
+                logger.warning(f"⚠️ [SAVE_COMPLETE] conversation_manager not available")
+                return first_turn
+            saved = await asyncio.to_thread(
+                self.conversation_manager.save_chat_turns, turns
+            )
+            for i, is_new in zip(positions, saved):
+                first_turn[i] = is_new
+            logger.info(f"💾 [SAVE_COMPLETE] ✅ Saved {len(turns)} conversation turns")
+        return first_turn
+
+    async def dispatch_turn_webhooks(
+        self, event: Dict[str, Any], is_new_user: bool
+    ) -> bool:
+        """
+        Backend callback (retried) + conversation webhooks for one saved turn
+        Gửi callback về backend (có retry) và webhook hội thoại cho một lượt chat
 
-                        else:
-                            logger.error(
-                                f"❌ [SAVE_COMPLETE] Failed to save conversation"
-                            )
-                            logger.error(
-                                f"❌ [SAVE_COMPLETE] User saved: {user_saved}, AI saved: {ai_saved}"
-                            )
+        Returns:
+            bool: False if the backend callback failed after every attempt
+        """
+        request = UnifiedChatRequest.model_validate(event["request"])
+        channel = ChannelType(event["channel"])
+        # Processing time was measured when the turn completed, not now
+        processing_start_time = time.time() - event["processing_time_ms"] / 1000
+
+        delivered = False
+        for attempt in range(1, CHAT_WEBHOOK_MAX_ATTEMPTS + 1):
+            delivered = await self._send_response_to_backend(
+                request=request,
+                ai_response=event["ai_response"],
+                parsed_response=event["parsed_response"],
+                channel=channel,
+                processing_start_time=processing_start_time,
+            )
+            if delivered:
+                break
+            if attempt < CHAT_WEBHOOK_MAX_ATTEMPTS:
+                delay = CHAT_WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+                logger.warning(
+                    f"⏳ [BACKEND_ROUTING] Callback attempt {attempt} failed, retrying in {delay}s"
+                )
+                await asyncio.sleep(delay)
 
-                    except Exception as save_error:
-                        logger.error(
-                            f"❌ [SAVE_COMPLETE] Database save error: {save_error}"
-                        )
-                        conversation_saved = False
-                else:
-                    logger.warning(
-                        f"⚠️ [SAVE_COMPLETE] No valid identifiers to save conversation"
-                    )
-            else:
-                if not self.conversation_manager:
-                    logger.warning(
-                        f"⚠️ [SAVE_COMPLETE] conversation_manager not available"
-                    )
-                if not ai_response or not ai_response.strip():
-                    logger.warning(
-                        f"⚠️ [SAVE_COMPLETE] Empty AI response, skipping save"
-                    )
+        await self._send_conversation_webhooks(
+            request=request,
+            company_id=event["company_id"],
+            user_query=event["user_query"],
+            ai_response=event["ai_response"],
+            is_new_user=is_new_user,
+        )
+        return delivered
 
+    async def _send_conversation_webhooks(
+        self,
+        request: UnifiedChatRequest,
+        company_id: str,
+        user_query: str,
+        ai_response: str,
+        is_new_user: bool,
+    ):
+        """
+        Send conversation.created (new user) or conversation.updated webhooks
+        Gửi webhook phù hợp theo trạng thái người dùng
+        """
+        _, device_id, session_id = self._turn_identifiers(request)
+        try:
             # Send appropriate webhooks based on user status
             if is_new_user:
                 # NEW USER: Send conversation.created + 2x message.created
@@ -3362,66 +3485,8 @@ BẮT ĐẦU THỰC HIỆN.
                         f"❌ [WEBHOOK] Failed to send update webhook: {webhook_error}"
                     )
 
-            logger.info(
-                f"✅ [SAVE_COMPLETE] Processing completed for company: {company_id}"
-            )
-
-        except Exception as e:
-            logger.error(f"❌ [SAVE_COMPLETE] Failed: {e}")
-            logger.error(f"❌ [SAVE_COMPLETE] Error details: {str(e)}")
-
-            logger.info(
-                f"✅ [SAVE_COMPLETE] Full conversation save and webhook completed for {company_id}"
-            )
-
-        except Exception as e:
-            logger.error(f"❌ [SAVE_COMPLETE] Complete conversation save failed: {e}")
-            logger.error(f"❌ [SAVE_COMPLETE] Error details: {str(e)}")
-
-    async def _verify_conversation_saved(
-        self,
-        user_id: str = None,
-        device_id: str = None,
-        session_id: str = None,
-        expected_messages: int = 2,
-    ) -> bool:
-        """
-        Verify that conversation was saved successfully by checking user_context retrieval
-        Kiểm tra conversation đã được lưu thành công bằng cách test user_context retrieval
-        """
-        try:
-            if not self.conversation_manager:
-                logger.warning("⚠️ [VERIFY_SAVE] conversation_manager not available")
-                return False
-
-            # Try to retrieve messages using the same method as user_context
-            messages = self.conversation_manager.get_optimized_messages_for_frontend(
-                user_id=user_id,
-                device_id=device_id,
-                session_id=session_id,
-                rag_context="",
-                current_query="",
-            )
-
-            primary_identifier = user_id or device_id or session_id
-
-            if messages and len(messages) >= expected_messages:
-                logger.info(
-                    f"✅ [VERIFY_SAVE] Conversation verified for {primary_identifier}: {len(messages)} messages"
-                )
-                logger.info(
-                    f"✅ [VERIFY_SAVE] Latest message: {messages[-1].get('content', '')[:100]}..."
-                )
-                return True
-            else:
-                logger.warning(
-                    f"⚠️ [VERIFY_SAVE] Expected {expected_messages} messages, found {len(messages) if messages else 0}"
-                )
-                return False
-
         except Exception as e:
-            logger.error(f"❌ [VERIFY_SAVE] Verification failed: {e}")
-            return False
+            logger.error(f"❌ [WEBHOOK] Conversation webhooks failed: {e}")
 
     def _extract_company_name_from_context(self, company_context: str) -> str:
         """
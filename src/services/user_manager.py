@@ -572,7 +572,14 @@ class UserManager:
                         "$project": {
                             "conversation_id": 1,
                             "ai_provider": 1,
-                            "message_count": {"$size": "$messages"},
+                            # Bucketed headers: counters (+ legacy array if not migrated)
+                            "message_count": {
+                                "$add": [
+                                    {"$ifNull": ["$message_count", 0]},
+                                    {"$ifNull": ["$legacy_message_count", 0]},
+                                    {"$size": {"$ifNull": ["$messages", []]}},
+                                ]
+                            },
                             "updated_at": 1,
                         }
                     },
@@ -1341,16 +1348,36 @@ class UserManager:
             int: Number of files deleted
         """
         try:
-            # 1. Get all deleted files
-            deleted_files = self.list_deleted_files(user_id=user_id, limit=10000)
+            if self.db is None or self.db.client is None:
+                # Fallback storage: no R2 objects to purge in bulk
+                deleted_count = 0
+                for file_doc in self.list_deleted_files(user_id=user_id, limit=10000):
+                    if self.permanent_delete_file(
+                        file_id=file_doc.get("file_id"), user_id=user_id
+                    ):
+                        deleted_count += 1
+                return deleted_count
 
-            deleted_count = 0
+            # Bulk purge: batched R2 deletes + delete_many (see r2_purge_service)
+            from src.services.r2_purge_service import USER_FILE_KEY_FIELDS, R2PurgeService
 
-            # 2. Delete each file from R2 and MongoDB
-            for file_doc in deleted_files:
-                file_id = file_doc.get("file_id")
-                if self.permanent_delete_file(file_id=file_id, user_id=user_id):
-                    deleted_count += 1
+            purger = R2PurgeService(
+                db=self.db.db, s3_client=getattr(self, "s3_client", None)
+            )
+            job_id = purger.create_records_job(
+                kind="files_trash",
+                user_id=user_id,
+                collection=self.user_files.name,
+                query={"user_id": user_id, "is_deleted": True},
+                key_fields=USER_FILE_KEY_FIELDS,
+            )
+            job = purger.claim(job_id)
+            if job is None:
+                # The r2_purge_worker claimed the pending job first and runs it
+                logger.info(f"🗑️ Files trash purge {job_id} is running in the worker")
+                return 0
+            job = purger.run(job) or {}
+            deleted_count = job.get("deleted_records", 0)
 
             logger.info(
                 f"🗑️ Emptied trash: {deleted_count} files deleted for user {user_id}"
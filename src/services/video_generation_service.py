@@ -13,7 +13,6 @@ import json
 import logging
 import os
 import re
-import subprocess
 import tempfile
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -21,6 +20,8 @@ from typing import Any, Dict, List, Optional
 import httpx
 import soundfile as sf
 
+from src.services.ffmpeg_scheduler import PRIORITY_NORMAL, get_ffmpeg_scheduler
+
 # ─────────────────────────────────────────────
 # Duration presets
 # ─────────────────────────────────────────────
@@ -123,6 +124,19 @@ FRAME_TEMPLATE = """<!DOCTYPE html>
 </html>"""
 
 
+async def run_ffmpeg(
+    cmd: List[str],
+    error_label: str,
+    timeout: Optional[float] = None,
+    encode: bool = False,
+    priority: str = PRIORITY_NORMAL,
+) -> None:
+    """Run an ffmpeg command through the host-wide ffmpeg scheduler (non-blocking)."""
+    await get_ffmpeg_scheduler().run(
+        cmd, error_label, priority=priority, encode=encode, timeout=timeout
+    )
+
+
 def _calc_font_size(text: str) -> int:
     """Adaptive font size based on text length."""
     n = len(text)
@@ -551,16 +565,31 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
 
     async def _tts_edge(self, text: str, voice: str, out_path: Path) -> None:
         """Use edge-tts (free Microsoft TTS, multi-language)."""
-        import edge_tts  # type: ignore
+        from src.services.tts_cache import get_tts_cache
 
-        communicate = edge_tts.Communicate(text, voice)
-        # edge-tts saves as MP3 → convert to WAV with ffmpeg
+        async def synthesize():
+            import edge_tts  # type: ignore
+
+            buffer = bytearray()
+            async for chunk in edge_tts.Communicate(text, voice).stream():
+                if chunk["type"] == "audio":
+                    buffer.extend(chunk["data"])
+            return bytes(buffer), {"format": "mp3", "voice_name": voice}
+
+        mp3_bytes, _ = await get_tts_cache().get_or_generate(
+            "video_scene",
+            synthesize,
+            text=text,
+            voice=voice,
+            language=voice[:5],
+            model="edge-tts",
+            fmt="mp3",
+        )
+        # edge-tts returns MP3 → convert to WAV with ffmpeg
         mp3_path = out_path.with_suffix(".mp3")
-        await communicate.save(str(mp3_path))
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", str(mp3_path), str(out_path)],
-            check=True,
-            capture_output=True,
+        mp3_path.write_bytes(mp3_bytes)
+        await run_ffmpeg(
+            ["ffmpeg", "-y", "-i", str(mp3_path), str(out_path)], "FFmpeg mp3→wav"
         )
         mp3_path.unlink(missing_ok=True)
 
@@ -576,6 +605,7 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
             language="vi-VN",
             voice_name="Enceladus",
             use_pro_model=False,
+            cache_path="video_scene",
         )
         out_path.write_bytes(audio_data)
 
@@ -589,8 +619,14 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
         total_scenes: int,
         video_title: str,
         task_dir: Path,
+        browser: Any = None,
     ) -> Path:
-        """Render HTML frame (image + text overlay) → PNG via Playwright."""
+        """
+        Render HTML frame (image + text overlay) → PNG via Playwright.
+
+        Pass a launched `browser` to render in a new page of a shared Chromium
+        instead of launching one per frame.
+        """
         from playwright.async_api import async_playwright
 
         out_path = task_dir / f"scene_{scene_index:02d}_frame.png"
@@ -610,14 +646,22 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
             progress=int((scene_index + 1) / total_scenes * 100),
         )
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
-            )
+        if browser is not None:
             page = await browser.new_page(viewport={"width": 1080, "height": 1920})
-            await page.set_content(html, wait_until="networkidle")
-            await page.screenshot(path=str(out_path), type="png")
-            await browser.close()
+            try:
+                await page.set_content(html, wait_until="networkidle")
+                await page.screenshot(path=str(out_path), type="png")
+            finally:
+                await page.close()
+        else:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(
+                    args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
+                )
+                page = await browser.new_page(viewport={"width": 1080, "height": 1920})
+                await page.set_content(html, wait_until="networkidle")
+                await page.screenshot(path=str(out_path), type="png")
+                await browser.close()
 
         logger.info(
             f"  🎨 Scene {scene_index} frame: {out_path.name} ({out_path.stat().st_size // 1024}KB)"
@@ -626,7 +670,7 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
 
     # ── FFmpeg ─────────────────────────────────────────────────────────────
 
-    def create_video_segment(
+    async def create_video_segment(
         self,
         frame_path: Path,
         audio_path: Path,
@@ -660,9 +704,7 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
             "+faststart",
             str(out_path),
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg segment failed: {result.stderr[-500:]}")
+        await run_ffmpeg(cmd, "FFmpeg segment", encode=True)
 
         logger.info(f"  🎬 Scene {scene_index} segment: {out_path.name}")
         return out_path
@@ -682,7 +724,7 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
         "scale=1350:2400,crop=w=1080:h=1920:x=135:y=480-t*96",
     ]
 
-    def create_video_segment_ken_burns(
+    async def create_video_segment_ken_burns(
         self,
         frame_path: Path,
         audio_path: Path,
@@ -725,14 +767,12 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
             "+faststart",
             str(out_path),
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg Ken Burns failed: {result.stderr[-500:]}")
+        await run_ffmpeg(cmd, "FFmpeg Ken Burns", timeout=300, encode=True)
 
         logger.info(f"  🎬 Scene {scene_index} Ken Burns: {out_path.name}")
         return out_path
 
-    def merge_video_with_audio(
+    async def merge_video_with_audio(
         self,
         video_path: Path,
         audio_path: Path,
@@ -775,15 +815,13 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
             "+faststart",
             str(out_path),
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg merge failed: {result.stderr[-500:]}")
+        await run_ffmpeg(cmd, "FFmpeg merge", timeout=300, encode=True)
         logger.info(
             f"  🎬 Scene {scene_index} merged (xAI video+audio): {out_path.name}"
         )
         return out_path
 
-    def concat_segments(
+    async def concat_segments(
         self,
         segments: List[Path],
         task_dir: Path,
@@ -815,9 +853,7 @@ Chỉ trả về JSON, KHÔNG có gì khác."""
             "+faststart",
             str(out_path),
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg concat failed: {result.stderr[-500:]}")
+        await run_ffmpeg(cmd, "FFmpeg concat", encode=True)
 
         size_mb = out_path.stat().st_size / 1_048_576
         logger.info(f"  ✂️  Final video: {out_path.name} ({size_mb:.1f}MB)")
@@ -0,0 +1,388 @@
+"""
+Video Render Pipeline — scene-parallel task DAG with a content-hashed artifact cache
+
+Final render of a video task expressed as a DAG:
+
+    slideshow:  image ─┐
+                       ├─ frame ─┐
+                audio ─┼─────────┴─ segment ─┐
+                       ...                   ├─ concat
+    ai_video:   xai clip ─┐                  │
+                audio ────┴─ segment ────────┘
+
+- Nodes run as soon as their inputs are ready, with bounded parallelism per resource
+  (network downloads, Chromium pages, ffmpeg processes, xAI generations).
+- Every artifact is keyed by a hash of its inputs (content hash of downloaded assets +
+  render parameters). Artifacts are kept in a local disk cache, so a retry or an edit to
+  one scene only rebuilds what changed.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from src.services.artifact_cache import ArtifactCache, hash_inputs
+from src.services.video_generation_service import FRAME_TEMPLATE, VideoGenerationService
+
+logger = logging.getLogger(__name__)
+
+VIDEO_RENDER_CACHE_DIR = os.getenv("VIDEO_RENDER_CACHE_DIR", "/tmp/wordai_video_cache")
+VIDEO_RENDER_CACHE_MAX_MB = int(os.getenv("VIDEO_RENDER_CACHE_MAX_MB", "4096"))
+
+# Per-resource concurrency limits for one render job
+DEFAULT_LIMITS = {
+    "network": int(os.getenv("VIDEO_RENDER_DOWNLOAD_CONCURRENCY", "6")),
+    "browser": int(os.getenv("VIDEO_RENDER_BROWSER_CONCURRENCY", "3")),
+    "ffmpeg": int(os.getenv("VIDEO_RENDER_FFMPEG_CONCURRENCY", "3")),
+    "xai": int(os.getenv("VIDEO_RENDER_XAI_CONCURRENCY", "3")),
+}
+
+# Bump when render output for the same inputs changes (template, ffmpeg args)
+RENDER_VERSION = "2"
+_FRAME_TEMPLATE_HASH = hashlib.sha256(FRAME_TEMPLATE.encode()).hexdigest()[:12]
+
+
+@dataclass
+class Artifact:
+    """A file produced by a DAG node plus the hash identifying its content/inputs"""
+
+    path: Path
+    key: str
+    cached: bool = False
+
+
+# ─────────────────────────────────────────────
+# Task DAG
+# ─────────────────────────────────────────────
+
+
+@dataclass
+class _Node:
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    deps: Sequence[str]
+    resource: Optional[str]
+
+
+class TaskGraph:
+    """
+    Minimal async DAG executor.
+
+    Nodes must be added after their dependencies; each node is called with the
+    results of its dependencies (in order) once they are all done, and holds one
+    slot of its resource semaphore while running. The first failure cancels the rest.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self._nodes: Dict[str, _Node] = {}
+        self._semaphores = {
+            name: asyncio.Semaphore(max(1, limit)) for name, limit in (limits or {}).items()
+        }
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        deps: Sequence[str] = (),
+        resource: Optional[str] = None,
+    ) -> str:
+        if name in self._nodes:
+            raise ValueError(f"Duplicate DAG node: {name}")
+        missing = [d for d in deps if d not in self._nodes]
+        if missing:
+            raise ValueError(f"Node {name} depends on unknown nodes: {missing}")
+        self._nodes[name] = _Node(name, fn, tuple(deps), resource)
+        return name
+
+    async def run(self) -> Dict[str, Any]:
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_node(node: _Node):
+            inputs = [await tasks[d] for d in node.deps]
+            semaphore = self._semaphores.get(node.resource)
+            if semaphore is None:
+                return await node.fn(*inputs)
+            async with semaphore:
+                return await node.fn(*inputs)
+
+        # Insertion order is a topological order (deps must exist when added)
+        for name, node in self._nodes.items():
+            tasks[name] = asyncio.create_task(run_node(node), name=f"dag:{name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
+
+
+# ─────────────────────────────────────────────
+# Render pipeline
+# ─────────────────────────────────────────────
+
+
+@dataclass
+class RenderStats:
+    built: Dict[str, int] = field(default_factory=dict)
+    cached: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, kind: str, cached: bool):
+        bucket = self.cached if cached else self.built
+        bucket[kind] = bucket.get(kind, 0) + 1
+
+
+class VideoRenderPipeline:
+    """Builds the final video of one task from its scene assets"""
+
+    def __init__(
+        self,
+        svc: VideoGenerationService,
+        task_dir: Path,
+        cache: Optional[ArtifactCache] = None,
+        limits: Optional[Dict[str, int]] = None,
+    ):
+        self.svc = svc
+        self.task_dir = task_dir
+        self.cache = cache or ArtifactCache(VIDEO_RENDER_CACHE_DIR, VIDEO_RENDER_CACHE_MAX_MB)
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.stats = RenderStats()
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
+
+    # ── Shared resources ─────────────────────────────────────────────────
+
+    async def _get_browser(self):
+        """One Chromium per render job, shared by all frame nodes"""
+        async with self._browser_lock:
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
+                )
+            return self._browser
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # ── Node helpers ──────────────────────────────────────────────────────
+
+    async def _cached(
+        self,
+        kind: str,
+        key: str,
+        out_path: Path,
+        build: Callable[[], Awaitable[Path]],
+    ) -> Artifact:
+        """Return the cached artifact for `key` or build + store it"""
+        suffix = out_path.suffix
+        if self.cache.fetch(kind, key, suffix, out_path):
+            self.stats.record(kind, cached=True)
+            return Artifact(out_path, key, cached=True)
+
+        # Never write through a hardlink into the cache
+        out_path.unlink(missing_ok=True)
+        built = await build()
+        self.cache.store(kind, key, suffix, built)
+        self.stats.record(kind, cached=False)
+        return Artifact(built, key)
+
+    async def _download(self, url: str, out_path: Path) -> Artifact:
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=60.0)
+        resp = await self._http.get(url)
+        resp.raise_for_status()
+        out_path.write_bytes(resp.content)
+        # Content hash (not URL): R2 keys are reused when a scene asset is regenerated
+        return Artifact(out_path, hashlib.sha256(resp.content).hexdigest())
+
+    # ── DAG builders ──────────────────────────────────────────────────────
+
+    def _add_concat(self, graph: TaskGraph, segment_nodes: List[str]) -> str:
+        async def concat(*segments: Artifact) -> Artifact:
+            key = hash_inputs("concat", RENDER_VERSION, [s.key for s in segments])
+            return await self._cached(
+                "final",
+                key,
+                self.task_dir / "final.mp4",
+                lambda: self.svc.concat_segments([s.path for s in segments], self.task_dir),
+            )
+
+        return graph.add("concat", concat, segment_nodes, resource="ffmpeg")
+
+    async def render_slideshow(
+        self,
+        scenes: List[Dict[str, Any]],
+        image_urls: List[str],
+        audio_urls: List[str],
+        video_title: str,
+    ) -> Path:
+        """Slideshow mode: image + text overlay frame → Ken Burns segment per scene"""
+        graph = TaskGraph(self.limits)
+        n_scenes = len(scenes)
+        segment_nodes = []
+
+        for i, scene in enumerate(scenes):
+            text_overlay = scene.get("text_overlay", "")
+
+            image = graph.add(
+                f"image:{i}",
+                lambda url=image_urls[i], i=i: self._download(
+                    url, self.task_dir / f"scene_{i:02d}_image.png"
+                ),
+                resource="network",
+            )
+            audio = graph.add(
+                f"audio:{i}",
+                lambda url=audio_urls[i], i=i: self._download(
+                    url, self.task_dir / f"scene_{i:02d}_audio.wav"
+                ),
+                resource="network",
+            )
+
+            async def frame(image_art: Artifact, i=i, text_overlay=text_overlay) -> Artifact:
+                key = hash_inputs(
+                    "frame", RENDER_VERSION, _FRAME_TEMPLATE_HASH, image_art.key,
+                    text_overlay, i, n_scenes, video_title,
+                )
+
+                async def build() -> Path:
+                    return await self.svc.render_frame(
+                        image_path=image_art.path,
+                        text_overlay=text_overlay,
+                        scene_index=i,
+                        total_scenes=n_scenes,
+                        video_title=video_title,
+                        task_dir=self.task_dir,
+                        browser=await self._get_browser(),
+                    )
+
+                return await self._cached(
+                    "frame", key, self.task_dir / f"scene_{i:02d}_frame.png", build
+                )
+
+            frame_node = graph.add(f"frame:{i}", frame, [image], resource="browser")
+
+            async def segment(frame_art: Artifact, audio_art: Artifact, i=i) -> Artifact:
+                vf = self.svc._KEN_BURNS[i % len(self.svc._KEN_BURNS)]
+                key = hash_inputs("ken_burns", RENDER_VERSION, frame_art.key, audio_art.key, vf)
+                return await self._cached(
+                    "segment",
+                    key,
+                    self.task_dir / f"scene_{i:02d}_segment.mp4",
+                    lambda: self.svc.create_video_segment_ken_burns(
+                        frame_path=frame_art.path,
+                        audio_path=audio_art.path,
+                        scene_index=i,
+                        task_dir=self.task_dir,
+                    ),
+                )
+
+            segment_nodes.append(
+                graph.add(f"segment:{i}", segment, [frame_node, audio], resource="ffmpeg")
+            )
+
+        self._add_concat(graph, segment_nodes)
+        return await self._run(graph)
+
+    async def render_ai_video(
+        self,
+        scenes: List[Dict[str, Any]],
+        audio_urls: List[str],
+        style_anchor: str,
+        clip_nonce: str = "",
+    ) -> Path:
+        """
+        AI video mode: xAI clip per scene merged with its narration audio
+
+        `clip_nonce` is part of the clip cache key: keep it to reuse generated
+        clips across retries, change it to generate new ones.
+        """
+        graph = TaskGraph(self.limits)
+        segment_nodes = []
+
+        for i, scene in enumerate(scenes):
+            prompt = scene.get("visual_prompt", scene.get("narration", ""))
+
+            audio = graph.add(
+                f"audio:{i}",
+                lambda url=audio_urls[i], i=i: self._download(
+                    url, self.task_dir / f"scene_{i:02d}_audio.wav"
+                ),
+                resource="network",
+            )
+
+            async def clip(i=i, prompt=prompt) -> Artifact:
+                # Generated clips are cached by prompt so retries don't pay for xAI again
+                key = hash_inputs("xai_clip", prompt, style_anchor, clip_nonce)
+                return await self._cached(
+                    "xai_clip",
+                    key,
+                    self.task_dir / f"scene_{i:02d}_xai_video.mp4",
+                    lambda: self.svc.generate_scene_video_xai(
+                        prompt=prompt,
+                        scene_index=i,
+                        task_dir=self.task_dir,
+                        style_anchor=style_anchor,
+                    ),
+                )
+
+            clip_node = graph.add(f"clip:{i}", clip, resource="xai")
+
+            async def segment(clip_art: Artifact, audio_art: Artifact, i=i) -> Artifact:
+                key = hash_inputs("merge", RENDER_VERSION, clip_art.key, audio_art.key)
+                return await self._cached(
+                    "segment",
+                    key,
+                    self.task_dir / f"scene_{i:02d}_segment.mp4",
+                    lambda: self.svc.merge_video_with_audio(
+                        video_path=clip_art.path,
+                        audio_path=audio_art.path,
+                        scene_index=i,
+                        task_dir=self.task_dir,
+                    ),
+                )
+
+            segment_nodes.append(
+                graph.add(f"segment:{i}", segment, [clip_node, audio], resource="ffmpeg")
+            )
+
+        self._add_concat(graph, segment_nodes)
+        return await self._run(graph)
+
+    async def _run(self, graph: TaskGraph) -> Path:
+        try:
+            results = await graph.run()
+        finally:
+            await self.close()
+            try:
+                await asyncio.to_thread(self.cache.evict)
+            except Exception as e:
+                logger.warning(f"⚠️ Render cache eviction failed: {e}")
+
+        logger.info(
+            f"  📊 Render DAG: built={self.stats.built} cached={self.stats.cached}"
+        )
+        return results["concat"].path
@@ -0,0 +1,49 @@
+"""
+Worker Heartbeats - per-replica liveness records kept in Redis
+
+The worker supervisor (src/workers/worker_supervisor.py) writes one hash per
+replica; the API reads them for /health/workers. Kept separate from the
+supervisor so the API process can read heartbeats without importing the
+src.workers package (and everything its workers pull in).
+
+Usage:
+    heartbeats = await get_worker_heartbeats(redis_client)
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+HEARTBEAT_KEY_PREFIX = "worker_heartbeat"
+HEARTBEAT_INTERVAL_SECONDS = 15
+HEARTBEAT_TTL_SECONDS = HEARTBEAT_INTERVAL_SECONDS * 4
+
+
+def heartbeat_key(name: str, replica: int) -> str:
+    return f"{HEARTBEAT_KEY_PREFIX}:{name}:{replica}"
+
+
+async def get_worker_heartbeats(redis_client) -> List[Dict[str, Any]]:
+    """Read all worker heartbeats from Redis, marking stale replicas"""
+    heartbeats = []
+    async for key in redis_client.scan_iter(match=f"{HEARTBEAT_KEY_PREFIX}:*"):
+        data = await redis_client.hgetall(key)
+        if not data:
+            continue
+        data = {
+            (k.decode() if isinstance(k, bytes) else k): (
+                v.decode() if isinstance(v, bytes) else v
+            )
+            for k, v in data.items()
+        }
+        try:
+            age = (
+                datetime.utcnow() - datetime.fromisoformat(data.get("last_seen", ""))
+            ).total_seconds()
+        except ValueError:
+            age = None
+        data["seconds_since_heartbeat"] = age
+        data["alive"] = age is not None and age <= HEARTBEAT_INTERVAL_SECONDS * 3
+        heartbeats.append(data)
+
+    heartbeats.sort(key=lambda d: (d.get("worker", ""), str(d.get("replica", ""))))
+    return heartbeats
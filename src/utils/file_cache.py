@@ -1,6 +1,10 @@
 """
 File Cache Manager for Document Chat
 Manages temporary file caching for R2 files during conversation sessions
+
+R2 downloads themselves go through the host-wide R2 object cache
+(src/services/r2_object_cache.py); this layer only tracks per-conversation copies.
+Metadata lost on restart (or owned by another worker) is recovered from disk.
 """
 
 import os
@@ -23,6 +27,7 @@ class FileCacheManager:
     - Cache is cleared when conversation ends
     - Multiple users can share same file (different cache entries)
     - Cache expires after 24 hours
+    - Metadata is in memory; files found on disk are re-adopted (mtime = cached_at)
     """
 
     def __init__(self, cache_dir: str = "temp_files/chat_cache"):
@@ -50,11 +55,28 @@ class FileCacheManager:
         conv_dir = self.cache_dir / conversation_id
         conv_dir.mkdir(parents=True, exist_ok=True)
 
+        return conv_dir / f"{self._file_stem(file_id)}{extension}"
+
+    @staticmethod
+    def _file_stem(file_id: str) -> str:
         # Generate safe filename
         file_hash = hashlib.md5(file_id.encode()).hexdigest()[:12]
-        filename = f"{file_id}_{file_hash}{extension}"
+        return f"{file_id}_{file_hash}"
 
-        return conv_dir / filename
+    def _adopt_from_disk(self, file_id: str, conversation_id: str) -> bool:
+        """Rebuild metadata for a file cached before a restart or by another worker"""
+        conv_dir = self.cache_dir / conversation_id
+        if not conv_dir.is_dir():
+            return False
+        for cache_path in conv_dir.glob(f"{self._file_stem(file_id)}*"):
+            self.cache_metadata.setdefault(conversation_id, {})[file_id] = {
+                "path": str(cache_path),
+                "cached_at": datetime.fromtimestamp(cache_path.stat().st_mtime),
+                "file_type": cache_path.suffix.lstrip("."),
+                "metadata": {},
+            }
+            return True
+        return False
 
     def is_cached(self, file_id: str, conversation_id: str) -> bool:
         """
@@ -64,12 +86,10 @@ class FileCacheManager:
             True if cached and not expired
         """
         try:
-            # Check in-memory metadata
-            if conversation_id not in self.cache_metadata:
-                return False
-
-            if file_id not in self.cache_metadata[conversation_id]:
-                return False
+            # Check in-memory metadata, then disk
+            if file_id not in self.cache_metadata.get(conversation_id, {}):
+                if not self._adopt_from_disk(file_id, conversation_id):
+                    return False
 
             cache_info = self.cache_metadata[conversation_id][file_id]
             cache_path = Path(cache_info["path"])
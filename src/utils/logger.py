@@ -1,40 +1,278 @@
 """
 Logging utility for AI Chatbot RAG Service
+
+Every logger (the shared "chatbot" logger and the per-module __name__ loggers)
+writes through the root logger:
+
+- Non-blocking: records go into a bounded in-memory queue (QueueHandler) and a
+  background listener thread writes them to stdout, so the event loop never
+  waits on stdout. When the queue is full, records are dropped and counted
+  rather than blocking.
+- Structured: LOG_FORMAT=json emits one JSON object per line (ts, level, logger,
+  msg, location, extra fields, exception); "text" keeps the classic format.
+- Rate limited: LOG_RATE_LIMITS caps records per second per call site for
+  selected loggers; get_hot_logger() returns a limited child logger for hot paths
+  (per-chunk / per-answer / per-prompt logs). Suppressed counts are reported on
+  the next record that passes.
+- Lazy: a record that is filtered out is never formatted. Pass expensive values
+  as %-args (wrap previews in lazy()) instead of building f-strings.
+
+Usage:
+    logger = setup_logger()                   # "chatbot"
+    hot_logger = get_hot_logger()             # "chatbot.hot", rate limited
+    hot_logger.info("Chunk %s: %s", i, lazy(lambda: content[:200]))
+
+    LOG_FORMAT=json LOG_RATE_LIMITS="chatbot.hot=2/10,src.services.x=5" python serve.py
 """
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from pathlib import Path
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Records per second per call site (token bucket) for hot-path loggers
+LOG_HOT_RATE = float(os.getenv("LOG_HOT_RATE", "2"))
+LOG_HOT_BURST = int(os.getenv("LOG_HOT_BURST", "10"))
+# "logger=rate[/burst],logger=rate" - extra per-logger limits
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+}
+
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured = False
+
+
+class lazy:
+    """Defer an expensive log argument until the record is actually emitted"""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+
+    def __str__(self) -> str:
+        return str(self.fn())
+
+    __repr__ = __str__
+
+
+# ============================================================================
+# FORMATTERS
+# ============================================================================
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including `extra={...}` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+def _make_formatter() -> logging.Formatter:
+    return JsonFormatter() if LOG_FORMAT == "json" else _TextFormatter(TEXT_FORMAT)
+
+
+# ============================================================================
+# NON-BLOCKING HANDLER
+# ============================================================================
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated later) but leave the layout
+        # (timestamp, JSON encoding, traceback text) to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# ============================================================================
+# RATE LIMITING
+# ============================================================================
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (pathname:lineno): at most `rate` records per
+    second with bursts of `burst`. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._sites: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = [float(self.burst), now, 0]
+            tokens, last, suppressed = site
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                site[:] = [tokens, now, suppressed + 1]
+                return False
+            site[:] = [tokens - 1, now, 0]
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def _parse_rate_limits(value: str) -> Dict[str, Tuple[float, int]]:
+    """Parse "logger=rate[/burst],..." (invalid items are ignored)"""
+    limits = {}
+    for item in (value or "").split(","):
+        name, _, spec = item.strip().partition("=")
+        if not name or not spec:
+            continue
+        rate, _, burst = spec.partition("/")
+        try:
+            limits[name.strip()] = (float(rate), int(burst) if burst else LOG_HOT_BURST)
+        except ValueError:
+            continue
+    return limits
+
+
+def _limit(logger: logging.Logger, rate: float, burst: int):
+    if not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter(rate, burst))
+
+
+# ============================================================================
+# SETUP
+# ============================================================================
+
+
+def configure_logging(level: int = logging.INFO):
+    """
+    Install the queue handler on the root logger (idempotent)
+
+    Replaces handlers added by earlier basicConfig() calls so every record is
+    written once, by the listener thread.
+    """
+    global _listener, _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(_make_formatter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        if LOG_ASYNC:
+            log_queue: "queue.Queue" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            root.addHandler(_NonBlockingQueueHandler(log_queue))
+            _listener = logging.handlers.QueueListener(
+                log_queue, stream_handler, respect_handler_level=True
+            )
+            _listener.start()
+            atexit.register(_listener.stop)  # flush what is still queued
+        else:
+            root.addHandler(stream_handler)
+        root.setLevel(level)
+
+        for name, (rate, burst) in _parse_rate_limits(LOG_RATE_LIMITS).items():
+            _limit(logging.getLogger(name), rate, burst)
+        _configured = True
+
 
 def setup_logger(name: str = "chatbot", level: int = logging.INFO) -> logging.Logger:
     """
     Setup logger with consistent formatting
-    
+
     Args:
         name: Logger name
         level: Logging level
-        
+
     Returns:
-        Configured logger instance
+        Configured logger instance (records go through the shared async handler)
     """
+    configure_logging()
     logger = logging.getLogger(name)
-    
-    # Don't add handlers if already configured
-    if logger.handlers:
-        return logger
-    
     logger.setLevel(level)
-    
-    # Create console handler
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(level)
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    
-    # Add handler to logger
-    logger.addHandler(handler)
-    
     return logger
+
+
+def get_hot_logger(name: str = "chatbot") -> logging.Logger:
+    """
+    Rate-limited child logger for hot-path detail (per chunk / item / request)
+
+    Args:
+        name: Parent logger name - records are "{name}.hot"
+
+    Returns:
+        Logger limited to LOG_HOT_RATE records/s per call site (LOG_HOT_BURST burst)
+    """
+    configure_logging()
+    logger = logging.getLogger(f"{name}.hot")
+    _limit(logger, LOG_HOT_RATE, LOG_HOT_BURST)
+    return logger
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full"""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _NonBlockingQueueHandler):
+            return handler.dropped
+    return 0
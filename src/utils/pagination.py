@@ -0,0 +1,217 @@
+"""
+Keyset (cursor) pagination for MongoDB list endpoints
+
+Offset pagination (`.skip(n)`) makes MongoDB walk and discard n index entries, so
+deep pages get linearly slower, and list views that `find()` without a projection
+drag whole documents (content_html, questions, ...) over the wire just to render a
+row. This module provides:
+
+- keyset_page(): "everything after the last row I saw" over an indexed sort key,
+  with `_id` as the tiebreaker, returning an opaque `next_cursor`
+- a mandatory projection per list view (sort keys are added automatically)
+- cached_count(): totals cached for COUNT_CACHE_TTL seconds, because a list page
+  does not need an exact `count_documents` on every request
+
+Cursors are url-safe base64 JSON of the last row's sort values; they are only
+valid for the same query + sort they were issued for.
+
+Usage:
+    items, next_cursor = keyset_page(
+        db.documents,
+        {"user_id": uid, "is_deleted": False},
+        sort=[("last_opened_at", -1)],
+        projection=DOCUMENT_LIST_FIELDS,
+        limit=20,
+        cursor=request_cursor,
+    )
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+
+COUNT_CACHE_TTL = float(os.getenv("PAGINATION_COUNT_CACHE_TTL", "60"))
+COUNT_CACHE_SIZE = 10000
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class InvalidCursorError(ValueError):
+    """Cursor is malformed or does not belong to this sort"""
+
+
+# ============================================================================
+# CURSOR ENCODING
+# ============================================================================
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$d": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$o": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$d" in value:
+            return datetime.fromisoformat(value["$d"])
+        if "$o" in value:
+            return ObjectId(value["$o"])
+    return value
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def encode_cursor(doc: Dict[str, Any], sort: SortSpec) -> str:
+    payload = {"k": [field for field, _ in sort], "v": [_encode_value(_get_path(doc, f)) for f, _ in sort]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    """Sort values of the last row of the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload["v"]]
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}") from e
+    if payload.get("k") != [field for field, _ in sort]:
+        raise InvalidCursorError("Pagination cursor does not match the requested sort")
+    return values
+
+
+# ============================================================================
+# KEYSET QUERY
+# ============================================================================
+
+
+def _with_tiebreaker(sort: SortSpec) -> List[Tuple[str, int]]:
+    sort = list(sort)
+    if not any(field == "_id" for field, _ in sort):
+        sort.append(("_id", sort[-1][1] if sort else -1))
+    return sort
+
+
+def _after(field: str, direction: int, value: Any) -> Dict[str, Any]:
+    """Rows strictly after `value` in `direction` (MongoDB sorts null lowest)"""
+    if value is None:
+        # asc: nulls come first, so every non-null is after; desc: nothing is after
+        return {field: {"$ne": None}} if direction == 1 else {"_id": {"$exists": False}}
+    if direction == 1:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort: SortSpec, values: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Filter for rows after the given sort values:
+    (a > va) OR (a == va AND b > vb) OR (a == va AND b == vb AND _id > vid) ...
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        after = _after(field, direction, values[i])
+        branches.append({"$and": [clause, after]} if clause else after)
+    return {"$or": branches}
+
+
+def keyset_page(
+    collection,
+    query: Dict[str, Any],
+    sort: SortSpec,
+    projection: Dict[str, Any],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of a list view, ordered by `sort` (+ `_id` tiebreaker)
+
+    Args:
+        collection: PyMongo collection
+        query: Filter (should be covered by an index together with the sort keys)
+        sort: [(field, 1 | -1), ...]
+        projection: Fields for the list view (required - list views never need whole documents)
+        limit: Page size
+        cursor: `next_cursor` from the previous page, or None for the first page
+
+    Returns:
+        (items, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        InvalidCursorError: cursor is malformed or was issued for another sort
+    """
+    sort = _with_tiebreaker(sort)
+    projection = dict(projection)
+    # The cursor needs every sort key, including _id, even if the view hides it
+    strip_id = projection.pop("_id", 1) in (0, False)
+    if any(v not in (0, False) for v in projection.values()):
+        for field, _ in sort:
+            if field != "_id":
+                projection.setdefault(field, 1)
+
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        query = {"$and": [query, keyset_filter(sort, values)]}
+
+    items = list(collection.find(query, projection or None).sort(sort).limit(limit + 1))
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(items[-1], sort) if has_more and items else None
+    if strip_id:
+        for item in items:
+            item.pop("_id", None)
+    return items, next_cursor
+
+
+# ============================================================================
+# CACHED TOTALS
+# ============================================================================
+
+_count_cache: Dict[Tuple[str, str], Tuple[int, float]] = {}
+_count_lock = threading.Lock()
+
+
+def cached_count(collection, query: Dict[str, Any], ttl: float = COUNT_CACHE_TTL) -> int:
+    """
+    count_documents(query), cached per (collection, query) for `ttl` seconds
+
+    Totals on list pages are informational; a count that is up to `ttl` seconds
+    old is fine and saves a full index scan per request. An empty query uses the
+    collection metadata count (estimated_document_count).
+    """
+    key = (collection.full_name, json.dumps(query, sort_keys=True, default=str))
+    now = time.monotonic()
+    with _count_lock:
+        entry = _count_cache.get(key)
+        if entry and entry[1] > now:
+            return entry[0]
+
+    total = collection.estimated_document_count() if not query else collection.count_documents(query)
+
+    with _count_lock:
+        if len(_count_cache) >= COUNT_CACHE_SIZE:
+            _count_cache.clear()
+        _count_cache[key] = (total, now + ttl)
+    return total
+
+
+def invalidate_counts(collection):
+    """Drop cached totals of a collection (after bulk inserts/deletes)"""
+    with _count_lock:
+        for key in [k for k in _count_cache if k[0] == collection.full_name]:
+            del _count_cache[key]
@@ -1,14 +1,19 @@
 """
 R2 File Downloader
 Download files from Cloudflare R2 storage to local cache
+
+Object reads go through the host-wide R2 object cache
+(src/services/r2_object_cache.py); callers get their own copy at local_path.
 """
 
+import asyncio
 import os
 import httpx
 from pathlib import Path
 from typing import Optional, Dict, Any
 from src.utils.logger import setup_logger
 from src.config.r2_storage import AIVungtauR2StorageConfig
+from src.services.r2_object_cache import get_r2_object_cache
 
 logger = setup_logger()
 
@@ -88,6 +93,21 @@ class R2FileDownloader:
             logger.error(f"❌ Download error: {e}")
             return False
 
+    async def _fetch_object(self, s3_client, bucket: str, r2_key: str, local_path: str):
+        """Copy object to local_path through the shared cache (direct download if disabled)"""
+        cache = get_r2_object_cache()
+        if cache:
+            await cache.acopy_to(r2_key, local_path, bucket=bucket, s3_client=s3_client)
+            return
+
+        def download():
+            response = s3_client.get_object(Bucket=bucket, Key=r2_key)
+            with open(local_path, "wb") as f:
+                for chunk in response["Body"].iter_chunks(1024 * 1024):
+                    f.write(chunk)
+
+        await asyncio.to_thread(download)
+
     async def _download_wordai_file(self, r2_key: str, local_path: str) -> bool:
         """Download from WordAI R2 bucket"""
         try:
@@ -95,15 +115,10 @@ class R2FileDownloader:
                 logger.error("❌ WordAI R2 client not initialized")
                 return False
 
-            # Download from R2
-            response = self.wordai_r2_client.get_object(
-                Bucket=R2_BUCKET_NAME, Key=r2_key
+            await self._fetch_object(
+                self.wordai_r2_client, R2_BUCKET_NAME, r2_key, local_path
             )
 
-            # Write to local file
-            with open(local_path, "wb") as f:
-                f.write(response["Body"].read())
-
             file_size = os.path.getsize(local_path)
             logger.info(
                 f"✅ Downloaded WordAI file: {r2_key} → {local_path} "
@@ -122,15 +137,13 @@ class R2FileDownloader:
                 logger.error("❌ AIVungtau R2 client not initialized")
                 return False
 
-            # Download from R2
-            response = self.aivungtau_r2.s3_client.get_object(
-                Bucket=self.aivungtau_r2.bucket_name, Key=r2_key
+            await self._fetch_object(
+                self.aivungtau_r2.s3_client,
+                self.aivungtau_r2.bucket_name,
+                r2_key,
+                local_path,
             )
 
-            # Write to local file
-            with open(local_path, "wb") as f:
-                f.write(response["Body"].read())
-
             file_size = os.path.getsize(local_path)
             logger.info(
                 f"✅ Downloaded AIVungtau file: {r2_key} → {local_path} "
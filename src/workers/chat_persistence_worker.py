@@ -0,0 +1,184 @@
+"""
+Chat Persistence Worker
+Consumes completed chat turns from the `chat:turns` Redis stream (write-behind).
+
+For each batch: save all turns in one go (header update per conversation + one
+bucket bulk_write), then hand each turn to a background task that sends the
+backend callback and conversation webhooks with retries, and XACKs. The loop
+reads the next batch without waiting for webhook delivery, so a slow backend
+does not hold up persistence (up to CHAT_WEBHOOK_BACKLOG undelivered turns).
+A turn is acked only once handled, so a crash leaves it pending and another
+consumer reclaims it; the saved-marker keeps the messages from being stored
+twice.
+
+Runs under the worker supervisor (`chat_persistence_worker`) or standalone:
+    python -m src.workers.chat_persistence_worker
+"""
+
+import os
+import sys
+import json
+import asyncio
+import signal
+import time
+from typing import Any, Dict, List, Tuple
+from dotenv import load_dotenv
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+# Load environment variables
+env_var = os.getenv("ENVIRONMENT", os.getenv("ENV", "production"))
+env_file = "development.env" if env_var == "development" else ".env"
+load_dotenv(env_file)
+
+from src.services.chat_turn_queue import ChatTurnQueue
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+CHAT_PERSIST_BATCH_SIZE = int(os.getenv("CHAT_PERSIST_BATCH_SIZE", "100"))
+CHAT_PERSIST_BLOCK_MS = int(os.getenv("CHAT_PERSIST_BLOCK_MS", "1000"))
+# Turns whose webhooks are dispatched concurrently
+CHAT_WEBHOOK_CONCURRENCY = int(os.getenv("CHAT_WEBHOOK_CONCURRENCY", "16"))
+# Saved turns waiting for webhook delivery before the loop stops reading
+CHAT_WEBHOOK_BACKLOG = int(os.getenv("CHAT_WEBHOOK_BACKLOG", "1000"))
+
+
+class ChatPersistenceWorker:
+    """Batches chat turn writes and dispatches their webhooks"""
+
+    def __init__(
+        self,
+        worker_id: str = None,
+        redis_url: str = None,
+        batch_size: int = CHAT_PERSIST_BATCH_SIZE,
+        block_ms: int = CHAT_PERSIST_BLOCK_MS,
+    ):
+        self.worker_id = (
+            worker_id or f"chat_persistence_worker_{int(time.time())}_{os.getpid()}"
+        )
+        self.redis_url = redis_url or os.getenv(
+            "REDIS_URL", "redis://redis-server:6379"
+        )
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.running = False
+        self.queue = ChatTurnQueue(redis_url=self.redis_url)
+        self.chat_service = None
+        self._webhook_slots = asyncio.Semaphore(CHAT_WEBHOOK_CONCURRENCY)
+        self._backlog = asyncio.Semaphore(CHAT_WEBHOOK_BACKLOG)
+        self._dispatch_tasks = set()
+
+        logger.info(f"🔧 Chat Persistence Worker {self.worker_id} initialized")
+
+    async def initialize(self):
+        """Connect to the stream and load the chat service (webhook code lives there)"""
+        try:
+            await self.queue.ensure_group()
+            from src.services.unified_chat_service import unified_chat_service
+
+            self.chat_service = unified_chat_service
+            logger.info(f"✅ Worker {self.worker_id}: Consuming chat:turns")
+        except Exception as e:
+            logger.error(f"❌ Worker {self.worker_id}: Initialization failed: {e}")
+            raise
+
+    async def shutdown(self):
+        """Gracefully shutdown worker"""
+        logger.info(f"🛑 Worker {self.worker_id}: Shutting down...")
+        self.running = False
+        if self._dispatch_tasks:
+            # Undelivered turns stay pending and are reclaimed by another consumer
+            await asyncio.wait(list(self._dispatch_tasks), timeout=30)
+        await self.queue.close()
+        logger.info(f"✅ Worker {self.worker_id}: Shutdown complete")
+
+    async def _dispatch(self, entry_id: str, event: Dict[str, Any], is_new_user: bool):
+        """Background task: webhooks for one saved turn, then XACK (or dead-letter)"""
+        try:
+            async with self._webhook_slots:
+                try:
+                    delivered = await self.chat_service.dispatch_turn_webhooks(
+                        event, is_new_user
+                    )
+                except Exception as e:
+                    delivered = False
+                    logger.error(f"❌ Turn {event.get('turn_id')} webhooks failed: {e}")
+                if delivered:
+                    await self.queue.ack(entry_id)
+                else:
+                    await self.queue.dead_letter(
+                        entry_id,
+                        json.dumps(event, ensure_ascii=False),
+                        "backend callback failed after retries",
+                    )
+        except Exception as e:
+            # Left pending - reclaimed after the idle timeout
+            logger.error(f"❌ Turn {event.get('turn_id')} ack failed: {e}")
+        finally:
+            self._backlog.release()
+
+    async def process_batch(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        """Save every not-yet-saved turn of the batch, then queue webhook delivery"""
+        turn_ids = [event["turn_id"] for _, event in batch]
+        flags = await self.queue.saved_flags(turn_ids)
+
+        pending = [i for i, flag in enumerate(flags) if flag is None]
+        if pending:
+            started = time.time()
+            first_turn = await self.chat_service.save_completed_turns(
+                [batch[i][1] for i in pending]
+            )
+            await self.queue.mark_saved([turn_ids[i] for i in pending], first_turn)
+            for i, is_new in zip(pending, first_turn):
+                flags[i] = is_new
+            logger.info(
+                f"💾 [{self.worker_id}] Saved {len(pending)} turns in "
+                f"{(time.time() - started) * 1000:.0f}ms"
+            )
+
+        for i, (entry_id, event) in enumerate(batch):
+            await self._backlog.acquire()
+            task = asyncio.create_task(self._dispatch(entry_id, event, flags[i]))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+    async def run(self):
+        """Main worker loop"""
+        self.running = True
+        logger.info(f"🚀 Worker {self.worker_id}: Started persisting chat turns")
+
+        while self.running:
+            try:
+                batch = await self.queue.read_batch(
+                    self.worker_id, self.batch_size, self.block_ms
+                )
+                if batch:
+                    await self.process_batch(batch)
+            except Exception as e:
+                # Unacked turns stay pending and are reclaimed after the idle timeout
+                logger.error(f"❌ Worker {self.worker_id}: Batch failed: {e}", exc_info=True)
+                await asyncio.sleep(2)
+
+
+async def main():
+    """Main entry point for Chat Persistence Worker"""
+    worker = ChatPersistenceWorker()
+    await worker.initialize()
+
+    loop = asyncio.get_running_loop()
+
+    def _shutdown(*_):
+        logger.info("📡 Received shutdown signal, finishing current batch...")
+        worker.running = False
+
+    loop.add_signal_handler(signal.SIGINT, _shutdown)
+    loop.add_signal_handler(signal.SIGTERM, _shutdown)
+
+    await worker.run()
+    await worker.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
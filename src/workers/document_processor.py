@@ -17,7 +17,6 @@ from botocore.config import Config
 import redis
 from qdrant_client import QdrantClient
 from qdrant_client.models import VectorParams, Distance, PointStruct, PayloadSchemaType
-from sentence_transformers import SentenceTransformer
 
 # import fitz  # PyMuPDF for PDF processing - REMOVED: Now using Gemini AI
 from docx import Document  # python-docx for Word documents
@@ -63,6 +62,8 @@ class AIDocumentProcessor:
         self.redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
 
         # Embedding model - Unified multilingual model
+        from sentence_transformers import SentenceTransformer
+
         self.embedder = SentenceTransformer(
             EMBEDDING_MODEL or "paraphrase-multilingual-mpnet-base-v2"
         )
@@ -0,0 +1,161 @@
+"""
+Email Sender Worker
+Delivers queued emails from the `email_outbox` collection in batches.
+
+Each round claims up to EMAIL_BATCH_SIZE due jobs, waits for the rate limiter
+(EMAIL_SEND_RATE emails/second) and sends them with one Brevo request. On HTTP
+429 the batch is put back without counting an attempt; if Brevo rejects a batch
+(e.g. one invalid address) its emails are retried one by one so a single bad
+recipient does not hold back the others. See src/services/email_outbox.py.
+
+Runs under the worker supervisor (`email_sender_worker`) or standalone:
+    python -m src.workers.email_sender_worker
+"""
+
+import os
+import sys
+import asyncio
+import signal
+import time
+from typing import Any, Dict, List
+from dotenv import load_dotenv
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+# Load environment variables
+env_var = os.getenv("ENVIRONMENT", os.getenv("ENV", "production"))
+env_file = "development.env" if env_var == "development" else ".env"
+load_dotenv(env_file)
+
+from src.services.brevo_email_service import get_brevo_service
+from src.services.email_outbox import get_email_outbox
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_SEND_RATE = float(os.getenv("EMAIL_SEND_RATE", "10"))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
+
+
+class EmailSenderWorker:
+    """Sends outbox emails through the Brevo batch API"""
+
+    def __init__(
+        self,
+        worker_id: str = None,
+        redis_url: str = None,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        send_rate: float = EMAIL_SEND_RATE,
+    ):
+        self.worker_id = (
+            worker_id or f"email_sender_worker_{int(time.time())}_{os.getpid()}"
+        )
+        self.batch_size = batch_size
+        self.send_rate = send_rate
+        self.running = False
+        self.outbox = None
+        self.brevo = None
+        self._next_send_at = 0.0
+
+        logger.info(f"🔧 Email Sender Worker {self.worker_id} initialized")
+
+    async def initialize(self):
+        """Connect to the outbox collection"""
+        try:
+            self.outbox = get_email_outbox()
+            self.brevo = get_brevo_service()
+            await asyncio.to_thread(self.outbox.create_indexes)
+            logger.info(f"✅ Worker {self.worker_id}: Sending from email_outbox")
+        except Exception as e:
+            logger.error(f"❌ Worker {self.worker_id}: Initialization failed: {e}")
+            raise
+
+    async def shutdown(self):
+        """Gracefully shutdown worker"""
+        logger.info(f"🛑 Worker {self.worker_id}: Shutting down...")
+        self.running = False
+        logger.info(f"✅ Worker {self.worker_id}: Shutdown complete")
+
+    async def _throttle(self, count: int):
+        """Pace sends to EMAIL_SEND_RATE emails per second"""
+        now = time.monotonic()
+        if self._next_send_at > now:
+            await asyncio.sleep(self._next_send_at - now)
+        self._next_send_at = max(now, self._next_send_at) + count / self.send_rate
+
+    async def _send(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        await self._throttle(len(jobs))
+        return await asyncio.to_thread(self.brevo.send_batch, jobs)
+
+    async def process_batch(self, jobs: List[Dict[str, Any]]):
+        """Send one claimed batch and record the outcome of every job"""
+        result = await self._send(jobs)
+
+        if result["sent"]:
+            await asyncio.to_thread(self.outbox.mark_sent, [j["_id"] for j in jobs])
+            return
+
+        if result["status"] == 429:
+            delay = result["retry_after"] if result["retry_after"] is not None else 10
+            logger.warning(
+                f"⏳ [{self.worker_id}] Brevo rate limit, retrying {len(jobs)} emails in {delay:.0f}s"
+            )
+            await asyncio.to_thread(self.outbox.release, jobs, delay)
+            self._next_send_at = time.monotonic() + delay
+            return
+
+        if 400 <= result["status"] < 500 and len(jobs) > 1:
+            # Rejected batch: isolate the bad message(s)
+            logger.warning(
+                f"⚠️ [{self.worker_id}] Batch rejected ({result['error']}), sending individually"
+            )
+            for job in jobs:
+                await self.process_batch([job])
+            return
+
+        logger.error(f"❌ [{self.worker_id}] Sending {len(jobs)} emails failed: {result['error']}")
+        await asyncio.to_thread(self.outbox.mark_failed, jobs, result["error"] or "unknown")
+
+    async def run(self):
+        """Main worker loop"""
+        self.running = True
+        logger.info(f"🚀 Worker {self.worker_id}: Started sending emails")
+
+        while self.running:
+            try:
+                jobs = await asyncio.to_thread(
+                    self.outbox.claim_batch, self.worker_id, self.batch_size
+                )
+                if not jobs:
+                    await asyncio.sleep(EMAIL_OUTBOX_POLL_SECONDS)
+                    continue
+                await self.process_batch(jobs)
+                logger.info(f"📧 [{self.worker_id}] Processed {len(jobs)} outbox emails")
+            except Exception as e:
+                # Claimed jobs are retried after their lease expires
+                logger.error(f"❌ Worker {self.worker_id}: Batch failed: {e}", exc_info=True)
+                await asyncio.sleep(5)
+
+
+async def main():
+    """Main entry point for Email Sender Worker"""
+    worker = EmailSenderWorker()
+    await worker.initialize()
+
+    loop = asyncio.get_running_loop()
+
+    def _shutdown(*_):
+        logger.info("📡 Received shutdown signal, finishing current batch...")
+        worker.running = False
+
+    loop.add_signal_handler(signal.SIGINT, _shutdown)
+    loop.add_signal_handler(signal.SIGTERM, _shutdown)
+
+    await worker.run()
+    await worker.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""
+Background Worker: R2 Purge
+Runs purge jobs queued in `r2_purge_jobs` (see src/services/r2_purge_service.py)
+
+- Pending jobs (e.g. Software Lab project deletion) are run in creation order.
+- Jobs whose owner died mid-purge (lease expired) are resumed from their checkpoint.
+"""
+
+import asyncio
+import logging
+
+from src.services.r2_purge_service import get_r2_purge_service, run_purge_job
+
+logger = logging.getLogger("chatbot")
+
+_running = True
+
+
+def stop_r2_purge_worker():
+    """Finish the current job, then exit"""
+    global _running
+    _running = False
+
+
+async def r2_purge_worker(poll_interval: float = 15.0):
+    """Claim and run purge jobs until stopped"""
+    global _running
+    _running = True
+    logger.info("🚀 [R2 Purge] Worker started")
+
+    try:
+        await asyncio.to_thread(get_r2_purge_service().create_indexes)
+    except Exception as e:
+        logger.warning(f"⚠️ [R2 Purge] Could not ensure indexes: {e}")
+
+    while _running:
+        try:
+            job = await run_purge_job()
+            if job is None:
+                await asyncio.sleep(poll_interval)
+
+        except asyncio.CancelledError:
+            logger.info("🛑 [R2 Purge] Worker stopped")
+            break
+        except Exception as e:
+            logger.error(f"❌ [R2 Purge] Worker error (retrying in 60s): {e}")
+            await asyncio.sleep(60)
+
+    logger.info("✅ [R2 Purge] Worker drained")
+
+
+if __name__ == "__main__":
+    asyncio.run(r2_purge_worker())
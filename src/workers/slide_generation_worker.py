@@ -25,6 +25,13 @@ load_dotenv(env_file)
 from src.queue.queue_manager import QueueManager, set_job_status
 from src.models.ai_queue_tasks import SlideGenerationTask
 from src.services.slide_ai_generation_service import get_slide_ai_service
+from src.services.slide_batch_pipeline import (
+    SLIDE_HTML_BATCH_SIZE,
+    SlideBatchStore,
+    batch_slot,
+    outline_fingerprint,
+    split_batches,
+)
 from src.services.document_manager import DocumentManager
 from src.services.points_service import get_points_service
 from src.services.online_test_utils import get_mongodb_service
@@ -65,6 +72,7 @@ class SlideGenerationWorker:
         self.ai_service = get_slide_ai_service()
         self.mongo = get_mongodb_service()
         self.doc_manager = DocumentManager(self.mongo.db)
+        self.batch_store = SlideBatchStore(self.mongo.db)
 
         logger.info(f"🔧 Slide Generation Worker {self.worker_id} initialized")
         logger.info(f"   📡 Redis: {self.redis_url}")
@@ -382,7 +390,24 @@ class SlideGenerationWorker:
             # Detect by: has slides_outline (AI slides always have outline)
             has_ai_generated_slides = len(existing_outline) > 0
 
-            if has_ai_generated_slides:
+            # Retries use the outline saved on the document (it may have been edited)
+            slides_outline = (
+                existing_outline if task.retry_count and existing_outline else None
+            ) or analysis["slides_outline"]
+
+            # Batches kept from a previous attempt on the same outline (retry)
+            fingerprint = outline_fingerprint(slides_outline)
+            batch_html: Dict[int, List[str]] = await asyncio.to_thread(
+                self.batch_store.load, document_id, fingerprint
+            )
+            is_resume = bool(batch_html)
+
+            if is_resume:
+                # Retry of an unfinished generation - same version, no new snapshot
+                logger.info(
+                    f"♻️ Resuming generation: {len(batch_html)} batch(es) already generated"
+                )
+            elif has_ai_generated_slides:
                 # This is regeneration (2nd+ AI generation) - create new version
                 try:
                     new_version = await asyncio.to_thread(
@@ -419,92 +444,92 @@ class SlideGenerationWorker:
                 user_id=task.user_id,
                 document_id=document_id,
                 started_at=start_time.isoformat(),
-                total_slides=len(analysis["slides_outline"]),
+                total_slides=len(slides_outline),
+                retry_count=task.retry_count,
                 title=analysis.get("title", "Untitled Presentation"),
             )
 
-            # Get slides from analysis
-            slides_outline = analysis["slides_outline"]
             num_slides = len(slides_outline)
-            BATCH_SIZE = 10  # Reduced from 15 to 10 to avoid Claude token limits
-            total_batches = (num_slides + BATCH_SIZE - 1) // BATCH_SIZE
+            batches = split_batches(slides_outline)
+            total_batches = len(batches)
+            # Slide HTML batches are generated with GLM-5 (SlideAIGenerationService)
+            provider = "glm5"
 
             logger.info(
-                f"📊 Generating {num_slides} slides in {total_batches} batch(es) ({BATCH_SIZE} slides/batch)"
+                f"📊 Generating {num_slides} slides in {total_batches} batch(es) "
+                f"({SLIDE_HTML_BATCH_SIZE} slides/batch, {len(batch_html)} already done)"
             )
 
-            # Generate HTML in batches
-            all_slides_html = []
-            generation_error = None  # Track if any batch fails
-            first_slide_sample = None  # Save first slide for style consistency
-
-            for i in range(total_batches):
-                start_idx = i * BATCH_SIZE
-                end_idx = min((i + 1) * BATCH_SIZE, num_slides)
-                batch_slides = slides_outline[start_idx:end_idx]
+            generation_errors: Dict[int, Exception] = {}
 
+            async def run_batch(i: int, first_slide_sample: Optional[str]):
+                start_idx = i * SLIDE_HTML_BATCH_SIZE
                 logger.info(
-                    f"🔄 Batch {i+1}/{total_batches}: slides {start_idx+1}-{end_idx}"
+                    f"🔄 Batch {i+1}/{total_batches}: slides {start_idx+1}-{start_idx + len(batches[i])}"
                 )
-
                 try:
-                    # Call AI to generate HTML for this batch
-                    batch_html = await self.ai_service.generate_slide_html_batch(
-                        title=analysis["title"],
-                        target_goal=analysis.get("target_goal", ""),
-                        slide_type=analysis["slide_type"],
-                        language=analysis["language"],
-                        slides_outline=batch_slides,
-                        slide_images=slide_images,
-                        logo_url=logo_url,
-                        user_query=user_query,
-                        batch_number=i + 1,
-                        total_batches=total_batches,
-                        first_slide_sample=first_slide_sample,  # Pass style reference from batch 1
-                    )
-
-                    all_slides_html.extend(batch_html)
-
-                    # Save first content slide (slide 1, not title slide 0) for style reference
-                    if i == 0 and len(batch_html) >= 2:
-                        first_slide_sample = batch_html[
-                            1
-                        ]  # Use slide 1 (Table of Contents)
-                        logger.info(
-                            "📌 Saved slide 1 as style reference for subsequent batches"
+                    async with batch_slot(task.user_id, provider):
+                        html = await self.ai_service.generate_slide_html_batch(
+                            title=analysis["title"],
+                            target_goal=analysis.get("target_goal", ""),
+                            slide_type=analysis["slide_type"],
+                            language=analysis["language"],
+                            slides_outline=batches[i],
+                            slide_images=slide_images,
+                            logo_url=logo_url,
+                            user_query=user_query,
+                            batch_number=i + 1,
+                            total_batches=total_batches,
+                            first_slide_sample=first_slide_sample,  # Style reference from batch 1
                         )
-
-                    # Update Redis progress (MongoDB no longer tracks progress)
-                    progress = int((i + 1) / total_batches * 100)
-                    await set_job_status(
-                        redis_client=self.queue_manager.redis_client,
-                        job_id=document_id,
-                        status="processing",
-                        user_id=task.user_id,
-                        progress_percent=progress,
-                        batches_completed=i + 1,
-                        total_batches=total_batches,
-                        title=analysis.get("title", "Untitled Presentation"),
+                    # Persist before publishing so a retry never regenerates it
+                    await asyncio.to_thread(
+                        self.batch_store.save, document_id, fingerprint, i, html
                     )
+                    batch_html[i] = html
+                except Exception as batch_error:
+                    logger.error(f"❌ Batch {i+1}/{total_batches} failed: {batch_error}")
+                    generation_errors[i] = batch_error
+                    return
 
-                    logger.info(
-                        f"✅ Batch {i+1}/{total_batches} completed ({progress}%)"
+                await self._publish_batch_progress(
+                    task, document_id, analysis, batch_html, total_batches
+                )
+                logger.info(
+                    f"✅ Batch {i+1}/{total_batches} completed "
+                    f"({len(batch_html)}/{total_batches} done)"
+                )
+
+            # Batch 1 first: its slide 1 (Table of Contents) is the style reference
+            if 0 not in batch_html:
+                await run_batch(0, None)
+
+            if 0 in batch_html:
+                first_batch = batch_html[0]
+                first_slide_sample = first_batch[1] if len(first_batch) >= 2 else None
+                # Remaining batches in parallel (bounded per user / provider)
+                await asyncio.gather(
+                    *(
+                        run_batch(i, first_slide_sample)
+                        for i in range(1, total_batches)
+                        if i not in batch_html
                     )
+                )
 
-                    # Small delay between batches
-                    if i < total_batches - 1:
-                        await asyncio.sleep(0.5)
+            generation_error = (
+                generation_errors[min(generation_errors)] if generation_errors else None
+            )
 
-                except Exception as batch_error:
-                    logger.error(
-                        f"❌ Batch {i+1}/{total_batches} failed: {batch_error}. "
-                        f"Saving {len(all_slides_html)} partial slides..."
-                    )
-                    generation_error = batch_error
-                    break  # Stop processing remaining batches
+            # Slides in order; a partial deck stops at the first missing batch
+            all_slides_html = []
+            for i in range(total_batches):
+                if i not in batch_html:
+                    break
+                all_slides_html.extend(batch_html[i])
 
             # Check if generation completed successfully
             if generation_error:
+                failed_batches = sorted(i + 1 for i in generation_errors)
                 # Save partial slides with outline for retry
                 if all_slides_html:
                     partial_html = "\n\n".join(all_slides_html)
@@ -540,12 +565,17 @@ class SlideGenerationWorker:
                     title=analysis.get("title", "Untitled Presentation"),
                     slides_generated=len(all_slides_html),
                     slides_expected=num_slides,
+                    batches_completed=len(batch_html),
+                    total_batches=total_batches,
+                    ready_batches=sorted(i + 1 for i in batch_html),
+                    failed_batches=failed_batches,
                     can_retry=True,  # Flag for frontend to show retry button
                 )
 
                 logger.error(
-                    f"❌ Generation incomplete: {len(all_slides_html)}/{num_slides} slides saved. "
-                    f"User can retry with saved outline."
+                    f"❌ Generation incomplete: batches {failed_batches} failed, "
+                    f"{len(all_slides_html)}/{num_slides} slides saved. "
+                    f"Retry regenerates only the failed batches."
                 )
                 return False
 
@@ -588,63 +618,46 @@ class SlideGenerationWorker:
                 slide_backgrounds=slide_backgrounds,
                 slides_outline=slides_outline,  # Save outline for retry capability
             )
+            await asyncio.to_thread(self.batch_store.clear, document_id)
 
-            # ✅ Add/Update version in version_history
+            # ✅ Add/Update current version in the version store
             current_doc = await asyncio.to_thread(
-                self.mongo.db["documents"].find_one, {"document_id": document_id}
+                self.mongo.db["documents"].find_one,
+                {"document_id": document_id},
+                {"version": 1},
             )
             if not current_doc:
                 raise Exception(f"Document {document_id} not found after save")
 
             current_version = current_doc.get("version", 1)
-            version_history = current_doc.get("version_history", [])
-
-            # Check if current version exists in history
-            version_exists = any(
-                v.get("version") == current_version for v in version_history
+            generated = {
+                "content_html": final_html,
+                "slides_outline": slides_outline,
+                "slide_backgrounds": slide_backgrounds,
+            }
+
+            version_exists = await asyncio.to_thread(
+                self.doc_manager.update_version_fields,
+                document_id,
+                task.user_id,
+                current_version,
+                generated,
             )
 
             if version_exists:
-                # Update existing version in history (regeneration)
-                await asyncio.to_thread(
-                    self.mongo.db["documents"].update_one,
-                    {
-                        "document_id": document_id,
-                        "user_id": task.user_id,
-                        "version_history.version": current_version,
-                    },
-                    {
-                        "$set": {
-                            "version_history.$.content_html": final_html,
-                            "version_history.$.slides_outline": slides_outline,
-                            "version_history.$.slide_backgrounds": slide_backgrounds,
-                            "version_history.$.slide_count": len(slides_outline),
-                        }
-                    },
-                )
+                # Regeneration: version already stored (snapshot before regenerating)
                 logger.info(
                     f"📸 Updated version {current_version} in history with generated slides"
                 )
             else:
                 # First generation - add version 1 to history
-                version_snapshot = {
-                    "version": current_version,
-                    "created_at": datetime.utcnow(),
-                    "description": f"AI generated slides (first generation)",
-                    "content_html": final_html,
-                    "slides_outline": slides_outline,
-                    "slide_backgrounds": slide_backgrounds,
-                    "slide_elements": [],
-                    "slide_count": len(slides_outline),
-                }
-
                 await asyncio.to_thread(
-                    self.mongo.db["documents"].update_one,
-                    {
-                        "document_id": document_id,
-                        "user_id": task.user_id,
-                    },
-                    {"$push": {"version_history": version_snapshot}},
+                    self.doc_manager.save_version,
+                    document_id=document_id,
+                    user_id=task.user_id,
+                    version=current_version,
+                    snapshot={**generated, "slide_elements": []},
+                    description="AI generated slides (first generation)",
                 )
                 logger.info(
                     f"📸 Created version {current_version} in history (first generation)"
@@ -655,9 +668,10 @@ class SlideGenerationWorker:
                 # Points calculation based on Claude provider:
                 # - Vertex AI: 2 points/batch (cheaper)
                 # - Direct API: 5 points/batch
-                points_per_batch = (
-                    2 if self.ai_service.claude_provider == "vertex" else 5
+                billing_provider = getattr(
+                    self.ai_service, "claude_provider", "default"
                 )
+                points_per_batch = 2 if billing_provider == "vertex" else 5
                 points_needed = total_batches * points_per_batch
 
                 points_service = get_points_service()
@@ -666,10 +680,10 @@ class SlideGenerationWorker:
                     amount=points_needed,
                     service="slide_ai_generation",
                     resource_id=document_id,
-                    description=f"AI Slide Generation: {actual_slides_count} slides ({total_batches} batches × {points_per_batch} points, {self.ai_service.claude_provider})",
+                    description=f"AI Slide Generation: {actual_slides_count} slides ({total_batches} batches × {points_per_batch} points, {billing_provider})",
                 )
                 logger.info(
-                    f"💰 Deducted {points_needed} points ({total_batches} batches × {points_per_batch} points/batch, provider: {self.ai_service.claude_provider})"
+                    f"💰 Deducted {points_needed} points ({total_batches} batches × {points_per_batch} points/batch, provider: {billing_provider})"
                 )
             else:
                 logger.info(
@@ -732,6 +746,28 @@ class SlideGenerationWorker:
 
             return False
 
+    async def _publish_batch_progress(
+        self,
+        task: SlideGenerationTask,
+        document_id: str,
+        analysis: dict,
+        batch_html: Dict[int, List[str]],
+        total_batches: int,
+    ):
+        """Publish a finished batch to the Redis job status (polled by the frontend)"""
+        await set_job_status(
+            redis_client=self.queue_manager.redis_client,
+            job_id=document_id,
+            status="processing",
+            user_id=task.user_id,
+            progress_percent=int(len(batch_html) / total_batches * 100),
+            batches_completed=len(batch_html),
+            total_batches=total_batches,
+            ready_batches=sorted(i + 1 for i in batch_html),
+            slides_generated=sum(len(html) for html in batch_html.values()),
+            title=analysis.get("title", "Untitled Presentation"),
+        )
+
     def _create_default_backgrounds(
         self, num_slides: int, slide_type: str
     ) -> List[dict]:
@@ -29,6 +29,16 @@ from src.queue.queue_manager import QueueManager, set_job_status
 from src.models.ai_queue_tasks import VideoExportTask
 from src.database.db_manager import DBManager
 from src.utils.logger import setup_logger
+from src.services.artifact_cache import ArtifactCache
+from src.services.ffmpeg_scheduler import PRIORITY_HIGH, get_ffmpeg_scheduler
+from src.services.r2_object_cache import get_r2_object_cache, key_from_url
+from src.services.slide_capture_engine import (
+    SLIDE_CAPTURE_CACHE_DIR,
+    SLIDE_CAPTURE_CACHE_MAX_MB,
+    SlideCaptureEngine,
+    summarize_timings,
+    timings_as_dicts,
+)
 
 logger = setup_logger()
 
@@ -72,6 +82,10 @@ class VideoExportWorker:
         # Frontend URL for loading presentations
         self.frontend_url = os.getenv("FRONTEND_URL", "https://wordai.pro")
 
+        # Screenshots of unchanged slides are reused across exports
+        self.slide_cache = ArtifactCache(SLIDE_CAPTURE_CACHE_DIR, SLIDE_CAPTURE_CACHE_MAX_MB)
+        self.capture_timings: Dict[str, list] = {}
+
         logger.info(f"🔧 Video Export Worker {self.worker_id} initialized")
         logger.info(f"   📡 Redis: {self.redis_url}")
         logger.info(f"   🌐 Frontend: {self.frontend_url}")
@@ -109,6 +123,31 @@ class VideoExportWorker:
 
         logger.info(f"✅ Worker {self.worker_id}: Shutdown complete")
 
+    def _slide_capture_engine(
+        self, public_token: str, slide_count: int, output_dir: Path, job_id: str, cache=None
+    ) -> SlideCaptureEngine:
+        """Parallel capture engine with screenshot-phase progress updates"""
+
+        async def on_progress(done: int, total: int):
+            # Update progress: screenshots are 50% of total work
+            await set_job_status(
+                redis_client=self.queue_manager.redis_client,
+                job_id=job_id,
+                status="processing",
+                progress=int((done / total) * 50),
+                current_phase="screenshot",
+            )
+
+        presentation_url = f"{self.frontend_url}/public/presentations/{public_token}"
+        logger.info(f"   🌐 Loading: {presentation_url}")
+        return SlideCaptureEngine(
+            presentation_url=presentation_url,
+            output_dir=output_dir,
+            cache=cache,
+            cache_scope=public_token,
+            on_progress=on_progress,
+        )
+
     async def capture_screenshots_optimized(
         self,
         public_token: str,
@@ -117,7 +156,10 @@ class VideoExportWorker:
         job_id: str,
     ) -> List[Path]:
         """
-        Capture 1 screenshot per slide at 6s mark (after animations)
+        Capture 1 screenshot per slide once its animations complete
+
+        Slides are captured on parallel pages; unchanged slides (same rendered HTML)
+        are reused from the slide capture cache.
 
         Args:
             public_token: Public presentation token
@@ -128,74 +170,17 @@ class VideoExportWorker:
         Returns:
             List of screenshot paths
         """
-        from playwright.async_api import async_playwright
-
         logger.info(f"📸 Optimized mode: Capturing {slide_count} screenshots...")
 
-        screenshot_paths = []
-        presentation_url = f"{self.frontend_url}/public/presentations/{public_token}"
-
-        async with async_playwright() as p:
-            # Launch browser
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-dev-shm-usage",
-                ],
-            )
-
-            page = await browser.new_page(
-                viewport={"width": 1920, "height": 1080},
-                device_scale_factor=1,
-            )
-
-            # Load presentation
-            logger.info(f"   🌐 Loading: {presentation_url}")
-            await page.goto(presentation_url, wait_until="networkidle")
-            await asyncio.sleep(2)  # Wait for initial render
-
-            # Capture each slide
-            for slide_idx in range(slide_count):
-                try:
-                    # Navigate to slide
-                    await page.evaluate(f"window.goToSlide({slide_idx})")
-
-                    # Wait 6 seconds for animations to complete
-                    await asyncio.sleep(6)
-
-                    # Take screenshot
-                    screenshot_path = output_dir / f"slide_{slide_idx:03d}.png"
-                    await page.screenshot(
-                        path=str(screenshot_path),
-                        type="png",
-                        full_page=False,
-                    )
-
-                    screenshot_paths.append(screenshot_path)
-                    logger.info(
-                        f"   ✅ Slide {slide_idx + 1}/{slide_count}: {screenshot_path.name}"
-                    )
-
-                    # Update progress: screenshots are 50% of total work
-                    progress = int(((slide_idx + 1) / slide_count) * 50)
-                    await set_job_status(
-                        redis_client=self.queue_manager.redis_client,
-                        job_id=job_id,
-                        status="processing",
-                        progress=progress,
-                        current_phase="screenshot",
-                    )
-
-                except Exception as e:
-                    logger.error(f"   ❌ Failed to capture slide {slide_idx}: {e}")
-                    # Continue with next slide
-                    continue
-
-            await browser.close()
+        engine = self._slide_capture_engine(
+            public_token, slide_count, output_dir, job_id, cache=self.slide_cache
+        )
+        screenshot_paths, timings = await engine.capture_stills(slide_count)
+        self.capture_timings[job_id] = timings
 
-        logger.info(f"✅ Captured {len(screenshot_paths)} screenshots")
+        logger.info(
+            f"✅ Captured {len(screenshot_paths)} screenshots {summarize_timings(timings)}"
+        )
         return screenshot_paths
 
     async def capture_screenshots_animated(
@@ -206,7 +191,7 @@ class VideoExportWorker:
         job_id: str,
     ) -> Dict[int, List[Path]]:
         """
-        Capture 5s animation (150 frames @ 30 FPS) per slide
+        Capture 5s animation (150 frames @ 30 FPS) per slide, slides on parallel pages
 
         Args:
             public_token: Public presentation token
@@ -217,105 +202,16 @@ class VideoExportWorker:
         Returns:
             Dict mapping slide_index to list of frame paths
         """
-        from playwright.async_api import async_playwright
-
         logger.info(f"🎬 Animated mode: Capturing {slide_count} slides × 150 frames...")
 
-        slide_frames = {}
-        presentation_url = f"{self.frontend_url}/public/presentations/{public_token}"
-        fps = 30
-        animation_duration = 5  # seconds
-        frames_per_slide = fps * animation_duration  # 150 frames
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-dev-shm-usage",
-                ],
-            )
-
-            page = await browser.new_page(
-                viewport={"width": 1920, "height": 1080},
-                device_scale_factor=1,
-            )
-
-            # Load presentation
-            logger.info(f"   🌐 Loading: {presentation_url}")
-            await page.goto(presentation_url, wait_until="networkidle")
-            await asyncio.sleep(2)
-
-            # Capture each slide
-            for slide_idx in range(slide_count):
-                try:
-                    # Navigate to slide (triggers animation start)
-                    await page.evaluate(f"window.goToSlide({slide_idx})")
-
-                    # ⚠️ CRITICAL: Wait for navigation to complete and animation to START
-                    # Animation starts immediately after slide change
-                    await asyncio.sleep(0.3)  # Brief stabilization
-
-                    # Create slide directory
-                    slide_dir = output_dir / f"slide_{slide_idx:03d}"
-                    slide_dir.mkdir(parents=True, exist_ok=True)
-
-                    frames = []
-                    start_time = asyncio.get_event_loop().time()
-
-                    # ✅ Capture frames at 30 FPS for 5 seconds (animation duration)
-                    # Animation plays automatically - we just capture it frame-by-frame
-                    frame_interval = 1 / fps  # ~33ms per frame
-
-                    for frame_idx in range(frames_per_slide):
-                        frame_path = slide_dir / f"frame_{frame_idx:04d}.jpg"
-
-                        # Capture current frame (animation is playing)
-                        # Use JPEG for 10x faster disk I/O (2-3MB PNG → 200-300KB JPEG)
-                        await page.screenshot(
-                            path=str(frame_path),
-                            type="jpeg",
-                            quality=85,  # Good quality, small size
-                            full_page=False,
-                        )
-
-                        frames.append(frame_path)
-
-                        # Wait until next frame time (maintain 30 FPS timing)
-                        elapsed = asyncio.get_event_loop().time() - start_time
-                        next_frame_time = (frame_idx + 1) * frame_interval
-                        sleep_time = max(0, next_frame_time - elapsed)
-
-                        if sleep_time > 0:
-                            await asyncio.sleep(sleep_time)
-
-                    slide_frames[slide_idx] = frames
-
-                    logger.info(
-                        f"   ✅ Slide {slide_idx + 1}/{slide_count}: {len(frames)} frames"
-                    )
-
-                    # Update progress: screenshots are 50% of total work
-                    progress = int(((slide_idx + 1) / slide_count) * 50)
-                    await set_job_status(
-                        redis_client=self.queue_manager.redis_client,
-                        job_id=job_id,
-                        status="processing",
-                        progress=progress,
-                        current_phase="screenshot",
-                    )
-
-                except Exception as e:
-                    logger.error(f"   ❌ Failed to capture slide {slide_idx}: {e}")
-                    slide_frames[slide_idx] = []
-                    continue
-
-            await browser.close()
+        engine = self._slide_capture_engine(public_token, slide_count, output_dir, job_id)
+        slide_frames, timings = await engine.capture_animated(slide_count, fps=30, duration=5)
+        self.capture_timings[job_id] = timings
 
         total_frames = sum(len(frames) for frames in slide_frames.values())
         logger.info(
-            f"✅ Captured {total_frames} frames across {len(slide_frames)} slides"
+            f"✅ Captured {total_frames} frames across {len(slide_frames)} slides "
+            f"{summarize_timings(timings)}"
         )
         return slide_frames
 
@@ -323,7 +219,7 @@ class VideoExportWorker:
         self, audio_url: str, output_path: Path, job_id: str
     ) -> Path:
         """
-        Download merged audio file
+        Download merged audio file (R2 CDN URLs via the shared R2 object cache)
 
         Args:
             audio_url: URL to download audio from
@@ -337,6 +233,20 @@ class VideoExportWorker:
 
         logger.info(f"🎵 Downloading audio from: {audio_url}")
 
+        r2_key = key_from_url(audio_url)
+        cache = get_r2_object_cache()
+        if r2_key and cache:
+            try:
+                await cache.acopy_to(r2_key, str(output_path))
+                file_size_mb = output_path.stat().st_size / (1024 * 1024)
+                logger.info(
+                    f"✅ Audio copied from R2 cache: {output_path.name} "
+                    f"({file_size_mb:.1f} MB)"
+                )
+                return output_path
+            except Exception as e:
+                logger.warning(f"⚠️ R2 cache read failed, downloading from CDN: {e}")
+
         async with aiohttp.ClientSession() as session:
             async with session.get(audio_url) as response:
                 if response.status != 200:
@@ -353,6 +263,40 @@ class VideoExportWorker:
         logger.info(f"✅ Audio downloaded: {output_path.name} ({file_size_mb:.1f} MB)")
         return output_path
 
+    async def _run_encode(
+        self,
+        ffmpeg_cmd: List[str],
+        job_id: str,
+        duration: Optional[float],
+        cwd: Optional[str] = None,
+    ):
+        """Run the video encode through the host-wide ffmpeg scheduler (progress 50-80%)"""
+
+        async def on_progress(fraction: float):
+            await set_job_status(
+                redis_client=self.queue_manager.redis_client,
+                job_id=job_id,
+                status="processing",
+                progress=50 + int(fraction * 30),
+                current_phase="encode",
+            )
+
+        # Exports are interactive: the user is waiting on the result
+        await on_progress(0.0)
+        try:
+            await get_ffmpeg_scheduler().run(
+                ffmpeg_cmd,
+                "FFmpeg encoding",
+                priority=PRIORITY_HIGH,
+                encode=True,
+                duration=duration,
+                on_progress=on_progress,
+                cwd=cwd,
+            )
+        except RuntimeError as e:
+            logger.error(f"   ❌ FFmpeg error: {e}")
+            raise
+
     async def encode_video_optimized(
         self,
         screenshot_paths: List[Path],
@@ -425,8 +369,6 @@ class VideoExportWorker:
             "libx264",
             "-crf",
             str(crf),
-            "-preset",
-            "medium",
             "-pix_fmt",
             "yuv420p",
             "-movflags",
@@ -437,30 +379,16 @@ class VideoExportWorker:
 
         logger.info(f"   FFmpeg command: {' '.join(ffmpeg_cmd)}")
 
-        # Run FFmpeg
-        process = await asyncio.create_subprocess_exec(
-            *ffmpeg_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=str(temp_dir),
-        )
-
-        # Update progress: encoding (50-80%)
-        await set_job_status(
-            redis_client=self.queue_manager.redis_client,
+        # Run FFmpeg - progress: encoding (50-80%)
+        await self._run_encode(
+            ffmpeg_cmd,
             job_id=job_id,
-            status="processing",
-            progress=65,
-            current_phase="encode",
+            duration=sum(
+                ts["end_time"] - ts["start_time"] for ts in slide_timestamps
+            ),
+            cwd=str(temp_dir),
         )
 
-        stdout, stderr = await process.communicate()
-
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "FFmpeg encoding failed"
-            logger.error(f"   ❌ FFmpeg error: {error_msg}")
-            raise RuntimeError(f"FFmpeg encoding failed: {error_msg}")
-
         logger.info(f"   ✅ Video encoded: {video_only_path.name}")
 
         # 4. Merge with audio
@@ -493,18 +421,13 @@ class VideoExportWorker:
 
         logger.info(f"   Merging audio: {' '.join(merge_cmd)}")
 
-        process = await asyncio.create_subprocess_exec(
-            *merge_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-
-        stdout, stderr = await process.communicate()
-
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Audio merge failed"
-            logger.error(f"   ❌ Merge error: {error_msg}")
-            raise RuntimeError(f"Audio merge failed: {error_msg}")
+        try:
+            await get_ffmpeg_scheduler().run(
+                merge_cmd, "Audio merge", priority=PRIORITY_HIGH
+            )
+        except RuntimeError as e:
+            logger.error(f"   ❌ Merge error: {e}")
+            raise
 
         file_size_mb = output_path.stat().st_size / (1024 * 1024)
         logger.info(f"✅ Final video: {output_path.name} ({file_size_mb:.1f} MB)")
@@ -619,8 +542,6 @@ class VideoExportWorker:
             "libx264",
             "-crf",
             str(crf),
-            "-preset",
-            "medium",
             "-pix_fmt",
             "yuv420p",
             "-movflags",
@@ -631,27 +552,13 @@ class VideoExportWorker:
 
         logger.info(f"   FFmpeg command: {' '.join(ffmpeg_cmd)}")
 
-        await set_job_status(
-            redis_client=self.queue_manager.redis_client,
+        # Progress: encoding (50-80%)
+        await self._run_encode(
+            ffmpeg_cmd,
             job_id=job_id,
-            status="processing",
-            progress=65,
-            current_phase="encode",
+            duration=slide_timestamps[-1]["end_time"] if slide_timestamps else None,
         )
 
-        process = await asyncio.create_subprocess_exec(
-            *ffmpeg_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-
-        stdout, stderr = await process.communicate()
-
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "FFmpeg encoding failed"
-            logger.error(f"   ❌ FFmpeg error: {error_msg}")
-            raise RuntimeError(f"FFmpeg encoding failed: {error_msg}")
-
         logger.info(f"   ✅ Video encoded: {video_only_path.name}")
 
         # 4. Merge with audio
@@ -684,18 +591,13 @@ class VideoExportWorker:
 
         logger.info(f"   Merging audio...")
 
-        process = await asyncio.create_subprocess_exec(
-            *merge_cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-
-        stdout, stderr = await process.communicate()
-
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Audio merge failed"
-            logger.error(f"   ❌ Merge error: {error_msg}")
-            raise RuntimeError(f"Audio merge failed: {error_msg}")
+        try:
+            await get_ffmpeg_scheduler().run(
+                merge_cmd, "Audio merge", priority=PRIORITY_HIGH
+            )
+        except RuntimeError as e:
+            logger.error(f"   ❌ Merge error: {e}")
+            raise
 
         file_size_mb = output_path.stat().st_size / (1024 * 1024)
         logger.info(f"✅ Final video: {output_path.name} ({file_size_mb:.1f} MB)")
@@ -962,6 +864,10 @@ class VideoExportWorker:
                     "slide_timestamps": slide_timestamps,
                 }
 
+            screenshot_data["slide_timings"] = timings_as_dicts(
+                self.capture_timings.pop(job_id, [])
+            )
+
             # Save screenshot metadata for Phase 3 (FFmpeg)
             import json
 
@@ -1129,6 +1035,10 @@ class VideoExportWorker:
 
             return False
 
+        finally:
+            # Failed / timed-out jobs never reach the metadata step that pops these
+            self.capture_timings.pop(job_id, None)
+
     async def run(self):
         """Main worker loop with concurrency support"""
         self.running = True
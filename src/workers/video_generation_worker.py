@@ -11,6 +11,11 @@ For each job:
 5. Concat all segments → final.mp4
 6. Upload final.mp4 to R2
 7. Update MongoDB task status → completed
+
+Steps 2-5 run as a scene-parallel DAG (src/services/video_render_pipeline.py);
+artifacts are cached by input hash so a retry/edit only rebuilds changed scenes.
+xAI clips (ai_video mode) are keyed on the task and its `clip_nonce`, which
+POST /{id}/render?regenerate_clips=true replaces.
 """
 
 import asyncio
@@ -35,6 +40,7 @@ import redis.asyncio as aioredis
 
 from src.database.db_manager import DBManager
 from src.services.video_generation_service import VideoGenerationService
+from src.services.video_render_pipeline import VideoRenderPipeline
 from src.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -136,89 +142,34 @@ class VideoGenerationWorker:
                             f"Scene {i} image not ready (status: {img.get('status')})"
                         )
 
-            import httpx
+            # Scene-parallel DAG: unchanged scenes come from the render cache
+            pipeline = VideoRenderPipeline(self.svc, task_dir)
 
             if mode == "ai_video":
                 # ── AI VIDEO MODE: xAI grok-imagine-video per scene ────────
                 logger.info(
-                    f"[{task_id[:8]}] [ai_video] Downloading {n_scenes} audio files..."
+                    f"[{task_id[:8]}] [ai_video] Rendering {n_scenes} scenes "
+                    f"(xAI clips + audio → segments → concat)..."
                 )
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    for i in range(n_scenes):
-                        aud_url = step3[i]["audio_url"]
-                        aud_resp = await client.get(aud_url)
-                        aud_resp.raise_for_status()
-                        aud_path = task_dir / f"scene_{i:02d}_audio.wav"
-                        aud_path.write_bytes(aud_resp.content)
-
-                logger.info(
-                    f"[{task_id[:8]}] [ai_video] Generating {n_scenes} xAI video clips..."
+                final_path = await pipeline.render_ai_video(
+                    scenes=scenes,
+                    audio_urls=[step3[i]["audio_url"] for i in range(n_scenes)],
+                    style_anchor=style_anchor,
+                    clip_nonce=f"{task_id}:{task.get('clip_nonce', '')}",
                 )
-                segments = []
-                for i, scene in enumerate(scenes):
-                    xai_clip = await self.svc.generate_scene_video_xai(
-                        prompt=scene.get("visual_prompt", scene.get("narration", "")),
-                        scene_index=i,
-                        task_dir=task_dir,
-                        style_anchor=style_anchor,
-                    )
-                    seg = self.svc.merge_video_with_audio(
-                        video_path=xai_clip,
-                        audio_path=task_dir / f"scene_{i:02d}_audio.wav",
-                        scene_index=i,
-                        task_dir=task_dir,
-                    )
-                    segments.append(seg)
 
             else:
                 # ── SLIDESHOW MODE: Ken Burns effect ───────────────────────
-                logger.info(f"[{task_id[:8]}] Downloading {n_scenes} images + audio...")
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    for i in range(n_scenes):
-                        img_url = step2[i]["image_url"]
-                        aud_url = step3[i]["audio_url"]
-
-                        img_resp = await client.get(img_url)
-                        img_resp.raise_for_status()
-                        img_path = task_dir / f"scene_{i:02d}_image.png"
-                        img_path.write_bytes(img_resp.content)
-
-                        aud_resp = await client.get(aud_url)
-                        aud_resp.raise_for_status()
-                        aud_path = task_dir / f"scene_{i:02d}_audio.wav"
-                        aud_path.write_bytes(aud_resp.content)
-
                 logger.info(
-                    f"[{task_id[:8]}] Rendering {n_scenes} frames via Playwright..."
+                    f"[{task_id[:8]}] Rendering {n_scenes} scenes "
+                    f"(frames via Playwright → Ken Burns segments → concat)..."
                 )
-                frame_paths = []
-                for i, scene in enumerate(scenes):
-                    fp = await self.svc.render_frame(
-                        image_path=task_dir / f"scene_{i:02d}_image.png",
-                        text_overlay=scene.get("text_overlay", ""),
-                        scene_index=i,
-                        total_scenes=n_scenes,
-                        video_title=video_title,
-                        task_dir=task_dir,
-                    )
-                    frame_paths.append(fp)
-
-                logger.info(
-                    f"[{task_id[:8]}] Encoding {n_scenes} Ken Burns segments via FFmpeg..."
+                final_path = await pipeline.render_slideshow(
+                    scenes=scenes,
+                    image_urls=[step2[i]["image_url"] for i in range(n_scenes)],
+                    audio_urls=[step3[i]["audio_url"] for i in range(n_scenes)],
+                    video_title=video_title,
                 )
-                segments = []
-                for i in range(n_scenes):
-                    seg = self.svc.create_video_segment_ken_burns(
-                        frame_path=frame_paths[i],
-                        audio_path=task_dir / f"scene_{i:02d}_audio.wav",
-                        scene_index=i,
-                        task_dir=task_dir,
-                    )
-                    segments.append(seg)
-
-            # ── Concat ────────────────────────────────────────────────────
-            logger.info(f"[{task_id[:8]}] Concatenating segments...")
-            final_path = self.svc.concat_segments(segments, task_dir)
 
             # ── Upload to R2 ───────────────────────────────────────────────
             logger.info(f"[{task_id[:8]}] Uploading final video to R2...")
@@ -0,0 +1,519 @@
+"""
+Worker Supervisor
+Runs background queue workers as dedicated processes outside the API server.
+
+The API process only enqueues tasks; this supervisor owns every worker type that
+used to be started inside app.py's lifespan (document, extraction, storage, AI
+editor, slide generation, translation, chapter translation, USDT verification
+and community cache updater), plus the R2 purge worker and the chat persistence
+(write-behind) worker.
+
+Features:
+- One process per replica, configurable replica count per worker type
+- Graceful drain on SIGTERM/SIGINT (stop dequeuing, finish in-flight jobs)
+- Restart-on-crash with exponential backoff
+- Per-replica liveness + throughput heartbeat in Redis (read by /health/workers
+  through src/services/worker_heartbeats.py)
+
+Usage:
+    python -m src.workers.worker_supervisor
+    python -m src.workers.worker_supervisor --only translation_worker,chapter_translation_worker
+    WORKER_REPLICAS="extraction_worker=2,slide_generation_worker=0" python -m src.workers.worker_supervisor
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+# Load environment variables
+env_var = os.getenv("ENVIRONMENT", os.getenv("ENV", "production"))
+env_file = "development.env" if env_var == "development" else ".env"
+load_dotenv(env_file)
+
+from src.services.worker_heartbeats import (
+    HEARTBEAT_INTERVAL_SECONDS,
+    HEARTBEAT_TTL_SECONDS,
+    heartbeat_key,
+)
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+@dataclass
+class WorkerSpec:
+    """How to build and run one worker type"""
+
+    name: str
+    module: str
+    target: str
+    kind: str = "class"  # "class" (initialize/run/shutdown) or "coroutine"
+    replicas: int = 1
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    stop: Optional[str] = None  # Optional stop function for coroutine workers
+
+
+WORKER_SPECS: Dict[str, WorkerSpec] = {
+    spec.name: spec
+    for spec in [
+        WorkerSpec(
+            name="document_worker",
+            module="src.workers.document_processing_worker",
+            target="DocumentProcessingWorker",
+            kwargs={"poll_interval": 2.0},
+        ),
+        WorkerSpec(
+            name="extraction_worker",
+            module="src.workers.extraction_processing_worker",
+            target="ExtractionProcessingWorker",
+            kwargs={"poll_interval": 1.0},
+        ),
+        WorkerSpec(
+            name="storage_worker",
+            module="src.workers.storage_processing_worker",
+            target="StorageProcessingWorker",
+            kwargs={"poll_interval": 1.0},
+        ),
+        WorkerSpec(
+            name="ai_editor_worker",
+            module="src.workers.ai_editor_worker",
+            target="AIEditorWorker",
+        ),
+        WorkerSpec(
+            name="slide_generation_worker",
+            module="src.workers.slide_generation_worker",
+            target="SlideGenerationWorker",
+        ),
+        WorkerSpec(
+            name="translation_worker",
+            module="src.workers.translation_worker",
+            target="TranslationWorker",
+        ),
+        WorkerSpec(
+            name="chapter_translation_worker",
+            module="src.workers.chapter_translation_worker",
+            target="ChapterTranslationWorker",
+        ),
+        WorkerSpec(
+            name="chat_persistence_worker",
+            module="src.workers.chat_persistence_worker",
+            target="ChatPersistenceWorker",
+        ),
+        WorkerSpec(
+            name="email_sender_worker",
+            module="src.workers.email_sender_worker",
+            target="EmailSenderWorker",
+        ),
+        WorkerSpec(
+            name="usdt_verification",
+            module="src.services.usdt_verification_job",
+            target="start_verification_job",
+            kind="coroutine",
+            stop="stop_verification_job",
+        ),
+        WorkerSpec(
+            name="r2_purge_worker",
+            module="src.workers.r2_purge_worker",
+            target="r2_purge_worker",
+            kind="coroutine",
+            stop="stop_r2_purge_worker",
+        ),
+        WorkerSpec(
+            name="community_cache_updater",
+            module="src.workers.community_cache_updater",
+            target="community_cache_updater_worker",
+            kind="coroutine",
+        ),
+    ]
+}
+
+
+def parse_replica_overrides(value: str) -> Dict[str, int]:
+    """Parse "name=count,name=count" into a dict (unknown names are ignored)"""
+    overrides = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        name, count = item.split("=", 1)
+        name = name.strip()
+        if name not in WORKER_SPECS:
+            logger.warning(f"⚠️ Unknown worker in WORKER_REPLICAS: {name}")
+            continue
+        try:
+            overrides[name] = max(0, int(count))
+        except ValueError:
+            logger.warning(f"⚠️ Invalid replica count for {name}: {count}")
+    return overrides
+
+
+# ============================================================================
+# CHILD PROCESS
+# ============================================================================
+
+
+class _ThroughputCounter:
+    """Counts tasks dequeued by a worker (wraps QueueManager.dequeue_generic_task)"""
+
+    def __init__(self):
+        self.tasks_dequeued = 0
+        self.last_task_at: Optional[str] = None
+
+    def instrument(self, worker) -> None:
+        queue_manager = getattr(worker, "queue_manager", None)
+        if queue_manager is None or not hasattr(queue_manager, "dequeue_generic_task"):
+            return
+
+        original = queue_manager.dequeue_generic_task
+
+        async def counted_dequeue(*args, **kwargs):
+            task = await original(*args, **kwargs)
+            if task:
+                self.tasks_dequeued += 1
+                self.last_task_at = datetime.utcnow().isoformat()
+            return task
+
+        queue_manager.dequeue_generic_task = counted_dequeue
+
+
+async def _heartbeat_loop(
+    name: str,
+    replica: int,
+    restarts: int,
+    counter: _ThroughputCounter,
+    stop_event: asyncio.Event,
+):
+    """Publish liveness + throughput for this replica to Redis"""
+    import redis.asyncio as aioredis
+
+    redis_client = aioredis.from_url(
+        os.getenv("REDIS_URL", "redis://redis-server:6379"), decode_responses=True
+    )
+    key = heartbeat_key(name, replica)
+    started_at = datetime.utcnow().isoformat()
+    started_ts = time.time()
+
+    try:
+        while not stop_event.is_set():
+            try:
+                uptime = max(time.time() - started_ts, 1.0)
+                await redis_client.hset(
+                    key,
+                    mapping={
+                        "worker": name,
+                        "replica": replica,
+                        "pid": os.getpid(),
+                        "host": os.getenv("HOSTNAME", ""),
+                        "started_at": started_at,
+                        "last_seen": datetime.utcnow().isoformat(),
+                        "restarts": restarts,
+                        "tasks_dequeued": counter.tasks_dequeued,
+                        "last_task_at": counter.last_task_at or "",
+                        "tasks_per_minute": round(
+                            counter.tasks_dequeued * 60.0 / uptime, 3
+                        ),
+                        "state": "running",
+                    },
+                )
+                await redis_client.expire(key, HEARTBEAT_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"⚠️ [{name}#{replica}] Heartbeat failed: {e}")
+
+            try:
+                await asyncio.wait_for(
+                    stop_event.wait(), timeout=HEARTBEAT_INTERVAL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+
+        await redis_client.hset(key, "state", "draining")
+    except Exception:
+        pass
+    finally:
+        await redis_client.close()
+
+
+async def _run_worker(spec: WorkerSpec, replica: int, restarts: int, drain_timeout: float):
+    """Run a single worker inside this process until SIGTERM, then drain"""
+    module = importlib.import_module(spec.module)
+    target = getattr(module, spec.target)
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    counter = _ThroughputCounter()
+    worker = None
+
+    if spec.kind == "class":
+        worker = target(
+            worker_id=f"{spec.name}_{replica}_{os.getpid()}",
+            redis_url=os.getenv("REDIS_URL", "redis://redis-server:6379"),
+            **spec.kwargs,
+        )
+        await worker.initialize()
+        counter.instrument(worker)
+        run_task = asyncio.create_task(worker.run())
+    else:
+        run_task = asyncio.create_task(target(**spec.kwargs))
+
+    heartbeat_task = asyncio.create_task(
+        _heartbeat_loop(spec.name, replica, restarts, counter, stop_event)
+    )
+    stop_task = asyncio.create_task(stop_event.wait())
+
+    done, _ = await asyncio.wait(
+        [run_task, stop_task], return_when=asyncio.FIRST_COMPLETED
+    )
+
+    if run_task in done:
+        # Worker exited on its own - surface the error so the supervisor restarts it
+        stop_event.set()
+        await heartbeat_task
+        exc = run_task.exception()
+        if exc:
+            raise exc
+        return
+
+    logger.info(f"🛑 [{spec.name}#{replica}] Draining (timeout {drain_timeout:.0f}s)...")
+
+    # Stop dequeuing new tasks; in-flight tasks finish inside run()
+    if worker is not None:
+        worker.running = False
+    elif spec.stop:
+        getattr(module, spec.stop)()
+
+    try:
+        await asyncio.wait_for(asyncio.shield(run_task), timeout=drain_timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ [{spec.name}#{replica}] Drain timeout, cancelling")
+        run_task.cancel()
+        try:
+            await run_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    except (asyncio.CancelledError, Exception):
+        pass
+
+    if worker is not None:
+        try:
+            await worker.shutdown()
+        except Exception as e:
+            logger.error(f"❌ [{spec.name}#{replica}] Shutdown error: {e}")
+
+    await heartbeat_task
+    logger.info(f"✅ [{spec.name}#{replica}] Stopped")
+
+
+def _worker_process_main(name: str, replica: int, restarts: int, drain_timeout: float):
+    """Entry point of a worker child process"""
+    # Own process group: terminal Ctrl+C reaches the supervisor only, which then
+    # drains children in order instead of every process dying at once
+    try:
+        os.setpgrp()
+    except OSError:
+        pass
+
+    spec = WORKER_SPECS[name]
+    logger.info(f"🚀 [{name}#{replica}] Worker process started (pid={os.getpid()})")
+    asyncio.run(_run_worker(spec, replica, restarts, drain_timeout))
+
+
+# ============================================================================
+# SUPERVISOR
+# ============================================================================
+
+
+@dataclass
+class _Replica:
+    name: str
+    index: int
+    process: Optional[multiprocessing.process.BaseProcess] = None
+    restarts: int = 0
+    started_at: float = 0.0
+    next_start_at: float = 0.0
+    last_exit_code: Optional[int] = None
+
+
+class WorkerSupervisor:
+    """Spawns, monitors and restarts worker processes"""
+
+    def __init__(
+        self,
+        replicas: Dict[str, int],
+        drain_timeout: float = 120.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        stable_after: float = 60.0,
+    ):
+        self.drain_timeout = drain_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.stopping = False
+        self.ctx = multiprocessing.get_context("spawn")
+
+        self.replicas: List[_Replica] = [
+            _Replica(name=name, index=i)
+            for name, count in replicas.items()
+            for i in range(count)
+        ]
+
+    def _spawn(self, replica: _Replica):
+        process = self.ctx.Process(
+            target=_worker_process_main,
+            args=(replica.name, replica.index, replica.restarts, self.drain_timeout),
+            name=f"{replica.name}#{replica.index}",
+            daemon=False,
+        )
+        process.start()
+        replica.process = process
+        replica.started_at = time.time()
+        logger.info(
+            f"▶️  Started {replica.name}#{replica.index} (pid={process.pid}, restarts={replica.restarts})"
+        )
+
+    def _backoff(self, replica: _Replica) -> float:
+        return min(self.backoff_base * (2 ** max(replica.restarts - 1, 0)), self.backoff_max)
+
+    def _check(self, replica: _Replica):
+        now = time.time()
+        process = replica.process
+
+        if process is None:
+            if now >= replica.next_start_at:
+                self._spawn(replica)
+            return
+
+        if process.is_alive():
+            return
+
+        replica.last_exit_code = process.exitcode
+        replica.process = None
+
+        # A replica that ran long enough is considered healthy again
+        if now - replica.started_at >= self.stable_after:
+            replica.restarts = 0
+
+        replica.restarts += 1
+        delay = self._backoff(replica)
+        replica.next_start_at = now + delay
+        logger.error(
+            f"💥 {replica.name}#{replica.index} exited (code={replica.last_exit_code}), "
+            f"restarting in {delay:.0f}s (attempt {replica.restarts})"
+        )
+
+    def _request_stop(self, sig, frame):
+        if not self.stopping:
+            logger.info(f"📡 Received signal {sig}, draining workers...")
+        self.stopping = True
+
+    def _drain(self):
+        alive = [r for r in self.replicas if r.process and r.process.is_alive()]
+        for replica in alive:
+            try:
+                os.kill(replica.process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.time() + self.drain_timeout + 10
+        for replica in alive:
+            replica.process.join(timeout=max(deadline - time.time(), 0))
+
+        for replica in alive:
+            if replica.process.is_alive():
+                logger.warning(f"⚠️ Killing {replica.name}#{replica.index} after drain timeout")
+                replica.process.kill()
+                replica.process.join(timeout=5)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "worker": r.name,
+                "replica": r.index,
+                "pid": r.process.pid if r.process else None,
+                "alive": bool(r.process and r.process.is_alive()),
+                "restarts": r.restarts,
+                "last_exit_code": r.last_exit_code,
+            }
+            for r in self.replicas
+        ]
+
+    def run(self, poll_interval: float = 1.0, status_interval: float = 300.0):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        logger.info(f"🧭 Worker supervisor starting {len(self.replicas)} process(es)")
+        last_status = time.time()
+
+        while not self.stopping:
+            for replica in self.replicas:
+                self._check(replica)
+
+            if time.time() - last_status >= status_interval:
+                logger.info(f"📊 Supervisor status: {json.dumps(self.status())}")
+                last_status = time.time()
+
+            time.sleep(poll_interval)
+
+        self._drain()
+        logger.info("✅ Worker supervisor stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background workers under supervision")
+    parser.add_argument(
+        "--only",
+        default=os.getenv("SUPERVISOR_WORKERS", ""),
+        help="Comma-separated worker names to run (default: all)",
+    )
+    parser.add_argument(
+        "--replicas",
+        default=os.getenv("WORKER_REPLICAS", ""),
+        help='Replica overrides, e.g. "extraction_worker=2,translation_worker=0"',
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=float(os.getenv("WORKER_DRAIN_TIMEOUT", "120")),
+        help="Seconds to wait for in-flight jobs on shutdown",
+    )
+    parser.add_argument("--list", action="store_true", help="List worker types and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for spec in WORKER_SPECS.values():
+            print(f"{spec.name:30} {spec.module}.{spec.target} (replicas={spec.replicas})")
+        return
+
+    selected = [n.strip() for n in args.only.split(",") if n.strip()] or list(WORKER_SPECS)
+    unknown = [n for n in selected if n not in WORKER_SPECS]
+    if unknown:
+        parser.error(f"Unknown worker(s): {', '.join(unknown)}")
+
+    overrides = parse_replica_overrides(args.replicas)
+    replicas = {name: overrides.get(name, WORKER_SPECS[name].replicas) for name in selected}
+
+    for name, count in replicas.items():
+        logger.info(f"   {name}: {count} replica(s)")
+
+    WorkerSupervisor(replicas=replicas, drain_timeout=args.drain_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
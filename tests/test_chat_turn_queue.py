@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime
+
+import fakeredis
+import mongomock
+import pytest
+
+from src.database import conversation_buckets
+from src.database.conversation_buckets import ConversationBucketStore
+from src.services import chat_turn_queue
+from src.workers.chat_persistence_worker import ChatPersistenceWorker
+
+
+class FakeChatService:
+    """save_completed_turns / dispatch_turn_webhooks with call recording"""
+
+    def __init__(self, deliver=True):
+        self.saved = []
+        self.dispatched = []
+        self.deliver = deliver
+
+    async def save_completed_turns(self, events):
+        self.saved.extend(e["turn_id"] for e in events)
+        return [e.get("new_user", False) for e in events]
+
+    async def dispatch_turn_webhooks(self, event, is_new_user):
+        self.dispatched.append((event["turn_id"], is_new_user))
+        return self.deliver
+
+
+def _worker(chat_service):
+    worker = ChatPersistenceWorker(worker_id="test_worker", redis_url="redis://test")
+    worker.queue._redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    worker.chat_service = chat_service
+    return worker
+
+
+async def _drain(worker):
+    while worker._dispatch_tasks:
+        await asyncio.gather(*list(worker._dispatch_tasks))
+
+
+async def _pending(queue):
+    info = await queue.redis.xpending(
+        chat_turn_queue.TURN_STREAM, chat_turn_queue.CONSUMER_GROUP
+    )
+    return info["pending"]
+
+
+def test_batch_is_saved_then_acked():
+    async def run():
+        service = FakeChatService()
+        worker = _worker(service)
+        for i in range(3):
+            await worker.queue.publish({"turn_id": f"t{i}", "new_user": i == 0})
+
+        batch = await worker.queue.read_batch("test_worker", 10, 0)
+        assert [event["turn_id"] for _, event in batch] == ["t0", "t1", "t2"]
+
+        await worker.process_batch(batch)
+        await _drain(worker)
+
+        assert service.saved == ["t0", "t1", "t2"]
+        assert sorted(service.dispatched) == [
+            ("t0", True),
+            ("t1", False),
+            ("t2", False),
+        ]
+        assert await _pending(worker.queue) == 0
+
+    asyncio.run(run())
+
+
+def test_redelivered_turn_is_not_saved_twice(monkeypatch):
+    async def run():
+        service = FakeChatService()
+        worker = _worker(service)
+        await worker.queue.publish({"turn_id": "t1", "new_user": True})
+        batch = await worker.queue.read_batch("crashed_worker", 10, 0)
+
+        # Saved, but the consumer died before the webhooks/XACK
+        await worker.queue.mark_saved(["t1"], [True])
+        assert await _pending(worker.queue) == 1
+
+        # Another consumer reclaims the idle entry
+        monkeypatch.setattr(chat_turn_queue, "CHAT_TURN_CLAIM_IDLE_MS", 0)
+        reclaimed = await worker.queue.read_batch("test_worker", 10, 0)
+        assert [entry_id for entry_id, _ in reclaimed] == [batch[0][0]]
+
+        await worker.process_batch(reclaimed)
+        await _drain(worker)
+
+        assert service.saved == []  # saved-marker short-circuits the write
+        assert service.dispatched == [("t1", True)]  # stored "new user" flag reused
+        assert await _pending(worker.queue) == 0
+
+    asyncio.run(run())
+
+
+def test_failed_webhooks_are_dead_lettered():
+    async def run():
+        worker = _worker(FakeChatService(deliver=False))
+        await worker.queue.publish({"turn_id": "t1"})
+        await worker.process_batch(await worker.queue.read_batch("test_worker", 10, 0))
+        await _drain(worker)
+
+        assert await _pending(worker.queue) == 0
+        assert await worker.queue.redis.xlen(chat_turn_queue.DEAD_LETTER_STREAM) == 1
+
+    asyncio.run(run())
+
+
+def _turn(primary_key, text, ts):
+    return {
+        "primary_key": primary_key,
+        "identifiers": {"user_id": primary_key},
+        "messages": [
+            {"role": "user", "content": text, "timestamp": ts},
+            {"role": "assistant", "content": f"re: {text}", "timestamp": ts},
+        ],
+    }
+
+
+@pytest.fixture
+def bucket_store(monkeypatch):
+    # Token counts are not under test here (tiktoken is heavy)
+    monkeypatch.setattr(conversation_buckets, "count_message_tokens", len)
+    monkeypatch.setattr(conversation_buckets, "CONVERSATION_BUCKET_SIZE", 3)
+    store = ConversationBucketStore(mongomock.MongoClient().db)
+    store.redis_tail._redis_ok = False  # no Redis tail in this test
+    return store
+
+
+def test_append_turns_numbers_messages_per_conversation(bucket_store):
+    ts = datetime(2026, 1, 1)
+    first = bucket_store.append_turns(
+        [_turn("u1", "a", ts), _turn("u2", "b", ts), _turn("u1", "c", ts)]
+    )
+    second = bucket_store.append_turns([_turn("u1", "d", ts)])
+
+    assert first == [True, True, False]
+    assert second == [False]
+
+    header = bucket_store.headers.find_one({"primary_key": "u1"})
+    assert header["message_count"] == 6
+
+    buckets = list(bucket_store.buckets.find({"primary_key": "u1"}).sort("seq", 1))
+    messages = [m for bucket in buckets for m in bucket["messages"]]
+    assert [m["n"] for m in messages] == [1, 2, 3, 4, 5, 6]
+    assert [m["content"] for m in messages[::2]] == ["a", "c", "d"]
+    # Bucket size 3: messages 1-3 in seq 0, 4-6 in seq 1
+    assert [bucket["count"] for bucket in buckets] == [3, 3]
+
+
+def test_append_turns_legacy_history_is_not_a_new_user(bucket_store):
+    bucket_store.headers.insert_one(
+        {"primary_key": "u1", "messages": [{"role": "user", "content": "old"}]}
+    )
+    first = bucket_store.append_turns([_turn("u1", "a", datetime(2026, 1, 1))])
+    assert first == [False]
+
+
+
+def test_append_turns_migrated_history_is_not_a_new_user(bucket_store):
+    old = {"role": "user", "content": "old", "timestamp": datetime(2025, 1, 1)}
+    header_id = bucket_store.headers.insert_one(
+        {"primary_key": "u1", "messages": [old]}
+    ).inserted_id
+    assert bucket_store.migrate_legacy(header_id) == 1
+
+    first = bucket_store.append_turns([_turn("u1", "a", datetime(2026, 1, 1))])
+    assert first == [False]
@@ -0,0 +1,75 @@
+import mongomock
+import pytest
+
+from src.services import document_version_store
+from src.services.document_version_store import DocumentVersionStore
+
+
+def _snapshot(version: int):
+    paragraphs = [f"<p>Paragraph {i}: lorem ipsum dolor sit</p>" for i in range(40)]
+    paragraphs[version % 40] = f"<p>Edited in version {version}</p>"
+    outline = [{"title": f"Slide {i}", "v": 0} for i in range(5)]
+    outline[0]["v"] = version
+    return {
+        "content_html": "\n".join(paragraphs),
+        "slides_outline": outline,
+        "slide_backgrounds": [],
+        "slide_elements": [],
+    }
+
+
+@pytest.fixture
+def store():
+    store = DocumentVersionStore(mongomock.MongoClient().db)
+    store.create_indexes()
+    return store
+
+
+def test_delta_round_trip(store):
+    for version in range(1, 6):
+        store.put("doc1", "u1", version, _snapshot(version))
+
+    records = {r["version"]: r for r in store.versions.find({"document_id": "doc1"})}
+    assert records[1]["kind"] == "keyframe"
+    assert all(records[v]["kind"] == "delta" for v in range(2, 6))
+    assert records[3]["stored_bytes"] < records[3]["full_bytes"]
+
+    for version in range(1, 6):
+        snapshot = store.get("doc1", version)
+        expected = _snapshot(version)
+        for field in document_version_store.SNAPSHOT_FIELDS:
+            assert snapshot[field] == expected[field]
+
+    listed = store.list("doc1")
+    assert [v["version"] for v in listed] == [1, 2, 3, 4, 5]
+    assert listed[4]["content_html"] == _snapshot(5)["content_html"]
+
+
+def test_keyframe_interval(store, monkeypatch):
+    monkeypatch.setattr(document_version_store, "VERSION_KEYFRAME_INTERVAL", 3)
+    for version in range(1, 8):
+        store.put("doc1", "u1", version, _snapshot(version))
+
+    kinds = [
+        r["kind"]
+        for r in store.versions.find({"document_id": "doc1"}).sort("version", 1)
+    ]
+    assert kinds == ["keyframe", "delta", "delta"] * 2 + ["keyframe"]
+    assert store.get("doc1", 7)["content_html"] == _snapshot(7)["content_html"]
+
+
+def test_replacing_a_base_version_keeps_dependents_intact(store):
+    for version in range(1, 4):
+        store.put("doc1", "u1", version, _snapshot(version))
+
+    store.update_fields("doc1", "u1", 2, {"slides_outline": [{"title": "Rewritten"}]})
+
+    assert store.get("doc1", 2)["slides_outline"] == [{"title": "Rewritten"}]
+    assert store.get("doc1", 3)["slides_outline"] == _snapshot(3)["slides_outline"]
+    assert store.get("doc1", 3)["content_html"] == _snapshot(3)["content_html"]
+
+
+def test_missing_version(store):
+    assert store.get("doc1", 1) is None
+    assert store.latest_version("doc1") is None
+    assert store.update_fields("doc1", "u1", 1, {"content_html": "x"}) is False
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+import pytest
+
+from src.services import email_outbox
+from src.services.email_outbox import EmailOutbox
+
+
+def _messages(n: int):
+    return [
+        {
+            "to_email": f"user{i}@example.com",
+            "subject": f"Subject {i}",
+            "html_body": f"<p>Body {i}</p>",
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def outbox():
+    outbox = EmailOutbox(mongomock.MongoClient().db)
+    outbox.create_indexes()
+    return outbox
+
+
+def _expire_leases(outbox):
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    outbox.jobs.update_many({"status": "sending"}, {"$set": {"lease_until": past}})
+
+
+def _make_due(outbox):
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    outbox.jobs.update_many({"status": "pending"}, {"$set": {"next_attempt_at": past}})
+
+
+def test_claim_leases_each_job_once(outbox):
+    assert outbox.enqueue(_messages(5), category="test_invitation") == 5
+
+    first = outbox.claim_batch("worker_a", limit=3)
+    second = outbox.claim_batch("worker_b", limit=10)
+
+    assert len(first) == 3 and len(second) == 2
+    assert {job["_id"] for job in first}.isdisjoint(job["_id"] for job in second)
+    assert all(job["attempts"] == 1 for job in first + second)
+    assert outbox.claim_batch("worker_c", limit=10) == []
+
+    outbox.mark_sent([job["_id"] for job in first + second])
+    assert outbox.stats() == {"pending": 0, "sending": 0, "sent": 5, "dead": 0}
+
+
+def test_expired_lease_is_claimed_again(outbox):
+    outbox.enqueue(_messages(2))
+    claimed = outbox.claim_batch("crashed_worker", limit=10)
+    assert outbox.claim_batch("worker_b", limit=10) == []
+
+    _expire_leases(outbox)
+    reclaimed = outbox.claim_batch("worker_b", limit=10)
+
+    assert {job["_id"] for job in reclaimed} == {job["_id"] for job in claimed}
+    assert all(job["lease_owner"] == "worker_b" for job in reclaimed)
+    assert all(job["attempts"] == 2 for job in reclaimed)
+
+
+def test_failures_back_off_then_go_dead(outbox, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 3)
+    outbox.enqueue(_messages(1))
+
+    delays = []
+    for attempt in range(1, 4):
+        _make_due(outbox)
+        (job,) = outbox.claim_batch("worker_a", limit=10)
+        assert job["attempts"] == attempt
+        before = datetime.now(timezone.utc).replace(tzinfo=None)
+        outbox.mark_failed([job], "Brevo 500")
+        stored = outbox.jobs.find_one({"_id": job["_id"]})
+        if stored["status"] == "pending":
+            delays.append((stored["next_attempt_at"] - before).total_seconds())
+            assert outbox.claim_batch("worker_a", limit=10) == []  # not due yet
+
+    base = email_outbox.EMAIL_RETRY_BASE_SECONDS
+    assert [round(d) for d in delays] == [round(base), round(base * 2)]
+    assert stored["status"] == "dead"
+    assert stored["last_error"] == "Brevo 500"
+    assert "lease_owner" not in stored
+
+
+def test_release_does_not_count_an_attempt(outbox):
+    outbox.enqueue(_messages(1))
+    jobs = outbox.claim_batch("worker_a", limit=10)
+
+    outbox.release(jobs, delay_seconds=0)
+    _make_due(outbox)
+    (job,) = outbox.claim_batch("worker_a", limit=10)
+
+    assert job["attempts"] == 1
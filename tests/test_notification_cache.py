@@ -0,0 +1,107 @@
+import time
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+from src.services import notification_cache
+from src.services.notification_cache import NotificationCache
+
+UNREAD = "notif:unread:u1"
+FEED = "notif:feed:u1"
+
+
+def _notification(i: int, is_read: bool = False):
+    return {
+        "notification_id": f"n{i}",
+        "title": f"Notification {i}",
+        "is_read": is_read,
+        "created_at": datetime(2026, 1, 1, 0, i),
+    }
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def cache(redis_client):
+    cache = NotificationCache(redis_url="redis://test")
+    cache._redis = redis_client
+    cache._created = redis_client.register_script(notification_cache._CREATED_SCRIPT)
+    cache._decrement = redis_client.register_script(
+        notification_cache._DECREMENT_SCRIPT
+    )
+    return cache
+
+
+def test_counters_only_change_once_cached(cache, redis_client):
+    # Nothing cached yet: the write only bumps the generation
+    cache.on_created("u1", [_notification(1)], unread=1)
+    assert redis_client.get(UNREAD) is None
+    assert redis_client.get("notif:gen:u1") == "1"
+
+    assert cache.unread_count("u1", loader=lambda: 1) == 1
+    cache.on_created("u1", [_notification(2), _notification(3)], unread=2)
+    assert cache.unread_count("u1", loader=lambda: pytest.fail("cached")) == 3
+
+    cache.on_read("u1", 5, datetime(2026, 1, 2))
+    assert redis_client.get(UNREAD) == "0"  # never below zero
+
+
+def test_feed_is_updated_in_place(cache, redis_client):
+    loaded = [_notification(2), _notification(1)]
+    page = cache.feed("u1", loader=lambda n: loaded[:n], limit=10)
+    assert [n["notification_id"] for n in page] == ["n2", "n1"]
+
+    cache.on_created("u1", [_notification(3)], unread=1)
+    cache.on_read("u1", 1, datetime(2026, 1, 2), notification_id="n2")
+    page = cache.feed("u1", loader=lambda n: pytest.fail("cached"), limit=10)
+    assert [n["notification_id"] for n in page] == ["n3", "n2", "n1"]
+    assert [n["is_read"] for n in page] == [False, True, False]
+    assert page[0]["created_at"] == datetime(2026, 1, 1, 0, 3)
+
+    unread = cache.feed("u1", loader=lambda n: [], is_read=False, limit=10)
+    assert [n["notification_id"] for n in unread] == ["n3", "n1"]
+
+    cache.on_deleted("u1", was_unread=False)
+    assert not redis_client.exists(FEED)
+
+
+def test_rebuild_skipped_when_a_write_races(cache, redis_client):
+    def loader():
+        # A write lands while MongoDB is being read
+        cache.on_created("u1", [_notification(1)], unread=1)
+        return 7
+
+    assert cache.unread_count("u1", loader=loader) == 7
+    assert redis_client.get(UNREAD) is None  # stale value not cached
+
+
+def test_writes_during_backoff_invalidate(cache, redis_client):
+    cache.unread_count("u1", loader=lambda: 4)
+    cache._retry_at = time.monotonic() + 30  # a previous call failed
+
+    cache.on_created("u1", [_notification(1)], unread=1)
+
+    assert redis_client.get(UNREAD) is None
+    assert cache._dirty == set()
+
+
+def test_failed_invalidation_is_retried_on_recovery(cache, redis_client, monkeypatch):
+    cache.unread_count("u1", loader=lambda: 4)
+
+    def unavailable(client, user_ids):
+        raise ConnectionError("Redis down")
+
+    monkeypatch.setattr(cache, "_delete_keys", unavailable)
+    cache._retry_at = time.monotonic() + 30
+    cache.on_deleted("u1", was_unread=True)
+    assert cache._dirty == {"u1"}
+    assert redis_client.get(UNREAD) == "4"
+
+    monkeypatch.undo()
+    cache._retry_at = 0.0
+    assert cache.unread_count("u1", loader=lambda: 3) == 3
+    assert cache._dirty == set()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from src.utils import pagination
+from src.utils.pagination import (
+    InvalidCursorError,
+    cached_count,
+    invalidate_counts,
+    keyset_page,
+)
+
+
+@pytest.fixture
+def documents():
+    collection = mongomock.MongoClient().db.documents
+    start = datetime(2026, 1, 1)
+    docs = []
+    for i in range(23):
+        # Ties every 3 rows and a few rows without the sort key
+        opened = None if i % 7 == 0 else start + timedelta(hours=i // 3)
+        docs.append(
+            {
+                "document_id": f"d{i:02d}",
+                "user_id": "u1",
+                "last_opened_at": opened,
+                "content_html": "<p>" + "x" * 1000 + "</p>",
+            }
+        )
+    docs.append({"document_id": "other", "user_id": "u2", "last_opened_at": start})
+    collection.insert_many(docs)
+    return collection
+
+
+def _walk(collection, sort, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        items, cursor = keyset_page(
+            collection,
+            {"user_id": "u1"},
+            sort=sort,
+            projection={"document_id": 1, "_id": 0},
+            limit=limit,
+            cursor=cursor,
+        )
+        pages += 1
+        seen.extend(items)
+        if cursor is None:
+            return seen, pages
+
+
+@pytest.mark.parametrize("direction", [-1, 1])
+def test_cursor_walk_matches_offset_order(documents, direction):
+    sort = [("last_opened_at", direction)]
+    expected = [
+        d["document_id"]
+        for d in documents.find({"user_id": "u1"}).sort(
+            [("last_opened_at", direction), ("_id", direction)]
+        )
+    ]
+
+    seen, pages = _walk(documents, sort, limit=5)
+
+    assert [d["document_id"] for d in seen] == expected
+    assert pages == 5
+    # List projection: no content, no _id, but the sort key is added for the cursor
+    assert all("content_html" not in d and "_id" not in d for d in seen)
+    assert all("last_opened_at" in d for d in seen)
+
+
+def test_cursor_for_another_sort_is_rejected(documents):
+    _, cursor = keyset_page(
+        documents,
+        {"user_id": "u1"},
+        sort=[("last_opened_at", -1)],
+        projection={"document_id": 1},
+        limit=5,
+    )
+    with pytest.raises(InvalidCursorError):
+        keyset_page(
+            documents,
+            {"user_id": "u1"},
+            sort=[("document_id", 1)],
+            projection={"document_id": 1},
+            limit=5,
+            cursor=cursor,
+        )
+    with pytest.raises(InvalidCursorError):
+        keyset_page(
+            documents,
+            {"user_id": "u1"},
+            sort=[("last_opened_at", -1)],
+            projection={"document_id": 1},
+            limit=5,
+            cursor="not-a-cursor",
+        )
+
+
+def test_cached_count_until_invalidated(documents, monkeypatch):
+    monkeypatch.setattr(pagination, "_count_cache", {})
+    assert cached_count(documents, {"user_id": "u1"}) == 23
+
+    documents.insert_one({"document_id": "new", "user_id": "u1"})
+    assert cached_count(documents, {"user_id": "u1"}) == 23  # within the TTL
+
+    invalidate_counts(documents)
+    assert cached_count(documents, {"user_id": "u1"}) == 24
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.services import r2_object_cache
+from src.services.r2_object_cache import R2ObjectCache, key_from_url
+
+
+class FakeClientError(Exception):
+    """botocore ClientError shape: .response with Error.Code / HTTP status"""
+
+    def __init__(self, code: str, status: int):
+        super().__init__(code)
+        self.response = {
+            "Error": {"Code": code},
+            "ResponseMetadata": {"HTTPStatusCode": status},
+        }
+
+
+class FakeBody:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i : i + chunk_size]
+
+
+class FakeS3:
+    """get_object with If-None-Match support and call recording"""
+
+    def __init__(self, delay: float = 0.0):
+        self.objects = {}
+        self.calls = []
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def put(self, key: str, data: bytes):
+        self.objects[key] = (data, hashlib.md5(data).hexdigest())
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        with self._lock:
+            self.calls.append((Key, IfNoneMatch))
+        time.sleep(self.delay)
+        if Key not in self.objects:
+            raise FakeClientError("NoSuchKey", 404)
+        data, etag = self.objects[Key]
+        if IfNoneMatch == f'"{etag}"':
+            raise FakeClientError("304", 304)
+        return {"Body": FakeBody(data), "ETag": f'"{etag}"'}
+
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+
+@pytest.fixture
+def cache(tmp_path, s3):
+    return R2ObjectCache(
+        cache_dir=str(tmp_path), s3_client=s3, bucket="wordai", max_bytes=10_000
+    )
+
+
+def test_fresh_entry_is_served_without_asking_r2(cache, s3):
+    s3.put("users/u1/logo.png", b"logo")
+
+    assert cache.read_bytes("users/u1/logo.png") == b"logo"
+    assert cache.read_bytes("users/u1/logo.png") == b"logo"
+
+    assert s3.calls == [("users/u1/logo.png", None)]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["revalidated"]) == (1, 1, 0)
+
+
+def test_unchanged_object_revalidates_with_304(cache, s3, monkeypatch):
+    s3.put("logo.png", b"logo")
+    path = cache.fetch("logo.png")
+
+    monkeypatch.setattr(r2_object_cache, "R2_OBJECT_CACHE_REVALIDATE_SECONDS", 0)
+    assert cache.fetch("logo.png") == path
+
+    etag = s3.objects["logo.png"][1]
+    assert s3.calls[-1] == ("logo.png", f'"{etag}"')
+    stats = cache.stats()
+    assert stats["revalidated"] == 1
+    assert stats["bytes_downloaded"] == 4 and stats["bytes_saved"] == 4
+
+
+def test_changed_object_is_downloaded_again(cache, s3, monkeypatch):
+    s3.put("logo.png", b"old")
+    old_path = cache.fetch("logo.png")
+
+    s3.put("logo.png", b"new logo")
+    monkeypatch.setattr(r2_object_cache, "R2_OBJECT_CACHE_REVALIDATE_SECONDS", 0)
+
+    assert cache.read_bytes("logo.png") == b"new logo"
+    # The old blob stays readable for whoever still holds its path
+    assert Path(old_path).read_bytes() == b"old"
+
+    # ... until LRU eviction drops it once it is no longer pinned
+    monkeypatch.setattr(r2_object_cache, "R2_OBJECT_CACHE_PIN_SECONDS", -1)
+    assert cache.prune(10) == 1
+    assert not Path(old_path).exists()
+    assert cache.read_bytes("logo.png") == b"new logo"
+
+
+def test_concurrent_misses_download_once(tmp_path):
+    s3 = FakeS3(delay=0.05)
+    s3.put("book.pdf", b"x" * 5000)
+    cache = R2ObjectCache(cache_dir=str(tmp_path), s3_client=s3, bucket="wordai")
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.read_bytes("book.pdf")))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b"x" * 5000] * 6
+    assert len(s3.calls) == 1
+
+
+def test_missing_object_raises(cache):
+    with pytest.raises(FakeClientError):
+        cache.fetch("missing.png")
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_keeps_pinned_entries(cache, s3, monkeypatch):
+    for i in range(3):
+        s3.put(f"k{i}", bytes([i]) * 4000)
+    cache.fetch("k0")
+    cache.fetch("k1")
+
+    # Everything pinned: over budget, but nothing can go
+    cache.fetch("k2")
+    assert cache.stats()["entries"] == 3
+
+    monkeypatch.setattr(r2_object_cache, "R2_OBJECT_CACHE_PIN_SECONDS", -1)
+    assert cache.prune(cache.max_bytes) == 1
+    assert cache.stats()["size_bytes"] <= 10_000
+    assert cache.read_bytes("k2") == bytes([2]) * 4000
+    assert len(s3.calls) == 3  # k2 was still cached
+
+
+def test_key_from_url():
+    base = "https://static.wordai.pro"
+    assert key_from_url(f"{base}/books/a%20b.pdf?verify=1", base) == "books/a b.pdf"
+    assert key_from_url("https://other.example/books/a.pdf", base) is None
+    assert key_from_url(f"{base}/", base) is None
+    assert key_from_url(None, base) is None